@@ -0,0 +1,104 @@
+"""add row versions to players, teams and player_match_stats
+
+version is the id of the last transaction that changed the row, set by a
+BEFORE trigger (updates that change nothing keep it). A client that
+remembers pg_snapshot_xmin() of the snapshot it read can ask for rows
+with version >= that value and gets every change committed since,
+including transactions that were still in flight at the time.
+player_removals records the old team and league of players that moved
+or were deleted, so such deltas can drop them too (app.players.compact).
+
+Existing rows keep version 0.
+
+Revision ID: a0b9c8d7e6f5
+Revises: f9a8b7c6d5e4
+Create Date: 2026-10-26 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a0b9c8d7e6f5'
+down_revision: Union[str, Sequence[str], None] = 'f9a8b7c6d5e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('players', 'teams', 'player_match_stats')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in VERSIONED_TABLES:
+        # constant default: no table rewrite, partitions get the column too
+        op.add_column(table, sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index(
+        'ix_player_match_stats_league_id_version', 'player_match_stats', ['league_id', 'version'], unique=False
+    )
+
+    op.create_table(
+        'player_removals',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_player_removals_league_id_version', 'player_removals', ['league_id', 'version'], unique=False)
+    op.create_index('ix_player_removals_team_id_version', 'player_removals', ['team_id', 'version'], unique=False)
+
+    op.execute("""
+        CREATE FUNCTION set_row_version() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.version := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END $$
+    """)
+    for table in VERSIONED_TABLES:
+        # on a partitioned table the triggers are cloned to every (future) partition
+        op.execute(
+            f"CREATE TRIGGER {table}_insert_version BEFORE INSERT ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION set_row_version()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_update_version BEFORE UPDATE ON {table} "
+            f"FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION set_row_version()"
+        )
+
+    op.execute("""
+        CREATE FUNCTION record_player_removal() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' OR OLD.team_id <> NEW.team_id OR OLD.league_id <> NEW.league_id THEN
+                INSERT INTO player_removals (player_id, team_id, league_id, version)
+                VALUES (OLD.id, OLD.team_id, OLD.league_id, pg_current_xact_id()::text::bigint);
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    op.execute(
+        "CREATE TRIGGER players_record_removal AFTER DELETE OR UPDATE OF team_id, league_id ON players "
+        "FOR EACH ROW EXECUTE FUNCTION record_player_removal()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER players_record_removal ON players")
+    op.execute("DROP FUNCTION record_player_removal()")
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_update_version ON {table}")
+        op.execute(f"DROP TRIGGER {table}_insert_version ON {table}")
+    op.execute("DROP FUNCTION set_row_version()")
+
+    op.drop_index('ix_player_removals_team_id_version', table_name='player_removals')
+    op.drop_index('ix_player_removals_league_id_version', table_name='player_removals')
+    op.drop_table('player_removals')
+    op.drop_index('ix_player_match_stats_league_id_version', table_name='player_match_stats')
+    for table in VERSIONED_TABLES:
+        op.drop_column(table, 'version')
@@ -0,0 +1,63 @@
+"""add batch_jobs and batch_partitions
+
+Work queue for whole-tour operations (finalize_match, start_tour,
+finalize_tour) split into squad_id range partitions; see app.batch.runner.
+
+Revision ID: a3f2e1d0c9b8
+Revises: f4e3d2c1b0a9
+Create Date: 2026-10-20 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f2e1d0c9b8'
+down_revision: Union[str, Sequence[str], None] = 'f4e3d2c1b0a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'batch_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.SmallInteger(), nullable=False),
+        sa.Column('target_id', sa.BigInteger(), nullable=False),
+        sa.Column('status', sa.SmallInteger(), server_default='0', nullable=False),
+        sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('partitions_total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('uq_batch_jobs_operation_target_id', 'batch_jobs', ['operation', 'target_id'], unique=True)
+    op.create_table(
+        'batch_partitions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('squad_id_from', sa.BigInteger(), nullable=False),
+        sa.Column('squad_id_to', sa.BigInteger(), nullable=True),
+        sa.Column('status', sa.SmallInteger(), server_default='0', nullable=False),
+        sa.Column('attempts', sa.SmallInteger(), server_default='0', nullable=False),
+        sa.Column('stats', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['batch_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_batch_partitions_job_id_status', 'batch_partitions', ['job_id', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_batch_partitions_job_id_status', table_name='batch_partitions')
+    op.drop_table('batch_partitions')
+    op.drop_index('uq_batch_jobs_operation_target_id', table_name='batch_jobs')
+    op.drop_table('batch_jobs')
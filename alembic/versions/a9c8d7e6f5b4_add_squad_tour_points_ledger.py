@@ -0,0 +1,48 @@
+"""add squad_tour_points_ledger
+
+Per-player contributions to squad tour points, written in bulk when a
+match is finalized or re-scored.
+
+Revision ID: a9c8d7e6f5b4
+Revises: f2b3c4d5e6a7
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c8d7e6f5b4'
+down_revision: Union[str, Sequence[str], None] = 'f2b3c4d5e6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'squad_tour_points_ledger',
+        sa.Column('squad_tour_id', sa.Integer(), nullable=False),
+        sa.Column('match_id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('base_points', sa.SmallInteger(), nullable=False),
+        sa.Column('multiplier', sa.SmallInteger(), nullable=False),
+        sa.Column('reason', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['squad_tour_id'], ['squad_tours.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['match_id'], ['matches.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('squad_tour_id', 'match_id', 'player_id'),
+    )
+    op.create_index(
+        'ix_squad_tour_points_ledger_match_id',
+        'squad_tour_points_ledger',
+        ['match_id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_squad_tour_points_ledger_match_id', table_name='squad_tour_points_ledger')
+    op.drop_table('squad_tour_points_ledger')
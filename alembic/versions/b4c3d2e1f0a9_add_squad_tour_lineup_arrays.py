@@ -0,0 +1,31 @@
+"""add lineup arrays to squad_tours (superseded, no-op)
+
+This revision used to add main_player_ids / bench_player_ids int[]
+columns with GIN indexes to squad_tours. The next revision, c5d4e3f2a1b0,
+moved lineups to lineup_versions and dropped those columns again, so a
+fresh upgrade rewrote squad_tours twice for nothing. The revision is kept
+so existing revision chains stay valid; c5d4e3f2a1b0 backfills from the
+lineup tables, or from the arrays on databases that already applied the
+old version of this revision.
+
+Revision ID: b4c3d2e1f0a9
+Revises: a3f2e1d0c9b8
+Create Date: 2026-10-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c3d2e1f0a9'
+down_revision: Union[str, Sequence[str], None] = 'a3f2e1d0c9b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
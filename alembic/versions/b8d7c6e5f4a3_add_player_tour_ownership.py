@@ -0,0 +1,58 @@
+"""add player_tour_ownership
+
+Per-tour counters of how many squads picked a player as a starter, on the
+bench and as captain. Backfilled from the lineup tables.
+
+Revision ID: b8d7c6e5f4a3
+Revises: a9c8d7e6f5b4
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d7c6e5f4a3'
+down_revision: Union[str, Sequence[str], None] = 'a9c8d7e6f5b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'player_tour_ownership',
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('tour_id', sa.Integer(), nullable=False),
+        sa.Column('starters', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('bench', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('captains', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['player_id'], ['players.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tour_id'], ['tours.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('player_id', 'tour_id'),
+    )
+    op.create_index('ix_player_tour_ownership_tour_id', 'player_tour_ownership', ['tour_id'])
+    op.execute("""
+        INSERT INTO player_tour_ownership (player_id, tour_id, starters, bench, captains)
+        SELECT player_id, tour_id, sum(starters), sum(bench), sum(captains)
+        FROM (
+            SELECT p.player_id, st.tour_id, 1 AS starters, 0 AS bench, 0 AS captains
+            FROM squad_tour_players p JOIN squad_tours st ON st.id = p.squad_tour_id
+            UNION ALL
+            SELECT b.player_id, st.tour_id, 0, 1, 0
+            FROM squad_tour_bench_players b JOIN squad_tours st ON st.id = b.squad_tour_id
+            UNION ALL
+            SELECT st.captain_id, st.tour_id, 0, 0, 1
+            FROM squad_tours st WHERE st.captain_id IS NOT NULL
+        ) lineups
+        GROUP BY player_id, tour_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_player_tour_ownership_tour_id', table_name='player_tour_ownership')
+    op.drop_table('player_tour_ownership')
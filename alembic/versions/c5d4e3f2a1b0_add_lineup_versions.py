@@ -0,0 +1,119 @@
+"""add lineup_versions
+
+Immutable, content-hashed lineups. squad_tours points to one through
+lineup_version_id; identical lineups share a version. The hash is md5 of
+"main ids|bench ids", both sorted and comma-separated, the same as
+app.squad_tours.lineup.lineup_hash.
+
+Versions are backfilled from squad_tour_players / squad_tour_bench_players.
+Databases that applied the old b4c3d2e1f0a9 carry main_player_ids /
+bench_player_ids arrays on squad_tours instead (lineups written with
+LINEUP_STORAGE = "arrays" exist only there); those are backfilled from the
+arrays, which are then dropped.
+
+Revision ID: c5d4e3f2a1b0
+Revises: b4c3d2e1f0a9
+Create Date: 2026-10-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d4e3f2a1b0'
+down_revision: Union[str, Sequence[str], None] = 'b4c3d2e1f0a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'lineup_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lineup_hash', sa.LargeBinary(), nullable=False),
+        sa.Column('main_player_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('bench_player_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('uq_lineup_versions_lineup_hash', 'lineup_versions', ['lineup_hash'], unique=True)
+    op.add_column('squad_tours', sa.Column('lineup_version_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'squad_tours_lineup_version_id_fkey', 'squad_tours', 'lineup_versions',
+        ['lineup_version_id'], ['id'],
+    )
+    conn = op.get_bind()
+    has_arrays = 'main_player_ids' in {column['name'] for column in sa.inspect(conn).get_columns('squad_tours')}
+    if has_arrays:
+        lineups = """
+            SELECT id,
+                   ARRAY(SELECT unnest(main_player_ids) ORDER BY 1) AS main_ids,
+                   ARRAY(SELECT unnest(bench_player_ids) ORDER BY 1) AS bench_ids
+            FROM squad_tours
+        """
+    else:
+        lineups = """
+            SELECT st.id,
+                   ARRAY(SELECT p.player_id FROM squad_tour_players p
+                         WHERE p.squad_tour_id = st.id ORDER BY 1) AS main_ids,
+                   ARRAY(SELECT b.player_id FROM squad_tour_bench_players b
+                         WHERE b.squad_tour_id = st.id ORDER BY 1) AS bench_ids
+            FROM squad_tours st
+        """
+    op.execute(f"""
+        WITH lineups AS ({lineups}), hashed AS (
+            SELECT id, main_ids, bench_ids,
+                   decode(md5(array_to_string(main_ids, ',') || '|' || array_to_string(bench_ids, ',')), 'hex')
+                       AS lineup_hash
+            FROM lineups
+        ), versions AS (
+            INSERT INTO lineup_versions (lineup_hash, main_player_ids, bench_player_ids)
+            SELECT DISTINCT ON (lineup_hash) lineup_hash, main_ids, bench_ids FROM hashed
+            RETURNING id, lineup_hash
+        )
+        UPDATE squad_tours st
+        SET lineup_version_id = v.id
+        FROM hashed h JOIN versions v ON v.lineup_hash = h.lineup_hash
+        WHERE st.id = h.id
+    """)
+    op.create_index('ix_squad_tours_lineup_version_id', 'squad_tours', ['lineup_version_id'])
+    op.create_index(
+        'ix_lineup_versions_main_player_ids', 'lineup_versions', ['main_player_ids'], postgresql_using='gin'
+    )
+    op.create_index(
+        'ix_lineup_versions_bench_player_ids', 'lineup_versions', ['bench_player_ids'], postgresql_using='gin'
+    )
+    if has_arrays:
+        op.drop_index('ix_squad_tours_bench_player_ids', table_name='squad_tours')
+        op.drop_index('ix_squad_tours_main_player_ids', table_name='squad_tours')
+        op.drop_column('squad_tours', 'bench_player_ids')
+        op.drop_column('squad_tours', 'main_player_ids')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # составы, записанные при LINEUP_STORAGE = "arrays", есть только в lineup_versions
+    op.execute("""
+        INSERT INTO squad_tour_players (squad_tour_id, player_id)
+        SELECT st.id, unnest(v.main_player_ids)
+        FROM squad_tours st JOIN lineup_versions v ON v.id = st.lineup_version_id
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        INSERT INTO squad_tour_bench_players (squad_tour_id, player_id)
+        SELECT st.id, unnest(v.bench_player_ids)
+        FROM squad_tours st JOIN lineup_versions v ON v.id = st.lineup_version_id
+        ON CONFLICT DO NOTHING
+    """)
+    op.drop_index('ix_squad_tours_lineup_version_id', table_name='squad_tours')
+    op.drop_constraint('squad_tours_lineup_version_id_fkey', 'squad_tours', type_='foreignkey')
+    op.drop_column('squad_tours', 'lineup_version_id')
+    op.drop_index('ix_lineup_versions_bench_player_ids', table_name='lineup_versions')
+    op.drop_index('ix_lineup_versions_main_player_ids', table_name='lineup_versions')
+    op.drop_index('uq_lineup_versions_lineup_hash', table_name='lineup_versions')
+    op.drop_table('lineup_versions')
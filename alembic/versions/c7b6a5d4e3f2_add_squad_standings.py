@@ -0,0 +1,58 @@
+"""add squad_standings
+
+Per-squad total net points over finalized tours and the league rank,
+used for "your place" on the league main page. Backfilled with RANK().
+
+Revision ID: c7b6a5d4e3f2
+Revises: b8d7c6e5f4a3
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7b6a5d4e3f2'
+down_revision: Union[str, Sequence[str], None] = 'b8d7c6e5f4a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'squad_standings',
+        sa.Column('squad_id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('total_net_points', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('place', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['squad_id'], ['squads.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('squad_id'),
+    )
+    op.create_index(
+        'ix_squad_standings_league_id_total_net_points',
+        'squad_standings',
+        ['league_id', 'total_net_points'],
+    )
+    op.execute("""
+        INSERT INTO squad_standings (squad_id, league_id, total_net_points, place)
+        SELECT s.id, s.league_id, coalesce(t.net, 0),
+               rank() OVER (PARTITION BY s.league_id ORDER BY coalesce(t.net, 0) DESC)
+        FROM squads s
+        LEFT JOIN (
+            SELECT squad_id, sum(points - penalty_points) AS net
+            FROM squad_tours
+            WHERE is_finalized
+            GROUP BY squad_id
+        ) t ON t.squad_id = s.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_squad_standings_league_id_total_net_points', table_name='squad_standings')
+    op.drop_table('squad_standings')
@@ -0,0 +1,97 @@
+"""add squad_tour_ranks
+
+Place of every squad after every finalized tour: in the league, among
+fans of its favourite club and in each of its user / commercial leagues
+(parallel id/place arrays). Backfilled for the finalized tours with
+cumulative net points.
+
+Revision ID: d6c5b4a3f2e1
+Revises: c7b6a5d4e3f2
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6c5b4a3f2e1'
+down_revision: Union[str, Sequence[str], None] = 'c7b6a5d4e3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'squad_tour_ranks',
+        sa.Column('tour_id', sa.Integer(), nullable=False),
+        sa.Column('squad_id', sa.Integer(), nullable=False),
+        sa.Column('total_net_points', sa.Integer(), nullable=False),
+        sa.Column('league_place', sa.Integer(), nullable=False),
+        sa.Column('club_place', sa.Integer(), nullable=False),
+        sa.Column('user_league_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+        sa.Column('user_league_places', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+        sa.Column('commercial_league_ids', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+        sa.Column('commercial_league_places', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+        sa.ForeignKeyConstraint(['tour_id'], ['tours.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['squad_id'], ['squads.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('tour_id', 'squad_id'),
+    )
+    op.create_index('ix_squad_tour_ranks_squad_id_tour_id', 'squad_tour_ranks', ['squad_id', 'tour_id'])
+    op.execute("""
+        WITH totals AS (
+            SELECT s.id AS squad_id, s.fav_team_id, t.id AS tour_id,
+                   sum(coalesce(st.points - st.penalty_points, 0))
+                       OVER (PARTITION BY s.id ORDER BY t.number) AS net
+            FROM squads s
+            JOIN tours t ON t.league_id = s.league_id AND t.is_finalized
+            LEFT JOIN squad_tours st
+                ON st.squad_id = s.id AND st.tour_id = t.id AND st.is_finalized
+        ),
+        user_league_places AS (
+            SELECT tour_id, squad_id,
+                   array_agg(user_league_id ORDER BY user_league_id) AS ids,
+                   array_agg(place ORDER BY user_league_id) AS places
+            FROM (
+                SELECT totals.tour_id, totals.squad_id, uls.user_league_id,
+                       rank() OVER (PARTITION BY totals.tour_id, uls.user_league_id
+                                    ORDER BY totals.net DESC) AS place
+                FROM totals JOIN user_league_squads uls ON uls.squad_id = totals.squad_id
+            ) ranked
+            GROUP BY tour_id, squad_id
+        ),
+        commercial_league_places AS (
+            SELECT tour_id, squad_id,
+                   array_agg(commercial_league_id ORDER BY commercial_league_id) AS ids,
+                   array_agg(place ORDER BY commercial_league_id) AS places
+            FROM (
+                SELECT totals.tour_id, totals.squad_id, cls.commercial_league_id,
+                       rank() OVER (PARTITION BY totals.tour_id, cls.commercial_league_id
+                                    ORDER BY totals.net DESC) AS place
+                FROM totals JOIN commercial_league_squads cls ON cls.squad_id = totals.squad_id
+            ) ranked
+            GROUP BY tour_id, squad_id
+        )
+        INSERT INTO squad_tour_ranks (
+            tour_id, squad_id, total_net_points, league_place, club_place,
+            user_league_ids, user_league_places, commercial_league_ids, commercial_league_places
+        )
+        SELECT totals.tour_id, totals.squad_id, totals.net,
+               rank() OVER (PARTITION BY totals.tour_id ORDER BY totals.net DESC),
+               rank() OVER (PARTITION BY totals.tour_id, totals.fav_team_id ORDER BY totals.net DESC),
+               coalesce(ul.ids, '{}'), coalesce(ul.places, '{}'),
+               coalesce(cl.ids, '{}'), coalesce(cl.places, '{}')
+        FROM totals
+        LEFT JOIN user_league_places ul ON ul.tour_id = totals.tour_id AND ul.squad_id = totals.squad_id
+        LEFT JOIN commercial_league_places cl ON cl.tour_id = totals.tour_id AND cl.squad_id = totals.squad_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_squad_tour_ranks_squad_id_tour_id', table_name='squad_tour_ranks')
+    op.drop_table('squad_tour_ranks')
@@ -0,0 +1,41 @@
+"""add users.referrals_count
+
+Counter of users invited by a user, maintained together with referrer_id.
+Backfilled from users.referrer_id.
+
+Revision ID: e5d4c3b2a1f0
+Revises: d6c5b4a3f2e1
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d4c3b2a1f0'
+down_revision: Union[str, Sequence[str], None] = 'd6c5b4a3f2e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('referrals_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE users SET referrals_count = referrals.n
+        FROM (
+            SELECT referrer_id, count(*) AS n
+            FROM users
+            WHERE referrer_id IS NOT NULL
+            GROUP BY referrer_id
+        ) referrals
+        WHERE users.id = referrals.referrer_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'referrals_count')
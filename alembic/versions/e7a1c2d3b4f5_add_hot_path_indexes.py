@@ -0,0 +1,112 @@
+"""add indexes for hot query paths
+
+Merges the open heads and adds indexes for the filters used by tour
+finalization, leaderboards, player pages and referrals. Indexes are built
+with CREATE INDEX CONCURRENTLY so production tables stay writable.
+
+Revision ID: e7a1c2d3b4f5
+Revises: g8h9i0j1k2l3, dd44ee55ff66, d3e4f5a6b7c8, d4e5f6g7h8i9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a1c2d3b4f5'
+down_revision: Union[str, Sequence[str], None] = (
+    'g8h9i0j1k2l3',
+    'dd44ee55ff66',
+    'd3e4f5a6b7c8',
+    'd4e5f6g7h8i9',
+)
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('ix_squad_tours_tour_id', 'squad_tours', ['tour_id'], False),
+    ('uq_squad_tours_squad_id_tour_id', 'squad_tours', ['squad_id', 'tour_id'], True),
+    ('ix_player_match_stats_player_id', 'player_match_stats', ['player_id'], False),
+    ('uq_player_match_stats_match_id_player_id', 'player_match_stats', ['match_id', 'player_id'], True),
+    ('ix_matches_tour_id', 'matches', ['tour_id'], False),
+    ('uq_squads_league_id_user_id', 'squads', ['league_id', 'user_id'], True),
+    ('ix_squads_fav_team_id', 'squads', ['fav_team_id'], False),
+    ('ix_users_referrer_id_registration_date', 'users', ['referrer_id', 'registration_date', 'id'], False),
+    ('ix_squad_tour_players_player_id', 'squad_tour_players', ['player_id', 'squad_tour_id'], False),
+    ('ix_squad_tour_bench_players_player_id', 'squad_tour_bench_players', ['player_id', 'squad_tour_id'], False),
+    ('ix_user_league_squads_user_league_id', 'user_league_squads', ['user_league_id', 'squad_id'], False),
+    ('ix_commercial_league_squads_commercial_league_id', 'commercial_league_squads', ['commercial_league_id', 'squad_id'], False),
+]
+
+# Covered by a leading prefix of one of the indexes above
+REDUNDANT = [
+    ('ix_users_referrer_id', 'users', ['referrer_id']),
+]
+
+
+def _check_no_duplicates(conn) -> None:
+    """Fail early with a readable message instead of an invalid unique index."""
+    for name, table, columns, unique in INDEXES:
+        if not unique:
+            continue
+        cols = ', '.join(columns)
+        duplicates = conn.execute(
+            sa.text(
+                f"SELECT {cols}, count(*) FROM {table} "
+                f"GROUP BY {cols} HAVING count(*) > 1 LIMIT 5"
+            )
+        ).fetchall()
+        if duplicates:
+            raise RuntimeError(
+                f"Cannot create unique index {name}: duplicate ({cols}) rows "
+                f"in {table}, e.g. {[tuple(row) for row in duplicates]}"
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _check_no_duplicates(op.get_bind())
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=unique,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _columns in REDUNDANT:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _columns, _unique in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,42 @@
+"""add league_archives
+
+Registry of finished leagues exported to Parquet by app.archives.export:
+archive path, manifest with per-table row counts and checksums, and
+trimmed_at once the rows are removed from the hot tables.
+
+Revision ID: e8f7a6b5c4d3
+Revises: d7e6f5a4b3c2
+Create Date: 2026-10-24 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8f7a6b5c4d3'
+down_revision: Union[str, Sequence[str], None] = 'd7e6f5a4b3c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'league_archives',
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('manifest', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('exported_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('trimmed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('league_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('league_archives')
@@ -0,0 +1,56 @@
+"""add match_scorings
+
+Per-match record of the player points already added to squad tours, used
+to re-score finished matches idempotently after stat corrections.
+Already finished matches are backfilled from their current stats.
+
+Revision ID: f2b3c4d5e6a7
+Revises: e7a1c2d3b4f5
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b3c4d5e6a7'
+down_revision: Union[str, Sequence[str], None] = 'e7a1c2d3b4f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'match_scorings',
+        sa.Column('match_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('player_points', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('scored_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['match_id'], ['matches.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('match_id'),
+    )
+    op.execute("""
+        INSERT INTO match_scorings (match_id, version, player_points, scored_at)
+        SELECT m.id,
+               1,
+               COALESCE(
+                   jsonb_object_agg(pms.player_id::text, COALESCE(pms.points, 0))
+                       FILTER (WHERE pms.player_id IS NOT NULL),
+                   '{}'::jsonb
+               ),
+               COALESCE(m.finished_at, now())
+        FROM matches m
+        LEFT JOIN player_match_stats pms ON pms.match_id = m.id
+        WHERE m.is_finished
+        GROUP BY m.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('match_scorings')
@@ -0,0 +1,49 @@
+"""add translations
+
+Persistent cache of name translations used when filling players.name_rus
+and teams.name_rus. Seeded from the names already translated.
+
+Revision ID: f4e3d2c1b0a9
+Revises: e5d4c3b2a1f0
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4e3d2c1b0a9'
+down_revision: Union[str, Sequence[str], None] = 'e5d4c3b2a1f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'translations',
+        sa.Column('source_text', sa.String(), nullable=False),
+        sa.Column('target_lang', sa.String(length=8), nullable=False),
+        sa.Column('translated_text', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('source_text', 'target_lang'),
+    )
+    op.execute("""
+        INSERT INTO translations (source_text, target_lang, translated_text)
+        SELECT DISTINCT ON (name) name, 'ru', name_rus
+        FROM (
+            SELECT name, name_rus FROM players WHERE name_rus IS NOT NULL AND name_rus <> ''
+            UNION ALL
+            SELECT name, name_rus FROM teams WHERE name_rus IS NOT NULL AND name_rus <> ''
+        ) translated
+        ORDER BY name
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('translations')
@@ -0,0 +1,47 @@
+"""add squad_tour_documents
+
+Precomputed squad-API responses for finalized squad tours, written in
+bulk by tour finalization and rewritten by match re-scoring
+(app.squad_tours.documents). Tours finalized before this revision have no
+documents and keep being built live.
+
+Revision ID: f9a8b7c6d5e4
+Revises: e8f7a6b5c4d3
+Create Date: 2026-10-25 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9a8b7c6d5e4'
+down_revision: Union[str, Sequence[str], None] = 'e8f7a6b5c4d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'squad_tour_documents',
+        sa.Column('tour_id', sa.Integer(), nullable=False),
+        sa.Column('squad_id', sa.Integer(), nullable=False),
+        sa.Column('document', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('built_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['tour_id'], ['tours.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['squad_id'], ['squads.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('tour_id', 'squad_id'),
+    )
+    op.create_index(
+        'ix_squad_tour_documents_squad_id_tour_id', 'squad_tour_documents', ['squad_id', 'tour_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_squad_tour_documents_squad_id_tour_id', table_name='squad_tour_documents')
+    op.drop_table('squad_tour_documents')
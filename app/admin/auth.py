@@ -5,7 +5,7 @@ from starlette.requests import Request
 from starlette.responses import RedirectResponse
 
 from app.admin.models import Admin
-from app.admin.utils import create_access_token, verify_password
+from app.admin.utils import create_admin_token, verify_password
 from app.config import settings
 from app.database import async_session_maker
 
@@ -27,7 +27,7 @@ class AdminAuth(AuthenticationBackend):
             if not admin or not verify_password(password, admin.hashed_password):
                 return False
 
-            access_token = create_access_token({"sub": admin.username})
+            access_token = create_admin_token(admin.username)
             request.session.update({"token": f"Bearer {access_token}"})
 
         return True
@@ -1,8 +1,48 @@
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.admin.models import Admin
+from app.admin.utils import ADMIN_TOKEN_SCOPE
+from app.config import settings
 from app.database import async_session_maker
+from app.utils.exceptions import ForbiddenException
 
 
 async def get_db() -> AsyncSession:
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_current_admin(request: Request) -> Admin:
+    """Администратор по токену из /api/admin/login (заголовок Authorization или кука admin_token).
+
+    Токены пользователей мини-приложения подписаны тем же ключом, поэтому
+    admin-токен отличается claim'ом scope; всё остальное — 403.
+    """
+    token = None
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        token = auth_header[7:]
+    else:
+        cookie_token = request.cookies.get("admin_token")
+        if cookie_token and cookie_token.startswith("Bearer "):
+            token = cookie_token[7:]
+    if not token:
+        raise ForbiddenException(msg="Admin access required")
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise ForbiddenException(msg="Admin access required")
+    if payload.get("scope") != ADMIN_TOKEN_SCOPE or not payload.get("sub"):
+        raise ForbiddenException(msg="Admin access required")
+
+    async with async_session_maker() as session:
+        admin = (await session.execute(
+            select(Admin).where(Admin.username == payload["sub"])
+        )).scalars().first()
+    if not admin:
+        raise ForbiddenException(msg="Admin access required")
+    return admin
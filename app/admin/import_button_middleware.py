@@ -1,108 +1,164 @@
-"""Middleware to inject Import button into SQLAdmin pages."""
+"""ASGI middleware to inject Import button into SQLAdmin pages.
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+The middleware is mounted inside the admin sub-application (see
+``app.main``), so ``/api`` requests never pass through it. List pages are
+rewritten as they stream: chunks are forwarded as soon as they arrive and the
+script is spliced in front of ``</body>`` without buffering the whole page.
+"""
 
+import re
+from typing import Optional
 
-class ImportButtonMiddleware(BaseHTTPMiddleware):
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_LIST_PAGE_RE = re.compile(r"^/(?P<identity>[^/]+)/list/?$")
+_BODY_CLOSE = b"</body>"
+
+
+def _build_import_script(identity: str) -> str:
+    return f"""
+    <script>
+    (function() {{
+        function addImportButton() {{
+            if (document.querySelector('.import-btn-custom')) {{
+                return; // Already added
+            }}
+
+            // Find all elements and log them for debugging
+            const allDropdowns = document.querySelectorAll('.dropdown');
+            const allButtons = document.querySelectorAll('.btn');
+            console.log('Found dropdowns:', allDropdowns.length);
+            console.log('Found buttons:', allButtons.length);
+
+            // Try to find the toolbar container (usually contains action buttons)
+            const toolbar = document.querySelector('.col-auto') || 
+                           document.querySelector('.d-flex.justify-content-end') ||
+                           document.querySelector('[class*="toolbar"]');
+
+            console.log('Toolbar found:', toolbar);
+
+            if (toolbar) {{
+                // Create Import button
+                const importBtn = document.createElement('a');
+                importBtn.href = '/admin/{identity}/import';
+                importBtn.className = 'btn btn-primary import-btn-custom';
+                importBtn.style.marginRight = '10px';
+                importBtn.innerHTML = '<i class="fa fa-upload"></i> Import';
+
+                // Add as first child of toolbar
+                toolbar.insertBefore(importBtn, toolbar.firstChild);
+                console.log('Import button added to toolbar');
+            }} else if (allDropdowns.length > 0) {{
+                // Fallback: insert before first dropdown
+                const dropdown = allDropdowns[0];
+                const importBtn = document.createElement('a');
+                importBtn.href = '/admin/{identity}/import';
+                importBtn.className = 'btn btn-primary import-btn-custom';
+                importBtn.style.marginRight = '10px';
+                importBtn.innerHTML = '<i class="fa fa-upload"></i> Import';
+
+                dropdown.parentNode.insertBefore(importBtn, dropdown);
+                console.log('Import button added before dropdown');
+            }} else {{
+                console.log('No suitable container found, retrying...');
+                setTimeout(addImportButton, 200);
+            }}
+        }}
+
+        if (document.readyState === 'loading') {{
+            document.addEventListener('DOMContentLoaded', addImportButton);
+        }} else {{
+            addImportButton();
+        }}
+    }})();
+    </script>
+    """
+
+
+def _list_page_identity(scope: Scope) -> Optional[str]:
+    """Return model identity for ``/<identity>/list`` paths, else None.
+
+    Starlette keeps the full path in mounted apps and exposes the mount prefix
+    as ``root_path``, so the prefix is stripped before matching.
+    """
+    path = scope.get("path", "")
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    match = _LIST_PAGE_RE.match(path)
+    return match.group("identity") if match else None
+
+
+class _ImportButtonInjector:
+    """Wraps ``send`` and splices the script into a streamed HTML body."""
+
+    def __init__(self, send: Send, payload: bytes):
+        self._send = send
+        self._payload = payload
+        self._active = False
+        self._injected = False
+        # Last bytes of the previous chunk, kept in case "</body>" is split
+        # across two chunks.
+        self._tail = b""
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message.get("headers", []))
+            if (message["status"] == 200 and
+                    headers.get("content-type", "").startswith("text/html")):
+                self._active = True
+                # Body length changes, so the response switches to chunked
+                # transfer encoding.
+                message["headers"] = [
+                    (key, value)
+                    for key, value in message.get("headers", [])
+                    if key.lower() != b"content-length"
+                ]
+            await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or not self._active:
+            await self._send(message)
+            return
+
+        body = self._tail + message.get("body", b"")
+        more_body = message.get("more_body", False)
+        self._tail = b""
+
+        if not self._injected:
+            index = body.find(_BODY_CLOSE)
+            if index != -1:
+                body = body[:index] + self._payload + body[index:]
+                self._injected = True
+            elif more_body:
+                keep = len(_BODY_CLOSE) - 1
+                self._tail = body[-keep:]
+                body = body[:-keep]
+
+        await self._send({
+            "type": "http.response.body",
+            "body": body,
+            "more_body": more_body,
+        })
+
+
+class ImportButtonMiddleware:
     """Middleware to add Import button next to Export button in admin."""
-    
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Only inject into admin list pages
-        if (request.url.path.startswith("/admin/") and 
-            "/list" in request.url.path and
-            response.status_code == 200 and
-            response.headers.get("content-type", "").startswith("text/html")):
-            
-            # Get the identity from URL (e.g., /admin/player/list -> player)
-            path_parts = request.url.path.split("/")
-            if len(path_parts) >= 3:
-                identity = path_parts[2]
-                
-                # Read response body
-                body = b""
-                async for chunk in response.body_iterator:
-                    body += chunk
-                
-                body_str = body.decode("utf-8")
-                
-                # Inject Import button JavaScript
-                import_js = f"""
-                <script>
-                (function() {{
-                    function addImportButton() {{
-                        if (document.querySelector('.import-btn-custom')) {{
-                            return; // Already added
-                        }}
-                        
-                        // Find all elements and log them for debugging
-                        const allDropdowns = document.querySelectorAll('.dropdown');
-                        const allButtons = document.querySelectorAll('.btn');
-                        console.log('Found dropdowns:', allDropdowns.length);
-                        console.log('Found buttons:', allButtons.length);
-                        
-                        // Try to find the toolbar container (usually contains action buttons)
-                        const toolbar = document.querySelector('.col-auto') || 
-                                       document.querySelector('.d-flex.justify-content-end') ||
-                                       document.querySelector('[class*="toolbar"]');
-                        
-                        console.log('Toolbar found:', toolbar);
-                        
-                        if (toolbar) {{
-                            // Create Import button
-                            const importBtn = document.createElement('a');
-                            importBtn.href = '/admin/{identity}/import';
-                            importBtn.className = 'btn btn-primary import-btn-custom';
-                            importBtn.style.marginRight = '10px';
-                            importBtn.innerHTML = '<i class="fa fa-upload"></i> Import';
-                            
-                            // Add as first child of toolbar
-                            toolbar.insertBefore(importBtn, toolbar.firstChild);
-                            console.log('Import button added to toolbar');
-                        }} else if (allDropdowns.length > 0) {{
-                            // Fallback: insert before first dropdown
-                            const dropdown = allDropdowns[0];
-                            const importBtn = document.createElement('a');
-                            importBtn.href = '/admin/{identity}/import';
-                            importBtn.className = 'btn btn-primary import-btn-custom';
-                            importBtn.style.marginRight = '10px';
-                            importBtn.innerHTML = '<i class="fa fa-upload"></i> Import';
-                            
-                            dropdown.parentNode.insertBefore(importBtn, dropdown);
-                            console.log('Import button added before dropdown');
-                        }} else {{
-                            console.log('No suitable container found, retrying...');
-                            setTimeout(addImportButton, 200);
-                        }}
-                    }}
-                    
-                    if (document.readyState === 'loading') {{
-                        document.addEventListener('DOMContentLoaded', addImportButton);
-                    }} else {{
-                        addImportButton();
-                    }}
-                }})();
-                </script>
-                """
-                
-                # Inject before closing body tag
-                if "</body>" in body_str:
-                    body_str = body_str.replace("</body>", import_js + "</body>")
-                    body = body_str.encode("utf-8")
-                
-                # Create new response with modified body
-                # Update Content-Length header
-                headers = dict(response.headers)
-                headers['content-length'] = str(len(body))
-                
-                return Response(
-                    content=body,
-                    status_code=response.status_code,
-                    headers=headers,
-                    media_type=response.media_type
-                )
-        
-        return response
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        identity = _list_page_identity(scope)
+        if identity is None:
+            await self.app(scope, receive, send)
+            return
+
+        payload = _build_import_script(identity).encode("utf-8")
+        injector = _ImportButtonInjector(send, payload)
+        await self.app(scope, receive, injector.send)
@@ -0,0 +1,21 @@
+from sqladmin import BaseView, expose
+from starlette.requests import Request
+from starlette.templating import Jinja2Templates
+
+from app.utils.loop_monitor import loop_monitor
+
+templates = Jinja2Templates(directory="templates")
+
+
+class LoopLagView(BaseView):
+    name = "Loop lag"
+    icon = "fa-solid fa-gauge-high"
+
+    @expose("/loop_lag", methods=["GET"])
+    async def loop_lag(self, request: Request):
+        return templates.TemplateResponse(
+            "loop_lag.html", {"request": request, "report": loop_monitor.snapshot()}
+        )
+
+    def is_visible(self, request: Request) -> bool:
+        return True
@@ -4,7 +4,7 @@ from sqlalchemy.future import select
 
 from app.admin.dependencies import get_db
 from app.admin.models import Admin
-from app.admin.utils import create_access_token, verify_password
+from app.admin.utils import create_admin_token, verify_password
 
 router = APIRouter()
 
@@ -22,7 +22,7 @@ async def admin_login(
     if not admin or not verify_password(password, admin.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token({"sub": admin.username})
+    access_token = create_admin_token(admin.username)
     response.set_cookie(
         key="admin_token",
         value=f"Bearer {access_token}",
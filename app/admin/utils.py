@@ -7,6 +7,9 @@ from app.config import settings
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
+# claim scope токенов администратора (app.admin.dependencies.get_current_admin)
+ADMIN_TOKEN_SCOPE = "admin"
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -25,4 +28,8 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+
+def create_admin_token(username: str) -> str:
+    return create_access_token({"sub": username, "scope": ADMIN_TOKEN_SCOPE})
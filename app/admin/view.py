@@ -37,6 +37,8 @@ from app.squad_tours.models import (
     squad_tour_players,
     squad_tour_bench_players,
 )
+from app.squad_tours.live import live_scoring
+from app.squad_tours.ownership import remove_squad_tours
 from app.teams.models import Team
 from app.tours.models import Tour
 from app.users.models import User
@@ -253,6 +255,8 @@ class UserAdmin(BaseModelView, model=User):
         User.registration_date,
     ]
     column_searchable_list = ["username"]
+    # Maintained by UserService together with referrer_id
+    form_excluded_columns = [User.referrals_count]
     # Allow deleting users from the admin panel.
     can_delete = True
     name = "User"
@@ -319,6 +323,7 @@ class UserAdmin(BaseModelView, model=User):
             #     the squad_tours themselves (defensive in case cascade is not
             #     configured at DB level).
             if squad_tour_ids:
+                await remove_squad_tours(session, squad_tour_ids)
                 await session.execute(
                     delete(squad_tour_players)
                     .where(squad_tour_players.c.squad_tour_id.in_(squad_tour_ids))
@@ -359,6 +364,14 @@ class UserAdmin(BaseModelView, model=User):
                     delete(UserLeague).where(UserLeague.id.in_(user_league_ids))
                 )
 
+            # 3) the referrer has one referral less
+            if model.referrer_id is not None:
+                await session.execute(
+                    update(User)
+                    .where(User.id == model.referrer_id)
+                    .values(referrals_count=User.referrals_count - 1)
+                )
+
             await session.commit()
 
         logger.debug(f"Удаление пользователя: {model.id}")
@@ -531,6 +544,11 @@ class SquadAdmin(BaseModelView, model=Squad):
                 delete(Boost)
                 .where(Boost.squad_id == model.id)
             )
+            # 4) его составы уходят каскадом — вычитаем их из счётчиков выбора
+            squad_tour_ids = (await session.execute(
+                select(SquadTour.id).where(SquadTour.squad_id == model.id)
+            )).scalars().all()
+            await remove_squad_tours(session, list(squad_tour_ids))
             await session.commit()
 
         logger.debug(f"Удаление команды: {model.id}")
@@ -568,7 +586,13 @@ class SquadTourAdmin(BaseModelView, model=SquadTour):
         "penalty_points": "Penalty Points",
         "is_finalized": "Finalized",
     }
-    
+    # состав меняется только через app.squad_tours.lineup (версия + строки таблиц)
+    form_excluded_columns = [
+        SquadTour.main_players,
+        SquadTour.bench_players,
+        SquadTour.lineup_version,
+    ]
+
     # AJAX поиск для выбора squad, tour
     # captain_id и vice_captain_id — это просто int поля, не relationships
     form_ajax_refs = {
@@ -589,6 +613,14 @@ class SquadTourAdmin(BaseModelView, model=SquadTour):
             return f"Tour {value.number}"
         return super().format(attr, value)
 
+    async def on_model_delete(self, model, request):
+        from app.database import async_session_maker
+
+        async with async_session_maker() as session:
+            await remove_squad_tours(session, [model.id])
+            await session.commit()
+        return await super().on_model_delete(model, request)
+
     name = "Squad Tour"
     name_plural = "Squad Tours"
     icon = "fa-solid fa-calendar"
@@ -689,6 +721,21 @@ class PlayerMatchStatsAdmin(BaseModelView, model=PlayerMatchStats):
             return f"Match {value.id}"
         return super().format(attr, value)
 
+    async def after_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        """Сразу обновить live-очки составов с этим игроком.
+
+        Для завершённого матча это исправление статистики — очки составов
+        пересчитываются через MatchService.rescore_match.
+        """
+        from app.matches.services import MatchService
+
+        match = await MatchService.find_one_or_none(id=model.match_id)
+        if match and match.is_finished:
+            await MatchService.rescore_match(model.match_id)
+        else:
+            await live_scoring.update_stats(model.match_id, model.player_id, model.points)
+        await super().after_model_change(data, model, is_created, request)
+
     name = "Player Match Stats"
     name_plural = "Player Match Stats"
     icon = "fa-solid fa-chart-simple"
@@ -0,0 +1,349 @@
+"""Архив завершённой лиги: выгрузка в Parquet и очистка рабочих таблиц.
+
+Лига — единица архива (сезонов в схеме нет, см. app.partitions): когда все
+её туры завершены, строки squad_tours, составов, леджера, мест, документов,
+владения, бустов и player_match_stats больше не меняются, но остаются в рабочих
+таблицах и в каждом агрегате без фильтра по лиге.
+
+    python -m app.archives.export export 39     # файлы + запись в league_archives
+    python -m app.archives.export verify 39     # перечитать файлы и сверить с манифестом
+    python -m app.archives.export trim 39       # сверить с базой и удалить строки
+    python -m app.archives.export archive 39    # export + trim
+
+export читает все таблицы в одной транзакции REPEATABLE READ (согласованный
+снимок) курсором пачками по BATCH_ROWS и пишет <ARCHIVE_DIR>/league_<id>/
+<таблица>.parquet (zstd) и manifest.json с числом строк и контрольной суммой
+каждой таблицы. Сумма не зависит от порядка строк и считается векторно по
+пачкам Arrow, поэтому ту же сумму дешево посчитать по файлу и по базе.
+
+trim сначала сверяет файлы с манифестом, затем в одной транзакции
+REPEATABLE READ сверяет с манифестом строки в базе и удаляет их: если
+строку успели изменить после выгрузки, проверка или DELETE откатят всё.
+tours, squads и lineup_versions попадают в архив справочно и не удаляются.
+Опустевшая секция player_match_stats лиги затем отсоединяется и удаляется;
+секции туров общие для лиг — их снимает python -m app.partitions.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Float,
+    Integer,
+    JSON,
+    LargeBinary,
+    SmallInteger,
+    String,
+    Text,
+    cast,
+    delete,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+import app.models  # noqa: F401  registers every model
+from app.archives.models import LeagueArchive
+from app.config import settings
+from app.database import Base, async_session_maker, engine
+from app.partitions import detach_league_partition
+from app.tours.models import Tour
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = 50_000
+
+# таблица -> порядок строк в файле (по нему row group'ы отсекаются фильтрами reader)
+ARCHIVE_TABLES = {
+    "tours": ("id",),
+    "squads": ("id",),
+    "lineup_versions": ("id",),
+    "squad_tours": ("squad_id", "tour_id"),
+    "squad_tour_players": ("squad_tour_id", "player_id"),
+    "squad_tour_bench_players": ("squad_tour_id", "player_id"),
+    "squad_tour_points_ledger": ("squad_tour_id", "match_id", "player_id"),
+    "squad_tour_ranks": ("squad_id", "tour_id"),
+    "squad_tour_documents": ("squad_id", "tour_id"),
+    "player_tour_ownership": ("tour_id", "player_id"),
+    "boosts": ("squad_id", "tour_id"),
+    "player_match_stats": ("player_id", "match_id"),
+}
+# удаляемые таблицы: ссылающиеся на squad_tours — раньше неё
+TRIMMED_TABLES = (
+    "squad_tour_points_ledger",
+    "squad_tour_players",
+    "squad_tour_bench_players",
+    "squad_tour_ranks",
+    "squad_tour_documents",
+    "player_tour_ownership",
+    "boosts",
+    "squad_tours",
+    "player_match_stats",
+)
+
+
+def _arrow_type(column_type) -> pa.DataType:
+    if isinstance(column_type, ARRAY):
+        return pa.list_(_arrow_type(column_type.item_type))
+    if isinstance(column_type, SmallInteger):
+        return pa.int16()
+    if isinstance(column_type, BigInteger):
+        return pa.int64()
+    if isinstance(column_type, Integer):
+        return pa.int32()
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, LargeBinary):
+        return pa.binary()
+    if isinstance(column_type, (String, JSON)):
+        return pa.string()
+    raise TypeError(f"No Arrow type for {column_type!r}")
+
+
+def archive_schema(name: str) -> pa.Schema:
+    return pa.schema([
+        pa.field(column.name, _arrow_type(column.type), nullable=column.nullable)
+        for column in Base.metadata.tables[name].columns
+    ])
+
+
+def _archive_columns(table) -> list:
+    # JSONB — текстом из Postgres (ключи в нём уже упорядочены): без разбора и повторной сериализации
+    return [
+        cast(column, Text).label(column.name) if isinstance(column.type, JSON) else column
+        for column in table.columns
+    ]
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    # splitmix64; переполнение uint64 в массивах numpy — по модулю 2**64
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _column_hashes(column: pa.Array) -> np.ndarray:
+    if pa.types.is_integer(column.type) or pa.types.is_boolean(column.type) or pa.types.is_timestamp(column.type):
+        values = column.cast(pa.int64()).fill_null(0).to_numpy(zero_copy_only=False).view(np.uint64)
+        hashes = _mix(values)
+    else:
+        # строки, bytea и массивы: по значению, их в архиве немного
+        hashes = np.fromiter((
+            int.from_bytes(hashlib.blake2b(repr(value).encode(), digest_size=8).digest(), "big")
+            for value in column.to_pylist()
+        ), dtype=np.uint64, count=len(column))
+    if column.null_count:
+        hashes[column.is_null().to_numpy(zero_copy_only=False)] = np.uint64(0x9E3779B97F4A7C15)
+    return hashes
+
+
+class _Checksum:
+    """Число строк и сумма по модулю 2**64 хэшей строк — не зависит от порядка.
+
+    Считается по пачкам Arrow в схеме архива: для базы и для файла это
+    одна и та же функция от одних и тех же типов.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.value = 0
+
+    def add(self, batch: pa.RecordBatch) -> None:
+        rows = np.zeros(batch.num_rows, dtype=np.uint64)
+        for column in batch.columns:
+            rows = _mix(rows * np.uint64(0x100000001B3) + _column_hashes(column))
+        self.value = (self.value + int(rows.sum(dtype=np.uint64))) % 2**64
+        self.rows += batch.num_rows
+
+    def as_dict(self) -> dict:
+        return {"rows": self.rows, "checksum": f"{self.value:016x}"}
+
+
+def _archive_query(name: str, league_id: int, tour_ids: list[int]):
+    table = Base.metadata.tables[name]
+    if name in ("tours", "squads", "player_match_stats"):
+        condition = table.c.league_id == league_id
+    elif name == "lineup_versions":
+        squad_tours = Base.metadata.tables["squad_tours"]
+        condition = table.c.id.in_(
+            select(squad_tours.c.lineup_version_id).where(squad_tours.c.tour_id.in_(tour_ids))
+        )
+    else:
+        # список id, а не подзапрос: секции туров отсекаются при планировании
+        condition = table.c.tour_id.in_(tour_ids)
+    return table, condition
+
+
+async def _league_tour_ids(conn, league_id: int) -> list[int]:
+    tours = (await conn.execute(
+        select(Tour.id, Tour.is_finalized).where(Tour.league_id == league_id).order_by(Tour.id)
+    )).all()
+    if not tours:
+        raise ValueError(f"League {league_id} has no tours")
+    unfinished = [tour_id for tour_id, is_finalized in tours if not is_finalized]
+    if unfinished:
+        raise ValueError(f"Tours {unfinished} of league {league_id} are not finalized")
+    return [tour_id for tour_id, _ in tours]
+
+
+async def _stream_checksum(conn, name: str, league_id: int, tour_ids: list[int], writer=None) -> dict:
+    table, condition = _archive_query(name, league_id, tour_ids)
+    order = [table.c[column] for column in ARCHIVE_TABLES[name]]
+    result = await conn.stream(
+        select(*_archive_columns(table)).where(condition).order_by(*order).execution_options(yield_per=BATCH_ROWS)
+    )
+    schema = archive_schema(name)
+    checksum = _Checksum()
+    async for rows in result.partitions():
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)], schema=schema
+        )
+        checksum.add(batch)
+        if writer is not None:
+            writer.write_batch(batch)
+    return checksum.as_dict()
+
+
+async def export_league(league_id: int, archive_dir: Optional[str] = None) -> dict:
+    """Выгрузить лигу в <archive_dir>/league_<id> и записать league_archives; вернуть манифест."""
+    async with async_session_maker() as session:
+        archive = await session.get(LeagueArchive, league_id)
+        if archive is not None and archive.trimmed_at is not None:
+            raise ValueError(f"League {league_id} is already archived to {archive.path} and trimmed")
+
+    target = Path(archive_dir or settings.ARCHIVE_DIR).resolve() / f"league_{league_id}"
+    staging = target.with_name(f"{target.name}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+        async with conn.begin():
+            tour_ids = await _league_tour_ids(conn, league_id)
+            tables = {}
+            for name in ARCHIVE_TABLES:
+                with pq.ParquetWriter(staging / f"{name}.parquet", archive_schema(name), compression="zstd") as writer:
+                    tables[name] = await _stream_checksum(conn, name, league_id, tour_ids, writer)
+                logger.info(f"Exported {tables[name]['rows']} rows of {name} for league {league_id}")
+
+    manifest = {
+        "league_id": league_id,
+        "tour_ids": tour_ids,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "tables": tables,
+    }
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    shutil.rmtree(target, ignore_errors=True)
+    staging.rename(target)
+
+    async with async_session_maker() as session:
+        await session.execute(
+            insert(LeagueArchive)
+            .values(league_id=league_id, path=str(target), manifest=manifest)
+            .on_conflict_do_update(
+                index_elements=[LeagueArchive.league_id],
+                set_={"path": str(target), "manifest": manifest, "exported_at": datetime.now(timezone.utc)},
+            )
+        )
+        await session.commit()
+    return manifest
+
+
+def verify_files(path: str) -> dict:
+    """Перечитать файлы архива и сверить строки и суммы с манифестом; вернуть манифест."""
+    root = Path(path)
+    manifest = json.loads((root / "manifest.json").read_text())
+    for name, expected in manifest["tables"].items():
+        checksum = _Checksum()
+        for batch in pq.ParquetFile(root / f"{name}.parquet").iter_batches(batch_size=BATCH_ROWS):
+            checksum.add(batch)
+        if checksum.as_dict() != expected:
+            raise ValueError(f"{root / name}.parquet does not match the manifest: {checksum.as_dict()} != {expected}")
+    return manifest
+
+
+async def trim_league(league_id: int) -> dict:
+    """Удалить выгруженные строки лиги из рабочих таблиц; вернуть число удалённых по таблицам."""
+    async with async_session_maker() as session:
+        archive = await session.get(LeagueArchive, league_id)
+    if archive is None:
+        raise ValueError(f"League {league_id} is not exported")
+    if archive.trimmed_at is not None:
+        return {}
+    manifest = verify_files(archive.path)
+
+    deleted = {}
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        async with conn.begin():
+            for name in TRIMMED_TABLES:
+                in_database = await _stream_checksum(conn, name, league_id, manifest["tour_ids"])
+                if in_database != manifest["tables"][name]:
+                    raise ValueError(
+                        f"{name} of league {league_id} changed since the export: "
+                        f"{in_database} != {manifest['tables'][name]}; export again"
+                    )
+            for name in TRIMMED_TABLES:
+                table, condition = _archive_query(name, league_id, manifest["tour_ids"])
+                deleted[name] = (await conn.execute(delete(table).where(condition))).rowcount
+            await conn.execute(
+                update(LeagueArchive).where(LeagueArchive.league_id == league_id).values(trimmed_at=datetime.now(timezone.utc))
+            )
+    logger.info(f"Trimmed league {league_id}: {deleted}")
+
+    # секция статистики лиги пуста; DETACH CONCURRENTLY не держит блокировку на родителе
+    partition = await detach_league_partition(league_id)
+    if partition is not None:
+        async with engine.begin() as conn:
+            if (await conn.execute(text(f'SELECT EXISTS (SELECT 1 FROM "{partition}")'))).scalar():
+                logger.warning(f"Detached partition {partition} is not empty, keeping it")
+            else:
+                await conn.execute(text(f'DROP TABLE "{partition}"'))
+    return deleted
+
+
+async def _main(args) -> None:
+    if args.command in ("export", "archive"):
+        manifest = await export_league(args.league_id, args.dir)
+        for name, table in manifest["tables"].items():
+            print(f"{name:<26} {table['rows']:>10} rows  {table['checksum']}")
+    if args.command == "verify":
+        async with async_session_maker() as session:
+            archive = await session.get(LeagueArchive, args.league_id)
+        if archive is None:
+            raise SystemExit(f"League {args.league_id} is not exported")
+        verify_files(archive.path)
+        print(f"{archive.path}: ok")
+    if args.command in ("trim", "archive"):
+        for name, rows in (await trim_league(args.league_id)).items():
+            print(f"{name:<26} {rows:>10} rows deleted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.archives.export")
+    parser.add_argument("command", choices=("export", "verify", "trim", "archive"))
+    parser.add_argument("league_id", type=int)
+    parser.add_argument("--dir", help="каталог архивов (по умолчанию ARCHIVE_DIR)")
+    logging.basicConfig(level=logging.INFO)
+    engine.echo = False
+    asyncio.run(_main(parser.parse_args()))
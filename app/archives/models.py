@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class LeagueArchive(Base):
+    """Архив завершённой лиги в Parquet-файлах (app.archives.export).
+
+    manifest — таблицы архива с числом строк и контрольными суммами.
+    Пока trimmed_at пуст, строки ещё лежат в рабочих таблицах; после
+    очистки исторические запросы по лиге читают файлы (app.archives.reader).
+    """
+    __tablename__ = "league_archives"
+
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"), primary_key=True)
+    path: Mapped[str]
+    manifest: Mapped[dict] = mapped_column(JSONB)
+    exported_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    trimmed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __str__(self):
+        return f"league {self.league_id}: {self.path}"
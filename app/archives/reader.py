@@ -0,0 +1,115 @@
+"""Чтение архивов лиг (app.archives.export) только из Parquet-файлов.
+
+Файлы отсортированы по ключам из ARCHIVE_TABLES, поэтому фильтр по
+squad_id / squad_tour_id / player_id отсекает лишние row group'ы по их
+статистике. Чтение блокирующее: сервисы зовут методы SeasonArchive через
+asyncio.to_thread. pyarrow импортируется при первом чтении, а не при
+старте приложения.
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.archives.models import LeagueArchive
+from app.squads.models import Squad
+from app.tours.models import Tour
+
+# league_id -> открытый архив; архив после очистки не меняется
+_archives: dict[int, "SeasonArchive"] = {}
+
+
+class SeasonArchive:
+    """Архив одной лиги: таблицы из манифеста, только чтение."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / "manifest.json").read_text())
+        self.league_id = self.manifest["league_id"]
+
+    def read(self, table: str, columns: Optional[list[str]] = None, filters=None) -> "pyarrow.Table":
+        import pyarrow.parquet as pq
+
+        if table not in self.manifest["tables"]:
+            raise KeyError(f"{table} is not in the archive of league {self.league_id}")
+        return pq.read_table(self.path / f"{table}.parquet", columns=columns, filters=filters)
+
+    def rows(self, table: str, columns: Optional[list[str]] = None, filters=None) -> list[dict]:
+        return self.read(table, columns, filters).to_pylist()
+
+    def squad_tour(self, squad_id: int, tour_id: int) -> Optional[dict]:
+        rows = self.rows("squad_tours", filters=[("squad_id", "=", squad_id), ("tour_id", "=", tour_id)])
+        return rows[0] if rows else None
+
+    def points_breakdown(self, squad_id: int, tour_id: int) -> Optional[list[dict]]:
+        """Строки леджера состава за тур или None, если состава нет."""
+        squad_tour = self.squad_tour(squad_id, tour_id)
+        if squad_tour is None:
+            return None
+        return sorted(
+            self.rows(
+                "squad_tour_points_ledger",
+                columns=["match_id", "player_id", "base_points", "multiplier", "reason"],
+                filters=[("squad_tour_id", "=", squad_tour["id"])],
+            ),
+            key=lambda entry: (entry["match_id"], entry["player_id"]),
+        )
+
+    def rank_history(self, squad_id: int) -> list[dict]:
+        """Снимки мест сквада с номером тура, по порядку туров."""
+        tour_numbers = {
+            tour["id"]: tour["number"] for tour in self.rows("tours", columns=["id", "number"])
+        }
+        ranks = self.rows("squad_tour_ranks", filters=[("squad_id", "=", squad_id)])
+        for rank in ranks:
+            rank["tour_number"] = tour_numbers[rank["tour_id"]]
+        return sorted(ranks, key=lambda rank: rank["tour_number"])
+
+    def player_match_stats(self, player_id: int) -> list[dict]:
+        return self.rows("player_match_stats", filters=[("player_id", "=", player_id)])
+
+    def squad_tour_documents(self, squad_id: Optional[int] = None, tour_id: Optional[int] = None) -> list[dict]:
+        """Документы SquadTour (app.squad_tours.documents) по порядку туров и сквадов."""
+        if "squad_tour_documents" not in self.manifest["tables"]:
+            # архив выгружен до появления документов
+            return []
+        filters = [
+            (column, "=", value)
+            for column, value in (("squad_id", squad_id), ("tour_id", tour_id))
+            if value is not None
+        ]
+        rows = self.rows("squad_tour_documents", columns=["tour_id", "squad_id", "document"], filters=filters or None)
+        return [
+            json.loads(row["document"])
+            for row in sorted(rows, key=lambda row: (row["tour_id"], row["squad_id"]))
+        ]
+
+
+async def _open(session, league_id: Optional[int]) -> Optional[SeasonArchive]:
+    if league_id is None:
+        return None
+    if league_id not in _archives:
+        path = (await session.execute(
+            select(LeagueArchive.path).where(
+                LeagueArchive.league_id == league_id, LeagueArchive.trimmed_at.is_not(None)
+            )
+        )).scalar()
+        if path is None:
+            # лигу могут архивировать позже — отсутствие не кэшируется
+            return None
+        _archives[league_id] = SeasonArchive(path)
+    return _archives[league_id]
+
+
+async def archive_for_tour(session, tour_id: int) -> Optional[SeasonArchive]:
+    """Архив лиги тура, если её строки уже удалены из рабочих таблиц."""
+    league_id = (await session.execute(select(Tour.league_id).where(Tour.id == tour_id))).scalar()
+    return await _open(session, league_id)
+
+
+async def archive_for_squad(session, squad_id: int) -> Optional[SeasonArchive]:
+    """Архив лиги сквада, если её строки уже удалены из рабочих таблиц."""
+    league_id = (await session.execute(select(Squad.league_id).where(Squad.id == squad_id))).scalar()
+    return await _open(session, league_id)
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, SmallInteger, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class BatchJob(Base):
+    """Пакетная операция над целым туром (финализация матча, старт/финализация тура).
+
+    Одна на (operation, target_id): повторный запуск продолжает её, а не
+    начинает заново. status и operation — коды из app.batch.runner.
+    """
+    __tablename__ = "batch_jobs"
+    __table_args__ = (
+        Index("uq_batch_jobs_operation_target_id", "operation", "target_id", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    operation: Mapped[int] = mapped_column(SmallInteger)
+    target_id: Mapped[int] = mapped_column(BigInteger)
+    status: Mapped[int] = mapped_column(SmallInteger, default=0, server_default="0")
+    # параметры, посчитанные при планировании (например, next_tour_id)
+    params: Mapped[dict] = mapped_column(JSONB, default=dict, server_default="{}")
+    partitions_total: Mapped[int] = mapped_column(default=0, server_default="0")
+    result: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __str__(self):
+        return f"{self.operation}:{self.target_id}"
+
+
+class BatchPartition(Base):
+    """Диапазон squad_id [squad_id_from, squad_id_to) пакетной операции.
+
+    Воркер забирает партицию через SELECT ... FOR UPDATE SKIP LOCKED и
+    коммитит её работу вместе с status = done — это и есть контрольная
+    точка: после падения повторно выполняются только незавершённые.
+    """
+    __tablename__ = "batch_partitions"
+    __table_args__ = (
+        Index("ix_batch_partitions_job_id_status", "job_id", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(ForeignKey("batch_jobs.id", ondelete="CASCADE"))
+    squad_id_from: Mapped[int] = mapped_column(BigInteger)
+    # None — без верхней границы (последняя партиция)
+    squad_id_to: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    status: Mapped[int] = mapped_column(SmallInteger, default=0, server_default="0")
+    attempts: Mapped[int] = mapped_column(SmallInteger, default=0, server_default="0")
+    stats: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def squad_range(self, squad_id_column):
+        """Условие попадания squad_id в партицию."""
+        condition = squad_id_column >= self.squad_id_from
+        if self.squad_id_to is not None:
+            condition = condition & (squad_id_column < self.squad_id_to)
+        return condition
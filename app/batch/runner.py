@@ -0,0 +1,434 @@
+"""Партиционированное выполнение операций над целым туром.
+
+Операция (finalize_match, start_tour, finalize_tour) планируется как
+BatchJob с партициями по диапазонам squad_id размером BATCH_PARTITION_SIZE.
+Каждый воркер в цикле забирает свободную партицию (FOR UPDATE SKIP LOCKED),
+выполняет её в своей транзакции и коммитит вместе с отметкой done. Падение
+воркера откатывает только его текущую партицию — её заберёт другой воркер
+или повторный запуск.
+
+Воркеры — BATCH_CELERY_WORKERS задач Celery (app.tasks.batch_tasks), если
+задан брокер, плюс сам вызвавший run_job процесс: BATCH_WORKERS сессий на
+его event loop или, с BATCH_PROCESSES > 0, пул отдельных процессов (у
+каждого свой event loop и свои соединения). Пул нужен CLI
+(python -m app.batch.runner run JOB_ID --processes N), а не процессу API:
+там BATCH_PROCESSES = 0, и HTTP-запрос не ждёт операцию — submit_job
+отдаёт её Celery (или фоновой задаче, если брокера нет) и сразу
+возвращает статус job. Когда незавершённых партиций не осталось, кто-то
+один (под блокировкой строки BatchJob) выполняет завершающий шаг операции:
+флаги тура, места, уведомления.
+
+Кэши процесса (live-очки, сводки лиг) сбрасывает Operation.invalidate
+в каждом процессе, который увидел завершение job, — и в том, что
+выполнил завершающий шаг, и в вызвавшем операцию, если завершил её
+воркер Celery. Остальные процессы API догоняют по TTL своих кэшей.
+
+Обработчики операций регистрируются через register_operation в модулях
+сервисов (app.matches.services, app.squads.services).
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from sqlalchemy import func, select, update
+
+from app.batch.models import BatchJob, BatchPartition
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.squads.models import Squad
+from app.utils.exceptions import FailedOperationException
+from app.utils.timezone import now_msk
+
+logger = logging.getLogger(__name__)
+
+# batch_jobs.operation
+OP_FINALIZE_MATCH = 1
+OP_START_TOUR = 2
+OP_FINALIZE_TOUR = 3
+
+OPERATION_NAMES = {
+    OP_FINALIZE_MATCH: "finalize_match",
+    OP_START_TOUR: "start_tour",
+    OP_FINALIZE_TOUR: "finalize_tour",
+}
+
+# batch_jobs.status
+JOB_RUNNING = 0
+JOB_DONE = 1
+
+# batch_partitions.status
+PARTITION_PENDING = 0
+PARTITION_DONE = 1
+
+POLL_SECONDS = 0.5
+
+
+class Operation(NamedTuple):
+    # работа одной партиции в переданной сессии; возвращает числовые счётчики
+    run_partition: Callable[..., Awaitable[dict]]
+    # завершающий шаг в транзакции под блокировкой job: (session, job, totals) -> результат
+    finish: Callable[..., Awaitable[dict]]
+    # побочные эффекты после коммита завершения (уведомления); только в завершившем процессе
+    after_finish: Optional[Callable[..., Awaitable[None]]] = None
+    # сброс кэшей процесса: (job) -> None, в каждом процессе, увидевшем завершение
+    invalidate: Optional[Callable[[BatchJob], None]] = None
+
+
+_operations: dict[int, Operation] = {}
+
+
+def register_operation(operation: int, handlers: Operation) -> None:
+    _operations[operation] = handlers
+
+
+async def get_job(session, operation: int, target_id: int) -> Optional[BatchJob]:
+    return (await session.execute(
+        select(BatchJob).where(BatchJob.operation == operation, BatchJob.target_id == target_id)
+    )).scalars().first()
+
+
+async def plan_job(session, operation: int, target_id: int, league_id: int, params: Optional[dict] = None) -> BatchJob:
+    """Создаёт job и партиции по squad_id лиги; коммитит вызывающий вместе с подготовкой."""
+    numbered = (
+        select(Squad.id, func.row_number().over(order_by=Squad.id).label("rn"))
+        .where(Squad.league_id == league_id)
+        .subquery()
+    )
+    starts = (await session.execute(
+        select(numbered.c.id)
+        .where((numbered.c.rn - 1) % settings.BATCH_PARTITION_SIZE == 0)
+        .order_by(numbered.c.id)
+    )).scalars().all()
+    # первая партиция начинается с 0, последняя открыта сверху: сквады,
+    # созданные после планирования, тоже попадут в какую-то партицию
+    bounds = [0, *starts[1:]]
+    ends = [*starts[1:], None]
+
+    job = BatchJob(
+        operation=operation,
+        target_id=target_id,
+        status=JOB_RUNNING,
+        params=params or {},
+        partitions_total=len(bounds),
+    )
+    session.add(job)
+    await session.flush()
+    session.add_all(
+        BatchPartition(job_id=job.id, squad_id_from=start, squad_id_to=end)
+        for start, end in zip(bounds, ends)
+    )
+    await session.flush()
+    logger.info(
+        f"Planned {OPERATION_NAMES[operation]} {target_id}: job {job.id}, {len(bounds)} partitions"
+    )
+    return job
+
+
+async def reset_attempts(session, job: BatchJob) -> None:
+    """Повторный запуск: незавершённые партиции снова можно забирать."""
+    await session.execute(
+        update(BatchPartition)
+        .where(BatchPartition.job_id == job.id, BatchPartition.status == PARTITION_PENDING)
+        .values(attempts=0)
+    )
+
+
+async def _record_failure(partition_id: int, error: Exception) -> None:
+    async with async_session_maker() as session:
+        await session.execute(
+            update(BatchPartition)
+            .where(BatchPartition.id == partition_id)
+            .values(attempts=BatchPartition.attempts + 1, last_error=f"{type(error).__name__}: {error}"[:1000])
+        )
+        await session.commit()
+
+
+async def run_one_partition(job_id: int) -> bool:
+    """Забирает и выполняет одну партицию; False — забирать нечего."""
+    async with async_session_maker() as session:
+        job = await session.get(BatchJob, job_id)
+        partition = (await session.execute(
+            select(BatchPartition)
+            .where(
+                BatchPartition.job_id == job_id,
+                BatchPartition.status == PARTITION_PENDING,
+                BatchPartition.attempts < settings.BATCH_MAX_ATTEMPTS,
+            )
+            .order_by(BatchPartition.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalars().first()
+        if partition is None:
+            return False
+
+        partition_id = partition.id
+        started = time.perf_counter()
+        try:
+            stats = await _operations[job.operation].run_partition(session, job, partition)
+            partition.status = PARTITION_DONE
+            partition.stats = stats
+            partition.last_error = None
+            partition.finished_at = now_msk()
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Batch job {job_id}: partition {partition_id} failed: {e}")
+            await _record_failure(partition_id, e)
+            return True
+
+    logger.info(
+        f"Batch job {job_id}: partition {partition_id} done in "
+        f"{time.perf_counter() - started:.2f}s {stats}"
+    )
+    return True
+
+
+async def _work(job_id: int) -> None:
+    while await run_one_partition(job_id):
+        pass
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_size = 0
+
+
+def _get_process_pool(size: int) -> ProcessPoolExecutor:
+    """Пул живёт, пока жив процесс: импорт приложения в воркере — один раз."""
+    global _process_pool, _process_pool_size
+    if _process_pool is None or _process_pool_size < size:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        # spawn, а не fork: у родителя уже есть event loop, потоки и соединения
+        _process_pool = ProcessPoolExecutor(size, mp_context=multiprocessing.get_context("spawn"))
+        _process_pool_size = size
+    return _process_pool
+
+
+async def _work_and_dispose(job_id: int) -> None:
+    try:
+        await _work(job_id)
+    finally:
+        # каждый вызов — новый event loop, соединения asyncpg к нему привязаны
+        await engine.dispose()
+
+
+def _work_in_process(job_id: int, echo: bool) -> None:
+    """Воркер в процессе пула: забирает партиции, пока они есть."""
+    # обработчики операций регистрируются при импорте сервисов
+    import app.models  # noqa: F401
+    import app.matches.services  # noqa: F401
+    import app.squads.services  # noqa: F401
+
+    # логирование SQL — как у вызвавшего процесса
+    engine.echo = echo
+    asyncio.run(_work_and_dispose(job_id))
+
+
+async def _run_workers(job_id: int, workers: int, processes: int) -> None:
+    global _process_pool
+    if not processes:
+        await asyncio.gather(*(_work(job_id) for _ in range(workers)))
+        return
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool(processes)
+    try:
+        await asyncio.gather(*(loop.run_in_executor(pool, _work_in_process, job_id, engine.echo) for _ in range(processes)))
+    except BrokenProcessPool:
+        # воркер убит (OOM, kill): его партиция не закоммичена, повторный запуск её заберёт
+        _process_pool = None
+        raise
+
+
+async def try_finish(job_id: int) -> Optional[dict]:
+    """Завершает job, если все партиции выполнены; результат или None."""
+    async with async_session_maker() as session:
+        job = (await session.execute(
+            select(BatchJob).where(BatchJob.id == job_id).with_for_update()
+        )).scalars().one()
+        if job.status == JOB_DONE:
+            # завершил другой процесс (воркер Celery): его кэши сброшены, наши — нет
+            _invalidate(job)
+            return job.result
+
+        partitions = (await session.execute(
+            select(BatchPartition.status, BatchPartition.stats).where(BatchPartition.job_id == job_id)
+        )).all()
+        if any(status != PARTITION_DONE for status, _ in partitions):
+            return None
+
+        totals = Counter()
+        for _, stats in partitions:
+            totals.update(stats or {})
+        operation = _operations[job.operation]
+        result = await operation.finish(session, job, dict(totals))
+        job.status = JOB_DONE
+        job.result = result
+        job.finished_at = now_msk()
+        await session.commit()
+
+    logger.info(f"Batch job {job_id} ({OPERATION_NAMES[job.operation]} {job.target_id}) finished: {result}")
+    _invalidate(job)
+    if operation.after_finish is not None:
+        await operation.after_finish(job, result)
+    return result
+
+
+def _invalidate(job: BatchJob) -> None:
+    invalidate = _operations[job.operation].invalidate
+    if invalidate is not None:
+        invalidate(job)
+
+
+async def is_running(session, operation: int, target_id: int) -> bool:
+    """Операция над target_id начата и ещё не завершена: часть партиций уже закоммичена."""
+    return bool((await session.execute(
+        select(func.count()).select_from(BatchJob).where(
+            BatchJob.operation == operation,
+            BatchJob.target_id == target_id,
+            BatchJob.status == JOB_RUNNING,
+        )
+    )).scalar())
+
+
+async def _unfinished(job_id: int) -> tuple[int, int]:
+    """(незавершённые партиции, из них исчерпавшие попытки)."""
+    async with async_session_maker() as session:
+        pending, exhausted = (await session.execute(
+            select(
+                func.count(),
+                func.count().filter(BatchPartition.attempts >= settings.BATCH_MAX_ATTEMPTS),
+            ).where(BatchPartition.job_id == job_id, BatchPartition.status == PARTITION_PENDING)
+        )).one()
+    return pending, exhausted
+
+
+def dispatch_celery_workers(job_id: int) -> None:
+    if not (settings.BATCH_CELERY_WORKERS and settings.CELERY_BROKER_URL):
+        return
+    from app.tasks.batch_tasks import run_batch_job
+
+    for _ in range(settings.BATCH_CELERY_WORKERS):
+        run_batch_job.delay(job_id)
+
+
+async def _job_summary(session, job: BatchJob) -> dict:
+    partitions_done = (await session.execute(
+        select(func.count()).where(BatchPartition.job_id == job.id, BatchPartition.status == PARTITION_DONE)
+    )).scalar()
+    return {
+        "job_id": job.id,
+        "operation": OPERATION_NAMES[job.operation],
+        "target_id": job.target_id,
+        "job_status": "done" if job.status == JOB_DONE else "running",
+        "partitions_total": job.partitions_total,
+        "partitions_done": partitions_done,
+        "result": job.result,
+    }
+
+
+async def job_status(operation: int, target_id: int) -> Optional[dict]:
+    """Статус job операции над target_id; None — операция не запускалась."""
+    async with async_session_maker() as session:
+        job = await get_job(session, operation, target_id)
+        return await _job_summary(session, job) if job is not None else None
+
+
+# фоновые run_job процесса API без брокера: ссылки держим, пока задачи идут
+_background_jobs: set[asyncio.Task] = set()
+
+
+async def _run_in_background(job_id: int) -> None:
+    try:
+        await run_job(job_id, processes=0)
+    except Exception as e:
+        # повторный запуск операции продолжит с незавершённых партиций
+        logger.error(f"Batch job {job_id} failed in background: {e}")
+
+
+async def submit_job(job_id: int) -> dict:
+    """Запускает job, не дожидаясь его: партиции выполняют задачи Celery,
+    а без брокера — фоновая задача этого процесса. Возвращает статус job."""
+    if settings.BATCH_CELERY_WORKERS and settings.CELERY_BROKER_URL:
+        dispatch_celery_workers(job_id)
+    else:
+        task = asyncio.create_task(_run_in_background(job_id))
+        _background_jobs.add(task)
+        task.add_done_callback(_background_jobs.discard)
+    async with async_session_maker() as session:
+        return await _job_summary(session, await session.get(BatchJob, job_id))
+
+
+async def run_job(
+    job_id: int,
+    workers: Optional[int] = None,
+    processes: Optional[int] = None,
+    wait: bool = True,
+) -> Optional[dict]:
+    """Выполняет партиции job в processes процессах (не больше числа ядер;
+    при 0 — в workers сессиях этого процесса) и завершает его.
+
+    С wait=True дожидается партиций, которые держат другие воркеры, и
+    бросает FailedOperationException, если часть партиций не выполнилась;
+    повторный запуск операции продолжит с них.
+    """
+    workers = workers or settings.BATCH_WORKERS
+    processes = settings.BATCH_PROCESSES if processes is None else processes
+    # процессов больше, чем ядер, только мешают друг другу (и Postgres на той же машине)
+    processes = min(processes, os.cpu_count() or 1)
+    await _run_workers(job_id, workers, processes)
+
+    deadline = time.monotonic() + settings.BATCH_WAIT_SECONDS
+    while True:
+        result = await try_finish(job_id)
+        if result is not None or not wait:
+            return result
+        pending, exhausted = await _unfinished(job_id)
+        if exhausted or time.monotonic() > deadline:
+            raise FailedOperationException(
+                msg=f"Batch job {job_id}: {pending} partitions unfinished "
+                    f"({exhausted} failed {settings.BATCH_MAX_ATTEMPTS} times); re-run to resume"
+            )
+        # партиции держат другие воркеры — ждём, подбирая освободившиеся
+        await asyncio.sleep(POLL_SECONDS)
+        await _work(job_id)
+
+
+async def _main(args) -> None:
+    # обработчики операций регистрируются при импорте сервисов — в модуле
+    # app.batch.runner, а не в этом __main__
+    import app.models  # noqa: F401
+    import app.matches.services  # noqa: F401
+    import app.squads.services  # noqa: F401
+    from app.batch import runner
+
+    try:
+        if args.command == "run":
+            async with async_session_maker() as session:
+                job = await session.get(BatchJob, args.job_id)
+                if job is None:
+                    print(f"no batch job {args.job_id}")
+                    return
+                await runner.reset_attempts(session, job)
+                await session.commit()
+            print(await runner.run_job(args.job_id, processes=args.processes))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.batch.runner")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="выполнить (или продолжить) job и дождаться его")
+    run.add_argument("job_id", type=int)
+    run.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="процессы-воркеры")
+    logging.basicConfig(level=logging.INFO)
+    engine.echo = False
+    asyncio.run(_main(parser.parse_args()))
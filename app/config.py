@@ -10,6 +10,9 @@ class Settings(BaseSettings):
     EXTERNAL_API_BASE_URL: str
     EXTERNAL_API_KEY: str
     EXTERNAL_API_SEASON: int = 2025
+    # Каталог с записанными ответами API: если задан, сеть не используется
+    EXTERNAL_API_FIXTURES_DIR: str = ""
+    STATS_INGESTION_INTERVAL_SECONDS: int = 60
     MODE: str
     CELERY_BROKER_URL: str = ""
     CELERY_RESULT_BACKEND: str = ""
@@ -20,6 +23,41 @@ class Settings(BaseSettings):
     ADMIN_USERNAME: str
     ADMIN_PASSWORD: str
     FRONTEND_URL: str = "*"
+    LIVE_SCORING_REFRESH_SECONDS: int = 15
+    PLAYER_INDEX_REFRESH_SECONDS: int = 300
+    LEAGUE_SUMMARY_TTL_SECONDS: int = 30
+    # Перевод имён: размер пачки и число потоков для вызовов backend
+    TRANSLATION_BATCH_SIZE: int = 20
+    TRANSLATION_MAX_WORKERS: int = 4
+    # Что поднимает воркер: api, admin или all (см. app.main.create_app)
+    APP_ROLE: str = "all"
+    # DEBUG — только для локальной отладки, через .env
+    LOG_LEVEL: str = "INFO"
+    # Детектор залипаний event loop (app.utils.loop_monitor): ~1% ядра
+    # в простое, см. benchmarks/loop_monitor_overhead.py
+    LOOP_LAG_MONITOR_ENABLED: bool = True
+    # Маршрут запроса в отчёте о залипании: LoopLagMiddleware, ~20-50 мкс
+    # на каждый запрос — включать на время расследования
+    LOOP_LAG_ROUTE_ATTRIBUTION: bool = False
+    LOOP_LAG_THRESHOLD_MS: int = 100
+    LOOP_LAG_INTERVAL_MS: int = 50
+    LOOP_SLOW_CALLBACK_DEBUG: bool = False
+    # Пакетные операции над туром (app.batch.runner): партиции по squad_id
+    BATCH_PARTITION_SIZE: int = 2000
+    # процессы-воркеры вызвавшего run_job (не больше числа ядер); 0 —
+    # BATCH_WORKERS сессий на его event loop. В API пул не поднимается:
+    # процессы — это задачи Celery или CLI (python -m app.batch.runner)
+    BATCH_PROCESSES: int = 0
+    BATCH_WORKERS: int = 4
+    BATCH_CELERY_WORKERS: int = 0
+    BATCH_MAX_ATTEMPTS: int = 3
+    BATCH_WAIT_SECONDS: int = 600
+    # Хранение составов SquadTour: arrays — только lineup_versions,
+    # tables — ещё и строки squad_tour_players / squad_tour_bench_players
+    # (режим отката: туры, начатые в arrays, строк не имеют)
+    LINEUP_STORAGE: str = "arrays"
+    # Каталог Parquet-архивов завершённых лиг (app.archives)
+    ARCHIVE_DIR: str = "archives"
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -207,70 +207,78 @@ class UserLeagueService:
 
     @classmethod
     async def get_my_squad_leagues(cls, user_id: int) -> List[UserLeagueWithStatsSchema]:
-        async with async_session_maker() as session:
-            try:
-                leagues_data = []
-
-                stmt = select(Squad).where(Squad.user_id == user_id)
-                result = await session.execute(stmt)
-                squads = result.unique().scalars().all()
-
-                for squad in squads:
-                    stmt = (
-                        select(user_league_squads.c.user_league_id)
-                        .where(user_league_squads.c.squad_id == squad.id)
-                    )
-                    result = await session.execute(stmt)
-                    user_league_ids = [row.user_league_id for row in result.unique().all()]
-
-                    for user_league_id in user_league_ids:
-                        stmt = (
-                            select(UserLeague)
-                            .where(UserLeague.id == user_league_id)
-                            .options(joinedload(UserLeague.league))
-                        )
-                        result = await session.execute(stmt)
-                        user_league = result.unique().scalars().first()
-
-                        if not user_league:
-                            continue
-
-                        stmt = (
-                            select(user_league_squads.c.squad_id)
-                            .where(user_league_squads.c.user_league_id == user_league_id)
-                        )
-                        result = await session.execute(stmt)
-                        squad_ids_in_league = [row.squad_id for row in result.unique().all()]
-
-                        stmt = (
-                            select(SquadTour.squad_id, func.sum(SquadTour.points).label("total_points"))
-                            .where(SquadTour.squad_id.in_(squad_ids_in_league))
-                            .group_by(SquadTour.squad_id)
-                        )
-                        result = await session.execute(stmt)
-                        squad_points = {row.squad_id: row.total_points for row in result.unique().all()}
-
-                        sorted_squads = sorted(squad_points.items(), key=lambda x: x[1], reverse=True)
-                        squad_place = next((i + 1 for i, (s_id, _) in enumerate(sorted_squads) if s_id == squad.id),
-                                           len(squad_ids_in_league))
-
-                        leagues_data.append(
-                            UserLeagueWithStatsSchema(
-                                user_league_id=user_league.id,
-                                user_league_name=user_league.name,
-                                total_players=len(squad_ids_in_league),
-                                squad_place=squad_place,
-                                is_creator=user_league.creator_id == user_id,
-                                squad_id=squad.id,
-                                squad_name=squad.name,
-                            )
-                        )
+        """Все пользовательские лиги сквадов пользователя с местом и числом участников.
 
-                return leagues_data
+        Один запрос: место — RANK() по чистым очкам (points - penalty_points
+        по завершённым турам, как в лидерборде лиги), размер — COUNT() OVER.
+        """
+        async with async_session_maker() as session:
+            my_leagues = (
+                select(user_league_squads.c.user_league_id)
+                .join(Squad, Squad.id == user_league_squads.c.squad_id)
+                .where(Squad.user_id == user_id)
+                .cte("my_leagues")
+            )
+            members = (
+                select(user_league_squads.c.user_league_id, user_league_squads.c.squad_id)
+                .where(user_league_squads.c.user_league_id.in_(select(my_leagues.c.user_league_id)))
+                .cte("members")
+            )
+            totals = (
+                select(
+                    SquadTour.squad_id,
+                    func.sum(SquadTour.points - SquadTour.penalty_points).label("total_net"),
+                )
+                .where(
+                    SquadTour.squad_id.in_(select(members.c.squad_id)),
+                    SquadTour.is_finalized == True,
+                )
+                .group_by(SquadTour.squad_id)
+                .cte("totals")
+            )
+            total_net = func.coalesce(totals.c.total_net, 0)
+            standings = (
+                select(
+                    members.c.user_league_id,
+                    members.c.squad_id,
+                    func.rank().over(
+                        partition_by=members.c.user_league_id,
+                        order_by=total_net.desc(),
+                    ).label("squad_place"),
+                    func.count().over(partition_by=members.c.user_league_id).label("total_players"),
+                )
+                .outerjoin(totals, totals.c.squad_id == members.c.squad_id)
+                .subquery()
+            )
+            stmt = (
+                select(
+                    standings.c.user_league_id,
+                    UserLeague.name.label("user_league_name"),
+                    UserLeague.creator_id,
+                    standings.c.total_players,
+                    standings.c.squad_place,
+                    Squad.id.label("squad_id"),
+                    Squad.name.label("squad_name"),
+                )
+                .join(UserLeague, UserLeague.id == standings.c.user_league_id)
+                .join(Squad, Squad.id == standings.c.squad_id)
+                .where(Squad.user_id == user_id)
+                .order_by(Squad.id, standings.c.user_league_id)
+            )
+            result = await session.execute(stmt)
 
-            except Exception as e:
-                logger.error(f"Error in get_my_squad_leagues: {e}")
-                raise
+            return [
+                UserLeagueWithStatsSchema(
+                    user_league_id=row.user_league_id,
+                    user_league_name=row.user_league_name,
+                    total_players=row.total_players,
+                    squad_place=row.squad_place,
+                    is_creator=row.creator_id == user_id,
+                    squad_id=row.squad_id,
+                    squad_name=row.squad_name,
+                )
+                for row in result.all()
+            ]
 
     @classmethod
     async def get_user_league_leaderboard(cls, user_league_id: int, tour_id: int) -> List[Dict[str, Any]]:
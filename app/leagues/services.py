@@ -2,12 +2,13 @@ import logging
 from datetime import timedelta
 from typing import Optional, List
 
-from sqlalchemy import func, select as sql_select
+from sqlalchemy import select as sql_select
+from fastapi import HTTPException
 from sqlalchemy.orm import selectinload
 from app.leagues.models import League
+from app.leagues.summary import league_summaries
 from app.database import async_session_maker
-from app.squads.models import Squad
-from app.tours.services import TourService
+from app.squads.models import Squad, SquadStanding
 from app.utils.external_api import external_api
 from app.utils.base_service import BaseService
 from app.utils.exceptions import (
@@ -70,42 +71,38 @@ class LeagueService(BaseService):
     async def find_one_or_none_main_page(
             cls, league_id: int, user_id: int
     ) -> Optional[League]:
+        """Главная страница лиги: число сквадов и дедлайн из кэша сводки,
+        место пользователя — из squad_standings по индексу.
+        """
         async with async_session_maker() as session:
-            league_query = sql_select(cls.model).where(cls.model.id == league_id)
-            league_res = await session.execute(league_query)
-            league = league_res.scalar_one_or_none()
+            league = await session.get(cls.model, league_id)
             if not league:
                 return None
 
-            squads_count_query = sql_select(func.count()).select_from(Squad).where(Squad.league_id == league_id)
-            squads_count_res = await session.execute(squads_count_query)
-            league.all_squads_quantity = squads_count_res.scalar()
-
-            # NEW ARCHITECTURE: Squad contains only metadata, no players
-            user_squad_query = (
-                sql_select(Squad)
-                .where(Squad.league_id == league_id, Squad.user_id == user_id)
-            )
-            user_squad_res = await session.execute(user_squad_query)
-            user_squad = user_squad_res.unique().scalar_one_or_none()
-
-            if user_squad:
-                # NEW ARCHITECTURE: Squad contains only metadata
-                # For leaderboard, use SquadTour data instead
-                all_squads_query = (
-                    sql_select(Squad)
-                    .where(Squad.league_id == league_id)
+            summary = await league_summaries.get(league_id)
+            if summary.next_tour_id is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No next tour found for league with ID {league_id}"
                 )
-                all_squads_res = await session.execute(all_squads_query)
-                all_squads = all_squads_res.unique().scalars().all()
-
-                league.your_place = next(
-                    (i + 1 for i, squad in enumerate(all_squads) if squad.id == user_squad.id),
-                    None,
+            if not summary.deadline:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Deadline not set for tour {summary.next_tour_id}"
                 )
-            else:
-                league.your_place = None
 
-            league.deadline = await TourService.get_deadline_for_next_tour(league_id)
+            place_query = (
+                sql_select(Squad.id, SquadStanding.place)
+                .outerjoin(SquadStanding, SquadStanding.squad_id == Squad.id)
+                .where(Squad.league_id == league_id, Squad.user_id == user_id)
+            )
+            user_squad = (await session.execute(place_query)).first()
 
-            return league
\ No newline at end of file
+        league.all_squads_quantity = summary.squads_count
+        if user_squad:
+            # Сквад без строки в standings ещё не пересчитывался — у него 0 очков
+            league.your_place = user_squad.place or summary.unranked_place
+        else:
+            league.your_place = None
+        league.deadline = summary.deadline
+        return league
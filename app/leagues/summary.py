@@ -0,0 +1,80 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import async_session_maker
+from app.squads.models import Squad, SquadStanding
+from app.tours.models import Tour
+
+
+class LeagueSummary(NamedTuple):
+    squads_count: int
+    next_tour_id: Optional[int]
+    deadline: Optional[datetime]
+    # Место сквада без строки в squad_standings (создан после последнего
+    # пересчёта, 0 очков): все сквады с положительными очками выше него
+    unranked_place: int
+
+
+async def load_league_summary(session, league_id: int) -> LeagueSummary:
+    """Сводка для главной страницы лиги одним запросом по индексам."""
+    next_tour = (
+        select(Tour.id, Tour.deadline)
+        .where(Tour.league_id == league_id, Tour.is_started == False)
+        .order_by(Tour.number)
+        .limit(1)
+        .subquery()
+    )
+    row = (await session.execute(
+        select(
+            select(func.count()).select_from(Squad).where(Squad.league_id == league_id).scalar_subquery(),
+            select(next_tour.c.id).scalar_subquery(),
+            select(next_tour.c.deadline).scalar_subquery(),
+            select(func.count())
+            .select_from(SquadStanding)
+            .where(SquadStanding.league_id == league_id, SquadStanding.total_net_points > 0)
+            .scalar_subquery(),
+        )
+    )).one()
+    squads_count, next_tour_id, deadline, ranked_above = row
+    return LeagueSummary(squads_count, next_tour_id, deadline, ranked_above + 1)
+
+
+class LeagueSummaryCache:
+    """Сводки лиг в памяти процесса с TTL.
+
+    Число сквадов и дедлайн меняются редко; старт и финализация тура и
+    создание сквада сбрасывают сводку своей лиги в этом процессе,
+    остальные процессы догоняют по TTL.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._summaries: dict[int, tuple[float, LeagueSummary]] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, league_id: int) -> LeagueSummary:
+        cached = self._summaries.get(league_id)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        async with self._lock:
+            cached = self._summaries.get(league_id)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+            async with async_session_maker() as session:
+                summary = await load_league_summary(session, league_id)
+            self._summaries[league_id] = (time.monotonic(), summary)
+            return summary
+
+    def invalidate(self, league_id: Optional[int] = None) -> None:
+        if league_id is None:
+            self._summaries.clear()
+        else:
+            self._summaries.pop(league_id, None)
+
+
+league_summaries = LeagueSummaryCache(ttl=settings.LEAGUE_SUMMARY_TTL_SECONDS)
@@ -1,107 +1,173 @@
+"""ASGI application factory.
+
+Importing this module is cheap: routers, services and the admin panel are
+imported only when the application is built. APP_ROLE picks what a worker
+serves — "api" (routers under /api), "admin" (sqladmin under /admin) or
+"all". Run with ``uvicorn app.main:create_app --factory`` or the usual
+``uvicorn app.main:app``: ``app`` is built on first access.
+"""
+
 import logging
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqladmin import Admin
-from starlette.middleware.sessions import SessionMiddleware
-
-from app.admin.auth import AdminAuth
-from app.admin.import_button_middleware import ImportButtonMiddleware
-from app.admin.utils_view import UtilsView
-from app.admin.view import (
-    BoostAdmin,
-    # ClubLeagueAdmin,
-    CommercialLeagueAdmin,
-    LeagueAdmin,
-    MatchAdmin,
-    PlayerAdmin,
-    PlayerMatchStatsAdmin,
-    PlayerStatusAdmin,
-    SquadAdmin,
-    SquadTourAdmin,
-    TeamAdmin,
-    TourAdmin,
-    # TourMatchesAdmin,
-    UserAdmin,
-    UserLeagueAdmin,
-)
-from app.boosts.router import router as boosts_router
+
 from app.config import settings
-# club leagues removed
-from app.custom_leagues.commercial_league.router import (
-    router as commercial_leagues_router,
-)
-from app.custom_leagues.user_league.router import router as user_leagues_router
-from app.database import engine
-from app.leagues.router import router as leagues_router
-from app.matches.router import router as matches_router
-from app.player_match_stats.router import router as player_stats_router
-from app.players.router import router as players_router
-from app.player_statuses.router import router as player_statuses_router
-from app.squads.router import router as squads_router
-from app.squad_tours.router import router as squad_tours_router
-from app.teams.router import router as teams_router
-from app.tours.router import router as tours_router
-from app.users.router import router as users_router
-from app.utils.router import router as utils_router
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()],
-)
-
-app = FastAPI()
-
-# CORS — allow frontend to call backend directly
-allowed_origins = [o.strip() for o in settings.FRONTEND_URL.split(",") if o.strip()]
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
-app.add_middleware(ImportButtonMiddleware)
-
-app.include_router(utils_router, prefix="/api")
-app.include_router(users_router, prefix="/api")
-app.include_router(leagues_router, prefix="/api")
-app.include_router(teams_router, prefix="/api")
-app.include_router(tours_router, prefix="/api")
-app.include_router(matches_router, prefix="/api")
-app.include_router(players_router, prefix="/api")
-app.include_router(player_stats_router, prefix="/api")
-app.include_router(player_statuses_router, prefix="/api")
-app.include_router(squads_router, prefix="/api")
-app.include_router(squad_tours_router, prefix="/api")
-app.include_router(boosts_router, prefix="/api")
-app.include_router(user_leagues_router, prefix="/api")
-app.include_router(commercial_leagues_router, prefix="/api")
-# app.include_router(club_leagues_router, prefix="/api")  # removed
-
-authentication_backend = AdminAuth()
-admin = Admin(
-    app, 
-    engine, 
-    authentication_backend=authentication_backend
-)
-
-admin.add_view(UserAdmin)
-admin.add_view(LeagueAdmin)
-admin.add_view(MatchAdmin)
-admin.add_view(PlayerAdmin)
-admin.add_view(PlayerMatchStatsAdmin)
-admin.add_view(PlayerStatusAdmin)
-admin.add_view(SquadAdmin)
-admin.add_view(SquadTourAdmin)
-admin.add_view(BoostAdmin)
-admin.add_view(TeamAdmin)
-admin.add_view(TourAdmin)
-admin.add_view(UserLeagueAdmin)
-admin.add_view(CommercialLeagueAdmin)
-# admin.add_view(ClubLeagueAdmin)  # removed
-admin.add_view(UtilsView)
-# admin.add_view(TourMatchesAdmin)  # removed
+
+ROLES = ("api", "admin", "all")
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler()],
+    )
+
+
+def include_api_routers(app: FastAPI):
+    from app.admin.router import router as admin_router
+    from app.boosts.router import router as boosts_router
+    # club leagues removed
+    from app.custom_leagues.commercial_league.router import (
+        router as commercial_leagues_router,
+    )
+    from app.custom_leagues.user_league.router import router as user_leagues_router
+    from app.leagues.router import router as leagues_router
+    from app.matches.router import router as matches_router
+    from app.player_match_stats.router import router as player_stats_router
+    from app.players.router import router as players_router
+    from app.push.router import router as push_router
+    from app.player_statuses.router import router as player_statuses_router
+    from app.squads.router import router as squads_router
+    from app.squad_tours.router import router as squad_tours_router
+    from app.teams.router import router as teams_router
+    from app.tours.router import router as tours_router
+    from app.users.router import router as users_router
+    from app.utils.router import router as utils_router
+
+    app.include_router(admin_router, prefix="/api/admin")
+    app.include_router(utils_router, prefix="/api")
+    app.include_router(users_router, prefix="/api")
+    app.include_router(leagues_router, prefix="/api")
+    app.include_router(teams_router, prefix="/api")
+    app.include_router(tours_router, prefix="/api")
+    app.include_router(matches_router, prefix="/api")
+    app.include_router(players_router, prefix="/api")
+    app.include_router(player_stats_router, prefix="/api")
+    app.include_router(player_statuses_router, prefix="/api")
+    app.include_router(squads_router, prefix="/api")
+    app.include_router(squad_tours_router, prefix="/api")
+    app.include_router(boosts_router, prefix="/api")
+    app.include_router(user_leagues_router, prefix="/api")
+    app.include_router(commercial_leagues_router, prefix="/api")
+    app.include_router(push_router, prefix="/api")
+    # app.include_router(club_leagues_router, prefix="/api")  # removed
+
+
+def mount_admin(app: FastAPI):
+    from sqladmin import Admin
+    from starlette.middleware import Middleware
+
+    from app.admin.auth import AdminAuth
+    from app.admin.import_button_middleware import ImportButtonMiddleware
+    from app.admin.loop_lag_view import LoopLagView
+    from app.admin.utils_view import UtilsView
+    from app.admin.view import (
+        BoostAdmin,
+        # ClubLeagueAdmin,
+        CommercialLeagueAdmin,
+        LeagueAdmin,
+        MatchAdmin,
+        PlayerAdmin,
+        PlayerMatchStatsAdmin,
+        PlayerStatusAdmin,
+        SquadAdmin,
+        SquadTourAdmin,
+        TeamAdmin,
+        TourAdmin,
+        # TourMatchesAdmin,
+        UserAdmin,
+        UserLeagueAdmin,
+    )
+    from app.database import engine
+
+    authentication_backend = AdminAuth()
+    # Session and Import-button middlewares live inside the admin sub-app only
+    # (AdminAuth brings its own SessionMiddleware), so /api requests skip them.
+    admin = Admin(
+        app,
+        engine,
+        authentication_backend=authentication_backend,
+        middlewares=[Middleware(ImportButtonMiddleware)],
+    )
+
+    admin.add_view(UserAdmin)
+    admin.add_view(LeagueAdmin)
+    admin.add_view(MatchAdmin)
+    admin.add_view(PlayerAdmin)
+    admin.add_view(PlayerMatchStatsAdmin)
+    admin.add_view(PlayerStatusAdmin)
+    admin.add_view(SquadAdmin)
+    admin.add_view(SquadTourAdmin)
+    admin.add_view(BoostAdmin)
+    admin.add_view(TeamAdmin)
+    admin.add_view(TourAdmin)
+    admin.add_view(UserLeagueAdmin)
+    admin.add_view(CommercialLeagueAdmin)
+    # admin.add_view(ClubLeagueAdmin)  # removed
+    admin.add_view(UtilsView)
+    admin.add_view(LoopLagView)
+    # admin.add_view(TourMatchesAdmin)  # removed
+
+
+@asynccontextmanager
+async def monitor_event_loop(app: FastAPI):
+    from app.utils.loop_monitor import loop_monitor
+
+    loop_monitor.start()
+    try:
+        yield
+    finally:
+        await loop_monitor.stop()
+
+
+def create_app(role: Optional[str] = None) -> FastAPI:
+    role = role or settings.APP_ROLE
+    if role not in ROLES:
+        raise ValueError(f"Unknown APP_ROLE {role!r}, expected one of {', '.join(ROLES)}")
+
+    configure_logging()
+    app = FastAPI(lifespan=monitor_event_loop if settings.LOOP_LAG_MONITOR_ENABLED else None)
+
+    # CORS — allow frontend to call backend directly
+    allowed_origins = [o.strip() for o in settings.FRONTEND_URL.split(",") if o.strip()]
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if settings.LOOP_LAG_MONITOR_ENABLED and settings.LOOP_LAG_ROUTE_ATTRIBUTION:
+        from app.utils.loop_monitor import LoopLagMiddleware, loop_monitor
+
+        app.add_middleware(LoopLagMiddleware, monitor=loop_monitor)
+
+    if role in ("api", "all"):
+        include_api_routers(app)
+    if role in ("admin", "all"):
+        mount_admin(app)
+    logging.getLogger(__name__).info(f"Application created with role {role}")
+    return app
+
+
+def __getattr__(name: str):
+    # ``uvicorn app.main:app`` keeps working: the app is built on first access
+    if name == "app":
+        globals()["app"] = application = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
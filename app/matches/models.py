@@ -1,11 +1,15 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import ForeignKey, DateTime
+from sqlalchemy import ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        Index("ix_matches_tour_id", "tour_id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     is_finished: Mapped[bool] = mapped_column(default=False, server_default="false")
@@ -28,3 +32,21 @@ class Match(Base):
 
     def __str__(self):
         return f"{self.id}"
+
+
+class MatchScoring(Base):
+    """Очки игроков, уже начисленные составам за матч.
+
+    Пишется при финализации и обновляется при каждом пересчёте
+    (version + 1), так что повторный пересчёт ничего не меняет.
+    """
+    __tablename__ = "match_scorings"
+
+    match_id: Mapped[int] = mapped_column(ForeignKey("matches.id", ondelete="CASCADE"), primary_key=True)
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    # {"player_id": points}
+    player_points: Mapped[dict] = mapped_column(JSONB, default=dict, server_default="{}")
+    scored_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    def __str__(self):
+        return f"{self.match_id} v{self.version}"
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 
+from app.admin.dependencies import get_current_admin
+from app.admin.models import Admin
+from app.batch.runner import OP_FINALIZE_MATCH, job_status
 from app.matches.schemas import MatchSchema
 from app.matches.services import MatchService
-from app.users.dependencies import get_current_user
-from app.users.models import User
 from app.utils.exceptions import ResourceNotFoundException
 
 router = APIRouter(prefix="/matches", tags=["Matches"])
@@ -37,7 +38,7 @@ async def get_matches_by_team(team_id: int) -> list[MatchSchema]:
 @router.post("/finalize/{match_id}")
 async def finalize_match(
     match_id: int,
-    user: User = Depends(get_current_user)
+    admin: Admin = Depends(get_current_admin)
 ) -> dict:
     """Финализировать матч и начислить очки всем SquadTour.
     
@@ -48,21 +49,21 @@ async def finalize_match(
        где этот игрок в основном составе
     3. Очки игрока за матч прибавляются к очкам SquadTour
     
-    TODO: Добавить проверку прав доступа (только для админов)
+    Шаг 3 — пакетная операция (app.batch.runner): запрос её не ждёт,
+    ход и результат — GET /matches/finalize/{match_id}.
+    Только для администраторов (403 остальным).
     
     Args:
         match_id: ID завершённого матча
     
     Returns:
-        Информация о количестве обновлённых SquadTour и начисленных очков
+        Статус пакетной операции (job_id, job_status, партиции)
     """
-    # TODO: Добавить проверку: if not user.is_admin: raise HTTPException(403)
-    
     try:
-        result = await MatchService.finalize_match(match_id=match_id)
+        result = await MatchService.finalize_match(match_id=match_id, wait=False)
         return {
-            "status": "success",
-            "message": f"Match {match_id} finalized successfully",
+            "status": "accepted",
+            "message": f"Match {match_id} finalization started",
             **result
         }
     except HTTPException as e:
@@ -72,3 +73,64 @@ async def finalize_match(
             status_code=500,
             detail=f"Failed to finalize match: {str(e)}"
         )
+
+
+@router.get("/finalize/{match_id}")
+async def get_finalize_match_status(
+    match_id: int,
+    admin: Admin = Depends(get_current_admin)
+) -> dict:
+    """Статус финализации матча: job_status running/done, партиции, результат."""
+    status = await job_status(OP_FINALIZE_MATCH, match_id)
+    if status is None:
+        raise ResourceNotFoundException
+    return status
+
+
+@router.post("/rescore/{match_id}")
+async def rescore_match(
+    match_id: int,
+    admin: Admin = Depends(get_current_admin)
+) -> dict:
+    """Пересчитать очки SquadTour после исправления статистики завершённого матча.
+
+    Начисляется только разница между исправленными очками игроков и уже
+    начисленными при финализации/прошлом пересчёте. Повторный вызов без
+    новых исправлений ничего не меняет. Только для администраторов.
+    """
+    try:
+        result = await MatchService.rescore_match(match_id=match_id)
+        return {
+            "status": "success",
+            "message": f"Match {match_id} re-scored successfully",
+            **result
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to re-score match: {str(e)}"
+        )
+
+
+@router.post("/rebuild_ledger/league_{league_id}")
+async def rebuild_league_points_ledger(
+    league_id: int,
+    admin: Admin = Depends(get_current_admin)
+) -> dict:
+    """Переписать леджер всех финализированных матчей лиги (только для администраторов)."""
+    return {"status": "success", **await MatchService.rebuild_league_points_ledger(league_id=league_id)}
+
+
+@router.post("/rebuild_ledger/{match_id}")
+async def rebuild_points_ledger(
+    match_id: int,
+    admin: Admin = Depends(get_current_admin)
+) -> dict:
+    """Переписать леджер очков матча по снимку MatchScoring (только для администраторов).
+
+    Очки SquadTour не меняются: леджер приводится к тому, что уже начислено.
+    """
+    squad_tours = await MatchService.rebuild_points_ledger(match_id=match_id)
+    return {"status": "success", "match_id": match_id, "squad_tours": squad_tours}
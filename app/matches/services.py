@@ -4,13 +4,25 @@ from typing import Optional
 
 import httpx
 from fastapi import HTTPException
-from sqlalchemy import exc, or_, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import and_, bindparam, delete, exc, func, insert, or_, select, update
+from sqlalchemy.orm import raiseload, selectinload
 
 from app.utils.timezone import now_msk
 
+from app.batch.runner import (
+    JOB_DONE,
+    OP_FINALIZE_MATCH,
+    Operation,
+    dispatch_celery_workers,
+    get_job,
+    plan_job,
+    register_operation,
+    reset_attempts,
+    run_job,
+    submit_job,
+)
 from app.database import async_session_maker
-from app.matches.models import Match
+from app.matches.models import Match, MatchScoring
 from app.matches.schemas import MatchCreateSchema
 from app.utils.base_service import BaseService
 from app.utils.exceptions import (
@@ -122,7 +134,52 @@ class MatchService(BaseService):
             return result.scalars().all()
 
     @classmethod
-    async def finalize_match(cls, match_id: int) -> dict:
+    async def _write_points_ledger(cls, session, match_id: int, squad_tours, player_points: dict[int, int]) -> dict[int, int]:
+        """Записать пачкой строки леджера матча для SquadTour, заменив прежние.
+
+        Returns:
+            squad_tour_id -> очки SquadTour за матч
+        """
+        from app.squad_tours.models import SquadTourPointsEntry
+        from app.squad_tours.scoring import match_points_total, squad_tour_match_entries
+
+        match_points: dict[int, int] = {}
+        rows = []
+        for squad_tour in squad_tours:
+            entries = squad_tour_match_entries(
+                main_player_ids=squad_tour.main_player_ids,
+                bench_player_ids=squad_tour.bench_player_ids,
+                captain_id=squad_tour.captain_id,
+                vice_captain_id=squad_tour.vice_captain_id,
+                used_boost=squad_tour.used_boost,
+                player_points=player_points,
+            )
+            match_points[squad_tour.id] = match_points_total(entries)
+            rows.extend(
+                {
+                    "squad_tour_id": squad_tour.id,
+                    "tour_id": squad_tour.tour_id,
+                    "match_id": match_id,
+                    **entry._asdict(),
+                }
+                for entry in entries
+            )
+
+        if match_points:
+            await session.execute(
+                delete(SquadTourPointsEntry)
+                .where(
+                    SquadTourPointsEntry.tour_id.in_({squad_tour.tour_id for squad_tour in squad_tours}),
+                    SquadTourPointsEntry.match_id == match_id,
+                    SquadTourPointsEntry.squad_tour_id.in_(match_points),
+                )
+            )
+        if rows:
+            await session.execute(insert(SquadTourPointsEntry), rows)
+        return match_points
+
+    @classmethod
+    async def finalize_match(cls, match_id: int, wait: bool = True) -> dict:
         """Finalize match and add points to all SquadTours.
         
         Full implementation with captains and boosts:
@@ -136,14 +193,21 @@ class MatchService(BaseService):
                - Vice-captain: × 2 if captain got 0 points
              * Add to squad_tour.points
         
+        Step 3 runs as a partitioned batch job (app.batch.runner): SquadTours
+        are split by squad_id ranges, each range is committed on its own.
+        Calling this again for a match whose job did not finish resumes the
+        unfinished partitions.
+        
         Args:
             match_id: ID of match to finalize
+            wait: False — submit the job and return its status right away
         
         Returns:
             dict with counts of updated SquadTours and total points added
+            (job status if not wait)
         """
         from app.player_match_stats.models import PlayerMatchStats
-        from app.squad_tours.models import SquadTour, squad_tour_players, squad_tour_bench_players
+        from app.tours.models import Tour
         
         async with async_session_maker() as session:
             # 1. Get match and validate
@@ -158,7 +222,8 @@ class MatchService(BaseService):
                     detail=f"Match {match_id} not found"
                 )
             
-            if match.is_finished:
+            job = await get_job(session, OP_FINALIZE_MATCH, match_id)
+            if (job is None and match.is_finished) or (job is not None and job.status == JOB_DONE):
                 raise HTTPException(
                     status_code=400,
                     detail=f"Match {match_id} is already finished"
@@ -170,120 +235,346 @@ class MatchService(BaseService):
                     detail=f"Match {match_id} has no tour_id assigned"
                 )
             
-            # 2. Mark match as finished
-            match.is_finished = True
-            match.finished_at = now_msk()
-            
-            # 3. Get all PlayerMatchStats for this match as dict
-            player_stats_result = await session.execute(
-                select(PlayerMatchStats)
-                .where(PlayerMatchStats.match_id == match_id)
-            )
-            player_stats_list = player_stats_result.scalars().all()
-            player_points = {ps.player_id: (ps.points or 0) for ps in player_stats_list}
-            
-            if not player_points:
-                logger.warning(f"No PlayerMatchStats found for match {match_id}")
-                await session.commit()
-                return {
-                    "match_id": match_id,
-                    "updated_squad_tours": 0,
-                    "total_points_added": 0,
-                }
-            
-            # 4. Get all SquadTours for this tour with players loaded
-            squad_tours_stmt = (
-                select(SquadTour)
-                .where(SquadTour.tour_id == match.tour_id)
-                .options(
-                    selectinload(SquadTour.main_players),
-                    selectinload(SquadTour.bench_players)
-                )
-            )
-            result = await session.execute(squad_tours_stmt)
-            squad_tours = result.scalars().all()
-            
-            updated_squad_tours = set()
-            total_points_added = 0
-            
-            # 5. For each SquadTour, calculate and add points
-            for squad_tour in squad_tours:
-                squad_points = 0
-                captain_points = 0
-                vice_captain_points = 0
+            if job is not None:
+                logger.info(f"Resuming finalization of match {match_id} (batch job {job.id})")
+                await reset_attempts(session, job)
+            else:
+                # 2. Mark match as finished
+                match.is_finished = True
+                match.finished_at = now_msk()
                 
-                # Determine if bench boost is active
-                is_bench_boost = squad_tour.used_boost == "bench_boost"
-                is_triple_captain = squad_tour.used_boost == "triple_captain"
-                
-                # Get captain and vice-captain points
-                if squad_tour.captain_id:
-                    captain_points = player_points.get(squad_tour.captain_id, 0)
-                if squad_tour.vice_captain_id:
-                    vice_captain_points = player_points.get(squad_tour.vice_captain_id, 0)
-                
-                # Process main players
-                for player in squad_tour.main_players:
-                    player_id = player.id
-                    base_points = player_points.get(player_id, 0)
-                    
-                    if base_points == 0:
-                        continue
-                    
-                    # Apply multipliers
-                    if player_id == squad_tour.captain_id:
-                        if is_triple_captain:
-                            points_to_add = base_points * 3
-                            logger.info(
-                                f"SquadTour {squad_tour.id}: Captain {player_id} × 3 (Triple Captain) = {points_to_add}"
-                            )
-                        else:
-                            points_to_add = base_points * 2
-                            logger.info(
-                                f"SquadTour {squad_tour.id}: Captain {player_id} × 2 = {points_to_add}"
-                            )
-                    elif player_id == squad_tour.vice_captain_id and captain_points == 0:
-                        points_to_add = base_points * 2
-                        logger.info(
-                            f"SquadTour {squad_tour.id}: Vice-captain {player_id} × 2 (captain got 0) = {points_to_add}"
-                        )
-                    else:
-                        points_to_add = base_points
-                    
-                    squad_points += points_to_add
+                # 3. Get all PlayerMatchStats for this match as dict
+                player_stats_result = await session.execute(
+                    select(PlayerMatchStats)
+                    .where(PlayerMatchStats.league_id == match.league_id, PlayerMatchStats.match_id == match_id)
+                )
+                player_stats_list = player_stats_result.scalars().all()
+                player_points = {ps.player_id: (ps.points or 0) for ps in player_stats_list}
+                # снимок начисленных очков — от него считают партиции и дельты rescore_match
+                session.add(MatchScoring(
+                    match_id=match_id,
+                    player_points={str(player_id): points for player_id, points in player_points.items()},
+                    scored_at=match.finished_at,
+                ))
                 
-                # Process bench players if bench boost is active
-                if is_bench_boost:
-                    for player in squad_tour.bench_players:
-                        player_id = player.id
-                        base_points = player_points.get(player_id, 0)
-                        
-                        if base_points > 0:
-                            squad_points += base_points
-                            logger.info(
-                                f"SquadTour {squad_tour.id}: Bench player {player_id} = {base_points} (Bench Boost)"
-                            )
+                if not player_points:
+                    logger.warning(f"No PlayerMatchStats found for match {match_id}")
+                    await session.commit()
+                    return {
+                        "match_id": match_id,
+                        "updated_squad_tours": 0,
+                        "total_points_added": 0,
+                    }
                 
-                # Add points to squad_tour if any points were earned
-                if squad_points > 0:
-                    squad_tour.points = (squad_tour.points or 0) + squad_points
-                    updated_squad_tours.add(squad_tour.id)
-                    total_points_added += squad_points
-                    
-                    logger.info(
-                        f"SquadTour {squad_tour.id}: Added {squad_points} points from match {match_id}"
-                    )
+                # 4. Plan squad_id partitions of the tour
+                tour = await session.get(Tour, match.tour_id)
+                job = await plan_job(
+                    session, OP_FINALIZE_MATCH, match_id, tour.league_id, {"tour_id": match.tour_id}
+                )
             
             await session.commit()
-            
-            logger.info(
-                f"Match {match_id} finalized. "
-                f"Updated {len(updated_squad_tours)} SquadTours, "
-                f"added {total_points_added} total points"
+            job_id = job.id
+        
+        # 5. Write the points ledger and add points, partition by partition
+        if not wait:
+            return await submit_job(job_id)
+        dispatch_celery_workers(job_id)
+        return await run_job(job_id)
+
+    @classmethod
+    async def _finalize_match_partition(cls, session, job, partition) -> dict:
+        """Начисляет очки матча SquadTour тура из одной партиции squad_id."""
+        from app.squad_tours.models import SquadTour
+        
+        scoring = await session.get(MatchScoring, job.target_id)
+        player_points = {int(player_id): points for player_id, points in scoring.player_points.items()}
+        squad_tours = (await session.execute(
+            select(SquadTour)
+            .where(
+                SquadTour.tour_id == job.params["tour_id"],
+                partition.squad_range(SquadTour.squad_id),
             )
-            
-            return {
+            .options(raiseload(SquadTour.main_players), raiseload(SquadTour.bench_players))
+        )).scalars().all()
+        
+        updated_squad_tours = 0
+        total_points_added = 0
+        match_points = await cls._write_points_ledger(session, job.target_id, squad_tours, player_points)
+        for squad_tour in squad_tours:
+            squad_points = match_points[squad_tour.id]
+            if squad_points > 0:
+                squad_tour.points = (squad_tour.points or 0) + squad_points
+                updated_squad_tours += 1
+                total_points_added += squad_points
+        
+        return {"updated_squad_tours": updated_squad_tours, "total_points_added": total_points_added}
+
+    @classmethod
+    async def _finish_match_finalization(cls, session, job, totals: dict) -> dict:
+        return {
+            "match_id": job.target_id,
+            "updated_squad_tours": totals.get("updated_squad_tours", 0),
+            "total_points_added": totals.get("total_points_added", 0),
+        }
+
+    @staticmethod
+    def _invalidate_match_finalization(job) -> None:
+        from app.squad_tours.live import live_scoring
+        
+        # очки матча теперь в squad_tour.points — live-кэш перечитает туры
+        live_scoring.invalidate()
+
+    @classmethod
+    async def _after_match_finalization(cls, job, result: dict) -> None:
+        from app.push.notify import notify_leaderboard_head, notify_squad_points
+        from app.squad_tours.models import SquadTour, SquadTourPointsEntry
+        
+        async with async_session_maker() as session:
+            updated_squad_points = {
+                squad_id: (tour_id, points)
+                for squad_id, tour_id, points in (await session.execute(
+                    select(SquadTour.squad_id, SquadTour.tour_id, SquadTour.points)
+                    .join(SquadTourPointsEntry, and_(
+                        SquadTourPointsEntry.tour_id == SquadTour.tour_id,
+                        SquadTourPointsEntry.squad_tour_id == SquadTour.id,
+                    ))
+                    .where(
+                        SquadTour.tour_id == job.params["tour_id"],
+                        SquadTourPointsEntry.match_id == job.target_id,
+                    )
+                    .group_by(SquadTour.tour_id, SquadTour.id)
+                    .having(func.sum(SquadTourPointsEntry.base_points * SquadTourPointsEntry.multiplier) > 0)
+                )).all()
+            }
+        await notify_squad_points(updated_squad_points)
+        await notify_leaderboard_head(job.params["tour_id"])
+        
+        logger.info(
+            f"Match {job.target_id} finalized. "
+            f"Updated {result['updated_squad_tours']} SquadTours, "
+            f"added {result['total_points_added']} total points"
+        )
+
+    @classmethod
+    async def rescore_match(cls, match_id: int) -> dict:
+        """Пересчитать очки SquadTour после исправления статистики завершённого матча.
+
+        Сравнивает текущие PlayerMatchStats.points со снимком MatchScoring,
+        находит по версиям составов (GIN-индексы) только SquadTour тура, где есть
+        изменившиеся игроки, переписывает их строки леджера и одним UPDATE
+        добавляет им разницу очков (с капитаном и бустами). Снимок и
+        документы завершённых SquadTour (app.squad_tours.documents)
+        обновляются в той же транзакции, поэтому повторный запуск ничего не меняет.
+        """
+        from app.leagues.summary import league_summaries
+        from app.player_match_stats.models import PlayerMatchStats
+        from app.push.notify import notify_leaderboard_head, notify_squad_points
+        from app.squad_tours.documents import write_squad_tour_documents
+        from app.squad_tours.live import live_scoring
+        from app.squad_tours.models import LineupVersion, SquadTour
+        from app.squad_tours.ranks import snapshot_tour_ranks
+        from app.squad_tours.scoring import squad_tour_match_points
+        from app.squads.standings import refresh_league_standings
+        from app.tours.models import Tour
+
+        async with async_session_maker() as session:
+            match = await session.get(Match, match_id)
+            if not match:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Match {match_id} not found"
+                )
+
+            # блокировка записи сериализует параллельные пересчёты матча
+            scoring = (await session.execute(
+                select(MatchScoring)
+                .where(MatchScoring.match_id == match_id)
+                .with_for_update()
+            )).scalars().first()
+            if not scoring:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Match {match_id} is not finalized yet"
+                )
+            job = await get_job(session, OP_FINALIZE_MATCH, match_id)
+            if job is not None and job.status != JOB_DONE:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Match {match_id} finalization is still in progress (batch job {job.id})"
+                )
+
+            old_points = {int(player_id): points for player_id, points in scoring.player_points.items()}
+            new_points = {
+                player_id: points or 0
+                for player_id, points in (await session.execute(
+                    select(PlayerMatchStats.player_id, PlayerMatchStats.points)
+                    .where(PlayerMatchStats.league_id == match.league_id, PlayerMatchStats.match_id == match_id)
+                )).all()
+            }
+            changed_players = {
+                player_id for player_id in old_points.keys() | new_points.keys()
+                if old_points.get(player_id, 0) != new_points.get(player_id, 0)
+            }
+            result = {
                 "match_id": match_id,
-                "updated_squad_tours": len(updated_squad_tours),
-                "total_points_added": total_points_added,
+                "version": scoring.version,
+                "changed_players": len(changed_players),
+                "updated_squad_tours": 0,
+                "points_delta": 0,
             }
+            if not changed_players:
+                return result
+
+            changed_ids = sorted(changed_players)
+            squad_tours = (await session.execute(
+                select(SquadTour)
+                .where(
+                    SquadTour.tour_id == match.tour_id,
+                    SquadTour.lineup_version_id.in_(
+                        select(LineupVersion.id).where(or_(
+                            LineupVersion.main_player_ids.overlap(changed_ids),
+                            LineupVersion.bench_player_ids.overlap(changed_ids),
+                        ))
+                    ),
+                )
+                .options(raiseload(SquadTour.main_players), raiseload(SquadTour.bench_players))
+            )).scalars().all()
+
+            # прежний вклад считаем по снимку MatchScoring: он есть и у матчей,
+            # финализированных до появления леджера
+            old_match_points = {
+                squad_tour.id: squad_tour_match_points(
+                    main_player_ids=squad_tour.main_player_ids,
+                    bench_player_ids=squad_tour.bench_player_ids,
+                    captain_id=squad_tour.captain_id,
+                    vice_captain_id=squad_tour.vice_captain_id,
+                    used_boost=squad_tour.used_boost,
+                    player_points=old_points,
+                )
+                for squad_tour in squad_tours
+            }
+            new_match_points = await cls._write_points_ledger(session, match_id, squad_tours, new_points)
+            deltas = [
+                {"squad_tour_id": squad_tour_id, "delta": points - old_match_points[squad_tour_id]}
+                for squad_tour_id, points in new_match_points.items()
+                if points != old_match_points[squad_tour_id]
+            ]
+
+            if deltas:
+                squad_tours_table = SquadTour.__table__
+                await session.execute(
+                    update(squad_tours_table)
+                    .where(
+                        squad_tours_table.c.tour_id == match.tour_id,
+                        squad_tours_table.c.id == bindparam("squad_tour_id"),
+                    )
+                    .values(points=func.coalesce(squad_tours_table.c.points, 0) + bindparam("delta")),
+                    deltas,
+                )
+
+            scoring.player_points = {str(player_id): points for player_id, points in new_points.items()}
+            scoring.version += 1
+            scoring.scored_at = now_msk()
+            result["version"] = scoring.version
+
+            updated_squad_points: dict[int, tuple[int, int]] = {}
+            if deltas:
+                updated_squad_points = {
+                    squad_id: (tour_id, points)
+                    for squad_id, tour_id, points in (await session.execute(
+                        select(SquadTour.squad_id, SquadTour.tour_id, SquadTour.points)
+                        .where(
+                            SquadTour.tour_id == match.tour_id,
+                            SquadTour.id.in_([row["squad_tour_id"] for row in deltas]),
+                        )
+                        .execution_options(populate_existing=True)
+                    )).all()
+                }
+                # места по завершённым турам пересчитываем в той же транзакции
+                tour = await session.get(Tour, match.tour_id)
+                standings_changed = bool(tour and tour.is_finalized)
+                if standings_changed:
+                    await refresh_league_standings(session, tour.league_id)
+                    # снимки мест этого и следующих завершённых туров накопительные
+                    later_tours = (await session.execute(
+                        select(Tour)
+                        .where(
+                            Tour.league_id == tour.league_id,
+                            Tour.number >= tour.number,
+                            Tour.is_finalized == True,
+                        )
+                        .order_by(Tour.number)
+                    )).scalars().all()
+                    for finalized_tour in later_tours:
+                        await snapshot_tour_ranks(session, finalized_tour)
+            # очки игроков за тур есть во всех документах с ними, даже без изменения очков состава
+            await write_squad_tour_documents(
+                session, match.tour_id, [squad_tour.id for squad_tour in squad_tours if squad_tour.is_finalized]
+            )
+            await session.commit()
+
+        result["updated_squad_tours"] = len(deltas)
+        result["points_delta"] = sum(row["delta"] for row in deltas)
+        logger.info(
+            f"Match {match_id} re-scored (v{result['version']}): "
+            f"{len(changed_players)} changed players, {len(deltas)} SquadTours, "
+            f"delta {result['points_delta']}"
+        )
+        if deltas:
+            live_scoring.invalidate()
+            if standings_changed:
+                league_summaries.invalidate(match.league_id)
+            await notify_squad_points(updated_squad_points)
+            await notify_leaderboard_head(match.tour_id)
+        return result
+
+    @classmethod
+    async def rebuild_points_ledger(cls, match_id: int) -> int:
+        """Заново записать леджер завершённого матча по снимку MatchScoring.
+
+        Нужен для матчей, финализированных до появления леджера или до
+        правила negative_total; очки SquadTour не меняются. Вызывается из
+        POST /matches/rebuild_ledger. Возвращает число SquadTour.
+        """
+        from app.squad_tours.models import SquadTour
+
+        async with async_session_maker() as session:
+            match = await session.get(Match, match_id)
+            scoring = await session.get(MatchScoring, match_id)
+            if not match or not scoring:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Match {match_id} is not finalized yet"
+                )
+            squad_tours = (await session.execute(
+                select(SquadTour)
+                .where(SquadTour.tour_id == match.tour_id)
+                .options(raiseload(SquadTour.main_players), raiseload(SquadTour.bench_players))
+            )).scalars().all()
+            player_points = {int(player_id): points for player_id, points in scoring.player_points.items()}
+            await cls._write_points_ledger(session, match_id, squad_tours, player_points)
+            await session.commit()
+        return len(squad_tours)
+
+    @classmethod
+    async def rebuild_league_points_ledger(cls, league_id: int) -> dict:
+        """rebuild_points_ledger для всех финализированных матчей лиги."""
+        async with async_session_maker() as session:
+            match_ids = (await session.execute(
+                select(Match.id)
+                .join(MatchScoring, MatchScoring.match_id == Match.id)
+                .where(Match.league_id == league_id, Match.tour_id.is_not(None))
+                .order_by(Match.id)
+            )).scalars().all()
+        squad_tours = 0
+        for match_id in match_ids:
+            squad_tours += await cls.rebuild_points_ledger(match_id)
+        return {"league_id": league_id, "matches": len(match_ids), "squad_tour_rows": squad_tours}
+
+
+register_operation(OP_FINALIZE_MATCH, Operation(
+    run_partition=MatchService._finalize_match_partition,
+    finish=MatchService._finish_match_finalization,
+    after_finish=MatchService._after_match_finalization,
+    invalidate=MatchService._invalidate_match_finalization,
+))
@@ -0,0 +1,24 @@
+"""Импорт всех ORM-моделей, чтобы relationship() по именам классов
+сконфигурировались без сборки приложения (скрипты, бенчмарки).
+
+Порядок важен: user_league_squads объявлена в app.squads.models и
+переобъявляется (extend_existing) в моделях пользовательских лиг.
+"""
+
+from app.admin.models import Admin  # noqa: F401
+from app.leagues.models import League  # noqa: F401
+from app.teams.models import Team  # noqa: F401
+from app.matches.models import Match  # noqa: F401
+from app.players.models import Player  # noqa: F401
+from app.player_match_stats.models import PlayerMatchStats  # noqa: F401
+from app.squads.models import Squad  # noqa: F401
+from app.boosts.models import Boost  # noqa: F401
+from app.users.models import User  # noqa: F401
+from app.tours.models import Tour  # noqa: F401
+from app.custom_leagues.user_league.models import UserLeague  # noqa: F401
+from app.custom_leagues.commercial_league.models import CommercialLeague  # noqa: F401
+from app.player_statuses.models import PlayerStatus  # noqa: F401
+from app.squad_tours.models import SquadTour  # noqa: F401
+from app.translations.models import Translation  # noqa: F401
+from app.batch.models import BatchJob  # noqa: F401
+from app.archives.models import LeagueArchive  # noqa: F401
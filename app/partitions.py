@@ -0,0 +1,200 @@
+"""Секции squad_tours и player_match_stats.
+
+squad_tours, squad_tour_players, squad_tour_bench_players и
+squad_tour_points_ledger секционированы диапазонами tour_id по 100 туров
+(<таблица>_p<нижняя граница>), player_match_stats — списком по league_id
+(player_match_stats_l<id лиги>). Новые секции создают триггеры на вставку
+в tours и leagues (функции ensure_tour_partitions / ensure_league_partition
+из миграции d7e6f5a4b3c2), поэтому сервисам ничего делать не нужно —
+только передавать tour_id / league_id в условия, чтобы план читал одну
+секцию.
+
+Старые секции отсоединяются отсюда; отсоединённые таблицы остаются в базе
+(или удаляются с --drop) и больше не видны через родительские таблицы.
+Секцию туров можно снять, только когда каждая лига с турами в её
+диапазоне закончена (все туры завершены) или архивирована и очищена
+(league_archives.trimmed_at — файлы сверены с манифестом): история идущей
+лиги, даже её завершённых туров, нужна местам, документам и леджеру.
+
+    python -m app.partitions list
+    python -m app.partitions ensure
+    python -m app.partitions detach-tours --before-tour 1200 [--from-tour 1000] [--drop]
+    python -m app.partitions detach-league 39 [--drop]
+
+DETACH ... CONCURRENTLY не блокирует чтение и запись в родительскую
+таблицу и не может идти в транзакции, поэтому соединение — в AUTOCOMMIT.
+Прерванное отсоединение при повторном запуске завершается через FINALIZE.
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# таблицы, ссылающиеся на squad_tours, отсоединяются раньше неё
+TOUR_TABLES = ("squad_tour_points_ledger", "squad_tour_players", "squad_tour_bench_players", "squad_tours")
+LEAGUE_TABLE = "player_match_stats"
+
+_RANGE_BOUND = re.compile(r"FROM \((\d+)\) TO \((\d+)\)")
+_LIST_BOUND = re.compile(r"IN \((\d+)\)")
+
+
+@dataclass
+class Partition:
+    parent: str
+    name: str
+    rows: int
+    detach_pending: bool
+    lower_tour_id: Optional[int] = None
+    upper_tour_id: Optional[int] = None
+    league_id: Optional[int] = None
+
+
+async def list_partitions(conn) -> list[Partition]:
+    """Секции всех секционированных таблиц (rows — оценка по статистике)."""
+    result = await conn.execute(text("""
+        SELECT parent.relname, child.relname, pg_get_expr(child.relpartbound, child.oid),
+               greatest(child.reltuples, 0)::bigint, inh.inhdetachpending
+        FROM pg_inherits inh
+        JOIN pg_class parent ON parent.oid = inh.inhparent
+        JOIN pg_class child ON child.oid = inh.inhrelid
+        WHERE parent.relname = ANY(:parents) AND child.relkind IN ('r', 'p')
+        ORDER BY parent.relname, child.relname
+    """), {"parents": [*TOUR_TABLES, LEAGUE_TABLE]})
+    partitions = []
+    for parent, name, bound, rows, detach_pending in result.all():
+        partition = Partition(parent, name, rows, detach_pending)
+        if match := _RANGE_BOUND.search(bound):
+            partition.lower_tour_id, partition.upper_tour_id = int(match[1]), int(match[2])
+        elif match := _LIST_BOUND.search(bound):
+            partition.league_id = int(match[1])
+        partitions.append(partition)
+    return partitions
+
+
+async def ensure_partitions(conn) -> None:
+    """Создать недостающие секции для незавершённых туров и всех лиг.
+
+    Нужна после восстановления из дампа без триггеров; завершённые туры
+    пропускаются, чтобы не пересоздавать пустыми уже отсоединённые секции.
+    """
+    await conn.execute(text("SELECT ensure_tour_partitions(id) FROM tours WHERE NOT is_finalized"))
+    await conn.execute(text("SELECT ensure_league_partition(id) FROM leagues"))
+
+
+async def _detach(conn, partition: Partition, drop: bool) -> None:
+    mode = "FINALIZE" if partition.detach_pending else "CONCURRENTLY"
+    await conn.execute(text(f'ALTER TABLE "{partition.parent}" DETACH PARTITION "{partition.name}" {mode}'))
+    if partition.parent != "squad_tours" and partition.parent in TOUR_TABLES:
+        # отсоединённая таблица сохраняет внешний ключ на squad_tours,
+        # и он не дал бы отсоединить секцию squad_tours с теми же турами
+        foreign_keys = (await conn.execute(text("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = CAST(:name AS regclass) AND confrelid = CAST('squad_tours' AS regclass)
+        """), {"name": partition.name})).scalars().all()
+        for foreign_key in foreign_keys:
+            await conn.execute(text(f'ALTER TABLE "{partition.name}" DROP CONSTRAINT "{foreign_key}"'))
+    if drop:
+        await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+    logger.info(f"{'Dropped' if drop else 'Detached'} partition {partition.name} of {partition.parent}")
+
+
+async def detach_tour_partitions(before_tour_id: int, drop: bool = False, from_tour_id: int = 0) -> list[str]:
+    """Отсоединить секции туров с from_tour_id <= id < before_tour_id (диапазоны целиком в границах).
+
+    Каждая лига с турами в этих диапазонах должна быть закончена или
+    архивирована; иначе ValueError и ничего не отсоединяется.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        partitions = [
+            partition for partition in await list_partitions(conn)
+            if partition.parent in TOUR_TABLES
+            and from_tour_id <= partition.lower_tour_id and partition.upper_tour_id <= before_tour_id
+        ]
+        for lower_tour_id, upper_tour_id in sorted({
+            (partition.lower_tour_id, partition.upper_tour_id) for partition in partitions
+        }):
+            running = (await conn.execute(text("""
+                SELECT DISTINCT owner.league_id FROM tours owner
+                WHERE owner.id >= :lower AND owner.id < :upper
+                  AND EXISTS (SELECT 1 FROM tours t WHERE t.league_id = owner.league_id AND NOT t.is_finalized)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM league_archives archive
+                      WHERE archive.league_id = owner.league_id AND archive.trimmed_at IS NOT NULL
+                  )
+                ORDER BY owner.league_id
+            """), {"lower": lower_tour_id, "upper": upper_tour_id})).scalars().all()
+            if running:
+                raise ValueError(
+                    f"Leagues {running} have tours that are not finalized, partitions from {lower_tour_id} are kept"
+                )
+
+        partitions.sort(key=lambda partition: (partition.lower_tour_id, TOUR_TABLES.index(partition.parent)))
+        for partition in partitions:
+            await _detach(conn, partition, drop)
+        return [partition.name for partition in partitions]
+
+
+async def detach_league_partition(league_id: int, drop: bool = False) -> Optional[str]:
+    """Отсоединить секцию player_match_stats лиги, все туры которой завершены."""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        partition = next((
+            partition for partition in await list_partitions(conn)
+            if partition.parent == LEAGUE_TABLE and partition.league_id == league_id
+        ), None)
+        if partition is None:
+            return None
+        unfinished = (await conn.execute(text(
+            "SELECT count(*) FROM tours WHERE league_id = :league_id AND NOT is_finalized"
+        ), {"league_id": league_id})).scalar()
+        if unfinished:
+            raise ValueError(f"League {league_id} has {unfinished} tours that are not finalized")
+        await _detach(conn, partition, drop)
+        return partition.name
+
+
+async def _main(args) -> None:
+    if args.command == "list":
+        async with engine.connect() as conn:
+            for partition in await list_partitions(conn):
+                bound = (
+                    f"league {partition.league_id}" if partition.league_id is not None
+                    else f"tours [{partition.lower_tour_id}, {partition.upper_tour_id})"
+                )
+                pending = "  DETACH PENDING" if partition.detach_pending else ""
+                print(f"{partition.parent:<26} {partition.name:<40} {bound:<24} ~{partition.rows} rows{pending}")
+    elif args.command == "ensure":
+        async with engine.begin() as conn:
+            await ensure_partitions(conn)
+    elif args.command == "detach-tours":
+        for name in await detach_tour_partitions(args.before_tour, args.drop, args.from_tour):
+            print(name)
+    elif args.command == "detach-league":
+        print(await detach_league_partition(args.league_id, args.drop) or "no partition")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="секции и их границы")
+    commands.add_parser("ensure", help="создать недостающие секции")
+    detach_tours = commands.add_parser("detach-tours", help="отсоединить секции туров с id < --before-tour")
+    detach_tours.add_argument("--before-tour", type=int, required=True)
+    detach_tours.add_argument("--from-tour", type=int, default=0)
+    detach_tours.add_argument("--drop", action="store_true", help="удалить отсоединённые таблицы")
+    detach_league = commands.add_parser("detach-league", help="отсоединить секцию статистики лиги")
+    detach_league.add_argument("league_id", type=int)
+    detach_league.add_argument("--drop", action="store_true", help="удалить отсоединённую таблицу")
+    logging.basicConfig(level=logging.INFO)
+    engine.echo = False
+    asyncio.run(_main(parser.parse_args()))
@@ -1,14 +1,26 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 class PlayerMatchStats(Base):
+    """Статистика игрока в матче; секции по league_id (app.partitions)."""
     __tablename__ = "player_match_stats"
+    __table_args__ = (
+        Index("ix_player_match_stats_player_id", "player_id"),
+        Index(
+            "uq_player_match_stats_match_id_player_id_league_id",
+            "match_id", "player_id", "league_id",
+            unique=True,
+        ),
+        Index("ix_player_match_stats_league_id_version", "league_id", "version"),
+        {"postgresql_partition_by": "LIST (league_id)"},
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     player_id: Mapped[int] = mapped_column(ForeignKey("players.id"))
     match_id: Mapped[int] = mapped_column(ForeignKey("matches.id"))
     team_id: Mapped[int] = mapped_column(ForeignKey("teams.id"))
-    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id"))
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id"), primary_key=True)
     position: Mapped[str] = mapped_column(default="Unknown", nullable=True)
     goals_total: Mapped[int] = mapped_column(default=0, nullable=True)
     assists: Mapped[int] = mapped_column(default=0, nullable=True)
@@ -16,6 +28,8 @@ class PlayerMatchStats(Base):
     red_cards: Mapped[int] = mapped_column(default=0, nullable=True)
     minutes_played: Mapped[int] = mapped_column(default=0, nullable=True)
     points: Mapped[int] = mapped_column(default=0, nullable=True)
+    # id последней изменившей строку транзакции, как Player.version
+    version: Mapped[int] = mapped_column(BigInteger, server_default="0")
 
     player: Mapped["Player"] = relationship(back_populates="match_stats")
     match: Mapped["Match"] = relationship()
@@ -1,15 +1,74 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 
 from app.matches.models import Match
 from app.player_match_stats.models import PlayerMatchStats
+from app.players.models import Player
 from app.teams.models import Team
+from app.tours.models import Tour
 from app.utils.base_service import BaseService
+from app.utils.batch_scoring import columns_from_statistics, get_scoring_rules, score_batch
+from app.utils.external_api import external_api
 import logging
 from sqlalchemy.future import select
 from app.database import async_session_maker
 
 logger = logging.getLogger(__name__)
 
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+# /fixtures/players отдаёт позицию одной буквой
+POSITIONS = {"G": "Goalkeeper", "D": "Defender", "M": "Midfielder", "F": "Attacker"}
+STAT_FIELDS = (
+    "team_id",
+    "position",
+    "goals_total",
+    "assists",
+    "yellow_cards",
+    "red_cards",
+    "minutes_played",
+    "points",
+)
+
+
+def fixture_players_to_rows(match_id: int, league_id: int, teams: list[dict]) -> list[dict]:
+    """Ответ /fixtures/players -> строки PlayerMatchStats.
+
+    Очки всего матча считаются одним проходом score_batch по правилам лиги.
+    """
+    rows = []
+    statistics_list = []
+    for team in teams:
+        team_id = team["team"]["id"]
+        for entry in team.get("players", []):
+            if not entry.get("statistics"):
+                continue
+            statistics = entry["statistics"][0]
+            games = dict(statistics.get("games") or {})
+            games["position"] = POSITIONS.get(games.get("position"), games.get("position"))
+            statistics = {**statistics, "games": games}
+            goals = statistics.get("goals") or {}
+            cards = statistics.get("cards") or {}
+            rows.append({
+                "player_id": entry["player"]["id"],
+                "match_id": match_id,
+                "team_id": team_id,
+                "league_id": league_id,
+                "position": games["position"] or "Unknown",
+                "goals_total": goals.get("total") or 0,
+                "assists": goals.get("assists") or 0,
+                "yellow_cards": cards.get("yellow") or 0,
+                "red_cards": cards.get("red") or 0,
+                "minutes_played": games.get("minutes") or 0,
+            })
+            statistics_list.append(statistics)
+    points = score_batch(columns_from_statistics(statistics_list), get_scoring_rules(league_id))
+    for row, row_points in zip(rows, points.tolist()):
+        row["points"] = row_points
+    return rows
+
 class PlayerMatchStatsService(BaseService):
     model = PlayerMatchStats
 
@@ -84,6 +143,7 @@ class PlayerMatchStatsService(BaseService):
                 stats_to_add = []
                 for player in home_players + away_players:
                     existing_stmt = select(cls.model).where(
+                        cls.model.league_id == match.league_id,
                         cls.model.player_id == player.id,
                         cls.model.match_id == match.id
                     )
@@ -104,4 +164,121 @@ class PlayerMatchStatsService(BaseService):
                     total_added += len(stats_to_add)
 
             logger.info(f"Added empty stats for total {total_added} players in all matches")
-            return total_added
\ No newline at end of file
+            return total_added
+
+    @classmethod
+    async def upsert_stats(cls, rows: list[dict]) -> list[int]:
+        """Bulk upsert по (match_id, player_id, league_id); пишутся только изменившиеся строки.
+
+        Returns:
+            player_id строк, которые были вставлены или изменены
+        """
+        if not rows:
+            return []
+        async with async_session_maker() as session:
+            known = set((await session.execute(
+                select(Player.id).where(Player.id.in_({row["player_id"] for row in rows}))
+            )).scalars().all())
+            unknown = [row["player_id"] for row in rows if row["player_id"] not in known]
+            if unknown:
+                logger.warning(f"Skipping stats for unknown players: {unknown}")
+            rows = [row for row in rows if row["player_id"] in known]
+            if not rows:
+                return []
+
+            stmt = insert(cls.model).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[cls.model.match_id, cls.model.player_id, cls.model.league_id],
+                set_={field: stmt.excluded[field] for field in STAT_FIELDS},
+                where=or_(*(
+                    getattr(cls.model, field).is_distinct_from(stmt.excluded[field])
+                    for field in STAT_FIELDS
+                )),
+            ).returning(cls.model.player_id)
+            changed = (await session.execute(stmt)).scalars().all()
+            await session.commit()
+            return changed
+
+    @classmethod
+    async def ingest_match(cls, match_id: int) -> dict:
+        """Забрать статистику матча из внешнего API и сохранить изменения.
+
+        Если матч завершён (FT/AET/PEN), запускается MatchService.finalize_match;
+        изменения по уже финализированному матчу идут через MatchService.rescore_match.
+        """
+        from app.matches.services import MatchService
+
+        async with async_session_maker() as session:
+            match = await session.get(Match, match_id)
+            if not match:
+                raise ValueError(f"Match {match_id} not found")
+            league_id = match.league_id
+            already_finished = match.is_finished
+
+        fixture = await external_api.fetch_fixture(match_id)
+        teams = await external_api.fetch_fixture_players(match_id)
+        status = fixture["fixture"]["status"]
+
+        changed = await cls.upsert_stats(fixture_players_to_rows(match_id, league_id, teams))
+
+        async with async_session_maker() as session:
+            match = await session.get(Match, match_id)
+            if status.get("elapsed") is not None and match.duration != status["elapsed"]:
+                match.duration = status["elapsed"]
+                await session.commit()
+
+        finalized = False
+        if already_finished:
+            if changed:
+                await MatchService.rescore_match(match_id)
+        elif status.get("short") in FINISHED_STATUSES:
+            await MatchService.finalize_match(match_id)
+            finalized = True
+
+        logger.info(
+            f"Ingested match {match_id} ({status.get('short')}): "
+            f"{len(changed)} changed stats rows, finalized={finalized}"
+        )
+        return {"match_id": match_id, "status": status.get("short"), "changed": len(changed), "finalized": finalized}
+
+    @classmethod
+    async def ingest_live_matches(cls) -> list[dict]:
+        """Обработать все начавшиеся, но не завершённые матчи текущих туров.
+
+        После импорта рассылает изменившиеся live-очки составов: публикация
+        идёт отсюда, а не из запросов на чтение.
+        """
+        from app.squad_tours.live import live_scoring
+
+        async with async_session_maker() as session:
+            match_ids = (await session.execute(
+                select(Match.id)
+                .join(Tour, Tour.id == Match.tour_id)
+                .where(
+                    Tour.is_started.is_(True),
+                    Tour.is_finalized.is_(False),
+                    Match.is_finished.is_(False),
+                    Match.date <= datetime.now(timezone.utc),
+                )
+                .order_by(Match.date)
+            )).scalars().all()
+        results = await cls.ingest_matches(match_ids)
+        if any("error" not in result for result in results):
+            await live_scoring.publish()
+        return results
+
+    @classmethod
+    async def ingest_matches(cls, match_ids) -> list[dict]:
+        """ingest_match по очереди; ошибка одного матча не останавливает остальные.
+
+        У упавшего матча в результате {"match_id", "error"}, следующий
+        запуск по расписанию попробует его снова.
+        """
+        results = []
+        for match_id in match_ids:
+            try:
+                results.append(await cls.ingest_match(match_id))
+            except Exception as e:
+                logger.exception(f"Failed to ingest match {match_id}: {e!r}")
+                results.append({"match_id": match_id, "error": repr(e)})
+        return results
@@ -0,0 +1,173 @@
+"""Компактный формат списков игроков (format=compact).
+
+Мини-приложение на старте грузит весь пул игроков лиги. Вместо массива
+объектов ответ — заголовок и колонки:
+
+    {"version": 20417, "fields": ["id", "team_id", "points"],
+     "columns": [[101, 102], [7, 7], [34, 12]], "removed": []}
+
+fields= оставляет только нужные поля (id есть всегда), since_version= —
+только строки, изменившиеся после ответа с этим version, а в removed —
+id игроков, которые из выборки ушли (удалены или перешли в другую
+команду / лигу). Клиент удаляет removed из кэша, по id заменяет строки
+из columns и запоминает version.
+
+version ответа — pg_snapshot_xmin снимка, которым читались строки, а у
+строк — id изменившей их транзакции (триггеры миграции a0b9c8d7e6f5).
+Всё, чего этот снимок не видел, закоммичено транзакцией с id не меньше
+xmin, поэтому условие version >= since_version ничего не теряет; строки,
+пришедшие повторно, клиент просто перезапишет.
+"""
+
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from fastapi import Query
+from sqlalchemy import func, or_, select, text
+
+from app.database import async_session_maker
+from app.player_match_stats.models import PlayerMatchStats
+from app.players.models import Player, PlayerRemoval
+from app.players.schemas import PlayerSchema, PlayerWithTotalPointsSchema
+from app.teams.models import Team
+from app.utils.exceptions import InvalidDataException, ResourceNotFoundException
+
+PLAYER_FIELDS = tuple(PlayerSchema.model_fields)
+PLAYER_WITH_POINTS_FIELDS = tuple(PlayerWithTotalPointsSchema.model_fields)
+TEAM_FIELDS = ("team_name", "team_name_rus", "team_logo")
+
+
+@dataclass
+class CompactQuery:
+    fields: Optional[str]
+    since_version: Optional[int]
+
+
+def compact_query(
+    format: Literal["json", "compact"] = "json",
+    fields: Optional[str] = None,
+    since_version: Optional[int] = Query(None, ge=0),
+) -> Optional[CompactQuery]:
+    """Параметры компактного формата; None — обычный ответ списком объектов."""
+    if format != "compact":
+        if fields is not None or since_version is not None:
+            raise InvalidDataException(msg="fields and since_version require format=compact")
+        return None
+    return CompactQuery(fields=fields, since_version=since_version)
+
+
+def select_fields(fields: Optional[str], available: tuple[str, ...]) -> list[str]:
+    if fields is None:
+        return list(available)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in available]
+    if unknown:
+        raise InvalidDataException(msg=f"Unknown fields: {', '.join(unknown)}; available: {', '.join(available)}")
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+
+async def _snapshot_version(session) -> int:
+    # первым запросом: следующие читают снимком не раньше этого
+    return (await session.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))).scalar()
+
+
+async def _removed(session, since_version: int, present: set[int], **filter_by) -> list[int]:
+    player_ids = (await session.execute(
+        select(PlayerRemoval.player_id)
+        .where(
+            PlayerRemoval.version >= since_version,
+            *(PlayerRemoval.__table__.c[key] == value for key, value in filter_by.items()),
+        )
+        .distinct()
+    )).scalars().all()
+    # вернувшиеся в выборку уже есть среди строк
+    return sorted(set(player_ids) - present)
+
+
+def _compact(version: int, fields: list[str], rows, removed: list[int]) -> dict:
+    return {
+        "version": version,
+        "fields": fields,
+        "columns": [list(column) for column in zip(*rows)] if rows else [[] for _ in fields],
+        "removed": removed,
+    }
+
+
+async def compact_players(query: CompactQuery, **filter_by) -> dict:
+    """Игроки (поля PlayerSchema) с фильтром по колонкам players, например league_id."""
+    fields = select_fields(query.fields, PLAYER_FIELDS)
+    columns = Player.__table__.c
+    async with async_session_maker() as session:
+        version = await _snapshot_version(session)
+        stmt = (
+            select(*(columns[field] for field in fields))
+            .where(*(columns[key] == value for key, value in filter_by.items()))
+            .order_by(Player.id)
+        )
+        if query.since_version is not None:
+            stmt = stmt.where(Player.version >= query.since_version)
+        rows = (await session.execute(stmt)).all()
+        if query.since_version is None:
+            if not rows and filter_by:
+                raise ResourceNotFoundException
+            removed = []
+        else:
+            removed = await _removed(session, query.since_version, {row[0] for row in rows}, **filter_by)
+    return _compact(version, fields, rows, removed)
+
+
+async def compact_players_with_points(query: CompactQuery, league_id: int) -> dict:
+    """Игроки лиги с суммой очков (поля PlayerWithTotalPointsSchema).
+
+    Агрегат по player_match_stats считается, только если запрошено поле
+    points; тогда в дельту попадают и игроки с изменившейся статистикой,
+    а с полями команды — игроки изменившихся команд.
+    """
+    fields = select_fields(query.fields, PLAYER_WITH_POINTS_FIELDS)
+    total_points = (
+        select(PlayerMatchStats.player_id, func.sum(PlayerMatchStats.points).label("total_points"))
+        .where(PlayerMatchStats.league_id == league_id)  # одна секция player_match_stats
+        .group_by(PlayerMatchStats.player_id)
+        .subquery()
+    )
+    columns = {
+        "id": Player.id,
+        "name": Player.name,
+        "name_rus": Player.name_rus,
+        "team_id": Player.team_id,
+        "team_name": Team.name,
+        "team_name_rus": Team.name_rus,
+        "team_logo": Team.logo,
+        "position": Player.position,
+        "market_value": Player.market_value,
+        "points": func.coalesce(total_points.c.total_points, 0),
+    }
+    stmt = (
+        select(*(columns[field] for field in fields))
+        .select_from(Player)
+        .join(Team, Player.team_id == Team.id)
+        .where(Player.league_id == league_id)
+        .order_by(Player.id)
+    )
+    if "points" in fields:
+        stmt = stmt.outerjoin(total_points, Player.id == total_points.c.player_id)
+
+    async with async_session_maker() as session:
+        version = await _snapshot_version(session)
+        if query.since_version is not None:
+            changed = [Player.version >= query.since_version]
+            if any(field in TEAM_FIELDS for field in fields):
+                changed.append(Team.version >= query.since_version)
+            if "points" in fields:
+                changed.append(Player.id.in_(
+                    select(PlayerMatchStats.player_id).where(
+                        PlayerMatchStats.league_id == league_id,
+                        PlayerMatchStats.version >= query.since_version,
+                    )
+                ))
+            stmt = stmt.where(or_(*changed))
+        rows = (await session.execute(stmt)).all()
+        removed = [] if query.since_version is None else await _removed(
+            session, query.since_version, {row[0] for row in rows}, league_id=league_id
+        )
+    return _compact(version, fields, rows, removed)
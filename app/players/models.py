@@ -1,35 +1,36 @@
-from sqlalchemy import Column, ForeignKey, Integer, Table
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, Table
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.config import settings
 from app.database import Base
 player_squad_tours = Table(
     "squad_tour_players",
     Base.metadata,
-    Column(
-        "squad_tour_id",
-        Integer,
-        ForeignKey("squad_tours.id"),
-        primary_key=True,
-    ),
+    Column("squad_tour_id", Integer, primary_key=True),
     Column("player_id", Integer, ForeignKey("players.id"), primary_key=True),
+    Column("tour_id", Integer, ForeignKey("tours.id"), primary_key=True),
     extend_existing=True,
+    postgresql_partition_by="RANGE (tour_id)",
 )
 
 player_bench_squad_tours = Table(
     "squad_tour_bench_players",
     Base.metadata,
-    Column(
-        "squad_tour_id",
-        Integer,
-        ForeignKey("squad_tours.id"),
-        primary_key=True,
-    ),
+    Column("squad_tour_id", Integer, primary_key=True),
     Column("player_id", Integer, ForeignKey("players.id"), primary_key=True),
+    Column("tour_id", Integer, ForeignKey("tours.id"), primary_key=True),
     extend_existing=True,
+    postgresql_partition_by="RANGE (tour_id)",
 )
 
 
 class Player(Base):
+    """Игрок.
+
+    version — id последней транзакции, изменившей строку (триггер из
+    миграции a0b9c8d7e6f5); по нему компактный список игроков отдаёт
+    только изменения (app.players.compact).
+    """
     __tablename__ = "players"
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
@@ -40,6 +41,7 @@ class Player(Base):
     market_value: Mapped[int] = mapped_column(nullable=True)
     sport: Mapped[int] = mapped_column(default=1)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id"), nullable=False)
+    version: Mapped[int] = mapped_column(BigInteger, server_default="0")
 
     team: Mapped["Team"] = relationship(back_populates="players")
     league: Mapped["League"] = relationship(back_populates="players")
@@ -54,12 +56,54 @@ class Player(Base):
     )
 
     # NEW ARCHITECTURE: Players are linked only to SquadTour, not Squad
-    squad_tours: Mapped[list["SquadTour"]] = relationship(
-        secondary=player_squad_tours, back_populates="main_players"
-    )
-    bench_squad_tours: Mapped[list["SquadTour"]] = relationship(
-        secondary=player_bench_squad_tours, back_populates="bench_players"
-    )
+    if settings.LINEUP_STORAGE == "arrays":
+        squad_tours: Mapped[list["SquadTour"]] = relationship(
+            secondary="lineup_versions",
+            primaryjoin="Player.id == any_(foreign(LineupVersion.main_player_ids))",
+            secondaryjoin="LineupVersion.id == foreign(SquadTour.lineup_version_id)",
+            viewonly=True, uselist=True,
+        )
+        bench_squad_tours: Mapped[list["SquadTour"]] = relationship(
+            secondary="lineup_versions",
+            primaryjoin="Player.id == any_(foreign(LineupVersion.bench_player_ids))",
+            secondaryjoin="LineupVersion.id == foreign(SquadTour.lineup_version_id)",
+            viewonly=True, uselist=True,
+        )
+    else:
+        squad_tours: Mapped[list["SquadTour"]] = relationship(
+            secondary=player_squad_tours,
+            primaryjoin="Player.id == foreign(squad_tour_players.c.player_id)",
+            secondaryjoin="and_(SquadTour.id == foreign(squad_tour_players.c.squad_tour_id), "
+                          "SquadTour.tour_id == foreign(squad_tour_players.c.tour_id))",
+            back_populates="main_players",
+        )
+        bench_squad_tours: Mapped[list["SquadTour"]] = relationship(
+            secondary=player_bench_squad_tours,
+            primaryjoin="Player.id == foreign(squad_tour_bench_players.c.player_id)",
+            secondaryjoin="and_(SquadTour.id == foreign(squad_tour_bench_players.c.squad_tour_id), "
+                          "SquadTour.tour_id == foreign(squad_tour_bench_players.c.tour_id))",
+            back_populates="bench_players",
+        )
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class PlayerRemoval(Base):
+    """Игрок ушёл из команды / лиги или удалён: прежние team_id и league_id.
+
+    Пишется триггером на players (миграция a0b9c8d7e6f5), version — id
+    транзакции. Нужен компактному списку игроков: клиент с кэшем по
+    since_version должен узнать и об игроках, которых в выборке больше нет.
+    """
+    __tablename__ = "player_removals"
+    __table_args__ = (
+        Index("ix_player_removals_league_id_version", "league_id", "version"),
+        Index("ix_player_removals_team_id_version", "team_id", "version"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    player_id: Mapped[int]
+    team_id: Mapped[int]
+    league_id: Mapped[int]
+    version: Mapped[int] = mapped_column(BigInteger)
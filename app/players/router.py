@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from app.players.compact import CompactQuery, compact_players, compact_players_with_points, compact_query
 from app.tours.schemas import TourWithMatchesSchema
 from app.utils.exceptions import ResourceNotFoundException
 from app.players.schemas import PlayerSchema, PlayerBaseInfoSchema, PlayerExtendedInfoSchema, PlayerFullInfoSchema, \
-    PlayerWithTotalPointsSchema
+    PlayerOwnershipSchema, PlayerWithTotalPointsSchema
 from app.players.services import PlayerService
 
 router = APIRouter(prefix="/players", tags=["Players"])
 
 @router.get("/all")
-async def list_players() -> list[PlayerSchema]:
+async def list_players(compact: Optional[CompactQuery] = Depends(compact_query)) -> list[PlayerSchema]:
+    """format=compact: колонки с заголовком, fields= и since_version= (app.players.compact)."""
+    if compact:
+        return JSONResponse(await compact_players(compact))
     return await PlayerService.find_all()
 
 @router.get("/player_{player_id}")
@@ -20,27 +27,46 @@ async def get_player(player_id: int) -> PlayerSchema:
     return res
 
 @router.get("/team_{team_id}")
-async def get_players_by_team_id(team_id: int) -> list[PlayerSchema]:
+async def get_players_by_team_id(
+    team_id: int, compact: Optional[CompactQuery] = Depends(compact_query)
+) -> list[PlayerSchema]:
+    if compact:
+        return JSONResponse(await compact_players(compact, team_id=team_id))
     res = await PlayerService.find_filtered(team_id=team_id)
     if not res:
         raise ResourceNotFoundException
     return res
 
 @router.get("/league_{league_id}")
-async def get_players_by_league_id(league_id: int) -> list[PlayerSchema]:
+async def get_players_by_league_id(
+    league_id: int, compact: Optional[CompactQuery] = Depends(compact_query)
+) -> list[PlayerSchema]:
+    if compact:
+        return JSONResponse(await compact_players(compact, league_id=league_id))
     res = await PlayerService.find_filtered(league_id=league_id)
     if not res:
         raise ResourceNotFoundException
     return res
 
 @router.get("/league/{league_id}/players_with_points", response_model=list[PlayerWithTotalPointsSchema])
-async def get_players_with_total_points(league_id: int) -> list[PlayerWithTotalPointsSchema]:
+async def get_players_with_total_points(
+    league_id: int, compact: Optional[CompactQuery] = Depends(compact_query)
+) -> list[PlayerWithTotalPointsSchema]:
+    if compact:
+        return JSONResponse(await compact_players_with_points(compact, league_id))
     try:
         players = await PlayerService.find_all_with_total_points(league_id=league_id)
         return players
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@router.get("/tour/{tour_id}/most-selected", response_model=list[PlayerOwnershipSchema])
+async def get_most_selected_players(tour_id: int, limit: int = Query(20, ge=1, le=100)) -> list[PlayerOwnershipSchema]:
+    try:
+        return await PlayerService.get_most_selected(tour_id, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
 @router.get("/{player_id}/base-info", response_model=PlayerBaseInfoSchema)
 async def get_player_base_info(player_id: int) -> PlayerBaseInfoSchema:
     try:
@@ -65,6 +65,20 @@ class PlayerExtendedInfoSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class PlayerOwnershipSchema(BaseModel):
+    player_id: int
+    name: str
+    name_rus: Optional[str] = None
+    team_id: int
+    position: Optional[str]
+    starters: int
+    bench: int
+    captains: int
+    selected_percentage: float
+
+    class Config:
+        from_attributes = True
+
 class PlayerFullInfoSchema(BaseModel):
     base_info: PlayerBaseInfoSchema
     extended_info: PlayerExtendedInfoSchema
@@ -1,12 +1,12 @@
 import logging
 from datetime import datetime
 from random import randint
+from typing import Optional
 
 from app.utils.timezone import now_msk
-from sqlalchemy import func, desc, case, distinct, cast, Numeric, and_, or_
+from sqlalchemy import func, desc, and_, or_
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload, selectinload
-from deep_translator import GoogleTranslator
 
 from app.matches.models import Match
 from app.matches.schemas import MatchInTourSchema
@@ -14,12 +14,14 @@ from app.player_match_stats.models import PlayerMatchStats
 from app.players.models import Player
 from app.database import async_session_maker
 from app.players.schemas import PlayerBaseInfoSchema, PlayerExtendedInfoSchema, PlayerFullInfoSchema, \
-    PlayerWithTotalPointsSchema
+    PlayerOwnershipSchema, PlayerWithTotalPointsSchema
 from app.squads.models import Squad
-from app.squad_tours.models import SquadTour, squad_tour_players, squad_tour_bench_players
+from app.squads.validation import player_index
+from app.squad_tours.models import PlayerTourOwnership, SquadTour
 from app.teams.models import Team
 from app.tours.models import Tour
 from app.tours.schemas import TourWithMatchesSchema
+from app.translations.pipeline import TranslationBackend, apply_translations, translate_names
 from app.utils.external_api import external_api
 from app.utils.base_service import BaseService
 from app.utils.exceptions import FailedOperationException, ResourceNotFoundException
@@ -93,6 +95,7 @@ class PlayerService(BaseService):
                             continue
                     
                     await session.commit()
+                    player_index.invalidate(team.league_id)
                 except Exception as e:
                     logger.error(f"Failed to sync players for team {team.id}: {e}")
                     await session.rollback()
@@ -183,6 +186,7 @@ class PlayerService(BaseService):
                         continue
                 
                 await session.commit()
+                player_index.invalidate(team.league_id)
                 logger.info(f"Sync completed for team {team_id}: {total_added} added, {total_updated} updated")
                 return {"added": total_added, "updated": total_updated, "team_name": team.name}
                 
@@ -243,6 +247,7 @@ class PlayerService(BaseService):
                     continue
             try:
                 await session.commit()
+                player_index.invalidate(league_id)
                 logger.info(f"Committed players for league {league_id}")
             except Exception as e:
                 logger.error(f"Failed to commit players for league {league_id}: {e}")
@@ -257,6 +262,7 @@ class PlayerService(BaseService):
                     PlayerMatchStats.player_id,
                     func.coalesce(func.sum(PlayerMatchStats.points), 0).label("total_points")
                 )
+                .where(PlayerMatchStats.league_id == league_id)  # одна секция player_match_stats
                 .group_by(PlayerMatchStats.player_id)
                 .subquery()
             )
@@ -296,6 +302,30 @@ class PlayerService(BaseService):
             return players
 
 
+    @classmethod
+    async def get_recent_form(cls, league_id: int, last_matches: int = 5) -> dict[int, float]:
+        """Средние очки каждого игрока лиги за последние last_matches матчей (одним запросом)."""
+        async with async_session_maker() as session:
+            ranked = (
+                select(
+                    PlayerMatchStats.player_id,
+                    PlayerMatchStats.points,
+                    func.row_number().over(
+                        partition_by=PlayerMatchStats.player_id,
+                        order_by=desc(Match.date),
+                    ).label("match_rank"),
+                )
+                .join(Match, PlayerMatchStats.match_id == Match.id)
+                .where(PlayerMatchStats.league_id == league_id, Match.league_id == league_id)
+                .subquery()
+            )
+            result = await session.execute(
+                select(ranked.c.player_id, func.avg(ranked.c.points))
+                .where(ranked.c.match_rank <= last_matches)
+                .group_by(ranked.c.player_id)
+            )
+            return {player_id: float(avg_points) for player_id, avg_points in result.all()}
+
     @classmethod
     async def get_player_base_info(cls, player_id: int):
         async with async_session_maker() as session:
@@ -353,7 +383,7 @@ class PlayerService(BaseService):
         async with async_session_maker() as session:
             avg_points_stmt = (
                 select(func.coalesce(func.avg(PlayerMatchStats.points), 0))
-                .where(PlayerMatchStats.player_id == player_id)
+                .where(PlayerMatchStats.league_id == league_id, PlayerMatchStats.player_id == player_id)
             )
             avg_points_result = await session.execute(avg_points_stmt)
             avg_points = avg_points_result.scalar()
@@ -361,7 +391,11 @@ class PlayerService(BaseService):
             rank_stmt = (
                 select(func.count() + 1)
                 .select_from(Player)
-                .join(PlayerMatchStats, Player.id == PlayerMatchStats.player_id, isouter=True)
+                .join(
+                    PlayerMatchStats,
+                    and_(PlayerMatchStats.league_id == league_id, Player.id == PlayerMatchStats.player_id),
+                    isouter=True,
+                )
                 .group_by(Player.id)
                 .having(func.avg(PlayerMatchStats.points) > avg_points)
                 .where(Player.league_id == league_id)
@@ -377,7 +411,7 @@ class PlayerService(BaseService):
             last_5_matches_stmt = (
                 select(PlayerMatchStats)
                 .join(Match, PlayerMatchStats.match_id == Match.id)
-                .where(PlayerMatchStats.player_id == player_id)
+                .where(PlayerMatchStats.league_id == league_id, PlayerMatchStats.player_id == player_id)
                 .order_by(desc(Match.date))
                 .limit(5)
             )
@@ -391,7 +425,7 @@ class PlayerService(BaseService):
             last_5_matches_subq = (
                 select(PlayerMatchStats.match_id)
                 .join(Match, PlayerMatchStats.match_id == Match.id)
-                .where(PlayerMatchStats.player_id == Player.id)
+                .where(PlayerMatchStats.league_id == league_id, PlayerMatchStats.player_id == Player.id)
                 .order_by(desc(Match.date))
                 .limit(5)
                 .correlate(Player)
@@ -401,7 +435,11 @@ class PlayerService(BaseService):
             rank_stmt = (
                 select(func.count() + 1)
                 .select_from(Player)
-                .join(PlayerMatchStats, Player.id == PlayerMatchStats.player_id, isouter=True)
+                .join(
+                    PlayerMatchStats,
+                    and_(PlayerMatchStats.league_id == league_id, Player.id == PlayerMatchStats.player_id),
+                    isouter=True,
+                )
                 .join(Match, PlayerMatchStats.match_id == Match.id, isouter=True)
                 .where(
                     Player.league_id == league_id,
@@ -417,35 +455,16 @@ class PlayerService(BaseService):
 
     @classmethod
     async def _get_squad_presence_percentage(cls, player_id: int, league_id: int) -> tuple[float, int]:
-        async with async_session_maker() as session:
-            squad_presence_stmt = (
-                select(func.count())
-                .select_from(SquadTour)
-                .join(Squad, SquadTour.squad_id == Squad.id)
-                .join(squad_tour_players, SquadTour.id == squad_tour_players.c.squad_tour_id, isouter=True)
-                .where(
-                    squad_tour_players.c.player_id == player_id,
-                    Squad.league_id == league_id
-                )
-                .union_all(
-                    select(func.count())
-                    .select_from(SquadTour)
-                    .join(Squad, SquadTour.squad_id == Squad.id)
-                    .join(squad_tour_bench_players, SquadTour.id == squad_tour_bench_players.c.squad_tour_id,
-                          isouter=True)
-                    .where(
-                        squad_tour_bench_players.c.player_id == player_id,
-                        Squad.league_id == league_id
-                    )
-                )
-                .alias("squad_presence_count")
-            )
+        """Доля составов лиги (по всем турам), где есть игрок, и место по этой доле.
 
+        Читает счётчики player_tour_ownership вместо подсчёта по таблицам составов.
+        """
+        async with async_session_maker() as session:
             total_squad_tours_stmt = (
                 select(func.count())
                 .select_from(SquadTour)
-                .join(Squad, SquadTour.squad_id == Squad.id)
-                .where(Squad.league_id == league_id)
+                .join(Tour, SquadTour.tour_id == Tour.id)
+                .where(Tour.league_id == league_id)
             )
             total_squad_tours_result = await session.execute(total_squad_tours_stmt)
             total_squad_tours = total_squad_tours_result.scalar()
@@ -454,41 +473,70 @@ class PlayerService(BaseService):
                 total_players_in_league = await cls._get_total_players_in_league(league_id)
                 return 0, total_players_in_league
 
-            squad_presence_count_stmt = select(func.sum(squad_presence_stmt.c.count))
-            squad_presence_count_result = await session.execute(squad_presence_count_stmt)
+            selections_stmt = (
+                select(
+                    PlayerTourOwnership.player_id,
+                    func.sum(PlayerTourOwnership.starters + PlayerTourOwnership.bench).label("selections"),
+                )
+                .join(Tour, PlayerTourOwnership.tour_id == Tour.id)
+                .where(Tour.league_id == league_id)
+                .group_by(PlayerTourOwnership.player_id)
+                .subquery()
+            )
+            squad_presence_count_result = await session.execute(
+                select(selections_stmt.c.selections).where(selections_stmt.c.player_id == player_id)
+            )
             squad_presence_count = squad_presence_count_result.scalar() or 0
 
             squad_presence_percentage = (squad_presence_count / total_squad_tours) * 100
 
             rank_stmt = (
                 select(func.count() + 1)
-                .select_from(Player)
-                .join(Squad, Player.league_id == Squad.league_id, isouter=True)
-                .join(SquadTour, Squad.id == SquadTour.squad_id, isouter=True)
-                .join(squad_tour_players, SquadTour.id == squad_tour_players.c.squad_tour_id, isouter=True)
-                .join(squad_tour_bench_players, SquadTour.id == squad_tour_bench_players.c.squad_tour_id, isouter=True)
-                .group_by(Player.id)
-                .having(
-                    func.sum(
-                        case(
-                            (squad_tour_players.c.player_id == Player.id, 1),
-                            (squad_tour_bench_players.c.player_id == Player.id, 1),
-                            else_=0
-                        )
-                    ) / cast(func.count(distinct(SquadTour.id)), Numeric) > (squad_presence_percentage / 100)
-                )
-                .where(Player.league_id == league_id)
+                .select_from(selections_stmt)
+                .where(selections_stmt.c.selections > squad_presence_count)
             )
-
             rank_result = await session.execute(rank_stmt)
             rank = rank_result.scalar()
 
-            if rank is None:
-                total_players_in_league = await cls._get_total_players_in_league(league_id)
-                rank = total_players_in_league
-
             return squad_presence_percentage, rank
 
+    @classmethod
+    async def get_most_selected(cls, tour_id: int, limit: int = 20) -> list[PlayerOwnershipSchema]:
+        """Самые выбираемые игроки тура по счётчикам player_tour_ownership."""
+        async with async_session_maker() as session:
+            total_squad_tours_result = await session.execute(
+                select(func.count()).select_from(SquadTour).where(SquadTour.tour_id == tour_id)
+            )
+            total_squad_tours = total_squad_tours_result.scalar() or 0
+
+            selections = PlayerTourOwnership.starters + PlayerTourOwnership.bench
+            stmt = (
+                select(PlayerTourOwnership, Player)
+                .join(Player, PlayerTourOwnership.player_id == Player.id)
+                .where(PlayerTourOwnership.tour_id == tour_id, selections > 0)
+                .order_by(selections.desc(), PlayerTourOwnership.captains.desc(), Player.id)
+                .limit(limit)
+            )
+            result = await session.execute(stmt)
+
+            return [
+                PlayerOwnershipSchema(
+                    player_id=player.id,
+                    name=player.name,
+                    name_rus=player.name_rus,
+                    team_id=player.team_id,
+                    position=player.position,
+                    starters=ownership.starters,
+                    bench=ownership.bench,
+                    captains=ownership.captains,
+                    selected_percentage=(
+                        (ownership.starters + ownership.bench) / total_squad_tours * 100
+                        if total_squad_tours else 0
+                    ),
+                )
+                for ownership, player in result.all()
+            ]
+
     @classmethod
     async def get_player_extended_info(cls, player_id: int, league_id: int):
         total_players_in_league = await cls._get_total_players_in_league(league_id)
@@ -558,6 +606,7 @@ class PlayerService(BaseService):
                         player_points_stmt = (
                             select(PlayerMatchStats.points)
                             .where(
+                                PlayerMatchStats.league_id == match.league_id,
                                 PlayerMatchStats.player_id == player_id,
                                 PlayerMatchStats.match_id == match.id
                             )
@@ -675,62 +724,43 @@ class PlayerService(BaseService):
         return player_full_info
 
     @classmethod
-    async def translate_all_players_names(cls):
+    async def translate_all_players_names(cls, backend: Optional[TranslationBackend] = None):
         """Переводит имена всех игроков на русский и сохраняет в name_rus"""
-        translator = GoogleTranslator(source='auto', target='ru')
-        
         async with async_session_maker() as session:
-            # Получаем всех игроков
-            stmt = select(Player)
-            result = await session.execute(stmt)
-            players = result.scalars().all()
-            
-            logger.info(f"Found {len(players)} players to translate")
-            
-            translated_count = 0
-            
-            for player in players:
-                try:
-                    # Переводим имя игрока
-                    translated_name = translator.translate(player.name)
-                    player.name_rus = translated_name
-                    translated_count += 1
-                    
-                    if translated_count % 10 == 0:
-                        logger.info(f"Translated {translated_count}/{len(players)} players")
-                except Exception as e:
-                    logger.error(f"Failed to translate player {player.id} ({player.name}): {e}")
-                    continue
-            
+            names = (await session.execute(select(Player.name))).scalars().all()
+        logger.info(f"Found {len(names)} players to translate")
+
+        translations = await translate_names(names, backend)
+
+        async with async_session_maker() as session:
+            updated = await apply_translations(session, Player)
             await session.commit()
-            logger.info(f"Translation completed: {translated_count} players translated")
-            return {"translated": translated_count, "total": len(players)}
+
+        translated_count = sum(1 for name in names if name in translations)
+        logger.info(f"Translation completed: {translated_count} players translated, {updated} updated")
+        return {"translated": translated_count, "total": len(names)}
 
     @classmethod
-    async def translate_player_name_by_id(cls, player_id: int):
+    async def translate_player_name_by_id(cls, player_id: int, backend: Optional[TranslationBackend] = None):
         """Переводит имя конкретного игрока на русский по его ID"""
-        translator = GoogleTranslator(source='auto', target='ru')
-        
         async with async_session_maker() as session:
-            stmt = select(Player).where(Player.id == player_id)
-            result = await session.execute(stmt)
-            player = result.scalar_one_or_none()
-            
+            player = await session.get(Player, player_id)
             if not player:
-                raise ResourceNotFoundException(detail=f"Player with id {player_id} not found")
-            
-            try:
-                translated_name = translator.translate(player.name)
-                player.name_rus = translated_name
-                await session.commit()
-                
-                logger.info(f"Translated player {player_id}: {player.name} -> {translated_name}")
-                return {
-                    "player_id": player_id,
-                    "original_name": player.name,
-                    "translated_name": translated_name
-                }
-            except Exception as e:
-                logger.error(f"Failed to translate player {player_id} ({player.name}): {e}")
-                await session.rollback()
-                raise FailedOperationException(msg=f"Failed to translate player name: {e}")
+                raise ResourceNotFoundException(msg=f"Player with id {player_id} not found")
+            name = player.name
+
+        translated_name = (await translate_names([name], backend)).get(name)
+        if translated_name is None:
+            logger.error(f"Failed to translate player {player_id} ({name})")
+            raise FailedOperationException(msg=f"Failed to translate player name: {name}")
+
+        async with async_session_maker() as session:
+            await apply_translations(session, Player, ids=[player_id])
+            await session.commit()
+
+        logger.info(f"Translated player {player_id}: {name} -> {translated_name}")
+        return {
+            "player_id": player_id,
+            "original_name": name,
+            "translated_name": translated_name
+        }
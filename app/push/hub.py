@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PushHub:
+    """Рассылка push-событий подписчикам SSE.
+
+    Каждое соединение — одна asyncio.Queue, подписанная на набор топиков
+    ("squad:{id}", "user_league:{id}", "leaderboard:{tour_id}").
+    Событие сериализуется один раз и кладётся в очереди всех подписчиков.
+
+    Если задан REDIS_HOST, события публикуются в Redis pub/sub, и каждый
+    воркер держит одно подписанное соединение, раздавая сообщения своим
+    клиентам. Без Redis события раздаются только внутри процесса.
+    """
+
+    CHANNEL = "fantasy:push"
+    QUEUE_SIZE = 64
+
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None):
+        self.redis = redis_client
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def subscribe(self, topics: Iterable[str]):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        topics = set(topics)
+        for topic in topics:
+            self._subscribers[topic].add(queue)
+        self._ensure_listener()
+        try:
+            yield queue
+        finally:
+            for topic in topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    async def publish(self, events: list[tuple[str, dict]]) -> None:
+        """Опубликовать пачку событий (topic, payload)."""
+        if not events:
+            return
+        messages = [json.dumps({"topic": topic, "data": data}) for topic, data in events]
+        if self.redis is None:
+            for message in messages:
+                self._dispatch(message)
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for message in messages:
+                pipe.publish(self.CHANNEL, message)
+            await pipe.execute()
+
+    def _dispatch(self, message: str) -> None:
+        topic = json.loads(message)["topic"]
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        frame = f"data: {message}\n\n"
+        for queue in subscribers:
+            if queue.full():
+                # медленный клиент: выбрасываем самое старое событие
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    def _ensure_listener(self) -> None:
+        if self.redis is None:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    async for message in pubsub.listen():
+                        data = message["data"]
+                        self._dispatch(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Push listener lost Redis connection: {e}")
+                await asyncio.sleep(1)
+
+
+push_hub = PushHub(
+    aioredis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+    ) if settings.REDIS_HOST else None
+)
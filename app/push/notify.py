@@ -0,0 +1,143 @@
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.push.hub import push_hub
+from app.squads.models import user_league_squads
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_HEAD_SIZE = 10
+LIVE_DEDUP_TTL_SECONDS = 6 * 60 * 60
+
+# tour_id -> {squad_id: (place, tour_points, total_points)}, последняя отправленная голова
+_leaderboard_heads: dict[int, dict[int, tuple[int, int, int]]] = {}
+
+
+async def _dedup_live(squad_points: dict[int, tuple[int, int]]) -> dict[int, tuple[int, int]]:
+    """Оставить только значения, которые ещё не публиковал ни один воркер.
+
+    Live-изменения замечает каждый воркер при refresh; SET ... GET в Redis
+    атомарно отдаёт прежнее значение, так что событие уходит один раз.
+    """
+    if push_hub.redis is None:
+        return squad_points
+    items = list(squad_points.items())
+    async with push_hub.redis.pipeline(transaction=False) as pipe:
+        for squad_id, (tour_id, points) in items:
+            pipe.set(
+                f"push:live:{tour_id}:{squad_id}",
+                points,
+                ex=LIVE_DEDUP_TTL_SECONDS,
+                get=True,
+            )
+        previous = await pipe.execute()
+    return {
+        squad_id: value
+        for (squad_id, value), old in zip(items, previous)
+        if old is None or int(old) != value[1]
+    }
+
+
+async def _reset_live_dedup(squad_points: dict[int, tuple[int, int]]) -> None:
+    """После финализации следующее live-значение нужно отправить заново."""
+    if push_hub.redis is None or not squad_points:
+        return
+    await push_hub.redis.delete(*(
+        f"push:live:{tour_id}:{squad_id}"
+        for squad_id, (tour_id, _points) in squad_points.items()
+    ))
+
+
+async def notify_squad_points(
+    squad_points: dict[int, tuple[int, int]],
+    provisional: bool = False,
+) -> None:
+    """Разослать новые очки составов: squad_id -> (tour_id, points).
+
+    Событие уходит в топик состава и в топики user-лиг, где он участвует.
+    """
+    try:
+        if provisional:
+            squad_points = await _dedup_live(squad_points)
+        else:
+            await _reset_live_dedup(squad_points)
+        if not squad_points:
+            return
+
+        async with async_session_maker() as session:
+            memberships = await session.execute(
+                select(user_league_squads.c.user_league_id, user_league_squads.c.squad_id)
+                .where(user_league_squads.c.squad_id.in_(squad_points))
+            )
+            league_members: dict[int, list[int]] = defaultdict(list)
+            for user_league_id, squad_id in memberships.all():
+                league_members[user_league_id].append(squad_id)
+
+        events = []
+        for squad_id, (tour_id, points) in squad_points.items():
+            events.append((f"squad:{squad_id}", {
+                "type": "squad_points",
+                "squad_id": squad_id,
+                "tour_id": tour_id,
+                "points": points,
+                "provisional": provisional,
+            }))
+        for user_league_id, squad_ids in league_members.items():
+            events.append((f"user_league:{user_league_id}", {
+                "type": "user_league_points",
+                "user_league_id": user_league_id,
+                "squads": [
+                    {
+                        "squad_id": squad_id,
+                        "tour_id": squad_points[squad_id][0],
+                        "points": squad_points[squad_id][1],
+                    }
+                    for squad_id in squad_ids
+                ],
+                "provisional": provisional,
+            }))
+        await push_hub.publish(events)
+    except Exception as e:
+        logger.error(f"Failed to push squad points: {e}")
+
+
+async def notify_leaderboard_head(tour_id: int) -> None:
+    """Разослать изменившиеся строки топа лидерборда тура."""
+    from app.squads.services import SquadService
+
+    try:
+        head = await SquadService.get_leaderboard_head(tour_id, LEADERBOARD_HEAD_SIZE)
+        previous = _leaderboard_heads.get(tour_id, {})
+        current = {
+            entry["squad_id"]: (entry["place"], entry["tour_points"], entry["total_points"])
+            for entry in head
+        }
+        changed = [entry for entry in head if previous.get(entry["squad_id"]) != current[entry["squad_id"]]]
+        removed = [squad_id for squad_id in previous if squad_id not in current]
+        _leaderboard_heads[tour_id] = current
+        if changed or removed:
+            await push_hub.publish([(f"leaderboard:{tour_id}", {
+                "type": "leaderboard_head",
+                "tour_id": tour_id,
+                "entries": changed,
+                "removed": removed,
+            })])
+    except Exception as e:
+        logger.error(f"Failed to push leaderboard head for tour {tour_id}: {e}")
+
+
+async def notify_tour_event(tour_id: int, event: str, next_tour_id: Optional[int] = None) -> None:
+    """Старт/финализация тура: клиентам лидерборда нужно перечитать данные."""
+    try:
+        await push_hub.publish([(f"leaderboard:{tour_id}", {
+            "type": "tour",
+            "event": event,
+            "tour_id": tour_id,
+            "next_tour_id": next_tour_id,
+        })])
+    except Exception as e:
+        logger.error(f"Failed to push tour {tour_id} {event}: {e}")
@@ -0,0 +1,76 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.push.hub import push_hub
+from app.squads.models import Squad, user_league_squads
+from app.users.dependencies import get_current_user
+from app.users.models import User
+from app.utils.exceptions import ForbiddenException, InvalidDataException
+
+router = APIRouter(prefix="/push", tags=["Push"])
+
+KEEPALIVE_SECONDS = 25
+MAX_USER_LEAGUES = 50
+
+
+async def _check_subscriptions(user: User, squad_id: int | None, user_league_ids: list[int]) -> None:
+    """Свой состав и только те user-лиги, в которых есть состав пользователя."""
+    async with async_session_maker() as session:
+        squad_ids = set((await session.execute(
+            select(Squad.id).where(Squad.user_id == user.id)
+        )).scalars().all())
+        if squad_id is not None and squad_id not in squad_ids:
+            raise ForbiddenException(msg="Not your squad")
+        if user_league_ids:
+            member_of = set((await session.execute(
+                select(user_league_squads.c.user_league_id).where(
+                    user_league_squads.c.user_league_id.in_(user_league_ids),
+                    user_league_squads.c.squad_id.in_(squad_ids),
+                )
+            )).scalars().all())
+            if set(user_league_ids) - member_of:
+                raise ForbiddenException(msg="Not a member of the user league")
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    squad_id: int | None = None,
+    tour_id: int | None = None,
+    user_league_id: list[int] = Query(default=[]),
+    user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """SSE-поток обновлений вместо поллинга.
+
+    Подписки: squad_id — очки своего состава, user_league_id (можно
+    несколько) — очки участников user-лиг, где есть состав пользователя,
+    tour_id — топ лидерборда и старт/финализация тура.
+    """
+    user_league_id = user_league_id[:MAX_USER_LEAGUES]
+    await _check_subscriptions(user, squad_id, user_league_id)
+    topics = [f"user_league:{league_id}" for league_id in user_league_id]
+    if squad_id is not None:
+        topics.append(f"squad:{squad_id}")
+    if tour_id is not None:
+        topics.append(f"leaderboard:{tour_id}")
+    if not topics:
+        raise InvalidDataException(msg="Subscribe to at least one of squad_id, tour_id, user_league_id")
+
+    async def events():
+        async with push_hub.subscribe(topics) as queue:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
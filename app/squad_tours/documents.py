@@ -0,0 +1,236 @@
+"""Документы SquadTour для сквад-API.
+
+Документ — ответ /squad_tours/squad/{id}/tour/{id}, /squad_tours/squad/{id}
+и /squad_tours/tour/{id} по одному SquadTour (поля SquadTourHistorySchema):
+состояние сквада, номер тура и карточки игроков основы и скамейки с очками
+за тур и соперником. Завершённый тур больше не меняется, поэтому
+_finalize_tour_partition пишет документы своей партиции пачкой в
+squad_tour_documents, а rescore_match переписывает документы составов с
+изменившимися игроками. Открытый тур (и туры, завершённые до появления
+таблицы) собирается теми же функциями на лету — несколькими запросами на
+все составы сразу, а не запросами на каждого игрока.
+
+Единственное поле, которое растёт после тура, — total_points игрока (сумма
+за все матчи): в документе оно на момент записи, при чтении подставляется
+текущая сумма одним запросом. После очистки лиги (app.archives.export)
+документы читаются из архива как есть.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased, raiseload
+
+from app.archives.reader import archive_for_squad, archive_for_tour
+from app.matches.models import Match
+from app.player_match_stats.models import PlayerMatchStats
+from app.players.models import Player
+from app.squad_tours.models import SquadTour, SquadTourDocument
+from app.teams.models import Team
+from app.tours.models import Tour
+
+async def _total_points(session, player_ids: Iterable[int]) -> dict[int, int]:
+    """Сумма очков игроков за все матчи (как SquadService._get_player_total_points)."""
+    result = await session.execute(
+        select(PlayerMatchStats.player_id, func.sum(PlayerMatchStats.points))
+        .where(PlayerMatchStats.player_id.in_(list(player_ids)))
+        .group_by(PlayerMatchStats.player_id)
+    )
+    return {player_id: points or 0 for player_id, points in result.all()}
+
+
+async def _tour_points(session, tour_ids: list[int], player_ids: list[int]) -> dict[tuple[int, int], int]:
+    result = await session.execute(
+        select(Match.tour_id, PlayerMatchStats.player_id, func.sum(PlayerMatchStats.points))
+        .join(Match, Match.id == PlayerMatchStats.match_id)
+        .where(Match.tour_id.in_(tour_ids), PlayerMatchStats.player_id.in_(player_ids))
+        .group_by(Match.tour_id, PlayerMatchStats.player_id)
+    )
+    return {(tour_id, player_id): points or 0 for tour_id, player_id, points in result.all()}
+
+
+async def _tour_opponents(session, tour_ids: list[int]) -> dict[int, dict[int, tuple[str, bool]]]:
+    """tour_id -> team_id -> (соперник, матч домашний) по расписанию туров."""
+    home, away = aliased(Team), aliased(Team)
+    result = await session.execute(
+        select(Match.tour_id, home.id, home.name_rus, home.name, away.id, away.name_rus, away.name)
+        .join(home, home.id == Match.home_team_id)
+        .join(away, away.id == Match.away_team_id)
+        .where(Match.tour_id.in_(tour_ids))
+        .order_by(Match.id)
+    )
+    opponents: dict[int, dict[int, tuple[str, bool]]] = defaultdict(dict)
+    for tour_id, home_id, home_name_rus, home_name, away_id, away_name_rus, away_name in result.all():
+        opponents[tour_id][home_id] = (away_name_rus or away_name, True)
+        opponents[tour_id][away_id] = (home_name_rus or home_name, False)
+    return opponents
+
+
+async def build_documents(session, squad_tours: list[SquadTour]) -> list[dict]:
+    """Документы для squad_tours в том же порядке; запросы — на все составы сразу."""
+    if not squad_tours:
+        return []
+    tour_ids = sorted({squad_tour.tour_id for squad_tour in squad_tours})
+    player_ids = sorted({
+        player_id
+        for squad_tour in squad_tours
+        for player_id in (*squad_tour.main_player_ids, *squad_tour.bench_player_ids)
+    })
+
+    tour_numbers = dict((await session.execute(
+        select(Tour.id, Tour.number).where(Tour.id.in_(tour_ids))
+    )).all())
+    players = (await session.execute(
+        select(
+            Player.id, Player.name, Player.name_rus, Player.position, Player.team_id,
+            Player.market_value, Player.photo, Team.name, Team.name_rus, Team.logo,
+        )
+        .outerjoin(Team, Team.id == Player.team_id)
+        .where(Player.id.in_(player_ids))
+    )).all()
+    total_points = await _total_points(session, player_ids)
+    tour_points = await _tour_points(session, tour_ids, player_ids)
+    opponents = await _tour_opponents(session, tour_ids)
+
+    # карточка игрока одна на тур; в документы идут её копии
+    player_cards: dict[tuple[int, int], dict] = {}
+    for tour_id in tour_ids:
+        for player_id, name, name_rus, position, team_id, market_value, photo, team_name, team_name_rus, team_logo in players:
+            opponent_info = opponents[tour_id].get(team_id)
+            player_cards[(tour_id, player_id)] = {
+                "id": player_id,
+                "name": name_rus or name,
+                "position": position,
+                "team_id": team_id,
+                "team_name": (team_name_rus or team_name) if team_name else "",
+                "team_logo": team_logo,
+                "market_value": market_value,
+                "photo": photo,
+                "total_points": total_points.get(player_id, 0),
+                "tour_points": tour_points.get((tour_id, player_id), 0),
+                "next_opponent_team_name": opponent_info[0] if opponent_info else None,
+                "next_opponent_is_home": opponent_info[1] if opponent_info else None,
+            }
+
+    def cards(tour_id: int, ids: list[int]) -> list[dict]:
+        return [dict(player_cards[(tour_id, player_id)]) for player_id in ids if (tour_id, player_id) in player_cards]
+
+    return [
+        {
+            "tour_id": squad_tour.tour_id,
+            "tour_number": tour_numbers.get(squad_tour.tour_id, 0),
+            "points": squad_tour.points,
+            "penalty_points": squad_tour.penalty_points,
+            "used_boost": squad_tour.used_boost,
+            "captain_id": squad_tour.captain_id,
+            "vice_captain_id": squad_tour.vice_captain_id,
+            "budget": squad_tour.budget,
+            "replacements": squad_tour.replacements,
+            "is_finalized": squad_tour.is_finalized,
+            "main_players": cards(squad_tour.tour_id, squad_tour.main_player_ids),
+            "bench_players": cards(squad_tour.tour_id, squad_tour.bench_player_ids),
+        }
+        for squad_tour in squad_tours
+    ]
+
+
+def _squad_tours_stmt(*conditions):
+    # состав берётся из массивов версии (lineup_version грузится join'ом)
+    return (
+        select(SquadTour)
+        .where(*conditions)
+        .options(raiseload(SquadTour.main_players), raiseload(SquadTour.bench_players))
+        .execution_options(populate_existing=True)
+    )
+
+
+async def write_squad_tour_documents(session, tour_id: int, squad_tour_ids: Optional[list[int]] = None) -> int:
+    """Записать документы завершённых SquadTour тура (всех или squad_tour_ids).
+
+    Существующие документы заменяются. Коммит — на вызывающем.
+    Возвращает число записанных документов.
+    """
+    conditions = [SquadTour.tour_id == tour_id, SquadTour.is_finalized == True]
+    if squad_tour_ids is not None:
+        if not squad_tour_ids:
+            return 0
+        conditions.append(SquadTour.id.in_(squad_tour_ids))
+    squad_tours = (await session.execute(_squad_tours_stmt(*conditions))).scalars().all()
+    documents = await build_documents(session, squad_tours)
+
+    rows = [
+        {"tour_id": squad_tour.tour_id, "squad_id": squad_tour.squad_id, "document": document}
+        for squad_tour, document in zip(squad_tours, documents)
+    ]
+    if rows:
+        # executemany: запрос компилируется один раз, строки уходят пачками
+        stmt = insert(SquadTourDocument.__table__)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SquadTourDocument.tour_id, SquadTourDocument.squad_id],
+                set_={"document": stmt.excluded.document, "built_at": func.now()},
+            ),
+            rows,
+        )
+    return len(rows)
+
+
+async def squad_tour_documents(
+    session,
+    squad_id: Optional[int] = None,
+    tour_id: Optional[int] = None,
+) -> list[dict]:
+    """Документы SquadTour сквада и/или тура, по порядку туров и сквадов.
+
+    Сохранённые документы отдаются с текущим total_points, остальные
+    собираются на лету. Если в базе ничего нет, а лига уже очищена, —
+    документы из архива.
+    """
+    squad_tour_conditions, document_conditions = [], []
+    if squad_id is not None:
+        squad_tour_conditions.append(SquadTour.squad_id == squad_id)
+        document_conditions.append(SquadTourDocument.squad_id == squad_id)
+    if tour_id is not None:
+        squad_tour_conditions.append(SquadTour.tour_id == tour_id)
+        document_conditions.append(SquadTourDocument.tour_id == tour_id)
+
+    # сначала живые составы, потом документы: документ, записанный между
+    # запросами, попадёт в оба и заменит собранный на лету
+    live = (await session.execute(_squad_tours_stmt(
+        *squad_tour_conditions,
+        ~exists().where(
+            SquadTourDocument.tour_id == SquadTour.tour_id,
+            SquadTourDocument.squad_id == SquadTour.squad_id,
+        ),
+    ))).scalars().all()
+    documents = {
+        (squad_tour.tour_id, squad_tour.squad_id): document
+        for squad_tour, document in zip(live, await build_documents(session, live))
+    }
+
+    stored = (await session.execute(
+        select(SquadTourDocument.tour_id, SquadTourDocument.squad_id, SquadTourDocument.document).where(*document_conditions)
+    )).all()
+    if stored:
+        total_points = await _total_points(session, {
+            player["id"]
+            for _, _, document in stored
+            for player in (*document["main_players"], *document["bench_players"])
+        })
+        for stored_tour_id, stored_squad_id, document in stored:
+            for player in (*document["main_players"], *document["bench_players"]):
+                player["total_points"] = total_points.get(player["id"], player["total_points"])
+            documents[(stored_tour_id, stored_squad_id)] = document
+
+    if not documents:
+        if squad_id is not None:
+            archive = await archive_for_squad(session, squad_id)
+        else:
+            archive = await archive_for_tour(session, tour_id)
+        if archive is not None:
+            return await asyncio.to_thread(archive.squad_tour_documents, squad_id, tour_id)
+
+    return [documents[key] for key in sorted(documents)]
@@ -0,0 +1,108 @@
+"""Запись составов SquadTour.
+
+Состав хранится неизменяемыми версиями (LineupVersion), SquadTour
+ссылается на версию через lineup_version_id. По умолчанию
+(LINEUP_STORAGE = "arrays") больше ничего не пишется; строки
+squad_tour_players / squad_tour_bench_players пишутся только в режиме
+"tables", оставленном для отката. Всё, что меняет состав, идёт через эти
+функции, поэтому в режиме "tables" оба представления не расходятся, но
+туры, начатые в "arrays", строк не имеют — перед откатом их нужно
+заполнить из lineup_versions.
+"""
+
+import hashlib
+from typing import Iterable
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.squad_tours.models import (
+    LineupVersion,
+    SquadTour,
+    squad_tour_bench_players,
+    squad_tour_players,
+)
+
+
+def lineup_tables_enabled() -> bool:
+    return settings.LINEUP_STORAGE != "arrays"
+
+
+def lineup_hash(main_player_ids: Iterable[int], bench_player_ids: Iterable[int]) -> bytes:
+    """md5 канонической записи состава "1,2,...|3,4,..." (как в миграции)."""
+    key = "|".join(
+        ",".join(str(player_id) for player_id in sorted(player_ids))
+        for player_ids in (main_player_ids, bench_player_ids)
+    )
+    return hashlib.md5(key.encode()).digest()
+
+
+async def get_lineup_version(
+    session,
+    main_player_ids: Iterable[int],
+    bench_player_ids: Iterable[int],
+) -> LineupVersion:
+    """Версия с таким составом: существующая или новая."""
+    main_player_ids, bench_player_ids = sorted(main_player_ids), sorted(bench_player_ids)
+    digest = lineup_hash(main_player_ids, bench_player_ids)
+    version = (await session.execute(
+        select(LineupVersion).where(LineupVersion.lineup_hash == digest)
+    )).scalars().first()
+    if version is not None:
+        return version
+    # параллельная транзакция могла вставить ту же версию — тогда читаем её
+    await session.execute(
+        insert(LineupVersion)
+        .values(lineup_hash=digest, main_player_ids=main_player_ids, bench_player_ids=bench_player_ids)
+        .on_conflict_do_nothing(index_elements=[LineupVersion.lineup_hash])
+    )
+    return (await session.execute(
+        select(LineupVersion).where(LineupVersion.lineup_hash == digest)
+    )).scalars().one()
+
+
+async def insert_lineup_rows(session, squad_tours: Iterable[SquadTour]) -> None:
+    """Строки таблиц составов по версиям уже записанных (flush) SquadTour."""
+    if not lineup_tables_enabled():
+        return
+    main_rows, bench_rows = [], []
+    for squad_tour in squad_tours:
+        main_rows.extend(
+            {"squad_tour_id": squad_tour.id, "tour_id": squad_tour.tour_id, "player_id": player_id}
+            for player_id in squad_tour.main_player_ids
+        )
+        bench_rows.extend(
+            {"squad_tour_id": squad_tour.id, "tour_id": squad_tour.tour_id, "player_id": player_id}
+            for player_id in squad_tour.bench_player_ids
+        )
+    if main_rows:
+        await session.execute(squad_tour_players.insert(), main_rows)
+    if bench_rows:
+        await session.execute(squad_tour_bench_players.insert(), bench_rows)
+
+
+async def set_lineup(
+    session,
+    squad_tour: SquadTour,
+    main_player_ids: Iterable[int],
+    bench_player_ids: Iterable[int],
+) -> bool:
+    """Заменить состав существующего SquadTour; коммит — на вызывающем.
+
+    Если состав не изменился, ничего не пишет и возвращает False.
+    """
+    main_player_ids, bench_player_ids = list(main_player_ids), list(bench_player_ids)
+    if squad_tour.lineup_version is not None and (
+        squad_tour.lineup_version.lineup_hash == lineup_hash(main_player_ids, bench_player_ids)
+    ):
+        return False
+    squad_tour.lineup_version = await get_lineup_version(session, main_player_ids, bench_player_ids)
+    if not lineup_tables_enabled():
+        return True
+    for table in (squad_tour_players, squad_tour_bench_players):
+        await session.execute(
+            delete(table).where(table.c.tour_id == squad_tour.tour_id, table.c.squad_tour_id == squad_tour.id)
+        )
+    await insert_lineup_rows(session, [squad_tour])
+    return True
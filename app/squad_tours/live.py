@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session_maker
+from app.matches.models import Match
+from app.player_match_stats.models import PlayerMatchStats
+from app.push.notify import notify_squad_points
+from app.squad_tours.models import LineupVersion, SquadTour
+from app.squad_tours.scoring import squad_tour_match_points
+from app.tours.models import Tour
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LiveSquadTour:
+    squad_tour_id: int
+    squad_id: int
+    tour_id: int
+    points: int  # уже начисленные finalize_match очки
+    captain_id: Optional[int]
+    vice_captain_id: Optional[int]
+    used_boost: Optional[str]
+    main_player_ids: list[int] = field(default_factory=list)
+    bench_player_ids: list[int] = field(default_factory=list)
+    # match_id -> очки за ещё не финализированный матч
+    match_points: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def provisional_points(self) -> int:
+        return self.points + sum(self.match_points.values())
+
+
+class LiveScoring:
+    """Предварительные очки SquadTour для текущих туров.
+
+    Кэш в памяти процесса: составы текущих туров, очки игроков в
+    незавершённых матчах и инвертированный индекс player_id -> SquadTour.
+    При изменении PlayerMatchStats пересчитываются только SquadTour,
+    в составе которых есть этот игрок. Правила подсчёта те же, что в
+    MatchService.finalize_match (squad_tour_match_points).
+
+    Рассылка идёт только из пути загрузки статистики (refresh(publish=True)
+    из ingest_live_matches, update_stats из админки). Чтение через
+    get_by_squad обновляет кэш, но ничего не публикует: изменения копятся
+    в _unpublished до следующей публикации.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._lock = asyncio.Lock()
+        self._refreshed_at = 0.0
+        self._needs_rebuild = True
+        self._squad_tours: dict[int, LiveSquadTour] = {}
+        self._by_squad: dict[int, int] = {}
+        self._owners: dict[int, set[int]] = defaultdict(set)
+        self._tour_ids: set[int] = set()
+        self._match_tour: dict[int, int] = {}
+        self._stats: dict[int, dict[int, int]] = {}
+        self._unpublished: dict[int, LiveSquadTour] = {}
+
+    async def get_by_squad(self, squad_id: int) -> Optional[LiveSquadTour]:
+        await self._ensure_fresh()
+        squad_tour_id = self._by_squad.get(squad_id)
+        return self._squad_tours.get(squad_tour_id) if squad_tour_id else None
+
+    async def update_stats(self, match_id: int, player_id: int, points: Optional[int]) -> None:
+        """Применить изменение PlayerMatchStats и разослать новые live-очки."""
+        await self._notify(self.apply_stats(match_id, player_id, points))
+
+    def apply_stats(self, match_id: int, player_id: int, points: Optional[int]) -> list[LiveSquadTour]:
+        """Применить изменение PlayerMatchStats. Возвращает SquadTour с изменившимися очками."""
+        match_stats = self._stats.get(match_id)
+        if match_stats is None:
+            return []
+        points = points or 0
+        if match_stats.get(player_id, 0) == points:
+            return []
+        match_stats[player_id] = points
+        return self._recalculate(match_id, self._owners.get(player_id, ()))
+
+    def invalidate(self) -> None:
+        """Полная перезагрузка при следующем обращении (финализация матча, смена тура)."""
+        self._needs_rebuild = True
+        self._refreshed_at = 0.0
+
+    async def _ensure_fresh(self) -> None:
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return
+            await self.refresh()
+
+    async def publish(self) -> None:
+        """Догрузить статистику и разослать изменения после импорта статистики."""
+        async with self._lock:
+            await self.refresh(publish=True)
+
+    async def refresh(self, publish: bool = False) -> None:
+        """Догрузить статистику незавершённых матчей; publish — разослать накопленные изменения."""
+        async with async_session_maker() as session:
+            tour_ids = set((await session.execute(
+                select(Tour.id).where(
+                    Tour.is_started.is_(True),
+                    Tour.is_finalized.is_(False),
+                )
+            )).scalars().all())
+            live_matches = dict((await session.execute(
+                select(Match.id, Match.tour_id).where(
+                    Match.tour_id.in_(tour_ids),
+                    Match.is_finished.is_(False),
+                )
+            )).all()) if tour_ids else {}
+            if (
+                self._needs_rebuild
+                or tour_ids != self._tour_ids
+                or live_matches != self._match_tour
+            ):
+                await self._rebuild(session, tour_ids, live_matches)
+
+            changed = self._unpublished
+            if live_matches:
+                stats = await session.execute(
+                    select(
+                        PlayerMatchStats.match_id,
+                        PlayerMatchStats.player_id,
+                        PlayerMatchStats.points,
+                    ).where(PlayerMatchStats.match_id.in_(live_matches))
+                )
+                for match_id, player_id, points in stats.all():
+                    for squad_tour in self.apply_stats(match_id, player_id, points):
+                        changed[squad_tour.squad_tour_id] = squad_tour
+
+        self._refreshed_at = time.monotonic()
+        if publish and changed:
+            logger.info(f"Live scoring: recalculated {len(changed)} squad tours")
+            self._unpublished = {}
+            await self._notify(changed.values())
+
+    async def _rebuild(self, session, tour_ids: set[int], live_matches: dict[int, int]) -> None:
+        self._tour_ids = tour_ids
+        self._squad_tours = {}
+        self._by_squad = {}
+        self._owners = defaultdict(set)
+        self._match_tour = dict(live_matches)
+        self._stats = {match_id: {} for match_id in live_matches}
+        # статистика применяется заново, изменившиеся составы попадут сюда снова
+        self._unpublished = {}
+
+        if tour_ids:
+            rows = await session.execute(
+                select(
+                    SquadTour.id,
+                    SquadTour.squad_id,
+                    SquadTour.tour_id,
+                    SquadTour.points,
+                    SquadTour.captain_id,
+                    SquadTour.vice_captain_id,
+                    SquadTour.used_boost,
+                    LineupVersion.main_player_ids,
+                    LineupVersion.bench_player_ids,
+                )
+                .outerjoin(LineupVersion, LineupVersion.id == SquadTour.lineup_version_id)
+                .where(SquadTour.tour_id.in_(tour_ids))
+            )
+            for row in rows.all():
+                self._squad_tours[row.id] = LiveSquadTour(
+                    squad_tour_id=row.id,
+                    squad_id=row.squad_id,
+                    tour_id=row.tour_id,
+                    points=row.points or 0,
+                    captain_id=row.captain_id,
+                    vice_captain_id=row.vice_captain_id,
+                    used_boost=row.used_boost,
+                    main_player_ids=list(row.main_player_ids or ()),
+                    bench_player_ids=list(row.bench_player_ids or ()),
+                )
+                self._by_squad[row.squad_id] = row.id
+                for player_id in (*(row.main_player_ids or ()), *(row.bench_player_ids or ())):
+                    self._owners[player_id].add(row.id)
+
+        self._needs_rebuild = False
+        logger.info(
+            f"Live scoring: loaded {len(self._squad_tours)} squad tours "
+            f"for tours {sorted(tour_ids)}, {len(live_matches)} matches in progress"
+        )
+
+    def _recalculate(self, match_id: int, squad_tour_ids) -> list[LiveSquadTour]:
+        tour_id = self._match_tour[match_id]
+        player_points = self._stats[match_id]
+        changed = []
+        for squad_tour_id in squad_tour_ids:
+            squad_tour = self._squad_tours[squad_tour_id]
+            if squad_tour.tour_id != tour_id:
+                continue
+            points = squad_tour_match_points(
+                main_player_ids=squad_tour.main_player_ids,
+                bench_player_ids=squad_tour.bench_player_ids,
+                captain_id=squad_tour.captain_id,
+                vice_captain_id=squad_tour.vice_captain_id,
+                used_boost=squad_tour.used_boost,
+                player_points=player_points,
+            )
+            if squad_tour.match_points.get(match_id, 0) != points:
+                squad_tour.match_points[match_id] = points
+                changed.append(squad_tour)
+        return changed
+
+    @staticmethod
+    async def _notify(squad_tours) -> None:
+        await notify_squad_points(
+            {
+                squad_tour.squad_id: (squad_tour.tour_id, squad_tour.provisional_points)
+                for squad_tour in squad_tours
+            },
+            provisional=True,
+        )
+
+
+live_scoring = LiveScoring(refresh_interval=settings.LIVE_SCORING_REFRESH_SECONDS)
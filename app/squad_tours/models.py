@@ -1,38 +1,96 @@
 ﻿from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Table, func, select
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    LargeBinary,
+    SmallInteger,
+    Table,
+    func,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.config import settings
 from app.database import Base
-from app.player_match_stats.models import PlayerMatchStats
 
 
 squad_tour_players = Table(
     "squad_tour_players",
     Base.metadata,
-    Column("squad_tour_id", Integer, ForeignKey("squad_tours.id"), primary_key=True),
+    Column("squad_tour_id", Integer, primary_key=True),
     Column("player_id", Integer, ForeignKey("players.id"), primary_key=True),
+    Column("tour_id", Integer, ForeignKey("tours.id"), primary_key=True),
+    Index("ix_squad_tour_players_player_id", "player_id", "squad_tour_id"),
     extend_existing=True,
+    postgresql_partition_by="RANGE (tour_id)",
 )
 
 squad_tour_bench_players = Table(
     "squad_tour_bench_players",
     Base.metadata,
-    Column("squad_tour_id", Integer, ForeignKey("squad_tours.id"), primary_key=True),
+    Column("squad_tour_id", Integer, primary_key=True),
     Column("player_id", Integer, ForeignKey("players.id"), primary_key=True),
+    Column("tour_id", Integer, ForeignKey("tours.id"), primary_key=True),
+    Index("ix_squad_tour_bench_players_player_id", "player_id", "squad_tour_id"),
     extend_existing=True,
+    postgresql_partition_by="RANGE (tour_id)",
 )
 
 
+class LineupVersion(Base):
+    """Неизменяемый состав: отсортированные id игроков основы и скамейки.
+
+    lineup_hash — md5 канонической записи состава (app.squad_tours.lineup):
+    одинаковые составы разных туров и сквадов ссылаются на одну версию,
+    поэтому перенос состава в следующий тур копирует только ссылку.
+    """
+    __tablename__ = "lineup_versions"
+    __table_args__ = (
+        Index("uq_lineup_versions_lineup_hash", "lineup_hash", unique=True),
+        Index("ix_lineup_versions_main_player_ids", "main_player_ids", postgresql_using="gin"),
+        Index("ix_lineup_versions_bench_player_ids", "bench_player_ids", postgresql_using="gin"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    lineup_hash: Mapped[bytes] = mapped_column(LargeBinary)
+    main_player_ids: Mapped[List[int]] = mapped_column(ARRAY(Integer))
+    bench_player_ids: Mapped[List[int]] = mapped_column(ARRAY(Integer))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
 class SquadTour(Base):
+    """Состояние сквада в туре.
+
+    Состав — ссылка lineup_version_id на LineupVersion (её ставит
+    app.squad_tours.lineup в любом режиме). По умолчанию (LINEUP_STORAGE =
+    "arrays") main_players / bench_players грузятся по массивам версии,
+    строки составов не пишутся; в режиме отката "tables" состав
+    дублируется строками squad_tour_players / squad_tour_bench_players,
+    и связи грузятся через них.
+
+    Таблица секционирована по диапазонам tour_id (app.partitions), поэтому
+    tour_id входит в первичный ключ: запросы с ним читают одну секцию.
+    """
     __tablename__ = "squad_tours"
-    id: Mapped[int] = mapped_column(primary_key=True)
+    __table_args__ = (
+        Index("ix_squad_tours_tour_id", "tour_id"),
+        Index("uq_squad_tours_squad_id_tour_id", "squad_id", "tour_id", unique=True),
+        Index("ix_squad_tours_lineup_version_id", "lineup_version_id"),
+        {"postgresql_partition_by": "RANGE (tour_id)"},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     squad_id: Mapped[int] = mapped_column(
         ForeignKey("squads.id", ondelete="CASCADE"),
         nullable=False,
     )
-    tour_id: Mapped[int] = mapped_column(ForeignKey("tours.id", ondelete="CASCADE"))
+    tour_id: Mapped[int] = mapped_column(ForeignKey("tours.id", ondelete="CASCADE"), primary_key=True)
     is_current: Mapped[bool] = mapped_column(default=False)
     used_boost: Mapped[Optional[str]] = mapped_column(nullable=True)
     points: Mapped[int] = mapped_column(default=0)
@@ -47,70 +105,56 @@ class SquadTour(Base):
     replacements: Mapped[int] = mapped_column(default=2)
     is_finalized: Mapped[bool] = mapped_column(default=False)
     created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lineup_version_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("lineup_versions.id"), nullable=True
+    )
 
     squad: Mapped["Squad"] = relationship(back_populates="tour_history")
     tour: Mapped["Tour"] = relationship(back_populates="squads")
-    main_players: Mapped[List["Player"]] = relationship(
-        secondary=squad_tour_players, back_populates="squad_tours", lazy="selectin"
-    )
-    bench_players: Mapped[List["Player"]] = relationship(
-        secondary=squad_tour_bench_players, back_populates="bench_squad_tours", lazy="selectin"
-    )
+    lineup_version: Mapped[Optional[LineupVersion]] = relationship(lazy="joined")
+    if settings.LINEUP_STORAGE == "arrays":
+        main_players: Mapped[List["Player"]] = relationship(
+            secondary="lineup_versions",
+            primaryjoin="SquadTour.lineup_version_id == LineupVersion.id",
+            secondaryjoin="Player.id == any_(foreign(LineupVersion.main_player_ids))",
+            viewonly=True, uselist=True, lazy="selectin",
+        )
+        bench_players: Mapped[List["Player"]] = relationship(
+            secondary="lineup_versions",
+            primaryjoin="SquadTour.lineup_version_id == LineupVersion.id",
+            secondaryjoin="Player.id == any_(foreign(LineupVersion.bench_player_ids))",
+            viewonly=True, uselist=True, lazy="selectin",
+        )
+    else:
+        # у таблиц составов нет внешнего ключа на squad_tours (см. миграцию d7e6f5a4b3c2)
+        main_players: Mapped[List["Player"]] = relationship(
+            secondary=squad_tour_players,
+            primaryjoin="and_(SquadTour.id == foreign(squad_tour_players.c.squad_tour_id), "
+                        "SquadTour.tour_id == foreign(squad_tour_players.c.tour_id))",
+            secondaryjoin="Player.id == foreign(squad_tour_players.c.player_id)",
+            back_populates="squad_tours", lazy="selectin",
+        )
+        bench_players: Mapped[List["Player"]] = relationship(
+            secondary=squad_tour_bench_players,
+            primaryjoin="and_(SquadTour.id == foreign(squad_tour_bench_players.c.squad_tour_id), "
+                        "SquadTour.tour_id == foreign(squad_tour_bench_players.c.tour_id))",
+            secondaryjoin="Player.id == foreign(squad_tour_bench_players.c.player_id)",
+            back_populates="bench_squad_tours", lazy="selectin",
+        )
 
     @property
     def main_player_ids(self) -> List[int]:
-        return [player.id for player in self.main_players]
+        return self.lineup_version.main_player_ids if self.lineup_version else []
 
     @property
     def bench_player_ids(self) -> List[int]:
-        return [player.id for player in self.bench_players]
+        return self.lineup_version.bench_player_ids if self.lineup_version else []
 
     def calculate_players_cost(self) -> int:
         return sum(p.market_value for p in self.main_players) + sum(
             p.market_value for p in self.bench_players
         )
 
-    def validate_players(
-        self, main_players: List["Player"], bench_players: List["Player"]
-    ) -> None:
-        if len(main_players) != 11:
-            raise ValueError("Main squad must have exactly 11 players")
-        if len(bench_players) != 4:
-            raise ValueError("Bench must have exactly 4 players")
-
-        # Check that main squad has at least 1 player of each position
-        main_position_counts = {}
-        for player in main_players:
-            position = player.position
-            main_position_counts[position] = main_position_counts.get(position, 0) + 1
-        
-        # Required: at least 1 Goalkeeper, 1 Defender, 1 Midfielder, 1 Attacker
-        if main_position_counts.get("Goalkeeper", 0) < 1:
-            raise ValueError("Main squad must have at least 1 Goalkeeper")
-        if main_position_counts.get("Defender", 0) < 1:
-            raise ValueError("Main squad must have at least 1 Defender")
-        if main_position_counts.get("Midfielder", 0) < 1:
-            raise ValueError("Main squad must have at least 1 Midfielder")
-        if main_position_counts.get("Attacker", 0) < 1 and main_position_counts.get("Forward", 0) < 1:
-            raise ValueError("Main squad must have at least 1 Attacker or Forward")
-
-        # Budget validation removed - handled by frontend
-        # Backend only calculates budget, does not enforce limits
-
-        # Get league_id from Squad relationship
-        league_id = self.squad.league_id
-        for player in main_players + bench_players:
-            if player.league_id != league_id:
-                raise ValueError("All players must be from the same league")
-
-        club_counts = {}
-        for player in main_players + bench_players:
-            club_counts[player.team_id] = club_counts.get(player.team_id, 0) + 1
-            if club_counts[player.team_id] > 3:
-                raise ValueError(
-                    "Cannot have more than 3 players from the same club"
-                )
-
     def count_different_players(
         self, new_main_ids: List[int], new_bench_ids: List[int]
     ) -> int:
@@ -120,25 +164,105 @@ class SquadTour(Base):
             current_bench_ids - set(new_bench_ids)
         )
 
-    async def calculate_points(self, session) -> int:
-        total_points = 0
-
-        for player in self.main_players:
-            player_points_stmt = (
-                select(func.sum(PlayerMatchStats.points))
-                .where(PlayerMatchStats.player_id == player.id)
-            )
-            player_points_result = await session.execute(player_points_stmt)
-            player_points = player_points_result.scalar() or 0
-            total_points += player_points
-
-        for player in self.bench_players:
-            player_points_stmt = (
-                select(func.sum(PlayerMatchStats.points))
-                .where(PlayerMatchStats.player_id == player.id)
-            )
-            player_points_result = await session.execute(player_points_stmt)
-            player_points = player_points_result.scalar() or 0
-            total_points += player_points
-
-        return total_points
+
+class SquadTourPointsEntry(Base):
+    """Строка леджера: вклад игрока в очки SquadTour за финализированный матч.
+
+    Пишется пачкой в finalize_match/rescore_match; очки SquadTour за матч —
+    сумма base_points * multiplier, reason — код из app.squad_tours.scoring.
+    Секционирована по tour_id так же, как squad_tours.
+    """
+    __tablename__ = "squad_tour_points_ledger"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["squad_tour_id", "tour_id"], ["squad_tours.id", "squad_tours.tour_id"], ondelete="CASCADE"
+        ),
+        Index("ix_squad_tour_points_ledger_match_id", "match_id"),
+        {"postgresql_partition_by": "RANGE (tour_id)"},
+    )
+
+    squad_tour_id: Mapped[int] = mapped_column(primary_key=True)
+    match_id: Mapped[int] = mapped_column(
+        ForeignKey("matches.id", ondelete="CASCADE"), primary_key=True
+    )
+    player_id: Mapped[int] = mapped_column(primary_key=True)
+    tour_id: Mapped[int] = mapped_column(primary_key=True)
+    base_points: Mapped[int] = mapped_column(SmallInteger)
+    multiplier: Mapped[int] = mapped_column(SmallInteger)
+    reason: Mapped[int] = mapped_column(SmallInteger)
+
+
+class PlayerTourOwnership(Base):
+    """Сколько составов тура выбрали игрока: в основу, на скамейку, капитаном.
+
+    Счётчики меняются в той же транзакции, что и составы
+    (app.squad_tours.ownership); rebuild_ownership пересобирает их с нуля.
+    """
+    __tablename__ = "player_tour_ownership"
+    __table_args__ = (
+        Index("ix_player_tour_ownership_tour_id", "tour_id"),
+    )
+
+    player_id: Mapped[int] = mapped_column(
+        ForeignKey("players.id", ondelete="CASCADE"), primary_key=True
+    )
+    tour_id: Mapped[int] = mapped_column(
+        ForeignKey("tours.id", ondelete="CASCADE"), primary_key=True
+    )
+    starters: Mapped[int] = mapped_column(default=0, server_default="0")
+    bench: Mapped[int] = mapped_column(default=0, server_default="0")
+    captains: Mapped[int] = mapped_column(default=0, server_default="0")
+
+
+class SquadTourRank(Base):
+    """Места сквада после завершённого тура во всех его рейтингах.
+
+    Одна строка на (тур, сквад): место в лиге, среди болельщиков любимого
+    клуба и параллельные массивы id/мест пользовательских и коммерческих
+    лиг. Пишется одним INSERT ... SELECT при финализации тура
+    (app.squad_tours.ranks). Первичный ключ отдаёт места после тура для
+    любого набора сквадов, индекс по squad_id — историю мест сквада.
+    """
+    __tablename__ = "squad_tour_ranks"
+    __table_args__ = (
+        Index("ix_squad_tour_ranks_squad_id_tour_id", "squad_id", "tour_id"),
+    )
+
+    tour_id: Mapped[int] = mapped_column(
+        ForeignKey("tours.id", ondelete="CASCADE"), primary_key=True
+    )
+    squad_id: Mapped[int] = mapped_column(
+        ForeignKey("squads.id", ondelete="CASCADE"), primary_key=True
+    )
+    total_net_points: Mapped[int]
+    league_place: Mapped[int]
+    club_place: Mapped[int]
+    user_league_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), server_default="{}")
+    user_league_places: Mapped[list[int]] = mapped_column(ARRAY(Integer), server_default="{}")
+    commercial_league_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), server_default="{}")
+    commercial_league_places: Mapped[list[int]] = mapped_column(ARRAY(Integer), server_default="{}")
+
+
+class SquadTourDocument(Base):
+    """Готовый ответ сквад-API по завершённому SquadTour.
+
+    document — поля SquadTourHistorySchema: состояние сквада в туре, номер
+    тура и карточки игроков основы и скамейки с очками за тур и соперником.
+    Пишется пачкой при финализации тура и перезаписывается rescore_match
+    (app.squad_tours.documents); после этого эндпоинты отдают завершённые
+    туры без join'ов. Первичный ключ отдаёт документы тура, индекс по
+    squad_id — историю сквада.
+    """
+    __tablename__ = "squad_tour_documents"
+    __table_args__ = (
+        Index("ix_squad_tour_documents_squad_id_tour_id", "squad_id", "tour_id"),
+    )
+
+    tour_id: Mapped[int] = mapped_column(
+        ForeignKey("tours.id", ondelete="CASCADE"), primary_key=True
+    )
+    squad_id: Mapped[int] = mapped_column(
+        ForeignKey("squads.id", ondelete="CASCADE"), primary_key=True
+    )
+    document: Mapped[dict] = mapped_column(JSONB)
+    built_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
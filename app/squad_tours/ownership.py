@@ -0,0 +1,144 @@
+import logging
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+
+from app.squad_tours.models import LineupVersion, PlayerTourOwnership, SquadTour
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("starters", "bench", "captains")
+STARTERS, BENCH, CAPTAINS = range(len(COUNTERS))
+
+
+class OwnershipDelta:
+    """Изменения счётчиков player_tour_ownership, накопленные по ходу правки составов.
+
+    apply() записывает их одним upsert в текущей транзакции, поэтому
+    счётчики коммитятся вместе с составами.
+    """
+
+    def __init__(self):
+        self._counts: dict[tuple[int, int], list[int]] = defaultdict(lambda: [0, 0, 0])
+
+    def add(
+        self,
+        tour_id: int,
+        main_player_ids: Iterable[int],
+        bench_player_ids: Iterable[int],
+        captain_id: Optional[int],
+        sign: int = 1,
+    ) -> None:
+        for player_id in main_player_ids:
+            self.bump(player_id, tour_id, STARTERS, sign)
+        for player_id in bench_player_ids:
+            self.bump(player_id, tour_id, BENCH, sign)
+        if captain_id:
+            self.bump(captain_id, tour_id, CAPTAINS, sign)
+
+    def bump(self, player_id: int, tour_id: int, counter: int, amount: int) -> None:
+        self._counts[(player_id, tour_id)][counter] += amount
+
+    def remove(
+        self,
+        tour_id: int,
+        main_player_ids: Iterable[int],
+        bench_player_ids: Iterable[int],
+        captain_id: Optional[int],
+    ) -> None:
+        self.add(tour_id, main_player_ids, bench_player_ids, captain_id, sign=-1)
+
+    async def apply(self, session) -> None:
+        # порядок по ключу, чтобы параллельные upsert'ы не ловили дедлоки
+        rows = [
+            {"player_id": player_id, "tour_id": tour_id, **dict(zip(COUNTERS, counts))}
+            for (player_id, tour_id), counts in sorted(self._counts.items())
+            if any(counts)
+        ]
+        self._counts.clear()
+        if not rows:
+            return
+        table = PlayerTourOwnership.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.player_id, table.c.tour_id],
+            set_={name: table.c[name] + stmt.excluded[name] for name in COUNTERS},
+        )
+        await session.execute(stmt, rows)
+
+
+async def remove_squad_tours(session, squad_tour_ids: list[int]) -> None:
+    """Вычесть из счётчиков составы SquadTour, которые сейчас будут удалены."""
+    if not squad_tour_ids:
+        return
+    delta = OwnershipDelta()
+    result = await session.execute(
+        select(
+            SquadTour.tour_id,
+            LineupVersion.main_player_ids,
+            LineupVersion.bench_player_ids,
+            SquadTour.captain_id,
+        )
+        .outerjoin(LineupVersion, LineupVersion.id == SquadTour.lineup_version_id)
+        .where(SquadTour.id.in_(squad_tour_ids))
+    )
+    for tour_id, main_player_ids, bench_player_ids, captain_id in result.all():
+        delta.remove(tour_id, main_player_ids or (), bench_player_ids or (), captain_id)
+    await delta.apply(session)
+
+
+async def rebuild_ownership(session, tour_ids: Optional[list[int]] = None) -> int:
+    """Пересобрать счётчики из составов SquadTour (для всех туров или для tour_ids).
+
+    Таблица блокируется до конца транзакции: правки составов, идущие
+    параллельно, применят свои дельты уже поверх пересобранных значений.
+    """
+    await session.execute(text("LOCK TABLE player_tour_ownership IN EXCLUSIVE MODE"))
+
+    lineups = union_all(
+        select(
+            func.unnest(LineupVersion.main_player_ids).label("player_id"),
+            SquadTour.tour_id.label("tour_id"),
+            literal(1).label("starters"),
+            literal(0).label("bench"),
+            literal(0).label("captains"),
+        ).join(LineupVersion, LineupVersion.id == SquadTour.lineup_version_id),
+        select(
+            func.unnest(LineupVersion.bench_player_ids),
+            SquadTour.tour_id,
+            literal(0),
+            literal(1),
+            literal(0),
+        ).join(LineupVersion, LineupVersion.id == SquadTour.lineup_version_id),
+        select(
+            SquadTour.captain_id,
+            SquadTour.tour_id,
+            literal(0),
+            literal(0),
+            literal(1),
+        ).where(SquadTour.captain_id.is_not(None)),
+    ).subquery()
+
+    aggregated = select(
+        lineups.c.player_id,
+        lineups.c.tour_id,
+        func.sum(lineups.c.starters),
+        func.sum(lineups.c.bench),
+        func.sum(lineups.c.captains),
+    )
+    clear = delete(PlayerTourOwnership)
+    if tour_ids is not None:
+        aggregated = aggregated.where(lineups.c.tour_id.in_(tour_ids))
+        clear = clear.where(PlayerTourOwnership.tour_id.in_(tour_ids))
+    aggregated = aggregated.group_by(lineups.c.player_id, lineups.c.tour_id)
+
+    await session.execute(clear)
+    result = await session.execute(
+        insert(PlayerTourOwnership.__table__).from_select(
+            ["player_id", "tour_id", *COUNTERS], aggregated
+        )
+    )
+    logger.info(f"Rebuilt player_tour_ownership: {result.rowcount} rows")
+    return result.rowcount
@@ -0,0 +1,111 @@
+import logging
+
+from sqlalchemy import delete, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array, insert
+
+from app.custom_leagues.commercial_league.models import commercial_league_squads
+from app.custom_leagues.user_league.models import user_league_squads
+from app.squad_tours.models import SquadTour, SquadTourRank
+from app.squads.models import Squad
+from app.tours.models import Tour
+
+logger = logging.getLogger(__name__)
+
+
+def _custom_league_places(totals, membership, league_column, name: str):
+    """Места в кастомных лигах, собранные в два массива на сквад."""
+    ranked = (
+        select(
+            membership.c.squad_id,
+            league_column.label("league_id"),
+            func.rank().over(partition_by=league_column, order_by=totals.c.net.desc()).label("place"),
+        )
+        .join(totals, totals.c.squad_id == membership.c.squad_id)
+        .subquery()
+    )
+    return (
+        select(
+            ranked.c.squad_id,
+            func.array_agg(aggregate_order_by(ranked.c.league_id, ranked.c.league_id)).label("ids"),
+            func.array_agg(aggregate_order_by(ranked.c.place, ranked.c.league_id)).label("places"),
+        )
+        .group_by(ranked.c.squad_id)
+        .cte(name)
+    )
+
+
+async def snapshot_tour_ranks(session, tour: Tour) -> int:
+    """Записать места всех сквадов лиги после тура tour.
+
+    Очки — сумма points - penalty_points завершённых туров с номером не
+    больше tour.number (как в лидербордах). Итоги по сквадам считаются
+    один раз, места — RANK() с PARTITION BY рейтинга. Прежний снимок тура
+    заменяется, поэтому вызов можно повторить после перерасчёта матча.
+    Коммит — на вызывающем. Возвращает число записанных строк.
+    """
+    net = (
+        select(
+            SquadTour.squad_id,
+            func.sum(SquadTour.points - SquadTour.penalty_points).label("net"),
+        )
+        .join(Tour, Tour.id == SquadTour.tour_id)
+        .where(
+            Tour.league_id == tour.league_id,
+            Tour.number <= tour.number,
+            SquadTour.is_finalized == True,
+        )
+        .group_by(SquadTour.squad_id)
+        .subquery()
+    )
+    totals = (
+        select(
+            Squad.id.label("squad_id"),
+            Squad.fav_team_id,
+            func.coalesce(net.c.net, 0).label("net"),
+        )
+        .outerjoin(net, net.c.squad_id == Squad.id)
+        .where(Squad.league_id == tour.league_id)
+        .cte("totals")
+    )
+    user_leagues = _custom_league_places(
+        totals, user_league_squads, user_league_squads.c.user_league_id, "user_league_places"
+    )
+    commercial_leagues = _custom_league_places(
+        totals, commercial_league_squads, commercial_league_squads.c.commercial_league_id, "commercial_league_places"
+    )
+    empty = array([], type_=SquadTourRank.user_league_ids.type.item_type)
+    rows = (
+        select(
+            literal(tour.id),
+            totals.c.squad_id,
+            totals.c.net,
+            func.rank().over(order_by=totals.c.net.desc()),
+            func.rank().over(partition_by=totals.c.fav_team_id, order_by=totals.c.net.desc()),
+            func.coalesce(user_leagues.c.ids, empty),
+            func.coalesce(user_leagues.c.places, empty),
+            func.coalesce(commercial_leagues.c.ids, empty),
+            func.coalesce(commercial_leagues.c.places, empty),
+        )
+        .outerjoin(user_leagues, user_leagues.c.squad_id == totals.c.squad_id)
+        .outerjoin(commercial_leagues, commercial_leagues.c.squad_id == totals.c.squad_id)
+    )
+
+    await session.execute(delete(SquadTourRank).where(SquadTourRank.tour_id == tour.id))
+    result = await session.execute(
+        insert(SquadTourRank).from_select(
+            [
+                "tour_id",
+                "squad_id",
+                "total_net_points",
+                "league_place",
+                "club_place",
+                "user_league_ids",
+                "user_league_places",
+                "commercial_league_ids",
+                "commercial_league_places",
+            ],
+            rows,
+        )
+    )
+    logger.info(f"Snapshot of ranks after tour {tour.id}: {result.rowcount} squads")
+    return result.rowcount
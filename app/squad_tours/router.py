@@ -6,7 +6,10 @@ from sqlalchemy import select
 from sqlalchemy.orm import joinedload, selectinload
 
 from app.squad_tours.schemas import (
+    LiveSquadTourSchema,
     SquadTourHistorySchema,
+    SquadTourPointsEntrySchema,
+    SquadTourRankSchema,
     SquadTourUpdatePlayersSchema,
     SquadTourReplacePlayersResponseSchema,
     ReplacementInfoSchema,
@@ -14,6 +17,8 @@ from app.squad_tours.schemas import (
 from app.matches.models import Match
 from app.teams.models import Team
 from app.tours.models import Tour
+from app.squad_tours.documents import squad_tour_documents
+from app.squad_tours.live import live_scoring
 from app.squad_tours.services import SquadTourService
 from app.squads.services import SquadService
 from app.users.dependencies import get_current_user
@@ -63,87 +68,59 @@ async def get_squad_tour(
     squad_id: int,
     tour_id: int
 ) -> SquadTourHistorySchema:
-    """Get SquadTour for specific squad and tour."""
-    squad_tour = await SquadTourService.find_by_squad_and_tour(
-        squad_id=squad_id,
-        tour_id=tour_id,
-        with_players=True
-    )
+    """Get SquadTour for specific squad and tour.
+
+    Завершённый тур отдаётся готовым документом (app.squad_tours.documents).
+    """
+    from app.database import async_session_maker
+    async with async_session_maker() as session:
+        documents = await squad_tour_documents(session, squad_id=squad_id, tour_id=tour_id)
     
-    if not squad_tour:
+    if not documents:
         raise HTTPException(
             status_code=404,
             detail=f"SquadTour not found for squad {squad_id} and tour {tour_id}"
         )
     
-    # Get tour number
-    from app.tours.services import TourService
-    tour = await TourService.find_one_or_none(id=tour_id)
-    tour_number = tour.number if tour else 0
-    
-    # Get player points
-    from app.database import async_session_maker
-    async with async_session_maker() as session:
-        opponent_map = await _get_opponent_map_for_tour(session, tour_id)
+    return SquadTourHistorySchema(**documents[0])
 
-        main_players_data = []
-        for player in squad_tour.main_players:
-            total_points = await SquadService._get_player_total_points(session, player.id)
-            tour_points = await SquadService._get_player_tour_points(session, player.id, tour_id)
-            opponent_info = opponent_map.get(player.team_id)
-            
-            main_players_data.append({
-                "id": player.id,
-                "name": player.name_rus or player.name,
-                "position": player.position,
-                "team_id": player.team_id,
-                "team_name": (player.team.name_rus or player.team.name) if player.team else "",
-                "team_logo": player.team.logo if player.team else None,
-                "market_value": player.market_value,
-                "photo": player.photo,
-                "total_points": total_points,
-                "tour_points": tour_points,
-                "next_opponent_team_name": opponent_info[0] if opponent_info else None,
-                "next_opponent_is_home": opponent_info[1] if opponent_info else None,
-            })
-        
-        bench_players_data = []
-        for player in squad_tour.bench_players:
-            total_points = await SquadService._get_player_total_points(session, player.id)
-            tour_points = await SquadService._get_player_tour_points(session, player.id, tour_id)
-            opponent_info = opponent_map.get(player.team_id)
-            
-            bench_players_data.append({
-                "id": player.id,
-                "name": player.name_rus or player.name,
-                "position": player.position,
-                "team_id": player.team_id,
-                "team_name": (player.team.name_rus or player.team.name) if player.team else "",
-                "team_logo": player.team.logo if player.team else None,
-                "market_value": player.market_value,
-                "photo": player.photo,
-                "total_points": total_points,
-                "tour_points": tour_points,
-                "next_opponent_team_name": opponent_info[0] if opponent_info else None,
-                "next_opponent_is_home": opponent_info[1] if opponent_info else None,
-            })
-    
-    return SquadTourHistorySchema(
-        tour_id=squad_tour.tour_id,
-        tour_number=tour_number,
-        points=squad_tour.points,
-        penalty_points=squad_tour.penalty_points,
-        used_boost=squad_tour.used_boost,
-        captain_id=squad_tour.captain_id,
-        vice_captain_id=squad_tour.vice_captain_id,
-        budget=squad_tour.budget,
-        replacements=squad_tour.replacements,
-        is_finalized=squad_tour.is_finalized,
-        main_players=main_players_data,
-        bench_players=bench_players_data,
+
+@router.get("/squad/{squad_id}/live", response_model=LiveSquadTourSchema)
+async def get_squad_live_points(squad_id: int) -> LiveSquadTourSchema:
+    """Live-очки состава в текущем туре (из кэша, без финализации матчей)."""
+    live_squad_tour = await live_scoring.get_by_squad(squad_id)
+    if not live_squad_tour:
+        raise ResourceNotFoundException(msg=f"No tour in progress for squad {squad_id}")
+    return LiveSquadTourSchema(
+        squad_id=live_squad_tour.squad_id,
+        tour_id=live_squad_tour.tour_id,
+        points=live_squad_tour.points,
+        provisional_points=live_squad_tour.provisional_points,
     )
 
 
+@router.get("/squad/{squad_id}/tour/{tour_id}/breakdown", response_model=List[SquadTourPointsEntrySchema])
+async def get_squad_tour_points_breakdown(
+    squad_id: int,
+    tour_id: int
+) -> List[SquadTourPointsEntrySchema]:
+    """Откуда взялись очки состава за тур: строки леджера по матчам и игрокам."""
+    breakdown = await SquadTourService.get_points_breakdown(squad_id=squad_id, tour_id=tour_id)
+    if breakdown is None:
+        raise ResourceNotFoundException(msg=f"SquadTour not found for squad {squad_id} and tour {tour_id}")
+    return [SquadTourPointsEntrySchema(**entry) for entry in breakdown]
+
+
+@router.get("/squad/{squad_id}/ranks", response_model=List[SquadTourRankSchema])
+async def get_squad_rank_history(
+    squad_id: int
+) -> List[SquadTourRankSchema]:
+    """Места состава после каждого завершённого тура: в лиге, среди болельщиков
+    клуба, в пользовательских и коммерческих лигах."""
+    history = await SquadTourService.get_rank_history(squad_id=squad_id)
+    return [SquadTourRankSchema(**entry) for entry in history]
+
+
 @router.get("/squad/{squad_id}", response_model=List[SquadTourHistorySchema])
 async def get_squad_all_tours(
     squad_id: int
@@ -157,97 +134,10 @@ async def get_all_squads_for_tour(
     tour_id: int
 ) -> List[SquadTourHistorySchema]:
     """Get all SquadTours for a specific tour."""
-    squad_tours = await SquadTourService.find_all_by_tour(tour_id=tour_id)
-    
-    if not squad_tours:
-        return []
-    
-    # Get tour number
-    from app.tours.services import TourService
-    tour = await TourService.find_one_or_none(id=tour_id)
-    tour_number = tour.number if tour else 0
-    
-    result = []
     from app.database import async_session_maker
     async with async_session_maker() as session:
-        opponent_map = await _get_opponent_map_for_tour(session, tour_id)
-        for squad_tour in squad_tours:
-            # Load relationships if not loaded
-            from app.squad_tours.models import SquadTour
-            from app.players.models import Player
-            
-            stmt = (
-                select(SquadTour)
-                .where(SquadTour.id == squad_tour.id)
-                .options(
-                    selectinload(SquadTour.main_players).joinedload(Player.team),
-                    selectinload(SquadTour.bench_players).joinedload(Player.team)
-                )
-            )
-            loaded_result = await session.execute(stmt)
-            loaded_squad_tour = loaded_result.unique().scalars().first()
-            
-            if not loaded_squad_tour:
-                continue
-            
-            main_players_data = []
-            for player in loaded_squad_tour.main_players:
-                total_points = await SquadService._get_player_total_points(session, player.id)
-                tour_points = await SquadService._get_player_tour_points(session, player.id, tour_id)
-                opponent_info = opponent_map.get(player.team_id)
-                
-                main_players_data.append({
-                    "id": player.id,
-                    "name": player.name_rus or player.name,
-                    "position": player.position,
-                    "team_id": player.team_id,
-                    "team_name": (player.team.name_rus or player.team.name) if player.team else "",
-                    "team_logo": player.team.logo if player.team else None,
-                    "market_value": player.market_value,
-                    "photo": player.photo,
-                    "total_points": total_points,
-                    "tour_points": tour_points,
-                    "next_opponent_team_name": opponent_info[0] if opponent_info else None,
-                    "next_opponent_is_home": opponent_info[1] if opponent_info else None,
-                })
-            
-                bench_players_data = []
-                for player in loaded_squad_tour.bench_players:
-                    total_points = await SquadService._get_player_total_points(session, player.id)
-                    tour_points = await SquadService._get_player_tour_points(session, player.id, tour_id)
-                    opponent_info = opponent_map.get(player.team_id)
-                    
-                    bench_players_data.append({
-                    "id": player.id,
-                    "name": player.name_rus or player.name,
-                    "position": player.position,
-                    "team_id": player.team_id,
-                    "team_name": (player.team.name_rus or player.team.name) if player.team else "",
-                    "team_logo": player.team.logo if player.team else None,
-                    "market_value": player.market_value,
-                    "photo": player.photo,
-                    "total_points": total_points,
-                    "tour_points": tour_points,
-                    "next_opponent_team_name": opponent_info[0] if opponent_info else None,
-                    "next_opponent_is_home": opponent_info[1] if opponent_info else None,
-                })
-            
-            result.append(SquadTourHistorySchema(
-                tour_id=loaded_squad_tour.tour_id,
-                tour_number=tour_number,
-                points=loaded_squad_tour.points,
-                penalty_points=loaded_squad_tour.penalty_points,
-                used_boost=loaded_squad_tour.used_boost,
-                captain_id=loaded_squad_tour.captain_id,
-                vice_captain_id=loaded_squad_tour.vice_captain_id,
-                budget=loaded_squad_tour.budget,
-                replacements=loaded_squad_tour.replacements,
-                is_finalized=loaded_squad_tour.is_finalized,
-                main_players=main_players_data,
-                bench_players=bench_players_data,
-            ))
-    
-    return result
+        documents = await squad_tour_documents(session, tour_id=tour_id)
+    return [SquadTourHistorySchema(**document) for document in documents]
 
 
 @router.get("/all", response_model=List[SquadTourHistorySchema])
@@ -40,6 +40,39 @@ class SquadTourHistorySchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LiveSquadTourSchema(BaseModel):
+    """Предварительные очки состава в текущем туре"""
+    squad_id: int
+    tour_id: int
+    points: int  # начислено за финализированные матчи
+    provisional_points: int  # + очки незавершённых матчей
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SquadTourPointsEntrySchema(BaseModel):
+    """Вклад игрока в очки состава за финализированный матч"""
+    match_id: int
+    player_id: int
+    base_points: int
+    multiplier: int  # 0 — не пошло в зачёт
+    reason: str  # main, captain, triple_captain, vice_captain, bench_boost, not_counted, negative_total
+    points: int  # base_points * multiplier
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SquadTourRankSchema(BaseModel):
+    """Места состава после завершённого тура"""
+    tour_id: int
+    tour_number: int
+    total_net_points: int
+    league_place: int
+    club_place: int  # среди болельщиков любимого клуба
+    user_league_places: dict[int, int]  # user_league_id -> место
+    commercial_league_places: dict[int, int]  # commercial_league_id -> место
+
+
 class SquadTourUpdatePlayersSchema(BaseModel):
     captain_id: Optional[int] = None
     vice_captain_id: Optional[int] = None
@@ -0,0 +1,111 @@
+from typing import Iterable, Mapping, NamedTuple, Optional
+
+# Причины строк леджера (squad_tour_points_ledger.reason)
+REASON_NOT_COUNTED = 0  # запасной без bench_boost или игрок без очков
+REASON_MAIN = 1
+REASON_CAPTAIN = 2
+REASON_TRIPLE_CAPTAIN = 3
+REASON_VICE_CAPTAIN = 4
+REASON_BENCH_BOOST = 5
+REASON_NEGATIVE_TOTAL = 6  # сумма состава за матч отрицательная — не начисляется
+
+REASON_NAMES = {
+    REASON_NOT_COUNTED: "not_counted",
+    REASON_MAIN: "main",
+    REASON_CAPTAIN: "captain",
+    REASON_TRIPLE_CAPTAIN: "triple_captain",
+    REASON_VICE_CAPTAIN: "vice_captain",
+    REASON_BENCH_BOOST: "bench_boost",
+    REASON_NEGATIVE_TOTAL: "negative_total",
+}
+
+
+class PointsEntry(NamedTuple):
+    player_id: int
+    base_points: int
+    multiplier: int
+    reason: int
+
+
+def squad_tour_match_entries(
+    main_player_ids: Iterable[int],
+    bench_player_ids: Iterable[int],
+    captain_id: Optional[int],
+    vice_captain_id: Optional[int],
+    used_boost: Optional[str],
+    player_points: Mapping[int, int],
+) -> list[PointsEntry]:
+    """Вклад каждого игрока состава в очки SquadTour за один матч.
+
+    Строка есть у каждого игрока состава, у которого есть очки в матче
+    (player_points). Правила (общие для finalize_match и live-подсчёта):
+    - Captain: × 2 (или × 3 при triple_captain)
+    - Vice-captain: × 2, если капитан набрал 0 в этом матче
+    - bench_boost: очки запасных тоже идут в зачёт
+    - отрицательная сумма за матч не начисляется: у строк, которые шли в
+      зачёт, multiplier 0 и reason negative_total
+
+    Поэтому сумма base_points * multiplier по строкам — ровно те очки,
+    что finalize_match и rescore_match добавляют к squad_tour.points.
+    """
+    is_triple_captain = used_boost == "triple_captain"
+    captain_points = player_points.get(captain_id, 0) if captain_id else 0
+
+    entries = []
+    for player_id in main_player_ids:
+        if player_id not in player_points:
+            continue
+        base_points = player_points[player_id]
+        if base_points == 0:
+            entries.append(PointsEntry(player_id, base_points, 0, REASON_NOT_COUNTED))
+        elif player_id == captain_id:
+            if is_triple_captain:
+                entries.append(PointsEntry(player_id, base_points, 3, REASON_TRIPLE_CAPTAIN))
+            else:
+                entries.append(PointsEntry(player_id, base_points, 2, REASON_CAPTAIN))
+        elif player_id == vice_captain_id and captain_points == 0:
+            entries.append(PointsEntry(player_id, base_points, 2, REASON_VICE_CAPTAIN))
+        else:
+            entries.append(PointsEntry(player_id, base_points, 1, REASON_MAIN))
+
+    for player_id in bench_player_ids:
+        if player_id not in player_points:
+            continue
+        base_points = player_points[player_id]
+        if used_boost == "bench_boost" and base_points > 0:
+            entries.append(PointsEntry(player_id, base_points, 1, REASON_BENCH_BOOST))
+        else:
+            entries.append(PointsEntry(player_id, base_points, 0, REASON_NOT_COUNTED))
+
+    if sum(entry.base_points * entry.multiplier for entry in entries) < 0:
+        entries = [
+            entry._replace(multiplier=0, reason=REASON_NEGATIVE_TOTAL) if entry.multiplier else entry
+            for entry in entries
+        ]
+    return entries
+
+
+def match_points_total(entries: Iterable[PointsEntry]) -> int:
+    """Очки SquadTour за матч по строкам squad_tour_match_entries (не меньше 0)."""
+    return sum(entry.base_points * entry.multiplier for entry in entries)
+
+
+def squad_tour_match_points(
+    main_player_ids: Iterable[int],
+    bench_player_ids: Iterable[int],
+    captain_id: Optional[int],
+    vice_captain_id: Optional[int],
+    used_boost: Optional[str],
+    player_points: Mapping[int, int],
+) -> int:
+    """Очки SquadTour за один матч (match_points_total от squad_tour_match_entries)."""
+    return match_points_total(
+        squad_tour_match_entries(
+            main_player_ids,
+            bench_player_ids,
+            captain_id,
+            vice_captain_id,
+            used_boost,
+            player_points,
+        )
+    )
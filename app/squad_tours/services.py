@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Optional
 from datetime import datetime
@@ -5,8 +6,11 @@ from datetime import datetime
 from sqlalchemy import func, select
 from sqlalchemy.orm import joinedload, selectinload
 
+from app.archives.reader import archive_for_squad, archive_for_tour
 from app.database import async_session_maker
-from app.squad_tours.models import SquadTour
+from app.squad_tours.models import SquadTour, SquadTourPointsEntry, SquadTourRank
+from app.squad_tours.scoring import REASON_NAMES
+from app.tours.models import Tour
 from app.utils.base_service import BaseService
 
 logger = logging.getLogger(__name__)
@@ -145,3 +149,88 @@ class SquadTourService(BaseService):
             
             result = await session.execute(stmt)
             return result.scalar() or 0
+
+    @classmethod
+    async def get_points_breakdown(cls, squad_id: int, tour_id: int) -> Optional[list[dict]]:
+        """Get per-match, per-player contributions to SquadTour points.
+        
+        Reads the points ledger written at match finalization (one range
+        of the ledger primary key), or the league archive once the league
+        is trimmed (app.archives).
+        
+        Returns:
+            List of ledger rows or None if the SquadTour does not exist
+        """
+        async with async_session_maker() as session:
+            squad_tour_id = (await session.execute(
+                select(SquadTour.id).where(
+                    SquadTour.squad_id == squad_id,
+                    SquadTour.tour_id == tour_id
+                )
+            )).scalar()
+            if squad_tour_id is None:
+                archive = await archive_for_tour(session, tour_id)
+                if archive is None:
+                    return None
+                entries = await asyncio.to_thread(archive.points_breakdown, squad_id, tour_id)
+                if entries is None:
+                    return None
+            else:
+                entries = (await session.execute(
+                    select(
+                        SquadTourPointsEntry.match_id,
+                        SquadTourPointsEntry.player_id,
+                        SquadTourPointsEntry.base_points,
+                        SquadTourPointsEntry.multiplier,
+                        SquadTourPointsEntry.reason,
+                    )
+                    .where(
+                        SquadTourPointsEntry.tour_id == tour_id,
+                        SquadTourPointsEntry.squad_tour_id == squad_tour_id,
+                    )
+                    .order_by(SquadTourPointsEntry.match_id, SquadTourPointsEntry.player_id)
+                )).mappings().all()
+            return [
+                {
+                    "match_id": entry["match_id"],
+                    "player_id": entry["player_id"],
+                    "base_points": entry["base_points"],
+                    "multiplier": entry["multiplier"],
+                    "reason": REASON_NAMES.get(entry["reason"], str(entry["reason"])),
+                    "points": entry["base_points"] * entry["multiplier"],
+                }
+                for entry in entries
+            ]
+
+    @classmethod
+    async def get_rank_history(cls, squad_id: int) -> list[dict]:
+        """Места сквада после каждого завершённого тура.
+
+        Читает снимки squad_tour_ranks одним диапазоном индекса по squad_id,
+        а для очищенной лиги — её архив (app.archives).
+        """
+        async with async_session_maker() as session:
+            ranks = (await session.execute(
+                select(SquadTourRank.__table__, Tour.number.label("tour_number"))
+                .join(Tour, Tour.id == SquadTourRank.tour_id)
+                .where(SquadTourRank.squad_id == squad_id)
+                .order_by(Tour.number)
+            )).mappings().all()
+            if not ranks:
+                archive = await archive_for_squad(session, squad_id)
+                if archive is not None:
+                    ranks = await asyncio.to_thread(archive.rank_history, squad_id)
+            return [
+                {
+                    "tour_id": rank["tour_id"],
+                    "tour_number": rank["tour_number"],
+                    "total_net_points": rank["total_net_points"],
+                    "league_place": rank["league_place"],
+                    "club_place": rank["club_place"],
+                    "user_league_places": dict(zip(rank["user_league_ids"], rank["user_league_places"])),
+                    "commercial_league_places": dict(
+                        zip(rank["commercial_league_ids"], rank["commercial_league_places"])
+                    ),
+                }
+                for rank in ranks
+            ]
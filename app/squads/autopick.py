@@ -0,0 +1,276 @@
+import logging
+import time
+from typing import Mapping, NamedTuple, Optional
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+from scipy.sparse import csr_array, vstack
+
+from app.squads.validation import (
+    BENCH_SIZE,
+    BUDGET,
+    DEF,
+    FORMATIONS,
+    FWD,
+    GK,
+    MAIN_SIZE,
+    MAX_PLAYERS_PER_CLUB,
+    MID,
+    PlayerEntry,
+)
+
+logger = logging.getLogger(__name__)
+
+# Запасные почти не приносят очков (только при bench_boost),
+# поэтому при равенстве основы берём более сильную скамейку.
+BENCH_WEIGHT = 0.1
+# Первый отбор кандидатов: допуск к LP-оценке как доля от неё
+INITIAL_GAP = 0.0005
+# Общий бюджет времени на MILP; по истечении отдаём лучший найденный состав
+TIME_BUDGET_SECONDS = 0.15
+
+# Сколько игроков позиции может оказаться в составе 11+4
+MAX_POSITION_COUNT = {
+    GK: 2,
+    **{code: max(f[k] for f in FORMATIONS) + BENCH_SIZE - 1 for k, code in enumerate((DEF, MID, FWD))},
+}
+
+
+class AutoPick(NamedTuple):
+    main_player_ids: list[int]
+    bench_player_ids: list[int]
+    captain_id: int
+    vice_captain_id: int
+    score: float
+    cost: int
+    is_optimal: bool
+
+
+def _prune_dominated(
+    ids: list[int], players: Mapping[int, PlayerEntry], scores: Mapping[int, float]
+) -> list[int]:
+    """Убирает игроков, которых в любом оптимальном составе можно заменить.
+
+    q доминирует p (та же позиция, не дороже, очков не меньше). Если p в
+    составе, а q нет, замену p -> q не даёт сделать только лимит клуба q.
+    В составе кроме p ещё 14 игроков: не больше MAX_POSITION_COUNT - 1
+    доминаторов в самом составе и не больше 14 // 3 заполненных клубов.
+    Если доминаторов больше, чем могут заблокировать эти два случая,
+    p можно не рассматривать.
+    """
+    full_clubs = (MAIN_SIZE + BENCH_SIZE - 1) // MAX_PLAYERS_PER_CLUB
+    kept = []
+    for code, max_count in MAX_POSITION_COUNT.items():
+        group = [player_id for player_id in ids if players[player_id].position == code]
+        if len(group) <= max_count:
+            kept.extend(group)
+            continue
+        score = np.array([float(scores.get(player_id, 0)) for player_id in group])
+        price = np.array([players[player_id].price for player_id in group])
+        _, club = np.unique([players[player_id].team_id for player_id in group], return_inverse=True)
+        order = np.arange(len(group))
+        # dominates[q, p]: q не хуже p, при полном равенстве решает порядок
+        dominates = (score[:, None] >= score[None, :]) & (price[:, None] <= price[None, :])
+        dominates &= (
+            (score[:, None] > score[None, :])
+            | (price[:, None] < price[None, :])
+            | (order[:, None] < order[None, :])
+        )
+        by_club = np.zeros((club.max() + 1, len(group)), dtype=int)
+        np.add.at(by_club, club, dominates.astype(int))
+        by_club[club, order] = 0  # клуб самого p заблокировать замену не может
+        blocked = np.sort(by_club, axis=0)[-full_clubs:].sum(axis=0)
+        spare = dominates.sum(axis=0) - (max_count - 1) - blocked > 0
+        # Клуб без свободного доминатора либо заполнен, либо все его
+        # доминаторы уже в составе — таких клубов не больше full_clubs + max_count - 1
+        spare |= (by_club > 0).sum(axis=0) >= full_clubs + max_count
+        kept.extend(player_id for player_id, is_spare in zip(group, spare) if not is_spare)
+    return kept
+
+
+class _Model(NamedTuple):
+    objective: np.ndarray
+    a_ub: csr_array
+    b_ub: np.ndarray
+    a_eq: csr_array
+    b_eq: np.ndarray
+
+
+def _build_model(
+    score: np.ndarray, price: np.ndarray, position: np.ndarray, club: np.ndarray, budget: int, bench_weight: float
+) -> _Model:
+    """Переменные: main[0:n], bench[n:2n], captain[2n:3n], formation[3n:3n+F].
+
+    Капитан удваивает очки, поэтому входит в целевую функцию; схема
+    выбирается одной из FORMATIONS.
+    """
+    n = len(score)
+    n_formations = len(FORMATIONS)
+    n_vars = 3 * n + n_formations
+    main, bench, captain, formation = 0, n, 2 * n, 3 * n
+    eye = np.arange(n)
+    ones = np.ones(n)
+    schemes = formation + np.arange(n_formations)
+
+    def rows(data, row, col, n_rows=1):
+        return csr_array((data, (row, col)), shape=(n_rows, n_vars))
+
+    def total(columns, coefficients=None):
+        coefficients = np.ones(len(columns)) if coefficients is None else coefficients
+        return rows(coefficients, np.zeros(len(columns), dtype=int), columns)
+
+    gk = eye[position == GK]
+    n_clubs = int(club.max()) + 1
+    ub = [
+        # Игрок либо в основе, либо на скамейке; капитан — из основы
+        (rows(np.r_[ones, ones], np.r_[eye, eye], np.r_[main + eye, bench + eye], n), np.ones(n)),
+        (rows(np.r_[ones, -ones], np.r_[eye, eye], np.r_[captain + eye, main + eye], n), np.zeros(n)),
+        (
+            rows(np.r_[ones, ones], np.r_[club, club], np.r_[main + eye, bench + eye], n_clubs),
+            np.full(n_clubs, MAX_PLAYERS_PER_CLUB),
+        ),
+        (total(np.r_[main + eye, bench + eye], np.r_[price, price]), [budget]),
+    ]
+    eq = [
+        (total(captain + eye), [1]),
+        (total(main + eye), [MAIN_SIZE]),
+        (total(bench + eye), [BENCH_SIZE]),
+        (total(main + gk), [1]),
+        (total(bench + gk), [1]),
+        (total(schemes), [1]),
+    ]
+    # Число DEF/MID/FWD в основе равно числам выбранной схемы
+    for k, code in enumerate((DEF, MID, FWD)):
+        counts = [f[k] for f in FORMATIONS]
+        eq.append((total(np.r_[main + eye[position == code], schemes], np.r_[ones[position == code], -np.array(counts)]), [0]))
+
+    return _Model(
+        objective=-np.r_[score, bench_weight * score, score, np.zeros(n_formations)],
+        a_ub=vstack([matrix for matrix, _ in ub]).tocsr(),
+        b_ub=np.concatenate([bound for _, bound in ub]).astype(float),
+        a_eq=vstack([matrix for matrix, _ in eq]).tocsr(),
+        b_eq=np.concatenate([bound for _, bound in eq]).astype(float),
+    )
+
+
+def _solve(model: _Model, time_limit: float):
+    return milp(
+        model.objective,
+        constraints=[
+            LinearConstraint(model.a_ub, -np.inf, model.b_ub),
+            LinearConstraint(model.a_eq, model.b_eq, model.b_eq),
+        ],
+        integrality=np.ones(len(model.objective)),
+        bounds=Bounds(0, 1),
+        options={"time_limit": time_limit},
+    )
+
+
+def pick_lineup(
+    players: Mapping[int, PlayerEntry],
+    scores: Mapping[int, float],
+    league_id: int,
+    budget: int = BUDGET,
+    bench_weight: float = BENCH_WEIGHT,
+) -> Optional[AutoPick]:
+    """Лучший состав 11+4 по очкам scores при всех правилах validate_lineup.
+
+    MILP целиком (сотни игроков) HiGHS решает долго, хотя LP-релаксация
+    почти точная. Поэтому: LP по всем кандидатам даёт верхнюю оценку и
+    приведённые стоимости; MILP решается только по игрокам с приведённой
+    стоимостью в пределах допуска. Если найденный состав отстаёт от
+    LP-оценки больше допуска, допуск расширяется до этого отставания и
+    MILP решается ещё раз — игрок с большей приведённой стоимостью не
+    может улучшить ответ, так что результат точный (is_optimal). Если
+    не уложились в TIME_BUDGET_SECONDS, возвращается лучший найденный
+    состав с is_optimal=False. None — допустимого состава нет.
+    """
+    deadline = time.monotonic() + TIME_BUDGET_SECONDS
+    ids = _prune_dominated([
+        player_id for player_id, entry in players.items()
+        if entry.league_id == league_id and entry.position in (GK, DEF, MID, FWD)
+    ], players, scores)
+    n = len(ids)
+    if n < MAIN_SIZE + BENCH_SIZE:
+        return None
+
+    entries = [players[player_id] for player_id in ids]
+    score = np.array([float(scores.get(player_id, 0)) for player_id in ids])
+    price = np.array([entry.price for entry in entries], dtype=float)
+    position = np.array([entry.position for entry in entries])
+    _, club = np.unique([entry.team_id for entry in entries], return_inverse=True)
+
+    model = _build_model(score, price, position, club, budget, bench_weight)
+    relaxation = linprog(
+        model.objective,
+        A_ub=model.a_ub,
+        b_ub=model.b_ub,
+        A_eq=model.a_eq,
+        b_eq=model.b_eq,
+        bounds=(0, 1),
+        method="highs",
+    )
+    if relaxation.status != 0:
+        logger.info(f"No feasible auto-pick lineup for league {league_id}: {relaxation.message}")
+        return None
+
+    # Минимальная приведённая стоимость по ролям игрока (main/bench/captain)
+    reduced_cost = relaxation.lower.marginals[:3 * n].reshape(3, n).min(axis=0)
+    gap = max(INITIAL_GAP * abs(relaxation.fun), 1.0)
+    tolerance = 1e-6
+    best = None  # (objective, candidates, x)
+    is_optimal = False
+    while True:
+        candidates = np.flatnonzero(reduced_cost <= gap + tolerance)
+        if best is not None and len(candidates) == len(best[1]):
+            is_optimal = True
+            break
+        remaining = deadline - time.monotonic()
+        if best is not None and remaining <= 0:
+            break
+        result = _solve(
+            _build_model(score[candidates], price[candidates], position[candidates], club[candidates], budget, bench_weight),
+            time_limit=max(remaining, 0.01),
+        )
+        if result.x is None:
+            if best is not None or len(candidates) == n or result.status == 1:
+                break
+            gap *= 2
+            continue
+        if best is None or result.fun < best[0]:
+            best = (result.fun, candidates, np.round(result.x).astype(bool))
+        if result.status != 0:
+            break  # лимит времени: решение найдено, но оптимальность не доказана
+        if result.fun - relaxation.fun <= gap + tolerance:
+            is_optimal = True
+            break
+        gap = result.fun - relaxation.fun
+
+    if best is None:
+        logger.info(f"No feasible auto-pick lineup for league {league_id}")
+        return None
+    objective, selected, x = best
+    if not is_optimal:
+        logger.info(
+            f"Auto-pick for league {league_id} stopped by time budget, "
+            f"{-objective:.1f} vs LP bound {-relaxation.fun:.1f}"
+        )
+
+    m = len(selected)
+    main_idx = selected[x[:m]]
+    bench_idx = selected[x[m:2 * m]]
+    captain_idx = int(selected[x[2 * m:3 * m]][0])
+    vice_idx = max((i for i in main_idx if i != captain_idx), key=lambda i: score[i])
+
+    # Основа упорядочена GK, DEF, MID, FWD; на скамейке вратарь первым
+    main_idx = sorted(main_idx, key=lambda i: (position[i], -score[i]))
+    bench_idx = sorted(bench_idx, key=lambda i: (position[i] != GK, -score[i]))
+    return AutoPick(
+        main_player_ids=[ids[i] for i in main_idx],
+        bench_player_ids=[ids[i] for i in bench_idx],
+        captain_id=ids[captain_idx],
+        vice_captain_id=ids[int(vice_idx)],
+        score=float(score[main_idx].sum() + score[captain_idx]),
+        cost=int(price[main_idx].sum() + price[bench_idx].sum()),
+        is_optimal=is_optimal,
+    )
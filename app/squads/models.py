@@ -1,6 +1,6 @@
 from typing import List
 
-from sqlalchemy import Column, ForeignKey, Integer, Table
+from sqlalchemy import Column, ForeignKey, Index, Integer, Table
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -10,6 +10,7 @@ user_league_squads = Table(
     Base.metadata,
     Column("squad_id", Integer, ForeignKey("squads.id"), primary_key=True),
     Column("user_league_id", Integer, ForeignKey("user_leagues.id"), primary_key=True),
+    Index("ix_user_league_squads_user_league_id", "user_league_id", "squad_id"),
 )
 
 commercial_league_squads = Table(
@@ -17,10 +18,15 @@ commercial_league_squads = Table(
     Base.metadata,
     Column("squad_id", Integer, ForeignKey("squads.id"), primary_key=True),
     Column("commercial_league_id", Integer, ForeignKey("commercial_leagues.id"), primary_key=True),
+    Index("ix_commercial_league_squads_commercial_league_id", "commercial_league_id", "squad_id"),
 )
 
 class Squad(Base):
     __tablename__ = "squads"
+    __table_args__ = (
+        Index("uq_squads_league_id_user_id", "league_id", "user_id", unique=True),
+        Index("ix_squads_fav_team_id", "fav_team_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
@@ -47,3 +53,18 @@ class Squad(Base):
         return self.name
 
 
+class SquadStanding(Base):
+    """Место сквада в основной лиге по чистым очкам (points - penalty_points)
+    завершённых туров. Пересчитывается целиком по лиге при финализации тура
+    и при перерасчёте матча завершённого тура (app.squads.standings).
+    """
+
+    __tablename__ = "squad_standings"
+    __table_args__ = (
+        Index("ix_squad_standings_league_id_total_net_points", "league_id", "total_net_points"),
+    )
+
+    squad_id: Mapped[int] = mapped_column(ForeignKey("squads.id", ondelete="CASCADE"), primary_key=True)
+    league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id", ondelete="CASCADE"))
+    total_net_points: Mapped[int] = mapped_column(default=0, server_default="0")
+    place: Mapped[int]
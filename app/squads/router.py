@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -11,6 +11,9 @@ from app.squads.schemas import (
     SquadUpdateResponseSchema,
     SquadCreateSchema,
     SquadUpdatePlayersSchema,
+    SquadValidateSchema,
+    SquadValidationResultSchema,
+    SquadAutoPickSchema,
 )
 from app.squad_tours.schemas import (
     LeaderboardEntrySchema,
@@ -21,6 +24,7 @@ from app.squad_tours.schemas import (
     SquadTourHistorySchema,
 )
 from app.squads.services import SquadService
+from app.squads.validation import BUDGET, lineup_cost, player_index, validate_lineup
 from app.users.dependencies import get_current_user
 from app.users.models import User
 from app.utils.exceptions import ResourceNotFoundException, FailedOperationException
@@ -56,6 +60,35 @@ async def create_squad(
     squad_with_user.username = squad_with_user.user.username if squad_with_user.user else ""
     return squad_with_user
 
+@router.post("/validate", response_model=SquadValidationResultSchema)
+async def validate_squad(draft: SquadValidateSchema) -> SquadValidationResultSchema:
+    """Проверка черновика состава по правилам create_squad/replace_players.
+
+    Работает по индексу игроков в памяти, возвращает все нарушения сразу.
+    """
+    players = await player_index.get(draft.league_id)
+    violations = validate_lineup(
+        players,
+        draft.league_id,
+        draft.main_player_ids,
+        draft.bench_player_ids,
+        draft.captain_id,
+        draft.vice_captain_id,
+    )
+    return SquadValidationResultSchema(
+        is_valid=not violations,
+        violations=[violation._asdict() for violation in violations],
+        budget=BUDGET - lineup_cost(players, draft.main_player_ids + draft.bench_player_ids),
+    )
+
+@router.get("/auto_pick/{league_id}", response_model=SquadAutoPickSchema)
+async def auto_pick_squad(
+    league_id: int,
+    metric: Literal["total_points", "form"] = "total_points",
+) -> SquadAutoPickSchema:
+    """Лучший состав 11+4 лиги по сумме очков или форме за последние матчи."""
+    return await SquadService.auto_pick(league_id, metric)
+
 @router.get("/my_squads", response_model=list[SquadReadSchema])
 async def list_users_squads(user: User = Depends(get_current_user)) -> list[SquadReadSchema]:
     """List user's squads (metadata only)."""
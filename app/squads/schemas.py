@@ -56,5 +56,34 @@ class SquadRenameSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SquadValidateSchema(BaseModel):
+    league_id: int
+    captain_id: Optional[int] = None
+    vice_captain_id: Optional[int] = None
+    main_player_ids: list[int]
+    bench_player_ids: list[int]
+
 
+class SquadViolationSchema(BaseModel):
+    code: str
+    message: str
 
+
+class SquadValidationResultSchema(BaseModel):
+    """Результат проверки черновика состава (без записи в БД)."""
+    is_valid: bool
+    violations: list[SquadViolationSchema]
+    budget: int
+
+
+class SquadAutoPickSchema(BaseModel):
+    """Состав, подобранный auto-pick (ещё не сохранён)."""
+    league_id: int
+    metric: str
+    main_player_ids: list[int]
+    bench_player_ids: list[int]
+    captain_id: int
+    vice_captain_id: int
+    score: float
+    budget: int
+    is_optimal: bool
@@ -1,9 +1,10 @@
+import asyncio
 import logging
 from typing import Optional
 from dataclasses import dataclass
 
 from fastapi import HTTPException
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 from sqlalchemy.future import select
 from sqlalchemy import delete, func, desc
 from datetime import datetime, timedelta, timezone
@@ -11,12 +12,36 @@ from datetime import datetime, timedelta, timezone
 from app.matches.models import Match
 from app.player_match_stats.models import PlayerMatchStats
 from app.players.models import Player, player_bench_squad_tours, player_squad_tours
+from app.batch.runner import (
+    OP_FINALIZE_TOUR,
+    OP_START_TOUR,
+    Operation,
+    dispatch_celery_workers,
+    get_job,
+    is_running,
+    plan_job,
+    register_operation,
+    reset_attempts,
+    run_job,
+    submit_job,
+)
+from app.leagues.summary import league_summaries
+from app.players.services import PlayerService
 from app.squads.models import Squad
+from app.squads.schemas import SquadAutoPickSchema
+from app.squads.standings import refresh_league_standings
+from app.squad_tours.documents import squad_tour_documents, write_squad_tour_documents
+from app.squad_tours.lineup import get_lineup_version, insert_lineup_rows, set_lineup
+from app.squad_tours.live import live_scoring
 from app.squad_tours.models import SquadTour
+from app.squad_tours.ownership import OwnershipDelta
+from app.squad_tours.ranks import snapshot_tour_ranks
+from app.squads.validation import BUDGET, index_players, lineup_cost, player_index, validate_lineup
 from app.custom_leagues.user_league.models import UserLeague, user_league_squads
 from app.tours.models import Tour
 from app.tours.services import TourService
 from app.database import async_session_maker
+from app.push.notify import notify_leaderboard_head, notify_tour_event
 from app.utils.base_service import BaseService
 from app.utils.exceptions import ResourceNotFoundException, FailedOperationException
 from app.utils.timezone import now_msk
@@ -38,6 +63,20 @@ class SquadPoints:
 class SquadService(BaseService):
     model = Squad
 
+    @staticmethod
+    async def _ensure_tour_not_starting(session, tour_id: int) -> None:
+        """Пока идёт start_tour, часть сквадов уже скопирована в следующий тур.
+
+        Правка состава тура или новый сквад в нём в этот момент разошлись бы
+        с копией (или не попали бы в неё), поэтому до завершающего шага
+        (is_started) такие записи отклоняются.
+        """
+        if await is_running(session, OP_START_TOUR, tour_id):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Tour {tour_id} is starting, try again in a minute"
+            )
+
     @classmethod
     async def create_squad(
         cls,
@@ -75,93 +114,35 @@ class SquadService(BaseService):
                 active_tour = next_tour
                 active_tour_id = active_tour.id if active_tour else None
                 logger.debug(f"Next tour for new squad: {active_tour_id}")
+                if active_tour_id:
+                    await cls._ensure_tour_not_starting(session, active_tour_id)
 
                 all_player_ids = main_player_ids + bench_player_ids
                 players = await session.execute(
                     select(Player).where(Player.id.in_(all_player_ids))
                 )
                 players = players.scalars().all()
-                player_by_id = {player.id: player for player in players}
                 logger.debug(f"Found {len(players)} players")
 
-                if len(players) != len(all_player_ids):
+                if len({p.id for p in players}) != len(set(all_player_ids)):
                     missing_players = set(all_player_ids) - {p.id for p in players}
                     logger.error(f"Players not found: {missing_players}")
                     raise ResourceNotFoundException("One or more players not found")
 
-                if len(main_player_ids) != 11:
-                    logger.error(f"Main squad must have exactly 11 players, got {len(main_player_ids)}")
-                    raise FailedOperationException("Main squad must have exactly 11 players")
-                if len(bench_player_ids) != 4:
-                    logger.error(f"Bench must have exactly 4 players, got {len(bench_player_ids)}")
-                    raise FailedOperationException("Bench must have exactly 4 players")
-
-                total_cost = sum(p.market_value for p in players)
-                logger.debug(f"Total players cost: {total_cost}")
+                lineup_players = index_players(players)
+                violations = validate_lineup(
+                    lineup_players, league_id, main_player_ids, bench_player_ids, captain_id, vice_captain_id
+                )
+                if violations:
+                    logger.error(f"Invalid squad for user {user_id}: {[v.code for v in violations]}")
+                    raise FailedOperationException("; ".join(v.message for v in violations))
 
                 # Бюджет больше не валидируем на этапе создания сквада,
                 # но продолжаем его рассчитывать и сохранять.
+                total_cost = lineup_cost(lineup_players, all_player_ids)
+                logger.debug(f"Total players cost: {total_cost}")
 
-                for player in players:
-                    if player.league_id != league_id:
-                        logger.error(f"Player {player.id} is not from league {league_id}")
-                        raise FailedOperationException("All players must be from the same league")
-
-                club_counts = {}
-                for player in players:
-                    club_counts[player.team_id] = club_counts.get(player.team_id, 0) + 1
-                    if club_counts[player.team_id] > 3:
-                        logger.error(f"Cannot have more than 3 players from the same club {player.team_id}")
-                        raise FailedOperationException("Cannot have more than 3 players from the same club")
-                
-                # Validate main squad positions - must match valid formation with exactly 1 GK
-                main_players = [player_by_id[pid] for pid in main_player_ids]
-                bench_players = [player_by_id[pid] for pid in bench_player_ids]
-                
-                main_position_counts = {}
-                for player in main_players:
-                    position = player.position
-                    main_position_counts[position] = main_position_counts.get(position, 0) + 1
-                
-                bench_position_counts = {}
-                for player in bench_players:
-                    position = player.position
-                    bench_position_counts[position] = bench_position_counts.get(position, 0) + 1
-                
-                # Must have exactly 1 GK on field and 1 on bench
-                if main_position_counts.get("Goalkeeper", 0) != 1:
-                    logger.error("Main squad must have exactly 1 Goalkeeper")
-                    raise FailedOperationException("Main squad must have exactly 1 Goalkeeper")
-                if bench_position_counts.get("Goalkeeper", 0) != 1:
-                    logger.error("Bench must have exactly 1 Goalkeeper")
-                    raise FailedOperationException("Bench must have exactly 1 Goalkeeper")
-                
-                # Check if formation is valid
-                valid_formations = [
-                    {"DEF": 4, "MID": 3, "FWD": 3},
-                    {"DEF": 4, "MID": 4, "FWD": 2},
-                    {"DEF": 3, "MID": 5, "FWD": 2},
-                    {"DEF": 5, "MID": 4, "FWD": 1},
-                    {"DEF": 3, "MID": 4, "FWD": 3},
-                    {"DEF": 4, "MID": 5, "FWD": 1},
-                    {"DEF": 5, "MID": 2, "FWD": 3},
-                    {"DEF": 5, "MID": 3, "FWD": 2},
-                ]
-                
-                defenders = main_position_counts.get("Defender", 0)
-                midfielders = main_position_counts.get("Midfielder", 0)
-                forwards = main_position_counts.get("Attacker", 0) + main_position_counts.get("Forward", 0)
-                
-                is_valid = any(
-                    f["DEF"] == defenders and f["MID"] == midfielders and f["FWD"] == forwards
-                    for f in valid_formations
-                )
-                
-                if not is_valid:
-                    logger.error(f"Invalid formation: {defenders}-{midfielders}-{forwards}")
-                    raise FailedOperationException(f"Invalid formation ({defenders}-{midfielders}-{forwards}). Valid formations: 4-3-3, 4-4-2, 3-5-2, 5-4-1, 3-4-3, 4-5-1, 5-2-3, 5-3-2")
-
-                budget = 100_000 - total_cost
+                budget = BUDGET - total_cost
                 logger.debug(f"Calculated budget: {budget}")
 
                 # New architecture: Squad is metadata only
@@ -176,12 +157,11 @@ class SquadService(BaseService):
 
                 await session.commit()
                 await session.refresh(squad)
+                league_summaries.invalidate(league_id)
                 logger.debug(f"Committed squad with ID: {squad.id}")
 
                 # Create SquadTour for next tour with all state
                 if active_tour_id:
-                    from app.squad_tours.models import squad_tour_players, squad_tour_bench_players
-                    
                     squad_tour = SquadTour(
                         squad_id=squad.id,
                         tour_id=active_tour_id,
@@ -192,27 +172,18 @@ class SquadService(BaseService):
                         is_finalized=False,
                         points=0,
                         penalty_points=0,
+                        lineup_version=await get_lineup_version(session, main_player_ids, bench_player_ids),
                         created_at=now_msk()
                     )
                     session.add(squad_tour)
                     await session.flush()
                     
                     # Add player associations to SquadTour
-                    for player_id in main_player_ids:
-                        await session.execute(
-                            squad_tour_players.insert().values(
-                                squad_tour_id=squad_tour.id,
-                                player_id=player_id
-                            )
-                        )
+                    await insert_lineup_rows(session, [squad_tour])
                     
-                    for player_id in bench_player_ids:
-                        await session.execute(
-                            squad_tour_bench_players.insert().values(
-                                squad_tour_id=squad_tour.id,
-                                player_id=player_id
-                            )
-                        )
+                    ownership = OwnershipDelta()
+                    ownership.add(active_tour_id, main_player_ids, bench_player_ids, captain_id)
+                    await ownership.apply(session)
                     
                     await session.commit()
                     logger.info(f"Created SquadTour for squad {squad.id} and tour {active_tour_id}")
@@ -253,6 +224,41 @@ class SquadService(BaseService):
                 logger.error(f"Failed to create squad: {str(e)}", exc_info=True)
                 raise FailedOperationException(f"Failed to create squad: {str(e)}")
 
+    @classmethod
+    async def auto_pick(cls, league_id: int, metric: str = "total_points") -> SquadAutoPickSchema:
+        """Auto-pick: лучший состав 11+4 по правилам create_squad.
+
+        metric: total_points — очки за всё время (find_all_with_total_points),
+        form — средние очки за последние 5 матчей. Оптимизация CPU-bound,
+        поэтому выполняется в отдельном потоке.
+        """
+        players = await player_index.get(league_id)
+        if metric == "form":
+            scores = await PlayerService.get_recent_form(league_id)
+        else:
+            scores = {p.id: p.points for p in await PlayerService.find_all_with_total_points(league_id)}
+
+        from app.squads.autopick import pick_lineup  # scipy грузится только для auto-pick
+
+        lineup = await asyncio.to_thread(pick_lineup, players, scores, league_id)
+        if lineup is None:
+            raise FailedOperationException(f"No valid lineup can be built for league {league_id}")
+        logger.info(
+            f"Auto-pick for league {league_id} by {metric}: score={lineup.score}, "
+            f"cost={lineup.cost}, optimal={lineup.is_optimal}"
+        )
+        return SquadAutoPickSchema(
+            league_id=league_id,
+            metric=metric,
+            main_player_ids=lineup.main_player_ids,
+            bench_player_ids=lineup.bench_player_ids,
+            captain_id=lineup.captain_id,
+            vice_captain_id=lineup.vice_captain_id,
+            score=lineup.score,
+            budget=BUDGET - lineup.cost,
+            is_optimal=lineup.is_optimal,
+        )
+
     @classmethod
     async def _get_next_tour(cls, league_id: int) -> Optional[Tour]:
         now = datetime.utcnow()
@@ -712,6 +718,11 @@ class SquadService(BaseService):
             if squad_tour:
                 # SquadTour существует - обновляем его
                 squad_tour.points = await squad.calculate_points(session)
+                if squad_tour.captain_id != squad.captain_id:
+                    ownership = OwnershipDelta()
+                    ownership.remove(squad_tour.tour_id, [], [], squad_tour.captain_id)
+                    ownership.add(squad_tour.tour_id, [], [], squad.captain_id)
+                    await ownership.apply(session)
                 squad_tour.captain_id = squad.captain_id
                 squad_tour.vice_captain_id = squad.vice_captain_id
                 # Синхронизируем penalty_points с Squad
@@ -747,13 +758,26 @@ class SquadService(BaseService):
                     is_current=True,
                     captain_id=squad.captain_id,
                     vice_captain_id=squad.vice_captain_id,
-                    main_players=main_players,
-                    bench_players=bench_players,
+                    lineup_version=await get_lineup_version(
+                        session,
+                        [player.id for player in main_players],
+                        [player.id for player in bench_players],
+                    ),
                     points=0,
                     penalty_points=0,
                 )
                 session.add(new_squad_tour)
                 await session.flush()  # Чтобы получить ID
+                await insert_lineup_rows(session, [new_squad_tour])
+                
+                ownership = OwnershipDelta()
+                ownership.add(
+                    squad.current_tour_id,
+                    [player.id for player in main_players],
+                    [player.id for player in bench_players],
+                    squad.captain_id,
+                )
+                await ownership.apply(session)
                 
                 # Пересчитываем очки
                 new_squad_tour.points = await squad.calculate_points(session)
@@ -938,6 +962,71 @@ class SquadService(BaseService):
 
             return leaderboard
 
+    @classmethod
+    async def get_leaderboard_head(cls, tour_id: int, limit: int) -> list[dict]:
+        """Первые limit строк get_leaderboard одним запросом с LIMIT.
+
+        Порядок — по чистым очкам завершённых туров из squad_standings (их
+        пересчитывают финализация тура и перерасчёт матча завершённого тура),
+        у сквадов без строки standings — 0; при равенстве — по squad_id.
+        Суммы очков считаются только для попавших в голову сквадов.
+        """
+        from app.squads.models import SquadStanding
+        from app.users.models import User
+
+        async with async_session_maker() as session:
+            total_net = func.coalesce(SquadStanding.total_net_points, 0)
+            rows = (await session.execute(
+                select(
+                    Squad.id,
+                    Squad.name,
+                    User.id.label("user_id"),
+                    User.username,
+                    SquadTour.points,
+                    SquadTour.penalty_points,
+                )
+                .select_from(SquadTour)
+                .join(Squad, Squad.id == SquadTour.squad_id)
+                .join(User, User.id == Squad.user_id)
+                .outerjoin(SquadStanding, SquadStanding.squad_id == SquadTour.squad_id)
+                .where(SquadTour.tour_id == tour_id)
+                .order_by(total_net.desc(), SquadTour.squad_id)
+                .limit(limit)
+            )).all()
+            if not rows:
+                return []
+
+            totals = {
+                squad_id: (int(total_earned or 0), int(total_penalty or 0))
+                for squad_id, total_earned, total_penalty in (await session.execute(
+                    select(
+                        SquadTour.squad_id,
+                        func.sum(SquadTour.points),
+                        func.sum(SquadTour.penalty_points),
+                    )
+                    .where(
+                        SquadTour.squad_id.in_([row.id for row in rows]),
+                        SquadTour.is_finalized == True,
+                    )
+                    .group_by(SquadTour.squad_id)
+                )).all()
+            }
+
+        return [
+            {
+                "place": place,
+                "squad_id": row.id,
+                "squad_name": row.name,
+                "user_id": row.user_id,
+                "username": row.username,
+                "tour_points": (row.points or 0) - (row.penalty_points or 0),
+                "total_points": totals.get(row.id, (0, 0))[0],
+                "penalty_points": row.penalty_points or 0,
+                "total_penalty_points": totals.get(row.id, (0, 0))[1],
+            }
+            for place, row in enumerate(rows, start=1)
+        ]
+
    
 
     @classmethod
@@ -984,6 +1073,7 @@ class SquadService(BaseService):
                     detail="No open tour available for transfers"
                 )
             
+            await cls._ensure_tour_not_starting(session, target_tour.id)
             logger.info(f"Squad {squad_id} making transfers for tour {target_tour.id}")
             
             # Get or create SquadTour for target tour
@@ -1020,37 +1110,24 @@ class SquadService(BaseService):
             )
             players = players.scalars().all()
             
-            if len(players) != len(new_main_players) + len(new_bench_players):
+            if len({p.id for p in players}) != len(set(new_main_players + new_bench_players)):
                 raise HTTPException(
                     status_code=404,
                     detail="One or more players not found"
                 )
             
-            if captain_id and captain_id not in new_main_players + new_bench_players:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Captain must be in main or bench players"
-                )
-            if vice_captain_id and vice_captain_id not in new_main_players + new_bench_players:
+            lineup_players = index_players(players)
+            violations = validate_lineup(
+                lineup_players, squad.league_id, new_main_players, new_bench_players, captain_id, vice_captain_id
+            )
+            if violations:
                 raise HTTPException(
                     status_code=400,
-                    detail="Vice-captain must be in main or bench players"
+                    detail="; ".join(v.message for v in violations)
                 )
             
-            # Validate positions and formation
-            player_by_id = {p.id: p for p in players}
-            main_players_obj = [player_by_id[pid] for pid in new_main_players]
-            bench_players_obj = [player_by_id[pid] for pid in new_bench_players]
-            
-            # Use SquadTour's validate_players method
-            try:
-                squad_tour.validate_players(main_players_obj, bench_players_obj)
-            except ValueError as e:
-                raise HTTPException(status_code=400, detail=str(e))
-            
             # Calculate new budget
-            total_cost = sum(p.market_value for p in players)
-            new_budget = 100_000 - total_cost
+            new_budget = BUDGET - lineup_cost(lineup_players, new_main_players + new_bench_players)
             
             # Count transfers
             current_main_ids = {p.id for p in squad_tour.main_players}
@@ -1093,39 +1170,19 @@ class SquadService(BaseService):
                     # Apply penalty directly to this tour
                     squad_tour.penalty_points += penalty
             
+            ownership = OwnershipDelta()
+            ownership.remove(target_tour.id, current_main_ids, current_bench_ids, squad_tour.captain_id)
+            ownership.add(target_tour.id, new_main_players, new_bench_players, captain_id)
+            
             # Update SquadTour
             squad_tour.captain_id = captain_id
             squad_tour.vice_captain_id = vice_captain_id
             squad_tour.budget = new_budget
             
             # Update player associations
-            from app.squad_tours.models import squad_tour_players, squad_tour_bench_players
-            
-            await session.execute(
-                delete(squad_tour_players).where(
-                    squad_tour_players.c.squad_tour_id == squad_tour.id
-                )
-            )
-            await session.execute(
-                delete(squad_tour_bench_players).where(
-                    squad_tour_bench_players.c.squad_tour_id == squad_tour.id
-                )
-            )
-            
-            for player_id in new_main_players:
-                await session.execute(
-                    squad_tour_players.insert().values(
-                        squad_tour_id=squad_tour.id, player_id=player_id
-                    )
-                )
-            
-            for player_id in new_bench_players:
-                await session.execute(
-                    squad_tour_bench_players.insert().values(
-                        squad_tour_id=squad_tour.id, player_id=player_id
-                    )
-                )
+            await set_lineup(session, squad_tour, new_main_players, new_bench_players)
             
+            await ownership.apply(session)
             await session.commit()
             await session.refresh(squad_tour)
             
@@ -1198,7 +1255,7 @@ class SquadService(BaseService):
             }
 
     @classmethod
-    async def start_tour_for_all_squads(cls, tour_id: int):
+    async def start_tour_for_all_squads(cls, tour_id: int, wait: bool = True):
         """Start tour and create SquadTours for next tour.
         
         When a tour is started:
@@ -1208,11 +1265,17 @@ class SquadService(BaseService):
            - Find SquadTour for current tour
            - Copy data to create SquadTour for next tour
         
+        Step 3 runs as a partitioned batch job (app.batch.runner) by squad_id
+        ranges, each committed on its own; the tour is marked as started once
+        every partition is done. Calling this again after a failure resumes
+        the unfinished partitions.
+        
         Args:
             tour_id: ID of tour to start
+            wait: False — submit the job and return its status right away
         
         Returns:
-            dict with counts of created SquadTours
+            dict with counts of created SquadTours (job status if not wait)
         """
         async with async_session_maker() as session:
             # 1. Get tour and validate
@@ -1233,156 +1296,187 @@ class SquadService(BaseService):
                     detail=f"Tour {tour_id} is already started"
                 )
             
-            # 2. Check if previous tour is finalized
-            if tour.number > 1:
-                previous_tour = await session.execute(
+            job = await get_job(session, OP_START_TOUR, tour_id)
+            if job is not None:
+                logger.info(f"Resuming start of tour {tour_id} (batch job {job.id})")
+                await reset_attempts(session, job)
+            else:
+                # 2. Check if previous tour is finalized
+                if tour.number > 1:
+                    previous_tour = await session.execute(
+                        select(Tour)
+                        .where(Tour.league_id == tour.league_id)
+                        .where(Tour.number == tour.number - 1)
+                    )
+                    previous_tour = previous_tour.scalars().first()
+                    
+                    if previous_tour and not previous_tour.is_finalized:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"Previous tour {previous_tour.id} must be finalized before starting tour {tour_id}"
+                        )
+                
+                # 3. Find next tour
+                next_tour = await session.execute(
                     select(Tour)
                     .where(Tour.league_id == tour.league_id)
-                    .where(Tour.number == tour.number - 1)
+                    .where(Tour.number == tour.number + 1)
                 )
-                previous_tour = previous_tour.scalars().first()
+                next_tour = next_tour.scalars().first()
                 
-                if previous_tour and not previous_tour.is_finalized:
+                if not next_tour:
                     raise HTTPException(
-                        status_code=400,
-                        detail=f"Previous tour {previous_tour.id} must be finalized before starting tour {tour_id}"
+                        status_code=404,
+                        detail=f"Next tour not found for league {tour.league_id}"
                     )
-            
-            # 3. Find next tour
-            next_tour = await session.execute(
-                select(Tour)
-                .where(Tour.league_id == tour.league_id)
-                .where(Tour.number == tour.number + 1)
-            )
-            next_tour = next_tour.scalars().first()
-            
-            if not next_tour:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Next tour not found for league {tour.league_id}"
+                
+                # 4. Plan squad_id partitions of the league
+                job = await plan_job(
+                    session, OP_START_TOUR, tour_id, tour.league_id,
+                    {"league_id": tour.league_id, "next_tour_id": next_tour.id},
                 )
             
-            # 4. Get all squads in this league
-            all_squads = await session.execute(
-                select(Squad).where(Squad.league_id == tour.league_id)
-            )
-            all_squads = all_squads.scalars().all()
+            await session.commit()
+            job_id = job.id
+        
+        # 5. Copy SquadTours to the next tour, partition by partition
+        if not wait:
+            return await submit_job(job_id)
+        dispatch_celery_workers(job_id)
+        return await run_job(job_id)
+
+    @classmethod
+    async def _start_tour_partition(cls, session, job, partition) -> dict:
+        """Копирует SquadTour в следующий тур для сквадов одной партиции."""
+        tour_id = job.target_id
+        next_tour_id = job.params["next_tour_id"]
+        squad_ids = (await session.execute(
+            select(Squad.id)
+            .where(Squad.league_id == job.params["league_id"], partition.squad_range(Squad.id))
+            .order_by(Squad.id)
+        )).scalars().all()
+        
+        result = await session.execute(
+            select(SquadTour)
+            .where(SquadTour.tour_id == tour_id, partition.squad_range(SquadTour.squad_id))
+            # состав переносится ссылкой на версию, игроки не нужны
+            .options(raiseload(SquadTour.main_players), raiseload(SquadTour.bench_players))
+        )
+        squad_tours_by_squad_id = {st.squad_id: st for st in result.scalars().all()}
+        existing_next = set((await session.execute(
+            select(SquadTour.squad_id)
+            .where(SquadTour.tour_id == next_tour_id, partition.squad_range(SquadTour.squad_id))
+        )).scalars().all())
+        
+        skipped_count = 0
+        copies = []
+        for squad_id in squad_ids:
+            squad_tour = squad_tours_by_squad_id.get(squad_id)
             
-            # 5. Get all SquadTours for current tour
-            stmt = (
-                select(SquadTour)
-                .where(SquadTour.tour_id == tour_id)
-                .options(
-                    selectinload(SquadTour.main_players),
-                    selectinload(SquadTour.bench_players)
+            if not squad_tour:
+                # Skip squads that don't have SquadTour for current tour
+                skipped_count += 1
+                logger.warning(
+                    f"Squad {squad_id} doesn't have SquadTour for tour {tour_id}, skipping"
                 )
-            )
-            result = await session.execute(stmt)
-            squad_tours = result.scalars().all()
-            squad_tours_by_squad_id = {st.squad_id: st for st in squad_tours}
-            
-            created_count = 0
-            skipped_count = 0
+                continue
             
-            # 6. For each squad, create SquadTour for next tour
-            for squad in all_squads:
-                squad_tour = squad_tours_by_squad_id.get(squad.id)
-                
-                if not squad_tour:
-                    # Skip squads that don't have SquadTour for current tour
-                    skipped_count += 1
-                    logger.warning(
-                        f"Squad {squad.id} doesn't have SquadTour for tour {tour_id}, skipping"
-                    )
-                    continue
-                
-                # Check if SquadTour for next tour already exists
-                existing_next = await session.execute(
-                    select(SquadTour)
-                    .where(SquadTour.squad_id == squad.id)
-                    .where(SquadTour.tour_id == next_tour.id)
-                )
-                if existing_next.scalars().first():
-                    skipped_count += 1
-                    logger.warning(
-                        f"SquadTour for squad {squad.id} and tour {next_tour.id} already exists, skipping"
-                    )
-                    continue
-                
-                # Create SquadTour for next tour (copy from current tour)
-                new_squad_tour = SquadTour(
-                    squad_id=squad.id,
-                    tour_id=next_tour.id,
-                    captain_id=squad_tour.captain_id,
-                    vice_captain_id=squad_tour.vice_captain_id,
-                    budget=squad_tour.budget,
-                    replacements=2,  # Reset to 2 free transfers
-                    is_finalized=False,
-                    points=0,
-                    penalty_points=squad_tour.penalty_points,  # Carry over penalties
-                    used_boost=None,  # Reset boost
-                    created_at=now_msk()
-                )
-                session.add(new_squad_tour)
-                await session.flush()
-                
-                # Copy player associations
-                from app.squad_tours.models import squad_tour_players, squad_tour_bench_players
-                
-                for player in squad_tour.main_players:
-                    await session.execute(
-                        squad_tour_players.insert().values(
-                            squad_tour_id=new_squad_tour.id,
-                            player_id=player.id
-                        )
-                    )
-                
-                for player in squad_tour.bench_players:
-                    await session.execute(
-                        squad_tour_bench_players.insert().values(
-                            squad_tour_id=new_squad_tour.id,
-                            player_id=player.id
-                        )
-                    )
-                
-                created_count += 1
-                logger.info(
-                    f"Created SquadTour for squad {squad.id}, tour {next_tour.id}"
+            if squad_id in existing_next:
+                skipped_count += 1
+                logger.warning(
+                    f"SquadTour for squad {squad_id} and tour {next_tour_id} already exists, skipping"
                 )
-            
-            # 7. Mark tour as started
-            tour.is_started = True
-            
-            await session.commit()
-            
-            logger.info(
-                f"Tour {tour_id} started successfully. "
-                f"Created {created_count} SquadTours for tour {next_tour.id}, skipped {skipped_count}"
+                continue
+            
+            # Create SquadTour for next tour (copy from current tour)
+            new_squad_tour = SquadTour(
+                squad_id=squad_id,
+                tour_id=next_tour_id,
+                captain_id=squad_tour.captain_id,
+                vice_captain_id=squad_tour.vice_captain_id,
+                budget=squad_tour.budget,
+                replacements=2,  # Reset to 2 free transfers
+                is_finalized=False,
+                points=0,
+                penalty_points=squad_tour.penalty_points,  # Carry over penalties
+                used_boost=None,  # Reset boost
+                lineup_version=squad_tour.lineup_version,  # та же версия состава, копируется только ссылка
+                created_at=now_msk()
             )
-            
-            return {
-                "tour_id": tour_id,
-                "next_tour_id": next_tour.id,
-                "created_squad_tours": created_count,
-                "skipped_squads": skipped_count,
-                "total_squads": len(all_squads),
-            }
+            session.add(new_squad_tour)
+            copies.append(new_squad_tour)
+        
+        # один flush на партицию: id новых SquadTour для строк составов
+        await session.flush()
+        await insert_lineup_rows(session, copies)
+        
+        ownership = OwnershipDelta()
+        for new_squad_tour in copies:
+            ownership.add(
+                next_tour_id,
+                new_squad_tour.main_player_ids,
+                new_squad_tour.bench_player_ids,
+                new_squad_tour.captain_id,
+            )
+        await ownership.apply(session)
+        
+        return {
+            "created_squad_tours": len(copies),
+            "skipped_squads": skipped_count,
+            "total_squads": len(squad_ids),
+        }
+
+    @classmethod
+    async def _finish_tour_start(cls, session, job, totals: dict) -> dict:
+        tour = await session.get(Tour, job.target_id)
+        tour.is_started = True
+        return {
+            "tour_id": job.target_id,
+            "next_tour_id": job.params["next_tour_id"],
+            "created_squad_tours": totals.get("created_squad_tours", 0),
+            "skipped_squads": totals.get("skipped_squads", 0),
+            "total_squads": totals.get("total_squads", 0),
+        }
+
+    @staticmethod
+    def _invalidate_tour_start(job) -> None:
+        # следующий тур и дедлайн в сводке лиги сменились, live-очки — по новому туру
+        league_summaries.invalidate(job.params["league_id"])
+        live_scoring.invalidate()
+
+    @classmethod
+    async def _after_tour_start(cls, job, result: dict) -> None:
+        await notify_tour_event(job.target_id, "started", next_tour_id=result["next_tour_id"])
+        logger.info(
+            f"Tour {job.target_id} started successfully. "
+            f"Created {result['created_squad_tours']} SquadTours for tour {result['next_tour_id']}, "
+            f"skipped {result['skipped_squads']}"
+        )
 
     @classmethod
-    async def finalize_tour_for_all_squads(cls, tour_id: int, next_tour_id: Optional[int] = None):
+    async def finalize_tour_for_all_squads(
+        cls, tour_id: int, next_tour_id: Optional[int] = None, wait: bool = True
+    ):
         """Finalize completed tour.
         
         New architecture:
         1. Mark SquadTour as finalized (is_finalized=True)
-        2. Calculate and save points for finalized tour
+        2. Keep points accumulated by finalize_match (the ledger sum), write
+           squad-tour documents (app.squad_tours.documents)
         3. Mark Tour as finalized (is_finalized=True)
         
+        Steps 1-2 run as a partitioned batch job (app.batch.runner) by
+        squad_id ranges; step 3, standings and rank snapshots run once every
+        partition is done. Calling this again after a failure resumes the
+        unfinished partitions.
+        
         Args:
             tour_id: ID of completed tour
             next_tour_id: Deprecated, kept for backwards compatibility
+            wait: False — submit the job and return its status right away
         
         Returns:
-            dict with counts of processed squads
+            dict with counts of processed squads (job status if not wait)
         """
         async with async_session_maker() as session:
             # Get tour
@@ -1403,46 +1497,78 @@ class SquadService(BaseService):
                     detail=f"Tour {tour_id} is already finalized"
                 )
             
-            # Get all SquadTours for this tour
-            stmt = (
-                select(SquadTour)
-                .where(SquadTour.tour_id == tour_id)
-                .where(SquadTour.is_finalized == False)
-                .options(
-                    selectinload(SquadTour.main_players),
-                    selectinload(SquadTour.bench_players)
-                )
-            )
-            result = await session.execute(stmt)
-            squad_tours = result.scalars().all()
-            
-            finalized_count = 0
-            
-            for squad_tour in squad_tours:
-                # Calculate and save final points
-                squad_tour.points = await squad_tour.calculate_points(session)
-                squad_tour.is_finalized = True
-                finalized_count += 1
-                
-                logger.info(
-                    f"Finalized SquadTour {squad_tour.id} for squad {squad_tour.squad_id}, "
-                    f"tour {tour_id}: points={squad_tour.points}, penalties={squad_tour.penalty_points}"
+            job = await get_job(session, OP_FINALIZE_TOUR, tour_id)
+            if job is not None:
+                logger.info(f"Resuming finalization of tour {tour_id} (batch job {job.id})")
+                await reset_attempts(session, job)
+            else:
+                job = await plan_job(
+                    session, OP_FINALIZE_TOUR, tour_id, tour.league_id,
+                    {"league_id": tour.league_id, "next_tour_id": next_tour_id},
                 )
             
-            # Mark tour as finalized
-            tour.is_finalized = True
-            
             await session.commit()
-            
-            logger.info(
-                f"Tour finalization completed: tour {tour_id}. "
-                f"Finalized: {finalized_count} SquadTours"
-            )
-            
-            return {
-                "finalized_tours": finalized_count,
-                "total_squads_processed": len(squad_tours),
-            }
+            job_id = job.id
+        
+        if not wait:
+            return await submit_job(job_id)
+        dispatch_celery_workers(job_id)
+        return await run_job(job_id)
+
+    @classmethod
+    async def _finalize_tour_partition(cls, session, job, partition) -> dict:
+        """Фиксирует очки SquadTour тура для одной партиции squad_id.
+
+        Очки не пересчитываются: finalize_match/rescore_match уже накопили
+        в squad_tour.points сумму леджера (с капитаном и бустами).
+        """
+        stmt = (
+            select(SquadTour)
+            .where(SquadTour.tour_id == job.target_id)
+            .where(SquadTour.is_finalized == False)
+            .where(partition.squad_range(SquadTour.squad_id))
+            .options(raiseload(SquadTour.main_players), raiseload(SquadTour.bench_players))
+        )
+        result = await session.execute(stmt)
+        squad_tours = result.scalars().all()
+        
+        for squad_tour in squad_tours:
+            squad_tour.points = squad_tour.points or 0
+            squad_tour.is_finalized = True
+        
+        # готовые ответы сквад-API пишутся в той же транзакции, что и очки
+        await write_squad_tour_documents(
+            session, job.target_id, [squad_tour.id for squad_tour in squad_tours]
+        )
+        
+        return {"finalized_tours": len(squad_tours), "total_squads_processed": len(squad_tours)}
+
+    @classmethod
+    async def _finish_tour_finalization(cls, session, job, totals: dict) -> dict:
+        # Mark tour as finalized
+        tour = await session.get(Tour, job.target_id)
+        tour.is_finalized = True
+        await refresh_league_standings(session, tour.league_id)
+        await snapshot_tour_ranks(session, tour)
+        return {
+            "finalized_tours": totals.get("finalized_tours", 0),
+            "total_squads_processed": totals.get("total_squads_processed", 0),
+        }
+
+    @staticmethod
+    def _invalidate_tour_finalization(job) -> None:
+        # места в squad_standings пересчитаны
+        league_summaries.invalidate(job.params["league_id"])
+
+    @classmethod
+    async def _after_tour_finalization(cls, job, result: dict) -> None:
+        await notify_tour_event(job.target_id, "finalized", next_tour_id=job.params.get("next_tour_id"))
+        await notify_leaderboard_head(job.target_id)
+        
+        logger.info(
+            f"Tour finalization completed: tour {job.target_id}. "
+            f"Finalized: {result['finalized_tours']} SquadTours"
+        )
 
     @classmethod
     async def get_squad_tour_history_with_players(cls, squad_id: int) -> list[dict]:
@@ -1453,77 +1579,12 @@ class SquadService(BaseService):
         - Очки тура
         - Капитана и вице-капитана на тот момент
         - Список игроков основы и скамейки с их очками за этот тур
+        
+        Завершённые туры отдаются из squad_tour_documents, на лету
+        собирается только открытый (app.squad_tours.documents).
         """
         async with async_session_maker() as session:
-            # Загружаем все SquadTour для данного сквада
-            stmt = (
-                select(SquadTour)
-                .where(SquadTour.squad_id == squad_id)
-                .options(
-                    joinedload(SquadTour.tour),
-                    joinedload(SquadTour.main_players).joinedload(Player.team),
-                    joinedload(SquadTour.bench_players).joinedload(Player.team),
-                )
-                .order_by(SquadTour.tour_id.asc())
-            )
-            result = await session.execute(stmt)
-            squad_tours = result.unique().scalars().all()
-            
-            history = []
-            for squad_tour in squad_tours:
-                # Получаем очки каждого игрока за данный тур
-                main_players_data = []
-                for player in squad_tour.main_players:
-                    total_points = await cls._get_player_total_points(session, player.id)
-                    tour_points = await cls._get_player_tour_points(session, player.id, squad_tour.tour_id)
-                    
-                    main_players_data.append({
-                        "id": player.id,
-                        "name": player.name_rus or player.name,
-                        "position": player.position,
-                        "team_id": player.team_id,
-                        "team_name": (player.team.name_rus or player.team.name) if player.team else "",
-                        "team_logo": player.team.logo if player.team else None,
-                        "market_value": player.market_value,
-                        "photo": player.photo,
-                        "total_points": total_points,
-                        "tour_points": tour_points,
-                    })
-                
-                bench_players_data = []
-                for player in squad_tour.bench_players:
-                    total_points = await cls._get_player_total_points(session, player.id)
-                    tour_points = await cls._get_player_tour_points(session, player.id, squad_tour.tour_id)
-                    
-                    bench_players_data.append({
-                        "id": player.id,
-                        "name": player.name_rus or player.name,
-                        "position": player.position,
-                        "team_id": player.team_id,
-                        "team_name": (player.team.name_rus or player.team.name) if player.team else "",
-                        "team_logo": player.team.logo if player.team else None,
-                        "market_value": player.market_value,
-                        "photo": player.photo,
-                        "total_points": total_points,
-                        "tour_points": tour_points,
-                    })
-                
-                history.append({
-                    "tour_id": squad_tour.tour_id,
-                    "tour_number": squad_tour.tour.number,
-                    "points": squad_tour.points,
-                    "penalty_points": squad_tour.penalty_points,
-                    "used_boost": squad_tour.used_boost,
-                    "captain_id": squad_tour.captain_id,
-                    "vice_captain_id": squad_tour.vice_captain_id,
-                    "budget": squad_tour.budget,
-                    "replacements": squad_tour.replacements,
-                    "is_finalized": squad_tour.is_finalized,
-                    "main_players": main_players_data,
-                    "bench_players": bench_players_data,
-                })
-            
-            return history
+            return await squad_tour_documents(session, squad_id=squad_id)
 
     @classmethod
     async def get_leaderboard_by_fav_team(cls, tour_id: int, fav_team_id: int) -> list[dict]:
@@ -1602,3 +1663,17 @@ class SquadService(BaseService):
                 })
 
             return leaderboard
+
+
+register_operation(OP_START_TOUR, Operation(
+    run_partition=SquadService._start_tour_partition,
+    finish=SquadService._finish_tour_start,
+    after_finish=SquadService._after_tour_start,
+    invalidate=SquadService._invalidate_tour_start,
+))
+register_operation(OP_FINALIZE_TOUR, Operation(
+    run_partition=SquadService._finalize_tour_partition,
+    finish=SquadService._finish_tour_finalization,
+    after_finish=SquadService._after_tour_finalization,
+    invalidate=SquadService._invalidate_tour_finalization,
+))
@@ -0,0 +1,56 @@
+import logging
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.squad_tours.models import SquadTour
+from app.squads.models import Squad, SquadStanding
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_league_standings(session, league_id: int) -> None:
+    """Пересчитать места всех сквадов лиги одним INSERT ... SELECT.
+
+    Чистые очки — сумма points - penalty_points завершённых туров (как в
+    calculate_squad_points_bulk), место — RANK() по ним. Строки, у которых
+    ничего не поменялось, не перезаписываются. Коммит — на вызывающем.
+    """
+    totals = (
+        select(
+            SquadTour.squad_id,
+            func.sum(SquadTour.points - SquadTour.penalty_points).label("total_net_points"),
+        )
+        .join(Squad, Squad.id == SquadTour.squad_id)
+        .where(Squad.league_id == league_id, SquadTour.is_finalized == True)
+        .group_by(SquadTour.squad_id)
+        .subquery()
+    )
+    total_net_points = func.coalesce(totals.c.total_net_points, 0)
+    ranked = (
+        select(
+            Squad.id,
+            Squad.league_id,
+            total_net_points,
+            func.rank().over(order_by=total_net_points.desc()),
+        )
+        .outerjoin(totals, totals.c.squad_id == Squad.id)
+        .where(Squad.league_id == league_id)
+    )
+    stmt = insert(SquadStanding).from_select(
+        ["squad_id", "league_id", "total_net_points", "place"], ranked
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SquadStanding.squad_id],
+        set_={
+            "league_id": stmt.excluded.league_id,
+            "total_net_points": stmt.excluded.total_net_points,
+            "place": stmt.excluded.place,
+        },
+        where=or_(
+            SquadStanding.place != stmt.excluded.place,
+            SquadStanding.total_net_points != stmt.excluded.total_net_points,
+        ),
+    )
+    result = await session.execute(stmt)
+    logger.info(f"Refreshed standings for league {league_id}: {result.rowcount} rows changed")
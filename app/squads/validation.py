@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Iterable, Mapping, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session_maker
+from app.players.models import Player
+
+logger = logging.getLogger(__name__)
+
+MAIN_SIZE = 11
+BENCH_SIZE = 4
+MAX_PLAYERS_PER_CLUB = 3
+BUDGET = 100_000
+
+GK, DEF, MID, FWD, OTHER = range(5)
+POSITION_CODES = {
+    "Goalkeeper": GK,
+    "Defender": DEF,
+    "Midfielder": MID,
+    "Attacker": FWD,
+    "Forward": FWD,
+}
+
+# (защитники, полузащитники, нападающие) при одном вратаре
+FORMATIONS = (
+    (4, 3, 3),
+    (4, 4, 2),
+    (3, 5, 2),
+    (5, 4, 1),
+    (3, 4, 3),
+    (4, 5, 1),
+    (5, 2, 3),
+    (5, 3, 2),
+)
+VALID_FORMATIONS = frozenset(FORMATIONS)
+VALID_FORMATIONS_TEXT = ", ".join(f"{d}-{m}-{f}" for d, m, f in FORMATIONS)
+
+
+class PlayerEntry(NamedTuple):
+    position: int
+    team_id: int
+    price: int
+    league_id: int
+
+
+class Violation(NamedTuple):
+    code: str
+    message: str
+
+
+def player_entry(player: Player) -> PlayerEntry:
+    return PlayerEntry(
+        position=POSITION_CODES.get(player.position, OTHER),
+        team_id=player.team_id,
+        price=player.market_value or 0,
+        league_id=player.league_id,
+    )
+
+
+def index_players(players: Iterable[Player]) -> dict[int, PlayerEntry]:
+    return {player.id: player_entry(player) for player in players}
+
+
+def lineup_cost(players: Mapping[int, PlayerEntry], player_ids: Iterable[int]) -> int:
+    return sum(players[player_id].price for player_id in player_ids if player_id in players)
+
+
+def validate_lineup(
+    players: Mapping[int, PlayerEntry],
+    league_id: int,
+    main_player_ids: list[int],
+    bench_player_ids: list[int],
+    captain_id: Optional[int] = None,
+    vice_captain_id: Optional[int] = None,
+) -> list[Violation]:
+    """Все нарушения правил состава (пустой список — состав корректен).
+
+    Общая проверка для create_squad, replace_players и POST /squads/validate;
+    players — индекс id -> PlayerEntry, в БД не ходит.
+    """
+    violations = []
+    all_ids = main_player_ids + bench_player_ids
+
+    if len(main_player_ids) != MAIN_SIZE:
+        violations.append(Violation("main_size", f"Main squad must have exactly {MAIN_SIZE} players"))
+    if len(bench_player_ids) != BENCH_SIZE:
+        violations.append(Violation("bench_size", f"Bench must have exactly {BENCH_SIZE} players"))
+
+    duplicates = sorted(player_id for player_id, count in Counter(all_ids).items() if count > 1)
+    if duplicates:
+        violations.append(Violation("duplicate_players", f"Players selected more than once: {duplicates}"))
+
+    missing = sorted({player_id for player_id in all_ids if player_id not in players})
+    if missing:
+        violations.append(Violation("players_not_found", f"Players not found: {missing}"))
+
+    known = [players[player_id] for player_id in all_ids if player_id in players]
+    if any(entry.league_id != league_id for entry in known):
+        violations.append(Violation("league", "All players must be from the same league"))
+
+    club_counts = Counter(entry.team_id for entry in known)
+    if any(count > MAX_PLAYERS_PER_CLUB for count in club_counts.values()):
+        violations.append(Violation(
+            "club_limit",
+            f"Cannot have more than {MAX_PLAYERS_PER_CLUB} players from the same club",
+        ))
+
+    main_positions = Counter(players[player_id].position for player_id in main_player_ids if player_id in players)
+    bench_positions = Counter(players[player_id].position for player_id in bench_player_ids if player_id in players)
+    if main_positions[GK] != 1:
+        violations.append(Violation("main_goalkeeper", "Main squad must have exactly 1 Goalkeeper"))
+    if bench_positions[GK] != 1:
+        violations.append(Violation("bench_goalkeeper", "Bench must have exactly 1 Goalkeeper"))
+    formation = (main_positions[DEF], main_positions[MID], main_positions[FWD])
+    if len(main_player_ids) == MAIN_SIZE and not missing and formation not in VALID_FORMATIONS:
+        violations.append(Violation(
+            "formation",
+            f"Invalid formation ({formation[0]}-{formation[1]}-{formation[2]}). "
+            f"Valid formations: {VALID_FORMATIONS_TEXT}",
+        ))
+
+    if captain_id and captain_id not in all_ids:
+        violations.append(Violation("captain", "Captain must be in main or bench players"))
+    if vice_captain_id and vice_captain_id not in all_ids:
+        violations.append(Violation("vice_captain", "Vice-captain must be in main or bench players"))
+
+    return violations
+
+
+class PlayerIndex:
+    """Игроки лиги в памяти процесса: id -> PlayerEntry.
+
+    Лига загружается одним запросом при первом обращении и перечитывается
+    не чаще refresh_interval секунд; синхронизация игроков сбрасывает кэш.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._leagues: dict[int, tuple[float, dict[int, PlayerEntry]]] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, league_id: int) -> dict[int, PlayerEntry]:
+        cached = self._leagues.get(league_id)
+        if cached and time.monotonic() - cached[0] < self.refresh_interval:
+            return cached[1]
+        async with self._lock:
+            cached = self._leagues.get(league_id)
+            if cached and time.monotonic() - cached[0] < self.refresh_interval:
+                return cached[1]
+            async with async_session_maker() as session:
+                result = await session.execute(select(Player).where(Player.league_id == league_id))
+                players = index_players(result.scalars().all())
+            self._leagues[league_id] = (time.monotonic(), players)
+            logger.debug(f"Loaded {len(players)} players of league {league_id} into the player index")
+            return players
+
+    def invalidate(self, league_id: Optional[int] = None) -> None:
+        if league_id is None:
+            self._leagues.clear()
+        else:
+            self._leagues.pop(league_id, None)
+
+
+player_index = PlayerIndex(refresh_interval=settings.PLAYER_INDEX_REFRESH_SECONDS)
@@ -0,0 +1,29 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.batch.runner import run_job
+from app.database import engine
+from app.tasks.celery_app import celery_app
+
+# обработчики операций регистрируются при импорте сервисов
+import app.matches.services  # noqa: F401,E402
+import app.squads.services  # noqa: F401,E402
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_batch_job(job_id: int) -> Optional[dict]:
+    try:
+        # задача Celery уже отдельный процесс: партиции в её сессиях, без своего пула
+        return await run_job(job_id, processes=0, wait=False)
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task
+def run_batch_job(job_id: int) -> Optional[dict]:
+    """Дополнительный воркер пакетной операции: забирает партиции, пока они есть."""
+    result = asyncio.run(_run_batch_job(job_id))
+    logger.info(f"Batch job {job_id} worker exited, job {'finished' if result else 'still running'}")
+    return result
@@ -0,0 +1,14 @@
+from celery import Celery
+
+from app.config import settings
+
+# воркер не импортирует app.main — регистрируем все модели для relationship()
+import app.models  # noqa: F401
+
+celery_app = Celery(
+    "fantasy",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND or None,
+    include=["app.tasks.player_stats_tasks", "app.tasks.ownership_tasks", "app.tasks.batch_tasks"],
+)
+celery_app.config_from_object("app.tasks.celery_config")
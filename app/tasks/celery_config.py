@@ -0,0 +1,22 @@
+from celery.schedules import crontab
+
+from app.config import settings
+
+timezone = "Europe/Moscow"
+task_ignore_result = True
+worker_prefetch_multiplier = 1
+
+beat_schedule = {
+    "ingest-live-player-stats": {
+        "task": "app.tasks.player_stats_tasks.ingest_live_player_stats",
+        "schedule": settings.STATS_INGESTION_INTERVAL_SECONDS,
+        # не копим запуски, если предыдущий ещё идёт
+        "options": {"expires": settings.STATS_INGESTION_INTERVAL_SECONDS},
+    },
+    # счётчики ведутся инкрементально; ночная пересборка убирает дрейф
+    # после правок составов в обход сервисов (админка, ручной SQL)
+    "rebuild-player-tour-ownership": {
+        "task": "app.tasks.ownership_tasks.rebuild_player_tour_ownership",
+        "schedule": crontab(hour=4, minute=30),
+    },
+}
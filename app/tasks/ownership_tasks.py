@@ -0,0 +1,26 @@
+import asyncio
+import logging
+
+from app.database import async_session_maker, engine
+from app.squad_tours.ownership import rebuild_ownership
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+async def _rebuild_player_tour_ownership(tour_ids: list[int] | None) -> int:
+    try:
+        async with async_session_maker() as session:
+            rows = await rebuild_ownership(session, tour_ids)
+            await session.commit()
+            return rows
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task
+def rebuild_player_tour_ownership(tour_ids: list[int] | None = None) -> int:
+    """Пересобрать счётчики player_tour_ownership (бэкфилл и исправление дрейфа)."""
+    rows = asyncio.run(_rebuild_player_tour_ownership(tour_ids))
+    logger.info(f"player_tour_ownership rebuilt: {rows} rows")
+    return rows
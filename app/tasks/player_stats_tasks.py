@@ -0,0 +1,28 @@
+import asyncio
+import logging
+
+from app.database import engine
+from app.player_match_stats.services import PlayerMatchStatsService
+from app.push.hub import push_hub
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+async def _ingest_live_player_stats() -> list[dict]:
+    try:
+        return await PlayerMatchStatsService.ingest_live_matches()
+    finally:
+        # каждый запуск задачи — новый event loop, соединения asyncpg и Redis к нему привязаны
+        await engine.dispose()
+        if push_hub.redis is not None:
+            await push_hub.redis.connection_pool.disconnect()
+
+
+@celery_app.task
+def ingest_live_player_stats() -> list[dict]:
+    """Периодический импорт live-статистики игроков из внешнего API."""
+    results = asyncio.run(_ingest_live_player_stats())
+    failed = [result["match_id"] for result in results if "error" in result]
+    logger.info(f"Live stats ingestion: processed {len(results)} matches, failed {failed}")
+    return results
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -9,6 +9,8 @@ class Team(Base):
     name_rus: Mapped[str] = mapped_column(nullable=True)
     logo: Mapped[str] = mapped_column(nullable=True)
     league_id: Mapped[int] = mapped_column(ForeignKey("leagues.id"), nullable=False)
+    # id последней изменившей строку транзакции, как Player.version
+    version: Mapped[int] = mapped_column(BigInteger, server_default="0")
 
     league: Mapped["League"] = relationship(back_populates="teams")
     players: Mapped[list["Player"]] = relationship(back_populates="team", cascade="all, delete-orphan")
@@ -1,15 +1,17 @@
 import logging
+from typing import Optional
 
 import httpx
 from sqlalchemy.future import select
-from deep_translator import GoogleTranslator
 
 from app.database import async_session_maker
 from app.teams.models import Team
+from app.translations.pipeline import TranslationBackend, apply_translations, translate_names
 from app.utils.base_service import BaseService
 from app.utils.exceptions import (
     ExternalAPIErrorException,
     FailedOperationException,
+    ResourceNotFoundException,
 )
 from app.utils.external_api import external_api
 
@@ -84,63 +86,43 @@ class TeamService(BaseService):
                 raise FailedOperationException(msg=f"Failed to commit teams: {e}")
 
     @classmethod
-    async def translate_all_teams_names(cls):
+    async def translate_all_teams_names(cls, backend: Optional[TranslationBackend] = None):
         """Переводит названия всех команд на русский и сохраняет в name_rus"""
-        translator = GoogleTranslator(source='auto', target='ru')
-        
         async with async_session_maker() as session:
-            # Получаем все команды
-            stmt = select(Team)
-            result = await session.execute(stmt)
-            teams = result.scalars().all()
-            
-            logger.info(f"Found {len(teams)} teams to translate")
-            
-            translated_count = 0
-            
-            for team in teams:
-                try:
-                    # Переводим название команды
-                    translated_name = translator.translate(team.name)
-                    team.name_rus = translated_name
-                    translated_count += 1
-                    
-                    if translated_count % 10 == 0:
-                        logger.info(f"Translated {translated_count}/{len(teams)} teams")
-                except Exception as e:
-                    logger.error(f"Failed to translate team {team.id} ({team.name}): {e}")
-                    continue
-            
+            names = (await session.execute(select(Team.name))).scalars().all()
+        logger.info(f"Found {len(names)} teams to translate")
+
+        translations = await translate_names(names, backend)
+
+        async with async_session_maker() as session:
+            updated = await apply_translations(session, Team)
             await session.commit()
-            logger.info(f"Translation completed: {translated_count} teams translated")
-            return {"translated": translated_count, "total": len(teams)}
+
+        translated_count = sum(1 for name in names if name in translations)
+        logger.info(f"Translation completed: {translated_count} teams translated, {updated} updated")
+        return {"translated": translated_count, "total": len(names)}
 
     @classmethod
-    async def translate_team_name_by_id(cls, team_id: int):
+    async def translate_team_name_by_id(cls, team_id: int, backend: Optional[TranslationBackend] = None):
         """Переводит название конкретной команды на русский по её ID"""
-        translator = GoogleTranslator(source='auto', target='ru')
-        
         async with async_session_maker() as session:
-            stmt = select(Team).where(Team.id == team_id)
-            result = await session.execute(stmt)
-            team = result.scalar_one_or_none()
-            
+            team = await session.get(Team, team_id)
             if not team:
-                from app.utils.exceptions import ResourceNotFoundException
-                raise ResourceNotFoundException(detail=f"Team with id {team_id} not found")
-            
-            try:
-                translated_name = translator.translate(team.name)
-                team.name_rus = translated_name
-                await session.commit()
-                
-                logger.info(f"Translated team {team_id}: {team.name} -> {translated_name}")
-                return {
-                    "team_id": team_id,
-                    "original_name": team.name,
-                    "translated_name": translated_name
-                }
-            except Exception as e:
-                logger.error(f"Failed to translate team {team_id} ({team.name}): {e}")
-                await session.rollback()
-                raise FailedOperationException(msg=f"Failed to translate team name: {e}")
+                raise ResourceNotFoundException(msg=f"Team with id {team_id} not found")
+            name = team.name
+
+        translated_name = (await translate_names([name], backend)).get(name)
+        if translated_name is None:
+            logger.error(f"Failed to translate team {team_id} ({name})")
+            raise FailedOperationException(msg=f"Failed to translate team name: {name}")
+
+        async with async_session_maker() as session:
+            await apply_translations(session, Team, ids=[team_id])
+            await session.commit()
+
+        logger.info(f"Translated team {team_id}: {name} -> {translated_name}")
+        return {
+            "team_id": team_id,
+            "original_name": name,
+            "translated_name": translated_name
+        }
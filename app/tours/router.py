@@ -2,6 +2,7 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from app.batch.runner import OP_FINALIZE_TOUR, OP_START_TOUR, job_status
 from app.tours.models import Tour
 from app.tours.schemas import TourRead, TourReadWithType
 from app.tours.services import TourService
@@ -95,19 +96,22 @@ async def start_tour(
     
     TODO: Добавить проверку прав доступа (только для админов)
     
+    Копирование — пакетная операция (app.batch.runner): запрос её не ждёт,
+    ход и результат — GET /tours/start_tour/{tour_id}.
+    
     Args:
         tour_id: ID тура, который нужно начать
     
     Returns:
-        Информация о количестве созданных SquadTour
+        Статус пакетной операции (job_id, job_status, партиции)
     """
     # TODO: Добавить проверку: if not user.is_admin: raise HTTPException(403)
     
     try:
-        result = await SquadService.start_tour_for_all_squads(tour_id=tour_id)
+        result = await SquadService.start_tour_for_all_squads(tour_id=tour_id, wait=False)
         return {
-            "status": "success",
-            "message": f"Tour {tour_id} started successfully",
+            "status": "accepted",
+            "message": f"Tour {tour_id} start submitted",
             **result
         }
     except HTTPException as e:
@@ -118,6 +122,14 @@ async def start_tour(
             detail=f"Failed to start tour: {str(e)}"
         )
 
+@router.get("/start_tour/{tour_id}")
+async def get_start_tour_status(tour_id: int, user: User = Depends(get_current_user)) -> dict:
+    """Статус старта тура: job_status running/done, партиции, результат."""
+    status = await job_status(OP_START_TOUR, tour_id)
+    if status is None:
+        raise ResourceNotFoundException()
+    return status
+
 @router.post("/finalize_tour/{tour_id}")
 async def finalize_tour(
     tour_id: int,
@@ -131,12 +143,15 @@ async def finalize_tour(
     
     TODO: Добавить проверку прав доступа (только для админов)
     
+    Финализация — пакетная операция (app.batch.runner): запрос её не ждёт,
+    ход и результат — GET /tours/finalize_tour/{tour_id}.
+    
     Args:
         tour_id: ID завершенного тура
         next_tour_id: ID следующего тура (опционально, определяется автоматически)
     
     Returns:
-        Информация о количестве обработанных сквадов
+        Статус пакетной операции (job_id, job_status, партиции)
     """
     # TODO: Добавить проверку: if not user.is_admin: raise HTTPException(403)
     
@@ -162,11 +177,12 @@ async def finalize_tour(
         
         result = await SquadService.finalize_tour_for_all_squads(
             tour_id=tour_id,
-            next_tour_id=next_tour_id
+            next_tour_id=next_tour_id,
+            wait=False
         )
         return {
-            "status": "success",
-            "message": f"Tour {tour_id} finalized, created snapshots for tour {next_tour_id}",
+            "status": "accepted",
+            "message": f"Tour {tour_id} finalization submitted",
             **result
         }
     except Exception as e:
@@ -174,3 +190,11 @@ async def finalize_tour(
             status_code=500,
             detail=f"Failed to finalize tour: {str(e)}"
         )
+
+@router.get("/finalize_tour/{tour_id}")
+async def get_finalize_tour_status(tour_id: int, user: User = Depends(get_current_user)) -> dict:
+    """Статус финализации тура: job_status running/done, партиции, результат."""
+    status = await job_status(OP_FINALIZE_TOUR, tour_id)
+    if status is None:
+        raise ResourceNotFoundException()
+    return status
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class Translation(Base):
+    """Кэш переводов имён: исходная строка -> перевод на target_lang."""
+
+    __tablename__ = "translations"
+
+    source_text: Mapped[str] = mapped_column(String, primary_key=True)
+    target_lang: Mapped[str] = mapped_column(String(8), primary_key=True)
+    translated_text: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Translation {self.source_text!r} -> {self.translated_text!r} ({self.target_lang})>"
@@ -0,0 +1,140 @@
+"""Перевод имён игроков и команд без блокировки event loop.
+
+Имена дедуплицируются и сначала ищутся в таблице translations; в backend
+уходят только новые, пачками по TRANSLATION_BATCH_SIZE в пуле из
+TRANSLATION_MAX_WORKERS потоков. Результаты сохраняются в translations, а
+name_rus проставляется одним UPDATE ... FROM translations.
+
+Backend подменяемый: любой объект с translate_batch(texts) -> list[str | None]
+(None — не удалось перевести). По умолчанию — Google через deep_translator.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Protocol, Sequence
+
+from sqlalchemy import String, any_, bindparam, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.config import settings
+from app.database import async_session_maker
+from app.translations.models import Translation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_LANG = "ru"
+
+
+class TranslationBackend(Protocol):
+    def translate_batch(self, texts: Sequence[str]) -> list[Optional[str]]:
+        """Синхронный перевод пачки строк; вызывается в пуле потоков."""
+
+
+class GoogleTranslateBackend:
+    def __init__(self, target_lang: str = DEFAULT_TARGET_LANG):
+        self.target_lang = target_lang
+
+    def translate_batch(self, texts: Sequence[str]) -> list[Optional[str]]:
+        from deep_translator import GoogleTranslator  # тяжёлый импорт, нужен только для перевода
+
+        # GoogleTranslator хранит параметры запроса в себе — свой экземпляр на поток
+        translator = GoogleTranslator(source="auto", target=self.target_lang)
+        translated = []
+        for text in texts:
+            try:
+                translated.append(translator.translate(text))
+            except Exception as e:
+                logger.error(f"Failed to translate {text!r}: {e}")
+                translated.append(None)
+        return translated
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TRANSLATION_MAX_WORKERS,
+            thread_name_prefix="translation",
+        )
+    return _executor
+
+
+async def translate_missing(texts: Sequence[str], backend: TranslationBackend) -> dict[str, str]:
+    """Переводит texts через backend в пуле потоков, возвращает успешные переводы."""
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    batch_size = settings.TRANSLATION_BATCH_SIZE
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    async def run(batch: Sequence[str]) -> dict[str, str]:
+        try:
+            results = await loop.run_in_executor(executor, backend.translate_batch, batch)
+        except Exception as e:
+            logger.error(f"Translation batch of {len(batch)} failed: {e}")
+            return {}
+        return {text: result for text, result in zip(batch, results) if result}
+
+    translated: dict[str, str] = {}
+    for batch_result in await asyncio.gather(*(run(batch) for batch in batches)):
+        translated.update(batch_result)
+    logger.info(f"Backend translated {len(translated)}/{len(texts)} names in {len(batches)} batches")
+    return translated
+
+
+async def translate_names(
+    names: Iterable[str],
+    backend: Optional[TranslationBackend] = None,
+    target_lang: str = DEFAULT_TARGET_LANG,
+) -> dict[str, str]:
+    """Перевод для каждого уникального имени: из кэша или от backend (с сохранением)."""
+    unique = sorted({name for name in names if name})
+    if not unique:
+        return {}
+
+    async with async_session_maker() as session:
+        cached = dict((await session.execute(
+            select(Translation.source_text, Translation.translated_text).where(
+                Translation.target_lang == target_lang,
+                Translation.source_text == any_(bindparam("names", unique, type_=ARRAY(String))),
+            )
+        )).all())
+
+    missing = [name for name in unique if name not in cached]
+    logger.info(f"Translations: {len(cached)} cached, {len(missing)} to translate")
+    if not missing:
+        return cached
+
+    fresh = await translate_missing(missing, backend or GoogleTranslateBackend(target_lang))
+    if fresh:
+        async with async_session_maker() as session:
+            await session.execute(
+                insert(Translation).on_conflict_do_nothing(),
+                [
+                    {"source_text": text, "target_lang": target_lang, "translated_text": translated}
+                    for text, translated in fresh.items()
+                ],
+            )
+            await session.commit()
+    return {**cached, **fresh}
+
+
+async def apply_translations(session, model, ids: Optional[Sequence[int]] = None) -> int:
+    """Проставляет model.name_rus из кэша переводов одним UPDATE; коммитит вызывающий."""
+    stmt = (
+        update(model)
+        .where(
+            model.name == Translation.source_text,
+            Translation.target_lang == DEFAULT_TARGET_LANG,
+            model.name_rus.is_distinct_from(Translation.translated_text),
+        )
+        .values(name_rus=Translation.translated_text)
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        stmt = stmt.where(model.id.in_(ids))
+    result = await session.execute(stmt)
+    return result.rowcount
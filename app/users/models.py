@@ -1,7 +1,7 @@
 from typing import Optional
 from datetime import date, datetime
 
-from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -9,6 +9,9 @@ from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_referrer_id_registration_date", "referrer_id", "registration_date", "id"),
+    )
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
     tg_username: Mapped[Optional[str]] = mapped_column(nullable=True)
@@ -18,6 +21,8 @@ class User(Base):
     referrer_id: Mapped[Optional[int]] = mapped_column(
         BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
     )
+    # Число пользователей с referrer_id == id; меняется вместе с referrer_id
+    referrals_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     squads: Mapped[list["Squad"]] = relationship(back_populates="user")
     user_leagues: Mapped[list["UserLeague"]] = relationship(
@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
@@ -10,6 +11,7 @@ from app.users.schemas import (
     UserUpdateSchema,
     UserReferrerSchema,
     UserReferralsResponse,
+    UserReferralStatsResponse,
 )
 from app.users.services import UserService
 from app.users.utils import create_access_token, create_refresh_token, verify_token
@@ -235,12 +237,13 @@ async def get_user_referrer(
 @router.get("/{user_id}/referrals", response_model=UserReferralsResponse)
 async def get_user_referrals(
     user_id: int,
-    page: int = 1,
+    cursor: Optional[str] = None,
     page_size: int = 10,
     current_user: UserSchema = Depends(get_current_user),
 ):
-    """Get paginated list of users referred by this user.
+    """Get a page of users referred by this user, newest first.
     
+    Pass next_cursor of the previous page as cursor to get the next one.
     Users can only access their own referrals list.
     Max page_size is 50.
     """
@@ -249,14 +252,38 @@ async def get_user_referrals(
             raise HTTPException(status_code=403, detail="Forbidden")
         
         # Limit page_size to reasonable maximum
-        page_size = min(page_size, 50)
-        if page < 1:
-            page = 1
+        page_size = max(1, min(page_size, 50))
         
-        result = await UserService.get_referrals(user_id, page, page_size)
+        result = await UserService.get_referrals(user_id, cursor, page_size)
         return UserReferralsResponse(**result)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Get referrals error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/{user_id}/referrals/stats", response_model=UserReferralStatsResponse)
+async def get_user_referral_stats(
+    user_id: int,
+    max_depth: int = 5,
+    current_user: UserSchema = Depends(get_current_user),
+):
+    """Referral counts per level: invited by the user, invited by them, etc.
+    
+    Users can only access their own referral stats.
+    Max max_depth is 10.
+    """
+    try:
+        if current_user.id != user_id:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        
+        max_depth = max(1, min(max_depth, 10))
+        
+        result = await UserService.get_referral_stats(user_id, max_depth)
+        return UserReferralStatsResponse(**result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get referral stats error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
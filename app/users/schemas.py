@@ -37,13 +37,26 @@ class UserReferralSchema(BaseModel):
 
 
 class UserReferralsResponse(BaseModel):
-    """Paginated response for user referrals."""
+    """Page of user referrals (keyset pagination)."""
     total: int
-    page: int
     page_size: int
+    next_cursor: Optional[str] = None  # None on the last page
     referrals: list[UserReferralSchema]
 
 
+class ReferralLevelSchema(BaseModel):
+    """Referrals on one level of the referral tree."""
+    level: int
+    referrals: int
+
+
+class UserReferralStatsResponse(BaseModel):
+    """Referral counts per level of the referral tree."""
+    user_id: int
+    total: int
+    levels: list[ReferralLevelSchema]
+
+
 class UserCreateSchema(BaseModel):
     username: str
     tg_username: Optional[str] = None
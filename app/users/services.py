@@ -1,14 +1,17 @@
 import logging
 from datetime import datetime
 
+from typing import Optional
+
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import func
+from sqlalchemy import and_, func, literal, or_, tuple_, update
 
 from app.database import async_session_maker
 from app.users.models import User
 from app.users.schemas import UserCreateSchema, UserUpdateSchema
 from app.utils.base_service import BaseService
+from app.utils.cursor import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +39,8 @@ class UserService(BaseService):
                     **user_data.model_dump(exclude_unset=True),
                 )
                 session.add(user)
+                if user.referrer_id is not None:
+                    await cls._count_referral(session, user.referrer_id)
                 await session.commit()
                 await session.refresh(user)
                 logger.debug(f"New user created: {user.id}")
@@ -73,6 +78,8 @@ class UserService(BaseService):
                     if key == 'referrer_id' and user.referrer_id is not None:
                         logger.debug(f"Skipping referrer_id update - already set to {user.referrer_id}")
                         continue
+                    if key == 'referrer_id' and value is not None:
+                        await cls._count_referral(session, value)
                     setattr(user, key, value)
 
                 await session.commit()
@@ -103,31 +110,89 @@ class UserService(BaseService):
             
             return user.referrer
     
+    @staticmethod
+    async def _count_referral(session, referrer_id: int, delta: int = 1):
+        """Сдвинуть счётчик приглашённых у referrer_id в текущей транзакции."""
+        await session.execute(
+            update(User)
+            .where(User.id == referrer_id)
+            .values(referrals_count=User.referrals_count + delta)
+        )
+
     @classmethod
-    async def get_referrals(cls, user_id: int, page: int = 1, page_size: int = 10):
-        """Get paginated list of users referred by this user."""
-        logger.debug(f"Getting referrals for user ID: {user_id}, page: {page}, page_size: {page_size}")
+    async def get_referrals(cls, user_id: int, cursor: Optional[str] = None, page_size: int = 10):
+        """Get a page of users referred by this user, newest first.
+
+        Keyset pagination on (registration_date, id) over
+        ix_users_referrer_id_registration_date: every page is one index range
+        no matter how deep. cursor is next_cursor of the previous page;
+        total comes from the users.referrals_count counter.
+        """
+        logger.debug(f"Getting referrals for user ID: {user_id}, cursor: {cursor}, page_size: {page_size}")
         async with async_session_maker() as session:
-            # Count total referrals
-            count_query = select(func.count()).select_from(cls.model).where(cls.model.referrer_id == user_id)
-            total_result = await session.execute(count_query)
-            total = total_result.scalar_one()
-            
-            # Get paginated referrals
-            offset = (page - 1) * page_size
+            total = (await session.execute(
+                select(cls.model.referrals_count).where(cls.model.id == user_id)
+            )).scalar() or 0
+
             query = (
                 select(cls.model)
                 .where(cls.model.referrer_id == user_id)
-                .order_by(cls.model.registration_date.desc())
-                .limit(page_size)
-                .offset(offset)
+                # NULL registration_date идут первыми, как в обратном обходе индекса
+                .order_by(cls.model.registration_date.desc(), cls.model.id.desc())
+                .limit(page_size + 1)
             )
-            result = await session.execute(query)
-            referrals = result.scalars().all()
-            
+            if cursor:
+                registration_date, last_id = decode_cursor(cursor)
+                if registration_date is None:
+                    query = query.where(or_(
+                        and_(cls.model.registration_date.is_(None), cls.model.id < last_id),
+                        cls.model.registration_date.is_not(None),
+                    ))
+                else:
+                    query = query.where(
+                        tuple_(cls.model.registration_date, cls.model.id) < (registration_date, last_id)
+                    )
+            referrals = (await session.execute(query)).scalars().all()
+
+            next_cursor = None
+            if len(referrals) > page_size:
+                referrals = referrals[:page_size]
+                next_cursor = encode_cursor(referrals[-1].registration_date, referrals[-1].id)
+
             return {
                 "total": total,
-                "page": page,
                 "page_size": page_size,
+                "next_cursor": next_cursor,
                 "referrals": referrals
             }
+
+    @classmethod
+    async def get_referral_stats(cls, user_id: int, max_depth: int = 5) -> dict:
+        """Count referrals on every level of the referral tree up to max_depth.
+
+        Level 1 are users invited by user_id, level 2 are users invited by
+        them and so on. One recursive CTE walks the tree over the
+        referrer_id index; max_depth also bounds walks through referral cycles.
+        """
+        tree = (
+            select(cls.model.id, literal(1).label("level"))
+            .where(cls.model.referrer_id == user_id)
+            .cte("referral_tree", recursive=True)
+        )
+        tree = tree.union_all(
+            select(cls.model.id, tree.c.level + 1)
+            .join(tree, cls.model.referrer_id == tree.c.id)
+            .where(tree.c.level < max_depth, cls.model.id != user_id)
+        )
+        async with async_session_maker() as session:
+            rows = (await session.execute(
+                select(tree.c.level, func.count())
+                .group_by(tree.c.level)
+                .order_by(tree.c.level)
+            )).all()
+        levels = [{"level": level, "referrals": count} for level, count in rows]
+        return {
+            "user_id": user_id,
+            "total": sum(level["referrals"] for level in levels),
+            "levels": levels,
+        }
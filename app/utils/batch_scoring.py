@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+
+# Коды позиций в колонке "position"; всё остальное — UNKNOWN
+POSITION_CODES = {"Goalkeeper": 0, "Defender": 1, "Midfielder": 2, "Attacker": 3}
+UNKNOWN_POSITION = len(POSITION_CODES)
+
+COLUMNS = (
+    "minutes",
+    "goals",
+    "assists",
+    "conceded",
+    "yellow",
+    "yellowred",
+    "red",
+    "penalty_missed",
+    "position",
+)
+
+PerPosition = tuple[int, int, int, int, int]  # GK, DEF, MID, ATT, Unknown
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """Версия правил подсчёта очков игрока за матч.
+
+    league_id/season = None означает «для всех». Очки, зависящие от
+    позиции, заданы кортежем (GK, DEF, MID, ATT, Unknown).
+    """
+
+    version: int
+    league_id: Optional[int] = None
+    season: Optional[int] = None
+    points_per_full_hour: int = 1
+    goal: PerPosition = (5, 5, 5, 5, 5)
+    assist: PerPosition = (3, 3, 3, 3, 3)
+    clean_sheet: PerPosition = (5, 0, 0, 0, 0)
+    clean_sheet_min_minutes: int = 60
+    yellow: int = -1
+    yellowred: int = -2
+    red: int = -3
+    penalty_missed: int = -2
+    min_points: Optional[int] = 0
+
+
+# Версия 1 повторяет app.utils.count_points.calculate_points.
+# Новые правила добавляются новой записью, старые не меняются.
+SCORING_RULES: tuple[ScoringRules, ...] = (
+    ScoringRules(version=1),
+)
+
+
+def get_scoring_rules(league_id: Optional[int] = None, season: Optional[int] = None) -> ScoringRules:
+    """Самая свежая версия правил: сначала точное совпадение лиги/сезона, потом общие."""
+    candidates = [
+        rules for rules in SCORING_RULES
+        if rules.league_id in (None, league_id) and rules.season in (None, season)
+    ]
+    return max(
+        candidates,
+        key=lambda rules: (rules.league_id is not None, rules.season is not None, rules.version),
+    )
+
+
+def score_batch(columns: Mapping[str, np.ndarray], rules: ScoringRules = SCORING_RULES[0]) -> np.ndarray:
+    """Очки для всех строк за один векторный проход.
+
+    columns — массивы одинаковой длины с ключами из COLUMNS; position —
+    код из POSITION_CODES (UNKNOWN_POSITION для прочих).
+    """
+    minutes = np.asarray(columns["minutes"], dtype=np.int32)
+    position = np.asarray(columns["position"], dtype=np.intp)
+
+    points = (minutes // 60) * rules.points_per_full_hour
+    points += np.take(np.array(rules.goal, dtype=np.int32), position) * np.asarray(columns["goals"], dtype=np.int32)
+    points += np.take(np.array(rules.assist, dtype=np.int32), position) * np.asarray(columns["assists"], dtype=np.int32)
+    clean_sheet = (np.asarray(columns["conceded"]) == 0) & (minutes >= rules.clean_sheet_min_minutes)
+    points += np.take(np.array(rules.clean_sheet, dtype=np.int32), position) * clean_sheet
+    points += rules.yellow * np.asarray(columns["yellow"], dtype=np.int32)
+    points += rules.yellowred * np.asarray(columns["yellowred"], dtype=np.int32)
+    points += rules.red * np.asarray(columns["red"], dtype=np.int32)
+    points += rules.penalty_missed * np.asarray(columns["penalty_missed"], dtype=np.int32)
+
+    if rules.min_points is not None:
+        np.maximum(points, rules.min_points, out=points)
+    return points
+
+
+def columns_from_statistics(statistics: Sequence[dict]) -> dict[str, np.ndarray]:
+    """Список statistics-словарей API (формат calculate_points) -> колонки для score_batch."""
+    size = len(statistics)
+    columns = {name: np.zeros(size, dtype=np.int32) for name in COLUMNS}
+    columns["position"] = np.full(size, UNKNOWN_POSITION, dtype=np.int8)
+    for i, stats in enumerate(statistics):
+        games = stats.get("games") or {}
+        goals = stats.get("goals") or {}
+        cards = stats.get("cards") or {}
+        columns["minutes"][i] = games.get("minutes") or 0
+        columns["goals"][i] = goals.get("total") or 0
+        columns["assists"][i] = goals.get("assists") or 0
+        columns["conceded"][i] = goals.get("conceded") or 0
+        columns["yellow"][i] = cards.get("yellow") or 0
+        columns["yellowred"][i] = cards.get("yellowred") or 0
+        columns["red"][i] = cards.get("red") or 0
+        columns["penalty_missed"][i] = (stats.get("penalty") or {}).get("missed") or 0
+        columns["position"][i] = POSITION_CODES.get(games.get("position"), UNKNOWN_POSITION)
+    return columns
@@ -0,0 +1,28 @@
+"""Opaque cursors for keyset pagination."""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from app.utils.exceptions import InvalidDataException
+
+
+def encode_cursor(created_at: Optional[datetime], id: int) -> str:
+    """Encode the (timestamp, id) key of the last row on a page."""
+    payload = json.dumps([created_at.isoformat() if created_at else None, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    """Decode a cursor produced by encode_cursor.
+
+    Raises:
+        InvalidDataException: if the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(id)
+    except (ValueError, TypeError):
+        raise InvalidDataException(msg="Invalid cursor")
@@ -1,5 +1,7 @@
+import json
 import logging
 import httpx
+from pathlib import Path
 from typing import Dict, List
 from app.config import settings
 
@@ -10,6 +12,48 @@ class ExternalAPIClient:
         self.base_url = settings.EXTERNAL_API_BASE_URL
         self.api_key = settings.EXTERNAL_API_KEY
         self.season = settings.EXTERNAL_API_SEASON
+        self.fixtures_dir = settings.EXTERNAL_API_FIXTURES_DIR
+
+    async def _get(self, path: str, params: dict) -> Dict:
+        """GET к API; при EXTERNAL_API_FIXTURES_DIR — ответ из записанного файла.
+
+        Имя файла: "fixtures_players__fixture-123.json" для /fixtures/players?fixture=123.
+        """
+        if self.fixtures_dir:
+            name = path.strip("/").replace("/", "_") + "__" + "_".join(
+                f"{key}-{value}" for key, value in sorted(params.items())
+            )
+            recorded = Path(self.fixtures_dir) / f"{name}.json"
+            if not recorded.exists():
+                raise ValueError(f"No recorded API response {recorded.name}")
+            return json.loads(recorded.read_text(encoding="utf-8"))
+
+        async with httpx.AsyncClient() as client:
+            response = await client.get(
+                f"{self.base_url}{path}",
+                params=params,
+                headers={"x-apisports-key": self.api_key}
+            )
+            response.raise_for_status()
+            return response.json()
+
+    async def fetch_fixture(self, fixture_id: int) -> Dict:
+        """Матч с текущим статусом (short: NS, 1H, HT, 2H, FT, ...)."""
+        data = await self._get("/fixtures", {"id": fixture_id})
+        if data.get("errors"):
+            logger.error(f"API errors for fixture {fixture_id}: {data['errors']}")
+            raise ValueError(f"API errors for fixture {fixture_id}")
+        if not data.get("response"):
+            raise ValueError(f"Fixture {fixture_id} not found")
+        return data["response"][0]
+
+    async def fetch_fixture_players(self, fixture_id: int) -> List[Dict]:
+        """Статистика игроков матча: [{"team": {...}, "players": [...]}, ...]."""
+        data = await self._get("/fixtures/players", {"fixture": fixture_id})
+        if data.get("errors"):
+            logger.error(f"API errors for fixture {fixture_id} players: {data['errors']}")
+            raise ValueError(f"API errors for fixture {fixture_id} players")
+        return data.get("response", [])
 
     async def fetch_league(self, league_id: int) -> Dict:
         async with httpx.AsyncClient() as client:
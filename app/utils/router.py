@@ -1,7 +1,9 @@
 import logging
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from app.admin.dependencies import get_current_admin
+from app.admin.models import Admin
 from app.leagues.services import LeagueService
 from app.matches.services import MatchService
 from app.player_match_stats.services import PlayerMatchStatsService
@@ -12,6 +14,7 @@ from app.utils.exceptions import (
     ExternalAPIErrorException,
     FailedOperationException,
 )
+from app.utils.loop_monitor import loop_monitor
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/utils", tags=["Utils"])
@@ -97,4 +100,13 @@ async def add_empty_stats_for_match(match_id: int):
 @router.post("/add_empty_for_all_matches")
 async def add_empty_stats_for_all_matches():
     count = await PlayerMatchStatsService.add_empty_stats_for_all_matches()
-    return {"status": "success", "count": count}
\ No newline at end of file
+    return {"status": "success", "count": count}
+
+
+@router.get("/loop_lag")
+async def loop_lag(admin: Admin = Depends(get_current_admin)):
+    """Задержки event loop этого воркера и последние залипания со стеками.
+
+    Только для администраторов: в отчёте стеки и пути к коду.
+    """
+    return loop_monitor.snapshot()
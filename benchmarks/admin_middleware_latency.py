@@ -0,0 +1,123 @@
+"""Latency of /api and admin list pages: old vs new Import-button middleware.
+
+"before": app-wide BaseHTTPMiddleware that buffers admin list pages
+(the previous ImportButtonMiddleware) plus an app-wide SessionMiddleware.
+"after": ImportButtonMiddleware mounted inside the admin sub-app only.
+
+Runs in-process over httpx.ASGITransport, no database required:
+
+    python benchmarks/admin_middleware_latency.py [requests]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Mount, Route
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.admin.import_button_middleware import (  # noqa: E402
+    ImportButtonMiddleware,
+    _build_import_script,
+)
+
+LIST_PAGE = "<html><body>" + "<tr><td>row</td></tr>" * 2000 + "</body></html>"
+
+
+class LegacyImportButtonMiddleware(BaseHTTPMiddleware):
+    """Previous implementation: buffers the whole body and rewrites it."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if (request.url.path.startswith("/admin/") and
+                "/list" in request.url.path and
+                response.status_code == 200 and
+                response.headers.get("content-type", "").startswith("text/html")):
+            identity = request.url.path.split("/")[2]
+            body = b""
+            async for chunk in response.body_iterator:
+                body += chunk
+            body_str = body.decode("utf-8").replace(
+                "</body>", _build_import_script(identity) + "</body>"
+            )
+            body = body_str.encode("utf-8")
+            headers = dict(response.headers)
+            headers["content-length"] = str(len(body))
+            return Response(
+                content=body,
+                status_code=response.status_code,
+                headers=headers,
+                media_type=response.media_type,
+            )
+        return response
+
+
+async def ping(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def list_page(request):
+    return HTMLResponse(LIST_PAGE)
+
+
+def build_before() -> Starlette:
+    admin = Starlette(routes=[Route("/{identity}/list", list_page)])
+    return Starlette(
+        routes=[Route("/api/ping", ping), Mount("/admin", app=admin)],
+        middleware=[
+            Middleware(LegacyImportButtonMiddleware),
+            Middleware(SessionMiddleware, secret_key="bench"),
+        ],
+    )
+
+
+def build_after() -> Starlette:
+    admin = Starlette(
+        routes=[Route("/{identity}/list", list_page)],
+        middleware=[
+            Middleware(ImportButtonMiddleware),
+            Middleware(SessionMiddleware, secret_key="bench"),
+        ],
+    )
+    return Starlette(routes=[Route("/api/ping", ping), Mount("/admin", app=admin)])
+
+
+async def measure(app: Starlette, path: str, requests: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get(path)
+        assert response.status_code == 200
+        if path.startswith("/admin"):
+            assert "import-btn-custom" in response.text
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            await client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+
+def describe(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"p50={statistics.median(timings):.3f}ms p95={p95:.3f}ms"
+
+
+async def main(requests: int):
+    for path in ("/api/ping", "/admin/player/list"):
+        before = await measure(build_before(), path, requests)
+        after = await measure(build_after(), path, requests)
+        print(f"{path:<20} before: {describe(before)}  after: {describe(after)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,77 @@
+"""Auto-pick optimizer latency on synthetic leagues.
+
+Builds random leagues (20 clubs, realistic position mix, prices in the
+5000-10000 range used by the player sync, points correlated with price),
+runs pick_lineup several times per size, checks every lineup with
+validate_lineup and reports p50/p95 against the 200 ms budget and how many
+lineups were proven optimal within the time budget:
+
+    python benchmarks/autopick.py [players ...]   (default: 200 400 600 1000)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.squads.autopick import pick_lineup  # noqa: E402
+from app.squads.validation import BUDGET, DEF, FWD, GK, MID, PlayerEntry, validate_lineup  # noqa: E402
+
+LEAGUE_ID = 1
+CLUBS = 20
+RUNS = 30
+P95_BUDGET_MS = 200
+
+
+def random_league(size: int, seed: int) -> tuple[dict[int, PlayerEntry], dict[int, float]]:
+    rng = np.random.default_rng(seed)
+    positions = rng.choice([GK, DEF, MID, FWD], size, p=[0.1, 0.33, 0.35, 0.22])
+    prices = rng.integers(5000, 10001, size)
+    points = np.maximum((prices - 4000) / 50 * rng.uniform(0.5, 1.5, size) + rng.normal(0, 10, size), 0).round()
+    clubs = rng.integers(0, CLUBS, size)
+    players = {
+        i + 1: PlayerEntry(int(positions[i]), int(clubs[i]), int(prices[i]), LEAGUE_ID)
+        for i in range(size)
+    }
+    return players, {i + 1: float(points[i]) for i in range(size)}
+
+
+def main(sizes: list[int]):
+    failed = False
+    for size in sizes:
+        timings = []
+        optimal = 0
+        for run in range(RUNS):
+            players, scores = random_league(size, seed=size * 1000 + run)
+            started = time.perf_counter()
+            lineup = pick_lineup(players, scores, LEAGUE_ID)
+            timings.append((time.perf_counter() - started) * 1000)
+
+            assert lineup is not None, f"no lineup for {size} players, run {run}"
+            violations = validate_lineup(
+                players,
+                LEAGUE_ID,
+                lineup.main_player_ids,
+                lineup.bench_player_ids,
+                lineup.captain_id,
+                lineup.vice_captain_id,
+            )
+            assert not violations, violations
+            assert lineup.cost <= BUDGET
+            optimal += lineup.is_optimal
+
+        p50, p95 = np.percentile(timings, [50, 95])
+        failed |= p95 > P95_BUDGET_MS
+        print(
+            f"{size:>5} players  p50: {p50:6.1f}ms  p95: {p95:6.1f}ms  max: {max(timings):6.1f}ms  "
+            f"optimal: {optimal}/{RUNS}"
+            f"{'  OVER BUDGET' if p95 > P95_BUDGET_MS else ''}"
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [200, 400, 600, 1000])
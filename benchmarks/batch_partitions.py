@@ -0,0 +1,197 @@
+"""Partitioned whole-tour operations: resume after failure and worker scaling.
+
+Unlike the other benchmarks the seed is committed (partitions run in their
+own sessions and must see it) and deleted at the end. Seeds a league with
+squads whose tour-1 lineups are 11 + 4 players, then:
+
+1. start_tour for tour 1 with one partition failing every attempt (in
+   this process, BATCH_PROCESSES=0, so the patched handler is used). The
+   run fails, the other partitions stay committed. Re-running redoes only
+   the failed partition.
+2. finalize_match for a tour-1 match with 1 worker process and for a
+   tour-2 match with `workers` processes, then finalize_tour for both
+   tours the same way. Timings are printed side by side, and results are
+   checked against the seed. The first call pays for starting the pool.
+
+run_job caps processes at os.cpu_count(): process scaling is bounded by
+the cores left after Postgres, and on a single core extra processes only
+contend with each other and the database.
+
+    MODE=TEST python benchmarks/batch_partitions.py [squads] [workers]   (default: 4000 4)
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import func, select, text
+
+from query_plans import BASE  # noqa: E402  (also sets sys.path, registers models)
+
+from app.batch import runner  # noqa: E402
+from app.batch.models import BatchJob, BatchPartition  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.matches.services import MatchService  # noqa: E402
+from app.partitions import detach_league_partition, detach_tour_partitions  # noqa: E402
+from app.squad_tours.models import SquadTour  # noqa: E402
+from app.squads.services import SquadService  # noqa: E402
+from app.utils.exceptions import FailedOperationException  # noqa: E402
+
+PARTITION_SIZE = 500
+PLAYERS = 30
+TOURS = 3
+
+
+async def seed(squads: int):
+    params = {"base": BASE, "squads": squads, "players": PLAYERS, "tours": TOURS}
+    statements = [
+        "INSERT INTO leagues (id, name, sport) VALUES (:base, 'batch-check', 'football')",
+        "INSERT INTO teams (id, name, league_id) VALUES (:base, 'home', :base), (:base + 1, 'away', :base)",
+        """INSERT INTO tours (id, number, league_id, is_started, is_finalized)
+           SELECT :base + n, n + 1, :base, false, false FROM generate_series(0, :tours - 1) n""",
+        """INSERT INTO players (id, name, team_id, sport, league_id, position, market_value)
+           SELECT :base + n, 'player-' || n, :base + n % 2, 1, :base, 'Midfielder', 50
+           FROM generate_series(0, :players - 1) n""",
+        # матч в туре 1 и в туре 2, у каждого игрока очки 0..9
+        """INSERT INTO matches (id, date, league_id, home_team_id, away_team_id, tour_id, is_finished)
+           SELECT :base + t, now(), :base, :base, :base + 1, :base + t, false FROM generate_series(0, 1) t""",
+        """INSERT INTO player_match_stats (player_id, match_id, team_id, league_id, points)
+           SELECT :base + n, :base + t, :base + n % 2, :base, n % 10
+           FROM generate_series(0, :players - 1) n, generate_series(0, 1) t""",
+        """INSERT INTO users (id, username)
+           SELECT :base + n, 'batch-check-' || n FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squads (id, name, user_id, league_id, fav_team_id)
+           SELECT :base + n, 'squad-' || n, :base + n, :base, :base FROM generate_series(0, :squads - 1) n""",
+        # состав сквада n — игроки (n + 0..14) % players: по версии на n % players
+        """INSERT INTO lineup_versions (id, lineup_hash, main_player_ids, bench_player_ids)
+           SELECT :base + n, decode(md5(array_to_string(main_ids, ',') || '|' || array_to_string(bench_ids, ',')), 'hex'),
+                  main_ids, bench_ids
+           FROM generate_series(0, :players - 1) n,
+                LATERAL (SELECT ARRAY(SELECT :base + (n + p) % :players FROM generate_series(0, 10) p ORDER BY 1) AS main_ids,
+                                ARRAY(SELECT :base + (n + p) % :players FROM generate_series(11, 14) p ORDER BY 1) AS bench_ids) lineup""",
+        """INSERT INTO squad_tours (id, squad_id, tour_id, is_current, points, penalty_points, budget,
+                                   replacements, is_finalized, captain_id, vice_captain_id,
+                                   lineup_version_id)
+           SELECT :base + n, :base + n, :base, true, 0, 0, 100000, 2, false,
+                  :base + n % 11, :base + (n + 1) % 11, :base + n % :players
+           FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squad_tour_players (squad_tour_id, tour_id, player_id)
+           SELECT :base + n, :base, :base + (n + p) % :players
+           FROM generate_series(0, :squads - 1) n, generate_series(0, 10) p""",
+        """INSERT INTO squad_tour_bench_players (squad_tour_id, tour_id, player_id)
+           SELECT :base + n, :base, :base + (n + p) % :players
+           FROM generate_series(0, :squads - 1) n, generate_series(11, 14) p""",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), params)
+        await session.commit()
+        await session.execute(text("ANALYZE"))
+
+
+async def cleanup():
+    statements = [
+        "DELETE FROM batch_jobs WHERE target_id BETWEEN :base AND :base + 10",
+        """DELETE FROM squad_tour_players WHERE squad_tour_id IN (
+               SELECT id FROM squad_tours WHERE squad_id >= :base AND squad_id < :base + 1000000)""",
+        """DELETE FROM squad_tour_bench_players WHERE squad_tour_id IN (
+               SELECT id FROM squad_tours WHERE squad_id >= :base AND squad_id < :base + 1000000)""",
+        "DELETE FROM squad_tours WHERE squad_id >= :base AND squad_id < :base + 1000000",
+        "DELETE FROM lineup_versions WHERE id >= :base AND id < :base + 1000000",
+        "DELETE FROM squads WHERE league_id = :base",
+        "DELETE FROM users WHERE id >= :base AND id < :base + 1000000",
+        "DELETE FROM player_match_stats WHERE league_id = :base",
+        "DELETE FROM matches WHERE league_id = :base",
+        "DELETE FROM players WHERE league_id = :base",
+        "DELETE FROM tours WHERE league_id = :base",
+        "DELETE FROM teams WHERE league_id = :base",
+        "DELETE FROM leagues WHERE id = :base",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), {"base": BASE})
+        await session.commit()
+    # секции, созданные триггерами на tours / leagues при сидировании
+    await detach_tour_partitions(BASE + 1_000_000, drop=True, from_tour_id=BASE)
+    await detach_league_partition(BASE, drop=True)
+
+
+async def timed(label: str, processes: int, call):
+    settings.BATCH_PROCESSES = processes
+    started = time.perf_counter()
+    result = await call()
+    effective = min(processes, os.cpu_count() or 1)  # как в run_job
+    print(f"{label:<28} processes={effective}  {time.perf_counter() - started:6.2f}s  {result}")
+    return result
+
+
+async def check_resume(squads: int, workers: int):
+    run_partition = runner._operations[runner.OP_START_TOUR].run_partition
+    failing_from = BASE + PARTITION_SIZE
+
+    async def flaky(session, job, partition):
+        if partition.squad_id_from == failing_from:
+            raise RuntimeError("simulated crash")
+        return await run_partition(session, job, partition)
+
+    runner._operations[runner.OP_START_TOUR] = runner._operations[runner.OP_START_TOUR]._replace(run_partition=flaky)
+    settings.BATCH_PROCESSES = 0
+    try:
+        await SquadService.start_tour_for_all_squads(BASE)
+        raise AssertionError("start_tour should have failed")
+    except FailedOperationException as e:
+        print(f"start_tour with a failing partition: {e.detail}")
+    finally:
+        runner._operations[runner.OP_START_TOUR] = runner._operations[runner.OP_START_TOUR]._replace(
+            run_partition=run_partition
+        )
+
+    async with async_session_maker() as session:
+        copied = (await session.execute(
+            select(func.count()).select_from(SquadTour).where(SquadTour.tour_id == BASE + 1)
+        )).scalar()
+        assert copied == squads - PARTITION_SIZE, copied
+
+    result = await timed("start_tour (resume)", workers, lambda: SquadService.start_tour_for_all_squads(BASE))
+    assert result["created_squad_tours"] == squads, result
+    async with async_session_maker() as session:
+        partitions = (await session.execute(
+            select(BatchPartition.attempts, BatchPartition.squad_id_from)
+            .join(BatchJob, BatchJob.id == BatchPartition.job_id)
+            .where(BatchJob.operation == runner.OP_START_TOUR, BatchJob.target_id == BASE)
+        )).all()
+    # повторно выполнялась только упавшая партиция
+    assert all(attempts == 0 for attempts, start in partitions if start != failing_from), partitions
+
+
+async def main(squads: int, workers: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    settings.BATCH_PARTITION_SIZE = PARTITION_SIZE
+    settings.BATCH_WORKERS = workers
+    await cleanup()
+    await seed(squads)
+    try:
+        await check_resume(squads, workers)
+
+        one = await timed("finalize_match (tour 1)", 1, lambda: MatchService.finalize_match(BASE))
+        many = await timed("finalize_match (tour 2)", workers, lambda: MatchService.finalize_match(BASE + 1))
+        # составы тура 2 — копии тура 1, очки игроков в матчах одинаковые
+        assert one["total_points_added"] == many["total_points_added"] > 0, (one, many)
+
+        one = await timed("finalize_tour (tour 1)", 1, lambda: SquadService.finalize_tour_for_all_squads(BASE))
+        many = await timed("finalize_tour (tour 2)", workers, lambda: SquadService.finalize_tour_for_all_squads(BASE + 1))
+        assert one["finalized_tours"] == many["finalized_tours"] == squads, (one, many)
+    finally:
+        await cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(asyncio.run(main(*(args + [4000, 4][len(args):]))))
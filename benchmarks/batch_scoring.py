@@ -0,0 +1,80 @@
+"""Per-row calculate_points vs one vectorized score_batch pass.
+
+Generates random player-match statistics, checks that both scorers agree
+row for row and prints the timings:
+
+    python benchmarks/batch_scoring.py [rows ...]   (default: 100000 1000000)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.batch_scoring import POSITION_CODES, UNKNOWN_POSITION, score_batch  # noqa: E402
+from app.utils.count_points import calculate_points  # noqa: E402
+
+POSITIONS = [*POSITION_CODES, "Unknown"]
+
+
+def random_columns(rows: int, seed: int = 0) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return {
+        "minutes": rng.integers(0, 121, rows, dtype=np.int32),
+        "goals": rng.binomial(3, 0.1, rows).astype(np.int32),
+        "assists": rng.binomial(3, 0.1, rows).astype(np.int32),
+        "conceded": rng.integers(0, 5, rows, dtype=np.int32),
+        "yellow": rng.binomial(1, 0.15, rows).astype(np.int32),
+        "yellowred": rng.binomial(1, 0.02, rows).astype(np.int32),
+        "red": rng.binomial(1, 0.02, rows).astype(np.int32),
+        "penalty_missed": rng.binomial(1, 0.01, rows).astype(np.int32),
+        "position": rng.integers(0, UNKNOWN_POSITION + 1, rows, dtype=np.int8),
+    }
+
+
+def to_statistics(columns: dict[str, np.ndarray]) -> list[dict]:
+    lists = {name: values.tolist() for name, values in columns.items()}
+    return [
+        {
+            "games": {"minutes": lists["minutes"][i], "position": POSITIONS[lists["position"][i]]},
+            "goals": {
+                "total": lists["goals"][i],
+                "assists": lists["assists"][i],
+                "conceded": lists["conceded"][i],
+            },
+            "cards": {
+                "yellow": lists["yellow"][i],
+                "yellowred": lists["yellowred"][i],
+                "red": lists["red"][i],
+            },
+            "penalty": {"missed": lists["penalty_missed"][i]},
+        }
+        for i in range(len(lists["minutes"]))
+    ]
+
+
+def main(sizes: list[int]):
+    for rows in sizes:
+        columns = random_columns(rows)
+        statistics = to_statistics(columns)
+
+        started = time.perf_counter()
+        expected = [calculate_points(stats) for stats in statistics]
+        per_row = time.perf_counter() - started
+
+        started = time.perf_counter()
+        points = score_batch(columns)
+        batch = time.perf_counter() - started
+
+        assert points.tolist() == expected, "score_batch disagrees with calculate_points"
+        print(
+            f"{rows:>9} rows  calculate_points: {per_row * 1000:9.1f}ms  "
+            f"score_batch: {batch * 1000:7.2f}ms  x{per_row / batch:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,205 @@
+"""Lineup storage: squad_tour_players rows vs shared lineup_versions.
+
+Seeds the synthetic league from query_plans.py inside a transaction (it
+fills both layouts; squads keep their lineup across tours, so squad
+tours share versions), then prints for each layout the storage size, the
+time to roll a tour's lineups over to a new tour, to read one tour's
+lineups, to read single lineups by squad tour, to rewrite lineups the
+way replace_players does and to find the squad tours of a tour that own
+a player. The transaction is rolled back at the end.
+
+    MODE=TEST python benchmarks/lineup_storage.py [squads] [repeats]   (default: 5000 200)
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, insert, select, text, update
+
+from query_plans import BASE, PLAYERS_PER_TEAM, TEAMS, TOURS, insert_rows, seed  # noqa: E402  (also sets sys.path, registers models)
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.squad_tours.lineup import get_lineup_version  # noqa: E402
+from app.squad_tours.models import (  # noqa: E402
+    LineupVersion,
+    SquadTour,
+    squad_tour_bench_players,
+    squad_tour_players,
+)
+from app.tours.models import Tour  # noqa: E402
+
+TOUR_ID = BASE + TOURS - 1
+NEXT_TOUR_ID = BASE + TOURS
+
+ROLLOVER_SQUAD_TOURS = """
+    INSERT INTO squad_tours (squad_id, tour_id, is_current, points, penalty_points, budget,
+                             replacements, is_finalized, lineup_version_id)
+    SELECT squad_id, :next_tour, false, 0, penalty_points, budget, 2, false, lineup_version_id
+    FROM squad_tours WHERE tour_id = :tour
+"""
+# a separate statement after the squad tours, like start_tour's flush
+ROLLOVER_LINEUP_ROWS = """
+    INSERT INTO {table} (squad_tour_id, tour_id, player_id)
+    SELECT new.id, :next_tour, lineup.player_id
+    FROM squad_tours new
+    JOIN squad_tours old ON old.squad_id = new.squad_id AND old.tour_id = :tour
+    JOIN {table} lineup ON lineup.tour_id = :tour AND lineup.squad_tour_id = old.id
+    WHERE new.tour_id = :next_tour
+"""
+
+
+async def timed(session, label: str, repeats: int, make_query) -> None:
+    started = time.perf_counter()
+    for i in range(repeats):
+        await session.execute(make_query(i))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<44} {elapsed / repeats * 1000:8.3f}ms")
+
+
+async def sizes(session, squads: int) -> None:
+    rows = 0
+    total = 0
+    for table in ("squad_tour_players", "squad_tour_bench_players"):
+        table_rows, table_bytes = (await session.execute(text(
+            f"SELECT count(*), (SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree('{table}')) FROM {table}"
+        ))).one()
+        rows += table_rows
+        total += table_bytes
+    print(f"tables: {rows} rows, {total / 2**20:.2f}MB with indexes")
+
+    versions, versions_bytes, pointers = (await session.execute(text(
+        "SELECT (SELECT count(*) FROM lineup_versions), pg_total_relation_size('lineup_versions'), "
+        "(SELECT sum(pg_column_size(lineup_version_id)) FROM squad_tours) "
+        "+ (SELECT sum(pg_relation_size(relid)) FROM pg_partition_tree('ix_squad_tours_lineup_version_id'))"
+    ))).one()
+    print(f"versions: {versions} rows, {versions_bytes / 2**20:.2f}MB with indexes "
+          f"+ {pointers / 2**20:.2f}MB of squad_tours pointers and their index")
+    squad_tours = squads * TOURS
+    print(f"per squad tour: tables {total / squad_tours:.0f}B, versions {(versions_bytes + pointers) / squad_tours:.0f}B")
+
+
+async def rollover(session, squads: int) -> None:
+    print(f"roll {squads} lineups over to the next tour:")
+    params = {"tour": TOUR_ID, "next_tour": NEXT_TOUR_ID}
+    for label, statements in (
+        ("tables: squad tours + 15 rows each", (
+            ROLLOVER_SQUAD_TOURS,
+            ROLLOVER_LINEUP_ROWS.format(table="squad_tour_players"),
+            ROLLOVER_LINEUP_ROWS.format(table="squad_tour_bench_players"),
+        )),
+        ("versions: squad tours with the pointer", (ROLLOVER_SQUAD_TOURS,)),
+    ):
+        savepoint = await session.begin_nested()
+        started = time.perf_counter()
+        written = 0
+        for statement in statements:
+            written += (await session.execute(text(statement), params)).rowcount
+        elapsed = time.perf_counter() - started
+        await savepoint.rollback()
+        print(f"  {label:<44} {elapsed * 1000:8.1f}ms  {written} rows written")
+
+
+async def main(squads: int, repeats: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    squad_tour_ids = [BASE + (TOURS - 1) * squads + i for i in range(squads)]
+    player_id = BASE + TEAMS * PLAYERS_PER_TEAM // 2
+    async with async_session_maker() as session:
+        try:
+            await seed(session, squads)
+            await insert_rows(session, Tour, [{
+                "id": NEXT_TOUR_ID,
+                "number": TOURS + 1,
+                "league_id": BASE,
+                "deadline": datetime.now(timezone.utc),
+            }])
+            await sizes(session, squads)
+            await rollover(session, squads)
+
+            print(f"read one tour's lineups ({squads} squad tours):")
+            await timed(session, "tables: join both lineup tables", 5, lambda i: select(
+                squad_tour_players.c.squad_tour_id, squad_tour_players.c.player_id
+            ).join(SquadTour, SquadTour.id == squad_tour_players.c.squad_tour_id).where(
+                SquadTour.tour_id == TOUR_ID, squad_tour_players.c.tour_id == TOUR_ID
+            ).union_all(select(
+                squad_tour_bench_players.c.squad_tour_id, squad_tour_bench_players.c.player_id
+            ).join(SquadTour, SquadTour.id == squad_tour_bench_players.c.squad_tour_id).where(
+                SquadTour.tour_id == TOUR_ID, squad_tour_bench_players.c.tour_id == TOUR_ID
+            )))
+            await timed(session, "versions: join lineup_versions", 5, lambda i: select(
+                SquadTour.id, LineupVersion.main_player_ids, LineupVersion.bench_player_ids
+            ).join(LineupVersion, LineupVersion.id == SquadTour.lineup_version_id).where(
+                SquadTour.tour_id == TOUR_ID
+            ))
+
+            print("read one lineup by squad tour:")
+            await timed(session, "tables", repeats, lambda i: select(
+                squad_tour_players.c.player_id
+            ).where(
+                squad_tour_players.c.tour_id == TOUR_ID, squad_tour_players.c.squad_tour_id == squad_tour_ids[i % squads]
+            ).union_all(select(
+                squad_tour_bench_players.c.player_id
+            ).where(
+                squad_tour_bench_players.c.tour_id == TOUR_ID,
+                squad_tour_bench_players.c.squad_tour_id == squad_tour_ids[i % squads],
+            )))
+            await timed(session, "versions", repeats, lambda i: select(
+                LineupVersion.main_player_ids, LineupVersion.bench_player_ids
+            ).join(SquadTour, SquadTour.lineup_version_id == LineupVersion.id).where(
+                SquadTour.tour_id == TOUR_ID, SquadTour.id == squad_tour_ids[i % squads]
+            ))
+
+            print("owners of a player in one tour:")
+            await timed(session, "tables", repeats, lambda i: select(func.count()).select_from(
+                squad_tour_players
+            ).join(SquadTour, SquadTour.id == squad_tour_players.c.squad_tour_id).where(
+                squad_tour_players.c.player_id == player_id + i % 50,
+                squad_tour_players.c.tour_id == TOUR_ID,
+                SquadTour.tour_id == TOUR_ID,
+            ))
+            await timed(session, "versions", repeats, lambda i: select(func.count()).select_from(
+                SquadTour
+            ).join(LineupVersion, LineupVersion.id == SquadTour.lineup_version_id).where(
+                LineupVersion.main_player_ids.contains([player_id + i % 50]), SquadTour.tour_id == TOUR_ID
+            ))
+
+            print("rewrite a lineup (replace_players):")
+            started = time.perf_counter()
+            for i in range(repeats):
+                squad_tour_id = squad_tour_ids[i % squads]
+                lineup = [BASE + (i + p) % (TEAMS * PLAYERS_PER_TEAM) for p in range(15)]
+                for table in (squad_tour_players, squad_tour_bench_players):
+                    await session.execute(
+                        delete(table).where(table.c.tour_id == TOUR_ID, table.c.squad_tour_id == squad_tour_id)
+                    )
+                await session.execute(insert(squad_tour_players), [
+                    {"squad_tour_id": squad_tour_id, "tour_id": TOUR_ID, "player_id": p} for p in lineup[:11]
+                ])
+                await session.execute(insert(squad_tour_bench_players), [
+                    {"squad_tour_id": squad_tour_id, "tour_id": TOUR_ID, "player_id": p} for p in lineup[11:]
+                ])
+            print(f"  {'tables: delete + insert 15 rows':<44} {(time.perf_counter() - started) / repeats * 1000:8.3f}ms")
+            started = time.perf_counter()
+            for i in range(repeats):
+                lineup = [BASE + (i + p) % (TEAMS * PLAYERS_PER_TEAM) for p in range(15)]
+                version = await get_lineup_version(session, lineup[:11], lineup[11:])
+                await session.execute(
+                    update(SquadTour)
+                    .where(SquadTour.tour_id == TOUR_ID, SquadTour.id == squad_tour_ids[i % squads])
+                    .values(lineup_version_id=version.id)
+                )
+            print(f"  {'versions: get or add version + UPDATE':<44} {(time.perf_counter() - started) / repeats * 1000:8.3f}ms")
+        finally:
+            await session.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(asyncio.run(main(*(args + [5_000, 200][len(args):]))))
@@ -0,0 +1,90 @@
+"""Cost of leaving the event-loop stall detector on (LOOP_LAG_MONITOR_ENABLED,
+LOOP_LAG_ROUTE_ATTRIBUTION).
+
+Runs in-process over httpx.ASGITransport, no database required:
+
+1. request latency and throughput of a trivial JSON route with and without
+   LoopLagMiddleware + a running LoopLagMonitor,
+2. CPU time an idle worker spends on the sentinel task and the watchdog
+   thread (default 50ms interval, 100ms threshold).
+
+    python benchmarks/loop_monitor_overhead.py [requests]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.loop_monitor import LoopLagMiddleware, LoopLagMonitor  # noqa: E402
+
+CONCURRENCY = 20
+IDLE_SECONDS = 10
+
+
+def make_app(monitor: LoopLagMonitor | None) -> FastAPI:
+    app = FastAPI()
+    if monitor is not None:
+        app.add_middleware(LoopLagMiddleware, monitor=monitor)
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+async def measure(monitor: LoopLagMonitor | None, requests: int) -> tuple[float, float]:
+    if monitor is not None:
+        monitor.start()
+    timings = []
+    transport = httpx.ASGITransport(app=make_app(monitor))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def worker(count: int):
+            for _ in range(count):
+                started = time.perf_counter()
+                await client.get("/api/ping")
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(requests // CONCURRENCY) for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - started
+    if monitor is not None:
+        await monitor.stop()
+    return statistics.median(timings), len(timings) / elapsed
+
+
+async def idle_cpu(monitor: LoopLagMonitor | None) -> float:
+    if monitor is not None:
+        monitor.start()
+    started = time.process_time()
+    await asyncio.sleep(IDLE_SECONDS)
+    cpu = time.process_time() - started
+    if monitor is not None:
+        await monitor.stop()
+    return cpu / IDLE_SECONDS * 100
+
+
+async def main(requests: int) -> int:
+    results = {}
+    for _ in range(2):  # второй проход — после прогрева
+        for label, factory in (("off", lambda: None), ("on", lambda: LoopLagMonitor(100, 50))):
+            results[label] = await measure(factory(), requests)
+    for label, (p50, rps) in results.items():
+        print(f"monitor {label:<3}  p50 {p50:6.3f}ms  {rps:7.0f} req/s  ({requests} requests, {CONCURRENCY} concurrent)")
+    overhead = (results["off"][1] / results["on"][1] - 1) * 100
+    print(f"throughput cost {overhead:+.1f}%")
+
+    for label, monitor in (("off", None), ("on", LoopLagMonitor(100, 50))):
+        print(f"idle CPU, monitor {label:<3} {await idle_cpu(monitor):.2f}% of one core over {IDLE_SECONDS}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)))
@@ -0,0 +1,124 @@
+"""League main page latency at scale.
+
+Seeds one league with many squads and finalized tours with random points
+inside a transaction, refreshes squad_standings the way tour finalization
+does and times what the main page runs per request: the league summary
+(squad count, next deadline) and the user's place. The summary is normally
+served from the in-process cache, so the place lookup is what every request
+pays. Places are checked against a full RANK() over the seeded league. The
+transaction is rolled back at the end.
+
+    MODE=TEST python benchmarks/main_page_rank.py [squads]   (default: 100000)
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+
+from query_plans import BASE  # noqa: E402  (also sets sys.path, registers models)
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.leagues.models import League  # noqa: E402
+from app.leagues.summary import load_league_summary  # noqa: E402
+from app.squad_tours.models import SquadTour  # noqa: E402
+from app.squads.models import Squad, SquadStanding  # noqa: E402
+from app.squads.standings import refresh_league_standings  # noqa: E402
+from app.teams.models import Team  # noqa: E402
+
+FINALIZED_TOURS = 5
+REQUESTS = 200
+P95_BUDGET_MS = 10
+
+
+async def seed(session, squads: int):
+    league_id = BASE
+    await session.execute(insert(League), [{"id": league_id, "name": "main-page-check"}])
+    await session.execute(insert(Team), [{"id": BASE, "name": "main-page-team", "league_id": league_id}])
+    await session.execute(text("""
+        INSERT INTO tours (id, number, league_id, deadline, is_started, is_finalized)
+        SELECT :base + n, n + 1, :base, now() + n * interval '7 days',
+               n < :finalized, n < :finalized
+        FROM generate_series(0, :finalized) n
+    """), {"base": BASE, "finalized": FINALIZED_TOURS})
+    await session.execute(text("""
+        INSERT INTO users (id, username)
+        SELECT :base + n, 'main-page-' || n FROM generate_series(0, :squads - 1) n
+    """), {"base": BASE, "squads": squads})
+    await session.execute(text("""
+        INSERT INTO squads (id, name, user_id, league_id, fav_team_id)
+        SELECT :base + n, 'squad-' || n, :base + n, :base, :base FROM generate_series(0, :squads - 1) n
+    """), {"base": BASE, "squads": squads})
+    await session.execute(text("""
+        INSERT INTO squad_tours (id, squad_id, tour_id, is_current, points, penalty_points,
+                                 budget, replacements, is_finalized)
+        SELECT :base + t * :squads + n, :base + n, :base + t, false,
+               (random() * 90)::int, (random() < 0.1)::int * 4, 100000, 2, true
+        FROM generate_series(0, :squads - 1) n, generate_series(0, :finalized - 1) t
+    """), {"base": BASE, "squads": squads, "finalized": FINALIZED_TOURS})
+    await session.execute(text("ANALYZE"))
+
+
+async def user_place(session, user_id: int):
+    return (await session.execute(
+        select(SquadStanding.place)
+        .select_from(Squad)
+        .outerjoin(SquadStanding, SquadStanding.squad_id == Squad.id)
+        .where(Squad.league_id == BASE, Squad.user_id == user_id)
+    )).scalar()
+
+
+async def main(squads: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    async with async_session_maker() as session:
+        try:
+            await seed(session, squads)
+
+            started = time.perf_counter()
+            await refresh_league_standings(session, BASE)
+            print(f"refresh standings for {squads} squads: {(time.perf_counter() - started) * 1000:.0f}ms")
+            await session.execute(text("ANALYZE squad_standings"))
+
+            expected = dict((await session.execute(
+                select(
+                    SquadTour.squad_id,
+                    func.rank().over(order_by=func.sum(SquadTour.points - SquadTour.penalty_points).desc()),
+                )
+                .where(SquadTour.squad_id >= BASE, SquadTour.is_finalized == True)
+                .group_by(SquadTour.squad_id)
+            )).all())
+
+            users = random.Random(0).sample(range(BASE, BASE + squads), REQUESTS)
+            summary_ms, place_ms = [], []
+            for user_id in users:
+                started = time.perf_counter()
+                summary = await load_league_summary(session, BASE)
+                summary_ms.append((time.perf_counter() - started) * 1000)
+
+                started = time.perf_counter()
+                place = await user_place(session, user_id)
+                place_ms.append((time.perf_counter() - started) * 1000)
+                assert place == expected[user_id], (user_id, place, expected[user_id])
+            assert summary.squads_count == squads
+        finally:
+            await session.rollback()
+
+    failed = False
+    for name, timings in (("place", place_ms), ("summary (cache miss)", summary_ms)):
+        p50, p95 = np.percentile(timings, [50, 95])
+        over = name == "place" and p95 > P95_BUDGET_MS
+        failed |= over
+        print(f"{name:<22} p50: {p50:6.2f}ms  p95: {p95:6.2f}ms{'  OVER BUDGET' if over else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)))
@@ -0,0 +1,179 @@
+"""Player list payloads: objects vs format=compact, field selection and deltas.
+
+Like season_archive.py the seed is committed (the endpoints open their
+own sessions) and deleted at the end. Seeds one league with CLUBS clubs of
+PLAYERS_PER_CLUB players (Russian names, photos, logos) and stats for
+TOURS tours, then requests /players/league/{id}/players_with_points and
+/players/league_{id} through the API app:
+
+1. as before (a list of objects),
+2. format=compact with every field and with STARTUP_FIELDS,
+3. format=compact&since_version= after one rescored match and a transfer,
+   checking that the cached compact list patched with the delta equals a
+   fresh one.
+
+Prints body size raw and gzipped (nginx gzips application/json) and
+request latency. Only the players router is mounted.
+
+    MODE=TEST python benchmarks/player_list_payload.py
+"""
+
+import asyncio
+import gzip
+import sys
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from query_plans import BASE  # noqa: E402  (also sets sys.path, registers models)
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.players.router import router as players_router  # noqa: E402
+from app.partitions import detach_league_partition  # noqa: E402
+
+CLUBS = 16
+PLAYERS_PER_CLUB = 40
+TOURS = 15
+REQUESTS = 20
+STARTUP_FIELDS = "name_rus,team_id,position,market_value,points"
+
+
+async def seed():
+    params = {"base": BASE, "clubs": CLUBS, "players": CLUBS * PLAYERS_PER_CLUB, "tours": TOURS, "matches": CLUBS // 2}
+    statements = [
+        "INSERT INTO leagues (id, name, sport) VALUES (:base, 'payload-check', 'football')",
+        """INSERT INTO teams (id, name, name_rus, logo, league_id)
+           SELECT :base + n, 'Football Club ' || n, 'Футбольный клуб ' || n,
+                  'https://media.api-sports.io/football/teams/' || n || '.png', :base
+           FROM generate_series(0, :clubs - 1) n""",
+        """INSERT INTO players (id, name, name_rus, position, photo, team_id, market_value, sport, league_id)
+           SELECT :base + n, 'Player Surname ' || n, 'Игрок Фамилия ' || n,
+                  (ARRAY['Goalkeeper', 'Defender', 'Midfielder', 'Attacker'])[n % 4 + 1],
+                  'https://media.api-sports.io/football/players/' || n || '.png',
+                  :base + n % :clubs, 4000 + n % 9 * 500, 1, :base
+           FROM generate_series(0, :players - 1) n""",
+        """INSERT INTO tours (id, number, league_id, is_started, is_finalized)
+           SELECT :base + t, t + 1, :base, true, true FROM generate_series(0, :tours - 1) t""",
+        """INSERT INTO matches (id, date, is_finished, league_id, tour_id, home_team_id, away_team_id)
+           SELECT :base + t * :matches + m, now(), true, :base, :base + t, :base + 2 * m, :base + 2 * m + 1
+           FROM generate_series(0, :tours - 1) t, generate_series(0, :matches - 1) m""",
+        """INSERT INTO player_match_stats (player_id, match_id, team_id, league_id, points, minutes_played)
+           SELECT :base + n, :base + t * :matches + n % :clubs / 2, :base + n % :clubs, :base,
+                  (n * 7 + t * 3) % 12 - 2, 90
+           FROM generate_series(0, :players - 1) n, generate_series(0, :tours - 1) t""",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), params)
+        await session.commit()
+        await session.execute(text("ANALYZE"))
+
+
+async def change_league(step: int):
+    """Исправленная статистика одного матча и переход игрока в другой клуб."""
+    async with async_session_maker() as session:
+        await session.execute(
+            text("UPDATE player_match_stats SET points = points + 1 WHERE league_id = :base AND match_id = :match_id"),
+            {"base": BASE, "match_id": BASE + step},
+        )
+        await session.execute(
+            text("UPDATE players SET team_id = :team_id WHERE id = :player_id"),
+            {"team_id": BASE + (step + 1) % CLUBS, "player_id": BASE + step},
+        )
+        await session.commit()
+
+
+async def cleanup():
+    statements = [
+        "DELETE FROM player_match_stats WHERE league_id = :base",
+        "DELETE FROM matches WHERE league_id = :base",
+        "DELETE FROM tours WHERE league_id = :base",
+        "DELETE FROM players WHERE league_id = :base",
+        "DELETE FROM player_removals WHERE league_id = :base",
+        "DELETE FROM teams WHERE league_id = :base",
+        "DELETE FROM leagues WHERE id = :base",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), {"base": BASE})
+        await session.commit()
+    await detach_league_partition(BASE, drop=True)
+
+
+def apply_delta(cached: dict, delta: dict) -> dict:
+    assert cached["fields"] == delta["fields"]
+    rows = {row[0]: row for row in zip(*cached["columns"])}
+    for player_id in delta["removed"]:
+        rows.pop(player_id, None)
+    rows.update({row[0]: row for row in zip(*delta["columns"])})
+    ordered = [rows[player_id] for player_id in sorted(rows)]
+    return {
+        "version": delta["version"],
+        "fields": delta["fields"],
+        "columns": [list(column) for column in zip(*ordered)] if ordered else [[] for _ in delta["fields"]],
+        "removed": [],
+    }
+
+
+async def measure(client: httpx.AsyncClient, label: str, url: str, params: dict, baseline: tuple[int, int] = ()) -> tuple[tuple[int, int], httpx.Response]:
+    timings = []
+    for _ in range(REQUESTS):
+        started = time.perf_counter()
+        response = await client.get(url, params=params)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+    raw, zipped = len(response.content), len(gzip.compress(response.content))
+    ratio = f"  {baseline[0] / raw:6.1f}x / {baseline[1] / zipped:5.1f}x smaller" if baseline else ""
+    print(f"  {label:<34} {raw / 1024:8.1f}KB raw {zipped / 1024:7.1f}KB gzip  "
+          f"p50 {np.percentile(timings, 50):6.1f}ms{ratio}")
+    return (raw, zipped), response
+
+
+async def main() -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    await cleanup()
+    await seed()
+    try:
+        # только роутер игроков: create_app тянет зависимости авторизации
+        app = FastAPI()
+        app.include_router(players_router, prefix="/api")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for step, url in enumerate((f"/api/players/league/{BASE}/players_with_points", f"/api/players/league_{BASE}")):
+                fields = STARTUP_FIELDS if url.endswith("points") else "name_rus,team_id,position,market_value"
+                print(f"{url} ({CLUBS * PLAYERS_PER_CLUB} players)")
+                baseline, _ = await measure(client, "objects", url, {})
+                await measure(client, "compact", url, {"format": "compact"}, baseline)
+                _, cached = await measure(client, f"compact, {fields.count(',') + 1} fields", url,
+                                          {"format": "compact", "fields": fields}, baseline)
+                cached = cached.json()
+                await measure(client, "delta, nothing changed", url, {
+                    "format": "compact", "fields": fields, "since_version": cached["version"],
+                })
+
+                await change_league(step)
+                _, delta = await measure(client, "delta after match fix + transfer", url, {
+                    "format": "compact", "fields": fields, "since_version": cached["version"],
+                }, baseline)
+                delta = delta.json()
+                fresh = (await client.get(url, params={"format": "compact", "fields": fields})).json()
+                assert apply_delta(cached, delta)["columns"] == fresh["columns"]
+                print(f"  delta: {len(delta['columns'][0])} rows, removed {delta['removed']}")
+
+            response = await client.get(f"/api/players/league_{BASE}", params={"fields": "team_id"})
+            assert response.status_code == 400
+    finally:
+        await cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
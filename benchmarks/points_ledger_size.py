@@ -0,0 +1,93 @@
+"""Storage size of squad_tour_points_ledger on seeded data.
+
+Seeds the synthetic league from query_plans.py inside a transaction,
+writes the ledger for every match the way finalize_match does, and
+prints row counts, table/index sizes and the cost of the breakdown read
+for one squad tour. The transaction is rolled back at the end.
+
+    MODE=TEST python benchmarks/points_ledger_size.py [squads]
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+
+from query_plans import BASE, TOURS, seed  # noqa: E402  (also sets sys.path, registers models)
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.matches.models import Match  # noqa: E402
+from app.matches.services import MatchService  # noqa: E402
+from app.player_match_stats.models import PlayerMatchStats  # noqa: E402
+from app.squad_tours.models import SquadTour, SquadTourPointsEntry  # noqa: E402
+
+TABLES = ("squad_tour_points_ledger", "squad_tour_players", "squad_tours", "player_match_stats")
+
+
+async def write_ledger(session) -> int:
+    for tour_id in range(BASE, BASE + TOURS):
+        squad_tours = (await session.execute(
+            select(SquadTour)
+            .where(SquadTour.tour_id == tour_id)
+            .options(selectinload(SquadTour.main_players), selectinload(SquadTour.bench_players))
+        )).scalars().all()
+        match_ids = (await session.execute(select(Match.id).where(Match.tour_id == tour_id))).scalars().all()
+        for match_id in match_ids:
+            player_points = dict((await session.execute(
+                select(PlayerMatchStats.player_id, PlayerMatchStats.points)
+                .where(PlayerMatchStats.match_id == match_id)
+            )).all())
+            await MatchService._write_points_ledger(session, match_id, squad_tours, player_points)
+        session.expunge_all()
+    await session.execute(text("ANALYZE squad_tour_points_ledger"))
+    rows = (await session.execute(
+        select(text("count(*)")).select_from(SquadTourPointsEntry).where(SquadTourPointsEntry.match_id >= BASE)
+    )).scalar()
+    return rows
+
+
+async def main(squads: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    async with async_session_maker() as session:
+        try:
+            await seed(session, squads)
+            started = time.perf_counter()
+            rows = await write_ledger(session)
+            elapsed = time.perf_counter() - started
+            squad_tours = squads * TOURS
+            print(f"{squads} squads x {TOURS} tours: {rows} ledger rows "
+                  f"({rows / squad_tours:.1f} per squad tour), written in {elapsed:.1f}s")
+
+            for table in TABLES:
+                table_bytes, index_bytes = (await session.execute(text(
+                    "SELECT pg_table_size(:t), pg_indexes_size(:t)"
+                ), {"t": table})).one()
+                print(f"{table:<26} table={table_bytes / 2**20:7.2f}MB indexes={index_bytes / 2**20:7.2f}MB")
+            total = (await session.execute(text(
+                "SELECT pg_total_relation_size('squad_tour_points_ledger')"
+            ))).scalar()
+            print(f"ledger total {total / 2**20:.2f}MB, {total / max(rows, 1):.1f} bytes/row "
+                  f"(incl. existing rows), {total / squad_tours:.0f} bytes/squad tour")
+
+            plan = (await session.execute(text(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) "
+                "SELECT * FROM squad_tour_points_ledger WHERE squad_tour_id = :id "
+                "ORDER BY match_id, player_id"
+            ), {"id": BASE + squads // 2})).scalars().all()
+            print("breakdown read:")
+            for line in plan:
+                print(f"  {line}")
+        finally:
+            await session.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)))
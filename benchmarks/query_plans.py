@@ -0,0 +1,377 @@
+"""EXPLAIN regression check for the hot query paths.
+
+Seeds a synthetic league (users, squads, squad tours, lineups, match stats)
+inside a transaction, runs ANALYZE and EXPLAIN on the queries behind tour
+finalization, leaderboards, player pages and referrals, and fails if any of
+them plans a sequential scan on a large table, does not use the index it
+was built for (EXPECTED_INDEXES), or if a query that filters
+by tour_id / league_id reads more than one partition of a partitioned
+table (a second league and a tour in another tour range are seeded so
+there is something to prune). The transaction is rolled back at the end,
+so nothing is left in the database, partitions included.
+
+Run against a scratch/staging database with the migrations applied:
+
+    MODE=TEST python benchmarks/query_plans.py [squads]
+
+test_query_plans.py runs the same check under pytest.
+"""
+
+import asyncio
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import and_, func, insert, or_, select, text, tuple_
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app.models  # noqa: E402,F401  registers every model
+from app.config import settings  # noqa: E402
+from app.custom_leagues.user_league.models import UserLeague  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.leagues.models import League  # noqa: E402
+from app.matches.models import Match  # noqa: E402
+from app.partitions import list_partitions  # noqa: E402
+from app.player_match_stats.models import PlayerMatchStats  # noqa: E402
+from app.players.models import Player  # noqa: E402
+from app.squad_tours.lineup import lineup_hash  # noqa: E402
+from app.squad_tours.models import (  # noqa: E402
+    LineupVersion,
+    SquadTour,
+    SquadTourPointsEntry,
+    squad_tour_bench_players,
+    squad_tour_players,
+)
+from app.squads.models import Squad, user_league_squads  # noqa: E402
+from app.teams.models import Team  # noqa: E402
+from app.tours.models import Tour  # noqa: E402
+from app.users.models import User  # noqa: E402
+
+# Synthetic rows live far above real ids so they never collide.
+BASE = 900_000_000
+TEAMS = 20
+PLAYERS_PER_TEAM = 25
+TOURS = 10
+MATCHES_PER_TOUR = TEAMS // 2
+USER_LEAGUES = 200
+LARGE_TABLE_ROWS = 5_000
+CHUNK = 5_000
+# A second league and a tour in the next tour range get their own partitions.
+OTHER_LEAGUE_ID = BASE + 1
+OTHER_TOUR_ID = BASE + 100
+
+
+async def insert_rows(session, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        await session.execute(insert(model), rows[start:start + CHUNK])
+
+
+async def seed(session, squads: int):
+    now = datetime.now(timezone.utc)
+    league_id = BASE
+    await insert_rows(session, League, [
+        {"id": league_id, "name": "plan-check"},
+        {"id": OTHER_LEAGUE_ID, "name": "plan-check-other"},
+    ])
+    team_ids = [BASE + i for i in range(TEAMS)]
+    await insert_rows(session, Team, [
+        {"id": team_id, "name": f"team-{team_id}", "league_id": league_id}
+        for team_id in team_ids
+    ])
+    player_ids = [BASE + i for i in range(TEAMS * PLAYERS_PER_TEAM)]
+    await insert_rows(session, Player, [
+        {
+            "id": player_id,
+            "name": f"player-{player_id}",
+            "team_id": team_ids[(player_id - BASE) // PLAYERS_PER_TEAM],
+            "league_id": league_id,
+        }
+        for player_id in player_ids
+    ])
+    tour_ids = [BASE + i for i in range(TOURS)]
+    await insert_rows(session, Tour, [
+        {
+            "id": tour_id,
+            "number": tour_id - BASE + 1,
+            "league_id": league_id,
+            "deadline": now + timedelta(days=7 * (tour_id - BASE)),
+        }
+        for tour_id in tour_ids
+    ] + [{"id": OTHER_TOUR_ID, "number": 1, "league_id": OTHER_LEAGUE_ID, "deadline": now}])
+
+    matches = []
+    for tour_index, tour_id in enumerate(tour_ids):
+        for i in range(MATCHES_PER_TOUR):
+            matches.append({
+                "id": BASE + tour_index * MATCHES_PER_TOUR + i,
+                "date": now + timedelta(days=7 * tour_index),
+                "league_id": league_id,
+                "tour_id": tour_id,
+                "home_team_id": team_ids[2 * i],
+                "away_team_id": team_ids[2 * i + 1],
+            })
+    await insert_rows(session, Match, matches)
+
+    stats = []
+    for match in matches:
+        for team_id in (match["home_team_id"], match["away_team_id"]):
+            first = (team_id - BASE) * PLAYERS_PER_TEAM
+            for player_id in player_ids[first:first + PLAYERS_PER_TEAM]:
+                stats.append({
+                    "player_id": player_id,
+                    "match_id": match["id"],
+                    "team_id": team_id,
+                    "league_id": league_id,
+                    "points": (player_id + match["id"]) % 12,
+                })
+    await insert_rows(session, PlayerMatchStats, stats)
+
+    user_ids = [BASE + i for i in range(squads)]
+    await insert_rows(session, User, [
+        {
+            "id": user_id,
+            "username": f"plan-check-{user_id}",
+            "registration_date": now.replace(tzinfo=None) - timedelta(minutes=user_id - BASE),
+            # a handful of referrers with many referrals each
+            "referrer_id": BASE + (user_id - BASE) % 50 if user_id - BASE >= 50 else None,
+        }
+        for user_id in user_ids
+    ])
+    await insert_rows(session, Squad, [
+        {
+            "id": user_id,
+            "name": f"squad-{user_id}",
+            "user_id": user_id,
+            "league_id": league_id,
+            "fav_team_id": team_ids[(user_id - BASE) % TEAMS],
+        }
+        for user_id in user_ids
+    ])
+    await insert_rows(session, UserLeague, [
+        {
+            "id": BASE + i,
+            "name": f"user-league-{i}",
+            "league_id": league_id,
+            "creator_id": user_ids[i],
+        }
+        for i in range(USER_LEAGUES)
+    ])
+    await insert_rows(session, user_league_squads, [
+        {"squad_id": squad_id, "user_league_id": BASE + (squad_id - BASE) % USER_LEAGUES}
+        for squad_id in user_ids
+    ])
+
+    squad_tours, main, bench = [], [], []
+    versions: dict[int, dict] = {}
+    for tour_index, tour_id in enumerate(tour_ids):
+        for squad_id in user_ids:
+            squad_tour_id = BASE + tour_index * squads + (squad_id - BASE)
+            offset = (squad_id * 7) % (len(player_ids) - 15)
+            lineup = player_ids[offset:offset + 15]
+            # lineups do not change between tours: one version per offset
+            versions.setdefault(offset, {
+                "id": BASE + offset,
+                "lineup_hash": lineup_hash(lineup[:11], lineup[11:]),
+                "main_player_ids": lineup[:11],
+                "bench_player_ids": lineup[11:],
+            })
+            squad_tours.append({
+                "id": squad_tour_id,
+                "squad_id": squad_id,
+                "tour_id": tour_id,
+                "is_current": tour_index == TOURS - 1,
+                "lineup_version_id": BASE + offset,
+            })
+            main.extend({"squad_tour_id": squad_tour_id, "tour_id": tour_id, "player_id": p} for p in lineup[:11])
+            bench.extend({"squad_tour_id": squad_tour_id, "tour_id": tour_id, "player_id": p} for p in lineup[11:])
+    await insert_rows(session, LineupVersion, list(versions.values()))
+    await insert_rows(session, SquadTour, squad_tours)
+    # the app no longer writes lineup rows (LINEUP_STORAGE=arrays); lineup_storage.py compares both layouts
+    await insert_rows(session, squad_tour_players, main)
+    await insert_rows(session, squad_tour_bench_players, bench)
+
+    await session.execute(text("ANALYZE"))
+
+
+def hot_queries():
+    """Queries mirroring the filters used by the services."""
+    tour_id = BASE + TOURS - 1
+    squad_id = BASE + 123
+    player_id = BASE + 42
+    return {
+        "finalize tour: squad_tours by tour": select(SquadTour.id).where(
+            SquadTour.tour_id == tour_id
+        ),
+        "squad tour by (squad, tour)": select(SquadTour).where(
+            and_(SquadTour.squad_id == squad_id, SquadTour.tour_id == tour_id)
+        ),
+        "player total points": select(func.sum(PlayerMatchStats.points)).where(
+            PlayerMatchStats.player_id == player_id
+        ),
+        "player tour points": select(func.sum(PlayerMatchStats.points))
+        .join(Match, Match.id == PlayerMatchStats.match_id)
+        .where(PlayerMatchStats.player_id == player_id, Match.tour_id == tour_id),
+        "match stats by (match, player)": select(PlayerMatchStats).where(
+            PlayerMatchStats.league_id == BASE,
+            PlayerMatchStats.match_id == BASE,
+            PlayerMatchStats.player_id == player_id,
+        ),
+        "league total points": select(PlayerMatchStats.player_id, func.sum(PlayerMatchStats.points))
+        .where(PlayerMatchStats.league_id == BASE)
+        .group_by(PlayerMatchStats.player_id),
+        "matches by tour": select(Match.id).where(Match.tour_id == tour_id),
+        "squad by (league, user)": select(Squad).where(
+            Squad.league_id == BASE, Squad.user_id == squad_id
+        ),
+        "leaderboard by fav team": select(SquadTour.squad_id, SquadTour.points)
+        .join(Squad, Squad.id == SquadTour.squad_id)
+        .where(Squad.fav_team_id == BASE, SquadTour.tour_id == tour_id),
+        "referrals page": select(User.id)
+        .where(User.referrer_id == BASE)
+        .order_by(User.registration_date.desc(), User.id.desc())
+        .limit(20),
+        "referrals page (keyset)": select(User.id)
+        .where(
+            User.referrer_id == BASE,
+            tuple_(User.registration_date, User.id) < (datetime(2000, 1, 1), BASE + 1_000),
+        )
+        .order_by(User.registration_date.desc(), User.id.desc())
+        .limit(20),
+        "rescore: squad tours with changed players": select(SquadTour.id).where(
+            SquadTour.tour_id == tour_id,
+            SquadTour.lineup_version_id.in_(select(LineupVersion.id).where(or_(
+                LineupVersion.main_player_ids.overlap([player_id, player_id + 1]),
+                LineupVersion.bench_player_ids.overlap([player_id, player_id + 1]),
+            ))),
+        ),
+        "points breakdown": select(SquadTourPointsEntry).where(
+            SquadTourPointsEntry.tour_id == tour_id, SquadTourPointsEntry.squad_tour_id == BASE
+        ),
+        "user league members": select(user_league_squads.c.squad_id).where(
+            user_league_squads.c.user_league_id == BASE
+        ),
+    }
+
+
+# Queries that filter by the partition key must read a single partition.
+PRUNED = {
+    "finalize tour: squad_tours by tour",
+    "squad tour by (squad, tour)",
+    "match stats by (match, player)",
+    "league total points",
+    "leaderboard by fav team",
+    "rescore: squad tours with changed players",
+    "points breakdown",
+}
+# Queries that read a whole partition, where a sequential scan of it is the plan we want.
+WHOLE_PARTITION = {"league total points"}
+# Index each query must use (the partitioned parent's index for partitioned tables).
+EXPECTED_INDEXES = {
+    "finalize tour: squad_tours by tour": "ix_squad_tours_tour_id",
+    "squad tour by (squad, tour)": "uq_squad_tours_squad_id_tour_id",
+    "player total points": "ix_player_match_stats_player_id",
+    "player tour points": "ix_player_match_stats_player_id",
+    "match stats by (match, player)": "uq_player_match_stats_match_id_player_id_league_id",
+    "squad by (league, user)": "uq_squads_league_id_user_id",
+    "leaderboard by fav team": "ix_squad_tours_tour_id",
+    "referrals page": "ix_users_referrer_id_registration_date",
+    "referrals page (keyset)": "ix_users_referrer_id_registration_date",
+    "rescore: squad tours with changed players": "ix_squad_tours_tour_id",
+    "user league members": "ix_user_league_squads_user_league_id",
+}
+
+
+def seq_scans(plan: dict):
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def relations(plan: dict):
+    if "Relation Name" in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from relations(child)
+
+
+def index_names(plan: dict):
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from index_names(child)
+
+
+async def check_plans(squads: int) -> list[str]:
+    """Seed, EXPLAIN every hot query and return the names of those that regressed.
+
+    Also run by test_query_plans.py.
+    """
+    failures = []
+    async with async_session_maker() as session:
+        try:
+            await seed(session, squads)
+            large = {
+                name for name, rows in await session.execute(text(
+                    "SELECT relname, reltuples FROM pg_class "
+                    "WHERE relkind IN ('r', 'p') AND reltuples >= :rows"
+                ), {"rows": LARGE_TABLE_ROWS})
+            }
+            parents = {
+                partition.name: partition.parent
+                for partition in await list_partitions(await session.connection())
+            }
+            for name, query in hot_queries().items():
+                sql = str(query.compile(
+                    dialect=session.bind.dialect,
+                    compile_kwargs={"literal_binds": True},
+                ))
+                raw = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                bad = sorted(set(seq_scans(plan)) & large) if name not in WHOLE_PARTITION else []
+                scanned = defaultdict(set)
+                for relation in relations(plan):
+                    if relation in parents:
+                        scanned[parents[relation]].add(relation)
+                unpruned = sorted(parent for parent, partitions in scanned.items() if len(partitions) > 1)
+                if name not in PRUNED:
+                    unpruned = []
+                used = set()
+                for index in set(index_names(plan)):
+                    # partition indexes are attached to the parent's index
+                    used.add((await session.execute(
+                        text("SELECT pg_partition_root(CAST(:index AS regclass))::text"), {"index": index}
+                    )).scalar() or index)
+                expected = EXPECTED_INDEXES.get(name)
+                missing = expected if expected and expected not in used else None
+                failed = bool(bad or unpruned or missing)
+                status = "FAIL" if failed else "ok"
+                print(f"{status:<4} {name:<40} cost={plan['Total Cost']:.1f}"
+                      + (f"  seq scan on {', '.join(bad)}" if bad else "")
+                      + (f"  not pruned: {', '.join(unpruned)}" if unpruned else "")
+                      + (f"  {missing} not used ({', '.join(sorted(used)) or 'no index'})" if missing else ""))
+                if failed:
+                    failures.append(name)
+        finally:
+            await session.rollback()
+    return failures
+
+
+async def main(squads: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    failures = await check_plans(squads)
+    if failures:
+        print(f"{len(failures)} queries fall back to sequential scans or read extra partitions")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)))
@@ -0,0 +1,259 @@
+"""Season archive: export a finished league to Parquet, trim the hot tables.
+
+Like batch_partitions.py the seed is committed (export and trim use their
+own connections) and deleted at the end. Seeds a finished league with
+squads x tours of history (lineups, one match per tour with a ledger row
+per starter, rank snapshots, squad-tour documents, ownership, a boost per
+squad, stats) and a smaller active league, then:
+
+1. reads a few points breakdowns, rank histories and squad histories from
+   the database,
+2. exports the finished league, verifies the files, trims it and vacuums
+   the trimmed tables,
+3. reads the same breakdowns and histories again, now from the archive,
+   and checks they are identical.
+
+Prints export / verify / trim time, archive size against the size the
+rows took in the tables, aggregates over whole hot tables before and after
+trimming, and read latency from the database and from the archive.
+
+    MODE=TEST python benchmarks/season_archive.py [squads] [tours]   (default: 4000 10)
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from query_plans import BASE  # noqa: E402  (also sets sys.path, registers models)
+
+from app.archives.export import TRIMMED_TABLES, export_league, trim_league, verify_files  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.partitions import detach_league_partition, detach_tour_partitions  # noqa: E402
+from app.squad_tours.documents import write_squad_tour_documents  # noqa: E402
+from app.squad_tours.services import SquadTourService  # noqa: E402
+from app.squads.services import SquadService  # noqa: E402
+
+ACTIVE = BASE + 1
+ACTIVE_TOURS = BASE + 500
+ACTIVE_SQUADS = BASE + 500_000
+ACTIVE_SQUAD_TOURS = BASE + 50_000_000
+PLAYERS = 60
+READS = 50
+
+HOT_AGGREGATES = {
+    "squad_tours: net points per squad": "SELECT squad_id, sum(points - penalty_points) FROM squad_tours GROUP BY squad_id",
+    "player_match_stats: points per player": "SELECT player_id, sum(points) FROM player_match_stats GROUP BY player_id",
+    "lineups: presence per player": "SELECT player_id, count(*) FROM squad_tour_players GROUP BY player_id",
+}
+
+
+async def seed(squads: int, tours: int):
+    params = {
+        "base": BASE, "active": ACTIVE, "active_tours": ACTIVE_TOURS, "active_squads": ACTIVE_SQUADS,
+        "active_squad_tours": ACTIVE_SQUAD_TOURS, "squads": squads, "tours": tours, "players": PLAYERS,
+    }
+    statements = [
+        "INSERT INTO leagues (id, name, sport) VALUES (:base, 'archive-check', 'football'), (:active, 'archive-active', 'football')",
+        """INSERT INTO teams (id, name, league_id)
+           VALUES (:base, 'home', :base), (:base + 1, 'away', :base), (:base + 10, 'home', :active), (:base + 11, 'away', :active)""",
+        """INSERT INTO tours (id, number, league_id, is_started, is_finalized)
+           SELECT :base + n, n + 1, :base, true, true FROM generate_series(0, :tours - 1) n
+           UNION ALL SELECT :active_tours + n, n + 1, :active, n = 0, false FROM generate_series(0, 1) n""",
+        """INSERT INTO players (id, name, team_id, sport, league_id, position, market_value)
+           SELECT :base + n, 'player-' || n, :base + n % 2, 1, :base, 'Midfielder', 50 FROM generate_series(0, :players - 1) n
+           UNION ALL SELECT :active + 1000 + n, 'active-' || n, :base + 10 + n % 2, 1, :active, 'Midfielder', 50
+           FROM generate_series(0, :players - 1) n""",
+        """INSERT INTO matches (id, date, league_id, home_team_id, away_team_id, tour_id, is_finished)
+           SELECT :base + t, now(), :base, :base, :base + 1, :base + t, true FROM generate_series(0, :tours - 1) t
+           UNION ALL SELECT :active_tours + t, now(), :active, :base + 10, :base + 11, :active_tours + t, false
+           FROM generate_series(0, 1) t""",
+        """INSERT INTO player_match_stats (player_id, match_id, team_id, league_id, points)
+           SELECT :base + n, :base + t, :base + n % 2, :base, (n + t) % 10
+           FROM generate_series(0, :players - 1) n, generate_series(0, :tours - 1) t
+           UNION ALL SELECT :active + 1000 + n, :active_tours, :base + 10 + n % 2, :active, n % 10
+           FROM generate_series(0, :players - 1) n""",
+        """INSERT INTO users (id, username)
+           SELECT :base + n, 'archive-check-' || n FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squads (id, name, user_id, league_id, fav_team_id)
+           SELECT :base + n, 'squad-' || n, :base + n, :base, :base FROM generate_series(0, :squads - 1) n
+           UNION ALL SELECT :active_squads + n, 'active-' || n, :base + n, :active, :base + 10
+           FROM generate_series(0, :squads / 4 - 1) n""",
+        # состав сквада n — игроки (n + 0..14) % players, один на все туры
+        """INSERT INTO lineup_versions (id, lineup_hash, main_player_ids, bench_player_ids)
+           SELECT :base + n, decode(md5(array_to_string(main_ids, ',') || '|' || array_to_string(bench_ids, ',')), 'hex'),
+                  main_ids, bench_ids
+           FROM generate_series(0, :players - 1) n,
+                LATERAL (SELECT ARRAY(SELECT :base + (n + p) % :players FROM generate_series(0, 10) p ORDER BY 1) AS main_ids,
+                                ARRAY(SELECT :base + (n + p) % :players FROM generate_series(11, 14) p ORDER BY 1) AS bench_ids) lineup""",
+        """INSERT INTO squad_tours (id, squad_id, tour_id, is_current, points, penalty_points, budget,
+                                   replacements, is_finalized, captain_id, vice_captain_id, lineup_version_id)
+           SELECT :base + t * :squads + n, :base + n, :base + t, t = :tours - 1, (n + t) % 90, (n % 7 = 0)::int * 4,
+                  100000, 2, true, :base + n % :players, :base + (n + 1) % :players, :base + n % :players
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :tours - 1) t
+           UNION ALL
+           SELECT :active_squad_tours + n, :active_squads + n, :active_tours, true, 0, 0, 100000, 2, false,
+                  NULL, NULL, NULL
+           FROM generate_series(0, :squads / 4 - 1) n""",
+        """INSERT INTO squad_tour_players (squad_tour_id, tour_id, player_id)
+           SELECT :base + t * :squads + n, :base + t, :base + (n + p) % :players
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :tours - 1) t, generate_series(0, 10) p
+           UNION ALL
+           SELECT :active_squad_tours + n, :active_tours, :active + 1000 + (n + p) % :players
+           FROM generate_series(0, :squads / 4 - 1) n, generate_series(0, 10) p""",
+        """INSERT INTO squad_tour_bench_players (squad_tour_id, tour_id, player_id)
+           SELECT :base + t * :squads + n, :base + t, :base + (n + p) % :players
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :tours - 1) t, generate_series(11, 14) p""",
+        """INSERT INTO squad_tour_points_ledger (squad_tour_id, tour_id, match_id, player_id, base_points, multiplier, reason)
+           SELECT :base + t * :squads + n, :base + t, :base + t, :base + (n + p) % :players,
+                  ((n + p + t) % 10)::smallint, (CASE WHEN p = 0 THEN 2 ELSE 1 END)::smallint, (p % 3)::smallint
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :tours - 1) t, generate_series(0, 10) p""",
+        """INSERT INTO squad_tour_ranks (tour_id, squad_id, total_net_points, league_place, club_place)
+           SELECT :base + t, :base + n, (n * 7 + t) % 900, n + 1, n + 1
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :tours - 1) t""",
+        """INSERT INTO player_tour_ownership (player_id, tour_id, starters, bench, captains)
+           SELECT :base + n, :base + t, :squads * 11 / :players, :squads * 4 / :players, :squads / :players
+           FROM generate_series(0, :players - 1) n, generate_series(0, :tours - 1) t""",
+        """INSERT INTO boosts (squad_id, tour_id, type, used_at)
+           SELECT :base + n, :base + n % :tours, 'triple_captain', now() FROM generate_series(0, :squads - 1) n""",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), params)
+        for tour_id in range(BASE, BASE + tours):
+            await write_squad_tour_documents(session, tour_id)
+        await session.commit()
+        await session.execute(text("ANALYZE"))
+
+
+async def cleanup():
+    statements = [
+        "DELETE FROM league_archives WHERE league_id IN (:base, :active)",
+        "DELETE FROM boosts WHERE squad_id >= :base AND squad_id < :base + 1000000",
+        "DELETE FROM squad_tour_ranks WHERE squad_id >= :base AND squad_id < :base + 1000000",
+        "DELETE FROM squad_tour_documents WHERE squad_id >= :base AND squad_id < :base + 1000000",
+        "DELETE FROM player_tour_ownership WHERE tour_id >= :base AND tour_id < :base + 1000",
+        "DELETE FROM squad_tour_points_ledger WHERE tour_id >= :base AND tour_id < :base + 1000",
+        "DELETE FROM squad_tour_players WHERE tour_id >= :base AND tour_id < :base + 1000",
+        "DELETE FROM squad_tour_bench_players WHERE tour_id >= :base AND tour_id < :base + 1000",
+        "DELETE FROM squad_tours WHERE tour_id >= :base AND tour_id < :base + 1000",
+        "DELETE FROM lineup_versions WHERE id >= :base AND id < :base + 1000000",
+        "DELETE FROM squads WHERE league_id IN (:base, :active)",
+        "DELETE FROM users WHERE id >= :base AND id < :base + 1000000",
+        "DELETE FROM player_match_stats WHERE league_id IN (:base, :active)",
+        "DELETE FROM matches WHERE league_id IN (:base, :active)",
+        "DELETE FROM players WHERE league_id IN (:base, :active)",
+        "DELETE FROM tours WHERE league_id IN (:base, :active)",
+        "DELETE FROM teams WHERE league_id IN (:base, :active)",
+        "DELETE FROM leagues WHERE id IN (:base, :active)",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), {"base": BASE, "active": ACTIVE})
+        await session.commit()
+    # секции, созданные триггерами на tours / leagues при сидировании
+    await detach_tour_partitions(BASE + 1_000_000, drop=True, from_tour_id=BASE)
+    for league_id in (BASE, ACTIVE):
+        await detach_league_partition(league_id, drop=True)
+
+
+async def table_bytes() -> dict[str, int]:
+    async with async_session_maker() as session:
+        return {
+            name: (await session.execute(text(
+                f"SELECT coalesce((SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree('{name}')), "
+                f"pg_total_relation_size('{name}'))"
+            ))).scalar()
+            for name in TRIMMED_TABLES
+        }
+
+
+async def aggregates() -> dict[str, float]:
+    timings = {}
+    async with async_session_maker() as session:
+        for label, statement in HOT_AGGREGATES.items():
+            started = time.perf_counter()
+            for _ in range(3):
+                await session.execute(text(statement))
+            timings[label] = (time.perf_counter() - started) / 3 * 1000
+    return timings
+
+
+async def reads(squads: int, tours: int) -> tuple[list, float]:
+    results = []
+    started = time.perf_counter()
+    for i in range(READS):
+        squad_id = BASE + i * 37 % squads
+        results.append(await SquadTourService.get_points_breakdown(squad_id, BASE + i % tours))
+        results.append(await SquadTourService.get_rank_history(squad_id))
+        results.append(await SquadService.get_squad_tour_history_with_players(squad_id))
+    return results, (time.perf_counter() - started) / (3 * READS) * 1000
+
+
+def timed(label: str, started: float) -> None:
+    print(f"{label:<40} {time.perf_counter() - started:8.2f}s")
+
+
+async def main(squads: int, tours: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    archive_dir = tempfile.mkdtemp(prefix="season-archive-")
+    await cleanup()
+    await seed(squads, tours)
+    try:
+        before_bytes = await table_bytes()
+        before_aggregates = await aggregates()
+        from_database, database_ms = await reads(squads, tours)
+
+        started = time.perf_counter()
+        manifest = await export_league(BASE, archive_dir)
+        timed("export", started)
+        started = time.perf_counter()
+        await asyncio.to_thread(verify_files, str(Path(archive_dir) / f"league_{BASE}"))
+        timed("verify files", started)
+        started = time.perf_counter()
+        deleted = await trim_league(BASE)
+        timed("trim (checksum in db + delete)", started)
+        assert all(deleted[name] == manifest["tables"][name]["rows"] for name in TRIMMED_TABLES), deleted
+
+        # место освобождает (auto)vacuum: секция туров архивной лиги пустеет целиком
+        started = time.perf_counter()
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"VACUUM ANALYZE {', '.join(TRIMMED_TABLES)}"))
+        timed("vacuum", started)
+
+        after_bytes = await table_bytes()
+        after_aggregates = await aggregates()
+        from_archive, archive_ms = await reads(squads, tours)
+        assert from_archive == from_database, "archive reads differ from database reads"
+
+        archive_bytes = sum(path.stat().st_size for path in Path(archive_dir).rglob("*.parquet"))
+        rows = sum(table["rows"] for table in manifest["tables"].values())
+        print(f"archive: {rows} rows, {archive_bytes / 2**20:.2f}MB of parquet; "
+              f"the trimmed rows took {(sum(before_bytes.values()) - sum(after_bytes.values())) / 2**20:.2f}MB "
+              f"with indexes")
+        for name in TRIMMED_TABLES:
+            print(f"  {name:<28} {manifest['tables'][name]['rows']:>9} rows  "
+                  f"{before_bytes[name] / 2**20:8.2f}MB -> {after_bytes[name] / 2**20:8.2f}MB")
+        print("whole-table aggregates (before -> after trim):")
+        for label in HOT_AGGREGATES:
+            print(f"  {label:<40} {before_aggregates[label]:8.1f}ms -> {after_aggregates[label]:8.1f}ms")
+        print(f"breakdown / rank / squad history read: database {database_ms:.2f}ms, archive {archive_ms:.2f}ms")
+    finally:
+        await cleanup()
+        shutil.rmtree(archive_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    sys.exit(asyncio.run(main(*(args + [4000, 10][len(args):]))))
@@ -0,0 +1,231 @@
+"""Squad-tour views served from precomputed documents.
+
+Seeds one league inside a transaction: clubs with players, FINALIZED_TOURS
+finalized tours plus one open tour, a match per pair of clubs in every
+tour with player stats, and squads whose lineups are stored both as
+lineup_versions and as squad_tour_players rows. Then times
+write_squad_tour_documents for one finalized tour (the work added to tour
+finalization) and the documents of the remaining finalized tours, checks
+that every squad's history from squad_tour_documents matches the previous
+per-player implementation (kept below as legacy_history), and times both
+for the history of random squads and a whole finalized tour. The
+transaction is rolled back at the end.
+
+    MODE=TEST python benchmarks/squad_tour_documents.py [squads]   (default: 2000)
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.orm import joinedload
+
+from query_plans import BASE  # noqa: E402  (also sets sys.path, registers models)
+
+from app.config import settings  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.players.models import Player  # noqa: E402
+from app.squad_tours.documents import squad_tour_documents, write_squad_tour_documents  # noqa: E402
+from app.squad_tours.models import SquadTour  # noqa: E402
+from app.squads.services import SquadService  # noqa: E402
+
+CLUBS = 20
+PLAYERS_PER_CLUB = 25
+FINALIZED_TOURS = 9
+READS = 50
+CHECKED_SQUADS = 20
+
+
+async def seed(session, squads: int):
+    params = {
+        "base": BASE,
+        "squads": squads,
+        "clubs": CLUBS,
+        "players": CLUBS * PLAYERS_PER_CLUB,
+        "tours": FINALIZED_TOURS + 1,
+        "finalized": FINALIZED_TOURS,
+        "matches": CLUBS // 2,
+    }
+    statements = [
+        "INSERT INTO leagues (id, name, sport) VALUES (:base, 'documents-check', 'football')",
+        """INSERT INTO teams (id, name, name_rus, logo, league_id)
+           SELECT :base + n, 'team-' || n, 'команда-' || n, 'logo-' || n, :base
+           FROM generate_series(0, :clubs - 1) n""",
+        """INSERT INTO players (id, name, position, photo, team_id, market_value, sport, league_id)
+           SELECT :base + n, 'player-' || n, (ARRAY['GK', 'DEF', 'MID', 'FWD'])[n % 4 + 1], 'photo-' || n,
+                  :base + n % :clubs, 4000 + n % 9 * 1000, 1, :base
+           FROM generate_series(0, :players - 1) n""",
+        """INSERT INTO tours (id, number, league_id, is_started, is_finalized)
+           SELECT :base + t, t + 1, :base, true, t < :finalized FROM generate_series(0, :tours - 1) t""",
+        # в туре t клуб c играет с клубом c xor 1, хозяева — чётные клубы
+        """INSERT INTO matches (id, date, is_finished, league_id, tour_id, home_team_id, away_team_id)
+           SELECT :base + t * :matches + m, now() - (:tours - t) * interval '7 days', t < :finalized,
+                  :base, :base + t, :base + 2 * m, :base + 2 * m + 1
+           FROM generate_series(0, :tours - 1) t, generate_series(0, :matches - 1) m""",
+        """INSERT INTO player_match_stats (player_id, match_id, team_id, league_id, points)
+           SELECT :base + n, :base + t * :matches + n % :clubs / 2, :base + n % :clubs, :base,
+                  (random() * 12)::int - 2
+           FROM generate_series(0, :players - 1) n, generate_series(0, :finalized - 1) t""",
+        """INSERT INTO users (id, username)
+           SELECT :base + n, 'documents-check-' || n FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squads (id, name, user_id, league_id, fav_team_id)
+           SELECT :base + n, 'squad-' || n, :base + n, :base, :base + n % :clubs
+           FROM generate_series(0, :squads - 1) n""",
+        # 15 разных игроков на сквад: 11 в основе, 4 на скамейке
+        """INSERT INTO lineup_versions (id, lineup_hash, main_player_ids, bench_player_ids)
+           SELECT :base + n, decode(md5('documents-check-' || n), 'hex'),
+                  ARRAY(SELECT :base + (n * 37 + k * 31) % :players FROM generate_series(0, 10) k ORDER BY 1),
+                  ARRAY(SELECT :base + (n * 37 + k * 31) % :players FROM generate_series(11, 14) k ORDER BY 1)
+           FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squad_tours (id, squad_id, tour_id, is_current, points, penalty_points,
+                                   budget, replacements, is_finalized, captain_id, lineup_version_id)
+           SELECT :base + t * :squads + n, :base + n, :base + t, t = :finalized,
+                  (random() * 90)::int, (random() < 0.1)::int * 4, 100000, 2, t < :finalized,
+                  :base + (n * 37) % :players, :base + n
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :tours - 1) t""",
+        """INSERT INTO squad_tour_players (squad_tour_id, player_id, tour_id)
+           SELECT st.id, unnest(lv.main_player_ids), st.tour_id
+           FROM squad_tours st JOIN lineup_versions lv ON lv.id = st.lineup_version_id
+           WHERE st.squad_id >= :base""",
+        """INSERT INTO squad_tour_bench_players (squad_tour_id, player_id, tour_id)
+           SELECT st.id, unnest(lv.bench_player_ids), st.tour_id
+           FROM squad_tours st JOIN lineup_versions lv ON lv.id = st.lineup_version_id
+           WHERE st.squad_id >= :base""",
+    ]
+    for statement in statements:
+        await session.execute(text(statement), params)
+    await session.execute(text("ANALYZE"))
+
+
+async def legacy_history(session, squad_id: int) -> list[dict]:
+    """SquadService.get_squad_tour_history_with_players до документов: запросы на каждого игрока."""
+    squad_tours = (await session.execute(
+        select(SquadTour)
+        .where(SquadTour.squad_id == squad_id)
+        .options(
+            joinedload(SquadTour.tour),
+            joinedload(SquadTour.main_players).joinedload(Player.team),
+            joinedload(SquadTour.bench_players).joinedload(Player.team),
+        )
+        .order_by(SquadTour.tour_id.asc())
+    )).unique().scalars().all()
+
+    async def cards(players, tour_id: int) -> list[dict]:
+        return [
+            {
+                "id": player.id,
+                "name": player.name_rus or player.name,
+                "position": player.position,
+                "team_id": player.team_id,
+                "team_name": (player.team.name_rus or player.team.name) if player.team else "",
+                "team_logo": player.team.logo if player.team else None,
+                "market_value": player.market_value,
+                "photo": player.photo,
+                "total_points": await SquadService._get_player_total_points(session, player.id),
+                "tour_points": await SquadService._get_player_tour_points(session, player.id, tour_id),
+            }
+            for player in players
+        ]
+
+    return [
+        {
+            "tour_id": squad_tour.tour_id,
+            "tour_number": squad_tour.tour.number,
+            "points": squad_tour.points,
+            "penalty_points": squad_tour.penalty_points,
+            "used_boost": squad_tour.used_boost,
+            "captain_id": squad_tour.captain_id,
+            "vice_captain_id": squad_tour.vice_captain_id,
+            "budget": squad_tour.budget,
+            "replacements": squad_tour.replacements,
+            "is_finalized": squad_tour.is_finalized,
+            "main_players": await cards(squad_tour.main_players, squad_tour.tour_id),
+            "bench_players": await cards(squad_tour.bench_players, squad_tour.tour_id),
+        }
+        for squad_tour in squad_tours
+    ]
+
+
+def comparable(history: list[dict]) -> list[dict]:
+    """Без соперника (в прежней истории его не было) и без порядка игроков."""
+    return [
+        {
+            **document,
+            **{
+                key: sorted(
+                    ({field: value for field, value in player.items() if not field.startswith("next_opponent")}
+                     for player in document[key]),
+                    key=lambda player: player["id"],
+                )
+                for key in ("main_players", "bench_players")
+            },
+        }
+        for document in history
+    ]
+
+
+def percentiles(timings: list[float]) -> str:
+    p50, p95 = np.percentile(timings, [50, 95])
+    return f"p50: {p50:7.2f}ms  p95: {p95:7.2f}ms"
+
+
+async def timed(coroutine) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = await coroutine
+    return (time.perf_counter() - started) * 1000, result
+
+
+async def main(squads: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    async with async_session_maker() as session:
+        try:
+            await seed(session, squads)
+
+            elapsed, written = await timed(write_squad_tour_documents(session, BASE))
+            print(f"documents of one tour: {written} squads in {elapsed / 1000:.2f}s")
+            assert written == squads, (written, squads)
+            for tour_id in range(BASE + 1, BASE + FINALIZED_TOURS):
+                await write_squad_tour_documents(session, tour_id)
+            await session.execute(text("ANALYZE squad_tour_documents"))
+            size = (await session.execute(text(
+                "SELECT pg_size_pretty(pg_total_relation_size('squad_tour_documents'))"
+            ))).scalar()
+            print(f"squad_tour_documents: {FINALIZED_TOURS * squads} documents, {size}")
+
+            rng = random.Random(0)
+            for squad_id in rng.sample(range(BASE, BASE + squads), CHECKED_SQUADS):
+                documents = await squad_tour_documents(session, squad_id=squad_id)
+                assert len(documents) == FINALIZED_TOURS + 1
+                assert comparable(documents) == comparable(await legacy_history(session, squad_id)), squad_id
+                # завершённые туры — из таблицы, открытый собран на лету теми же функциями
+                assert [document["is_finalized"] for document in documents] == [True] * FINALIZED_TOURS + [False]
+
+            legacy_ms, documents_ms = [], []
+            for _ in range(READS):
+                squad_id = BASE + rng.randrange(squads)
+                legacy_ms.append((await timed(legacy_history(session, squad_id)))[0])
+                documents_ms.append((await timed(squad_tour_documents(session, squad_id=squad_id)))[0])
+
+            tour_ms, tour_documents = await timed(squad_tour_documents(session, tour_id=BASE + 1))
+            assert len(tour_documents) == squads
+            open_ms, open_documents = await timed(squad_tour_documents(session, tour_id=BASE + FINALIZED_TOURS))
+            assert len(open_documents) == squads and not open_documents[0]["is_finalized"]
+        finally:
+            await session.rollback()
+
+    print(f"squad history, per-player queries  {percentiles(legacy_ms)}")
+    print(f"squad history, documents           {percentiles(documents_ms)}")
+    print(f"finalized tour, {squads} documents      {tour_ms:8.1f}ms")
+    print(f"open tour, {squads} built live          {open_ms:8.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)))
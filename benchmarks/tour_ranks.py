@@ -0,0 +1,182 @@
+"""Rank snapshot cost at tour finalization.
+
+Seeds one league with many squads, finalized tours with random points, a
+fav club per squad, user leagues (every squad in CUSTOM_LEAGUES_PER_SQUAD
+of them) and a couple of commercial leagues inside a transaction. Then
+times snapshot_tour_ranks for the last tour, checks league places against
+a full RANK() and one user league against its members, and times the reads
+the snapshots are for: one squad's rank history and the movers of one user
+league between two tours. The transaction is rolled back at the end.
+
+    MODE=TEST python benchmarks/tour_ranks.py [squads]   (default: 100000)
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import aliased
+
+from query_plans import BASE  # noqa: E402  (also sets sys.path, registers models)
+
+from app.config import settings  # noqa: E402
+from app.custom_leagues.user_league.models import user_league_squads  # noqa: E402
+from app.database import async_session_maker, engine  # noqa: E402
+from app.squad_tours.models import SquadTour, SquadTourRank  # noqa: E402
+from app.squad_tours.ranks import snapshot_tour_ranks  # noqa: E402
+from app.tours.models import Tour  # noqa: E402
+
+CLUBS = 20
+FINALIZED_TOURS = 5
+CUSTOM_LEAGUES_PER_SQUAD = 20
+CUSTOM_LEAGUE_SIZE = 100
+COMMERCIAL_LEAGUES = 2
+READS = 100
+
+
+async def seed(session, squads: int):
+    params = {
+        "base": BASE,
+        "squads": squads,
+        "clubs": CLUBS,
+        "finalized": FINALIZED_TOURS,
+        "per_squad": CUSTOM_LEAGUES_PER_SQUAD,
+        "groups": squads // CUSTOM_LEAGUE_SIZE,
+        "user_leagues": CUSTOM_LEAGUES_PER_SQUAD * squads // CUSTOM_LEAGUE_SIZE,
+        "commercial": COMMERCIAL_LEAGUES,
+    }
+    statements = [
+        "INSERT INTO leagues (id, name, sport) VALUES (:base, 'rank-check', 'football')",
+        """INSERT INTO teams (id, name, league_id)
+           SELECT :base + n, 'team-' || n, :base FROM generate_series(0, :clubs - 1) n""",
+        """INSERT INTO tours (id, number, league_id, is_started, is_finalized)
+           SELECT :base + n, n + 1, :base, true, true FROM generate_series(0, :finalized - 1) n""",
+        """INSERT INTO users (id, username)
+           SELECT :base + n, 'rank-check-' || n FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squads (id, name, user_id, league_id, fav_team_id)
+           SELECT :base + n, 'squad-' || n, :base + n, :base, :base + n % :clubs
+           FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squad_tours (id, squad_id, tour_id, is_current, points, penalty_points,
+                                   budget, replacements, is_finalized)
+           SELECT :base + t * :squads + n, :base + n, :base + t, false,
+                  (random() * 90)::int, (random() < 0.1)::int * 4, 100000, 2, true
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :finalized - 1) t""",
+        # группа k — squads / CUSTOM_LEAGUE_SIZE лиг, каждый сквад ровно в одной лиге группы
+        """INSERT INTO user_leagues (id, name, league_id, creator_id)
+           SELECT :base + n, 'user-league-' || n, :base, :base + n % :squads
+           FROM generate_series(0, :user_leagues - 1) n""",
+        """INSERT INTO user_league_squads (user_league_id, squad_id)
+           SELECT :base + k * :groups + (n * 7919 + k) % :groups, :base + n
+           FROM generate_series(0, :squads - 1) n, generate_series(0, :per_squad - 1) k""",
+        """INSERT INTO commercial_leagues (id, name, league_id)
+           SELECT :base + n, 'commercial-' || n, :base FROM generate_series(0, :commercial - 1) n""",
+        """INSERT INTO commercial_league_squads (commercial_league_id, squad_id)
+           SELECT :base + n % :commercial, :base + n FROM generate_series(0, :squads - 1) n""",
+    ]
+    for statement in statements:
+        await session.execute(text(statement), params)
+    await session.execute(text("ANALYZE"))
+
+
+def percentiles(timings: list[float]) -> str:
+    p50, p95 = np.percentile(timings, [50, 95])
+    return f"p50: {p50:6.2f}ms  p95: {p95:6.2f}ms"
+
+
+async def main(squads: int) -> int:
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        print(f"Refusing to seed a {settings.MODE} database; set MODE=TEST")
+        return 2
+
+    engine.echo = False
+    async with async_session_maker() as session:
+        try:
+            await seed(session, squads)
+            tours = (await session.execute(
+                select(Tour).where(Tour.league_id == BASE).order_by(Tour.number)
+            )).scalars().all()
+
+            # предыдущий тур — для движения мест
+            await snapshot_tour_ranks(session, tours[-2])
+            started = time.perf_counter()
+            rows = await snapshot_tour_ranks(session, tours[-1])
+            elapsed = time.perf_counter() - started
+            print(f"snapshot after tour {tours[-1].number}: {rows} squads in {elapsed:.2f}s")
+            await session.execute(text("ANALYZE squad_tour_ranks"))
+
+            assert rows == squads, (rows, squads)
+            expected = dict((await session.execute(
+                select(
+                    SquadTour.squad_id,
+                    func.rank().over(order_by=func.sum(SquadTour.points - SquadTour.penalty_points).desc()),
+                )
+                .where(SquadTour.squad_id >= BASE, SquadTour.is_finalized == True)
+                .group_by(SquadTour.squad_id)
+            )).all())
+            actual = dict((await session.execute(
+                select(SquadTourRank.squad_id, SquadTourRank.league_place).where(
+                    SquadTourRank.tour_id == tours[-1].id,
+                )
+            )).all())
+            assert actual == expected
+
+            # места в одной пользовательской лиге против RANK() по её участникам
+            members = (await session.execute(
+                select(SquadTourRank)
+                .join(user_league_squads, user_league_squads.c.squad_id == SquadTourRank.squad_id)
+                .where(SquadTourRank.tour_id == tours[-1].id, user_league_squads.c.user_league_id == BASE)
+            )).scalars().all()
+            nets = sorted((rank.total_net_points for rank in members), reverse=True)
+            for rank in members:
+                place = rank.user_league_places[rank.user_league_ids.index(BASE)]
+                assert place == nets.index(rank.total_net_points) + 1
+
+            rng = random.Random(0)
+            history_ms, movers_ms = [], []
+            for _ in range(READS):
+                squad_id = BASE + rng.randrange(squads)
+                started = time.perf_counter()
+                history = (await session.execute(
+                    select(SquadTourRank).where(SquadTourRank.squad_id == squad_id)
+                )).scalars().all()
+                history_ms.append((time.perf_counter() - started) * 1000)
+                assert len(history) == 2
+                assert len(history[-1].user_league_ids) == CUSTOM_LEAGUES_PER_SQUAD
+
+                # движение мест в пользовательской лиге: участники по PK членства,
+                # их места после двух туров — по PK снимков
+                user_league_id = BASE + rng.randrange(CUSTOM_LEAGUES_PER_SQUAD * squads // CUSTOM_LEAGUE_SIZE)
+                before = aliased(SquadTourRank)
+                after = aliased(SquadTourRank)
+
+                def place(rank):
+                    return rank.user_league_places[func.array_position(rank.user_league_ids, user_league_id)]
+
+                started = time.perf_counter()
+                movers = (await session.execute(
+                    select(after.squad_id, place(before) - place(after))
+                    .select_from(user_league_squads)
+                    .join(after, (after.squad_id == user_league_squads.c.squad_id)
+                          & (after.tour_id == tours[-1].id))
+                    .join(before, (before.squad_id == user_league_squads.c.squad_id)
+                          & (before.tour_id == tours[-2].id))
+                    .where(user_league_squads.c.user_league_id == user_league_id)
+                    .order_by((place(before) - place(after)).desc())
+                    .limit(10)
+                )).all()
+                movers_ms.append((time.perf_counter() - started) * 1000)
+                assert len(movers) == 10
+
+        finally:
+            await session.rollback()
+
+    print(f"squad rank history      {percentiles(history_ms)}")
+    print(f"user league movers      {percentiles(movers_ms)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)))
@@ -0,0 +1,167 @@
+"""
+Проверка пакетных операций (нужен PostgreSQL с применёнными миграциями).
+
+- Если job завершил другой процесс (воркер Celery), run_job в вызвавшем
+  процессе видит готовый результат и всё равно сбрасывает кэши этого
+  процесса (Operation.invalidate); уведомления (after_finish) повторно
+  не отправляются.
+- Пока start_tour не завершён, тур помечен как стартующий: правки состава
+  и новые сквады в нём отклоняются с 409.
+- submit_job (путь HTTP-запроса) не ждёт операцию: сразу отдаёт статус
+  running, а без брокера Celery job доводит фоновая задача процесса.
+
+Без доступной БД (или не в MODE=TEST) тесты пропускаются.
+
+Запуск: MODE=TEST pytest test_batch_runner.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import HTTPException
+from sqlalchemy import text, update
+
+import app.matches.services  # noqa: F401  (регистрирует операцию finalize_match)
+import app.models  # noqa: F401  (регистрирует все модели)
+from app.batch import runner
+from app.batch.models import BatchJob
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.squads.services import SquadService
+
+TARGET_ID = 920_000_000
+LEAGUE_ID = 920_000_000  # без сквадов: одна пустая партиция
+
+
+async def _cleanup():
+    async with async_session_maker() as session:
+        await session.execute(
+            text("DELETE FROM batch_partitions WHERE job_id IN (SELECT id FROM batch_jobs WHERE target_id = :id)"),
+            {"id": TARGET_ID},
+        )
+        await session.execute(text("DELETE FROM batch_jobs WHERE target_id = :id"), {"id": TARGET_ID})
+        await session.commit()
+
+
+def _run(scenario):
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        pytest.skip("seeds the database; set MODE=TEST")
+
+    async def wrapped():
+        engine.echo = False
+        try:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except (OSError, ConnectionError) as e:
+                pytest.skip(f"database is not available: {e}")
+            await _cleanup()
+            try:
+                await scenario()
+            finally:
+                await _cleanup()
+        finally:
+            # у каждого asyncio.run свой loop, соединения пула к нему привязаны
+            await engine.dispose()
+
+    asyncio.run(wrapped())
+
+
+async def _plan(operation: int) -> int:
+    async with async_session_maker() as session:
+        job = await runner.plan_job(session, operation, TARGET_ID, LEAGUE_ID)
+        await session.commit()
+        return job.id
+
+
+def test_finish_observed_from_another_process_invalidates():
+    invalidated, notified = [], []
+
+    async def after_finish(job, result):
+        notified.append(job.target_id)
+
+    original = runner._operations[runner.OP_FINALIZE_MATCH]
+    runner._operations[runner.OP_FINALIZE_MATCH] = original._replace(
+        after_finish=after_finish,
+        invalidate=lambda job: invalidated.append(job.target_id),
+    )
+
+    async def scenario():
+        job_id = await _plan(runner.OP_FINALIZE_MATCH)
+        # завершающий шаг выполнил другой процесс
+        async with async_session_maker() as session:
+            await session.execute(
+                update(BatchJob).where(BatchJob.id == job_id).values(status=runner.JOB_DONE, result={"match_id": TARGET_ID})
+            )
+            await session.commit()
+
+        assert await runner.run_job(job_id, processes=0) == {"match_id": TARGET_ID}
+        assert invalidated == [TARGET_ID]
+        assert notified == []
+
+    try:
+        _run(scenario)
+    finally:
+        runner._operations[runner.OP_FINALIZE_MATCH] = original
+
+
+def test_starting_tour_rejects_lineup_changes():
+    async def scenario():
+        job_id = await _plan(runner.OP_START_TOUR)
+        async with async_session_maker() as session:
+            assert await runner.is_running(session, runner.OP_START_TOUR, TARGET_ID)
+            with pytest.raises(HTTPException) as error:
+                await SquadService._ensure_tour_not_starting(session, TARGET_ID)
+            assert error.value.status_code == 409
+
+            await session.execute(update(BatchJob).where(BatchJob.id == job_id).values(status=runner.JOB_DONE))
+            await session.commit()
+            assert not await runner.is_running(session, runner.OP_START_TOUR, TARGET_ID)
+            await SquadService._ensure_tour_not_starting(session, TARGET_ID)
+
+    _run(scenario)
+
+
+def test_submit_returns_before_the_job_finishes():
+    release = asyncio.Event()
+
+    async def run_partition(session, job, partition):
+        await release.wait()
+        return {"updated_squad_tours": 0}
+
+    async def finish(session, job, totals):
+        return {"match_id": job.target_id, **totals}
+
+    original = runner._operations[runner.OP_FINALIZE_MATCH]
+    runner._operations[runner.OP_FINALIZE_MATCH] = runner.Operation(run_partition=run_partition, finish=finish)
+
+    async def scenario():
+        job_id = await _plan(runner.OP_FINALIZE_MATCH)
+        status = await runner.submit_job(job_id)
+        assert status["job_id"] == job_id
+        assert status["job_status"] == "running"
+        assert status["partitions_done"] == 0
+
+        release.set()
+        await asyncio.gather(*runner._background_jobs)
+        status = await runner.job_status(runner.OP_FINALIZE_MATCH, TARGET_ID)
+        assert status["job_status"] == "done"
+        assert status["partitions_done"] == status["partitions_total"] == 1
+        assert status["result"] == {"match_id": TARGET_ID, "updated_squad_tours": 0}
+
+    try:
+        _run(scenario)
+    finally:
+        runner._operations[runner.OP_FINALIZE_MATCH] = original
+
+
+if __name__ == "__main__":
+    test_finish_observed_from_another_process_invalidates()
+    test_starting_tour_rejects_lineup_changes()
+    test_submit_returns_before_the_job_finishes()
+    print("OK")
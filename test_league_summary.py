@@ -0,0 +1,98 @@
+"""
+Проверка сброса сводки лиги (нужен PostgreSQL с применёнными миграциями).
+
+Сводка (LeagueSummaryCache) закэширована до старта тура; сразу после
+start_tour_for_all_squads она показывает следующий тур и его дедлайн,
+а не ждёт TTL. Лига с турами создаётся и удаляется тестом. Без доступной
+БД (или не в MODE=TEST) тест пропускается.
+
+Запуск: MODE=TEST pytest test_league_summary.py
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+
+import app.models  # noqa: F401  (регистрирует все модели)
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.leagues.summary import league_summaries
+from app.partitions import detach_league_partition, detach_tour_partitions
+from app.squads.services import SquadService
+
+LEAGUE_ID = 910_000_000
+TOUR_IDS = [LEAGUE_ID + number for number in range(3)]
+
+
+async def _cleanup():
+    async with async_session_maker() as session:
+        await session.execute(
+            text("DELETE FROM batch_partitions WHERE job_id IN (SELECT id FROM batch_jobs WHERE target_id = ANY(:ids))"),
+            {"ids": TOUR_IDS},
+        )
+        await session.execute(text("DELETE FROM batch_jobs WHERE target_id = ANY(:ids)"), {"ids": TOUR_IDS})
+        await session.execute(text("DELETE FROM tours WHERE league_id = :id"), {"id": LEAGUE_ID})
+        await session.execute(text("DELETE FROM leagues WHERE id = :id"), {"id": LEAGUE_ID})
+        await session.commit()
+    # туров не осталось — секции, созданные триггерами, никому не принадлежат
+    await detach_tour_partitions(LEAGUE_ID + 100, drop=True, from_tour_id=LEAGUE_ID)
+    await detach_league_partition(LEAGUE_ID, drop=True)
+
+
+async def _scenario():
+    engine.echo = False
+    try:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (OSError, ConnectionError) as e:
+            pytest.skip(f"database is not available: {e}")
+
+        await _cleanup()
+        deadline = datetime.now(timezone.utc).replace(microsecond=0)
+        async with async_session_maker() as session:
+            await session.execute(
+                text("INSERT INTO leagues (id, name, sport) VALUES (:id, 'summary-check', 'football')"),
+                {"id": LEAGUE_ID},
+            )
+            for number, tour_id in enumerate(TOUR_IDS):
+                await session.execute(
+                    text("INSERT INTO tours (id, number, league_id, is_started, is_finalized, deadline) "
+                         "VALUES (:id, :number, :league_id, :done, :done, :deadline)"),
+                    {"id": tour_id, "number": number + 1, "league_id": LEAGUE_ID,
+                     "done": number == 0, "deadline": deadline + timedelta(days=7 * number)},
+                )
+            await session.commit()
+
+        try:
+            before = await league_summaries.get(LEAGUE_ID)
+            assert before.next_tour_id == TOUR_IDS[1]
+
+            await SquadService.start_tour_for_all_squads(TOUR_IDS[1])
+
+            after = await league_summaries.get(LEAGUE_ID)
+            assert after.next_tour_id == TOUR_IDS[2]
+            assert after.deadline == deadline + timedelta(days=14)
+        finally:
+            await _cleanup()
+    finally:
+        # у каждого asyncio.run свой loop, соединения пула к нему привязаны
+        await engine.dispose()
+
+
+def test_summary_changes_right_after_tour_start():
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        pytest.skip("seeds the database; set MODE=TEST")
+    asyncio.run(_scenario())
+
+
+if __name__ == "__main__":
+    test_summary_changes_right_after_tour_start()
+    print("OK")
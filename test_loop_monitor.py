@@ -0,0 +1,124 @@
+"""
+Проверка детектора залипаний event loop (без сети и БД).
+
+Маленькое приложение с LoopLagMiddleware: один маршрут блокирует loop
+через time.sleep, другой — нет. Залипание должно попасть в отчёт с
+маршрутом (шаблоном пути) и стеком блокирующей функции. Отчёт со стеками
+отдаётся только администратору.
+
+Запуск: python test_loop_monitor.py  (или pytest test_loop_monitor.py)
+"""
+
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.loop_monitor import LoopLagMiddleware, LoopLagMonitor
+
+BLOCK_SECONDS = 0.3
+
+
+def _blocking_work():
+    time.sleep(BLOCK_SECONDS)
+
+
+def _make_app(monitor: LoopLagMonitor) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app):
+        monitor.start()
+        yield
+        await monitor.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(LoopLagMiddleware, monitor=monitor)
+
+    @app.get("/squads/{squad_id}/block")
+    async def block(squad_id: int):
+        _blocking_work()
+        return {"squad_id": squad_id}
+
+    @app.get("/fast")
+    async def fast():
+        await asyncio.sleep(0.01)
+        return {}
+
+    return app
+
+
+def test_stall_attributed_to_route_with_stack():
+    monitor = LoopLagMonitor(threshold_ms=100, interval_ms=10)
+    with TestClient(_make_app(monitor)) as client:
+        for _ in range(5):
+            client.get("/fast")
+        assert monitor.snapshot()["stalls_total"] == 0
+
+        client.get("/squads/7/block")
+        time.sleep(0.05)
+        report = monitor.snapshot()
+
+    assert report["stalls_total"] == 1, report
+    stall = report["recent"][0]
+    assert stall["source"] == "sentinel"
+    assert stall["lag_ms"] >= BLOCK_SECONDS * 1000 * 0.8
+    assert stall["route"] == "GET /squads/{squad_id}/block"
+    assert "_blocking_work" in stall["stack"]
+    assert report["by_route"]["GET /squads/{squad_id}/block"]["count"] == 1
+    assert report["lag"]["samples"] > 0
+    assert not monitor.running
+
+
+def test_slow_callback_debug():
+    monitor = LoopLagMonitor(threshold_ms=100, interval_ms=10, slow_callback_debug=True)
+    with TestClient(_make_app(monitor)) as client:
+        client.get("/squads/7/block")
+        time.sleep(0.05)
+        report = monitor.snapshot()
+
+    sources = {stall["source"] for stall in report["recent"]}
+    assert sources == {"sentinel", "slow_callback"}, report["recent"]
+
+
+def test_report_endpoint_requires_admin():
+    from app.users.utils import create_access_token
+    from app.utils.router import router as utils_router
+
+    app = FastAPI()
+    app.include_router(utils_router, prefix="/api")
+    client = TestClient(app)
+    user_token = create_access_token({"sub": "123456"})
+    assert client.get("/api/utils/loop_lag").status_code == 403
+    assert client.get("/api/utils/loop_lag", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+
+
+def test_route_attribution_off_by_default():
+    from app.config import settings
+    from app.main import create_app
+    from app.utils.loop_monitor import loop_monitor
+
+    assert settings.LOOP_LAG_MONITOR_ENABLED and not settings.LOOP_LAG_ROUTE_ATTRIBUTION
+    app = create_app("api")
+    assert LoopLagMiddleware not in [middleware.cls for middleware in app.user_middleware]
+    with TestClient(app):
+        assert loop_monitor.running  # sentinel и сторожевой поток работают и без middleware
+
+    settings.LOOP_LAG_ROUTE_ATTRIBUTION = True
+    try:
+        app = create_app("api")
+    finally:
+        settings.LOOP_LAG_ROUTE_ATTRIBUTION = False
+    assert LoopLagMiddleware in [middleware.cls for middleware in app.user_middleware]
+
+
+if __name__ == "__main__":
+    test_stall_attributed_to_route_with_stack()
+    test_slow_callback_debug()
+    test_report_endpoint_requires_admin()
+    test_route_attribution_off_by_default()
+    print("OK")
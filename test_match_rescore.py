@@ -0,0 +1,349 @@
+"""
+Проверка пересчёта матча (без сети и БД).
+
+- POST /matches/rescore, /matches/finalize и /matches/rebuild_ledger доступны только администратору:
+  токен пользователя мини-приложения и запрос без токена получают 403,
+  до MatchService дело не доходит.
+- finalize_match и rescore_match считают очки состава за матч одним
+  правилом: отрицательная сумма не начисляется. Пересчёт, уводящий сумму
+  в минус, даёт те же squad_tour.points, что и финализация с
+  исправленной статистикой.
+- Строки леджера складываются ровно в начисленные squad_tour.points,
+  в том числе после пересчётов.
+- На PostgreSQL: после finalize_match и finalize_tour_for_all_squads,
+  а также после пересчёта матча уже завершённого тура squad_tour.points,
+  очки в squad_standings, снимке мест и документе состава равны сумме
+  леджера (с капитаном и бустами). Без доступной БД (или не в MODE=TEST)
+  эти тесты пропускаются.
+
+Запуск: python test_match_rescore.py  (или pytest test_match_rescore.py)
+"""
+
+import asyncio
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.models  # noqa: F401  (регистрирует все модели)
+from app.admin.dependencies import get_current_admin
+from app.admin.utils import create_access_token as create_untyped_token
+from app.matches import router as matches_router_module
+from app.squad_tours.scoring import (
+    REASON_NEGATIVE_TOTAL,
+    match_points_total,
+    squad_tour_match_entries,
+    squad_tour_match_points,
+)
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.partitions import detach_league_partition, detach_tour_partitions
+from app.users.utils import create_access_token as create_user_token
+
+LINEUP = {
+    "main_player_ids": [1, 2, 3],
+    "bench_player_ids": [4],
+    "captain_id": 1,
+    "vice_captain_id": 2,
+    "used_boost": None,
+}
+
+BASE = 940_000_000  # лига, тур, матч, игроки и сквады теста на PostgreSQL
+MATCH_POINTS = [4, 0, 3, -2, 5, 1]  # очки игроков BASE + n в матче
+RESCORED_POINTS = [-1, 0, 6, -2, 2, 1]  # исправленная статистика
+SQUAD_LINEUPS = [
+    {"captain_id": BASE, "vice_captain_id": BASE + 2, "used_boost": None},
+    # капитан без очков: удваивается вице-капитан, и утраивается он же
+    {"captain_id": BASE + 1, "vice_captain_id": BASE + 2, "used_boost": "triple_captain"},
+    {"captain_id": BASE + 4, "vice_captain_id": BASE, "used_boost": "bench_boost"},
+]
+MAIN_IDS = [BASE, BASE + 1, BASE + 2, BASE + 3]
+BENCH_IDS = [BASE + 4, BASE + 5]
+
+
+def _client(calls: list) -> tuple[FastAPI, TestClient]:
+    class FakeMatchService:
+        @staticmethod
+        async def rescore_match(match_id: int) -> dict:
+            calls.append(("rescore", match_id))
+            return {"match_id": match_id}
+
+        @staticmethod
+        async def finalize_match(match_id: int, wait: bool = True) -> dict:
+            calls.append(("finalize", match_id))
+            return {"match_id": match_id}
+
+    matches_router_module.MatchService = FakeMatchService
+    app = FastAPI()
+    app.include_router(matches_router_module.router, prefix="/api")
+    return app, TestClient(app)
+
+
+def test_rescore_requires_admin():
+    from app.matches.services import MatchService
+
+    calls = []
+    try:
+        app, client = _client(calls)
+        for path in (
+            "/api/matches/rescore/7",
+            "/api/matches/finalize/7",
+            "/api/matches/rebuild_ledger/7",
+            "/api/matches/rebuild_ledger/league_3",
+        ):
+            assert client.post(path).status_code == 403
+            user_token = create_user_token({"sub": "123456"})
+            assert client.post(path, headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+            # подписан тем же ключом, но без scope администратора
+            token = create_untyped_token({"sub": "admin"})
+            assert client.post(path, headers={"Authorization": f"Bearer {token}"}).status_code == 403
+        assert calls == []
+
+        app.dependency_overrides[get_current_admin] = lambda: SimpleNamespace(id=1, username="admin")
+        assert client.post("/api/matches/rescore/7").status_code == 200
+        assert calls == [("rescore", 7)]
+    finally:
+        matches_router_module.MatchService = MatchService
+
+
+def _finalized_points(player_points: dict[int, int]) -> int:
+    # _finalize_match_partition начисляет только положительную сумму
+    points = squad_tour_match_points(**LINEUP, player_points=player_points)
+    return points if points > 0 else 0
+
+
+def test_rescore_negative_sum_matches_finalize():
+    before = {1: 2, 2: 1, 3: 0, 4: 6}  # капитан ×2: 5 очков
+    after = {1: -3, 2: 1, 3: -2, 4: 6}  # -6 + 1 - 2 = -7, запасной не в зачёт
+
+    assert squad_tour_match_points(**LINEUP, player_points=before) == 5
+    assert squad_tour_match_points(**LINEUP, player_points=after) == 0
+
+    # rescore_match прибавляет разницу пересчитанных очков к начисленным
+    finalized = _finalized_points(before)
+    delta = (
+        squad_tour_match_points(**LINEUP, player_points=after)
+        - squad_tour_match_points(**LINEUP, player_points=before)
+    )
+    assert finalized + delta == _finalized_points(after) == 0
+
+    # и обратно: исправление из минуса в плюс начисляет всю сумму
+    delta_back = (
+        squad_tour_match_points(**LINEUP, player_points=before)
+        - squad_tour_match_points(**LINEUP, player_points=after)
+    )
+    assert finalized + delta + delta_back == _finalized_points(before) == 5
+
+
+def test_ledger_rows_sum_to_squad_tour_points():
+    rng = random.Random(20261019)
+    for _ in range(2000):
+        players = rng.sample(range(1, 40), 15)
+        lineup = {
+            "main_player_ids": players[:11],
+            "bench_player_ids": players[11:],
+            "captain_id": players[0],
+            "vice_captain_id": players[1],
+            "used_boost": rng.choice([None, "bench_boost", "triple_captain"]),
+        }
+        squad_tour_points = 0
+        versions = [{player_id: rng.randint(-4, 8) for player_id in rng.sample(players, 12)} for _ in range(3)]
+        for version, player_points in enumerate(versions):
+            entries = squad_tour_match_entries(**lineup, player_points=player_points)
+            if version == 0:
+                # _finalize_match_partition
+                points = match_points_total(entries)
+                if points > 0:
+                    squad_tour_points += points
+            else:
+                # rescore_match: разница со снимком прошлой версии
+                squad_tour_points += match_points_total(entries) - squad_tour_match_points(
+                    **lineup, player_points=versions[version - 1]
+                )
+            # леджер матча переписывается целиком при каждой записи
+            ledger = sum(entry.base_points * entry.multiplier for entry in entries)
+            assert ledger == squad_tour_points >= 0
+            if any(entry.reason == REASON_NEGATIVE_TOTAL for entry in entries):
+                assert ledger == 0
+
+
+async def _seed():
+    params = {"base": BASE, "squads": len(SQUAD_LINEUPS), "main": MAIN_IDS, "bench": BENCH_IDS}
+    statements = [
+        "INSERT INTO leagues (id, name, sport) VALUES (:base, 'rescore-check', 'football')",
+        "INSERT INTO teams (id, name, league_id) VALUES (:base, 'home', :base), (:base + 1, 'away', :base)",
+        "INSERT INTO tours (id, number, league_id, is_started, is_finalized) VALUES (:base, 1, :base, true, false)",
+        """INSERT INTO players (id, name, team_id, sport, league_id, position, market_value)
+           SELECT :base + n, 'player-' || n, :base + n % 2, 1, :base, 'Midfielder', 50
+           FROM generate_series(0, 5) n""",
+        """INSERT INTO matches (id, date, league_id, home_team_id, away_team_id, tour_id, is_finished)
+           VALUES (:base, now(), :base, :base, :base + 1, :base, false)""",
+        """INSERT INTO users (id, username)
+           SELECT :base + n, 'rescore-check-' || n FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO squads (id, name, user_id, league_id, fav_team_id)
+           SELECT :base + n, 'squad-' || n, :base + n, :base, :base FROM generate_series(0, :squads - 1) n""",
+        """INSERT INTO lineup_versions (id, lineup_hash, main_player_ids, bench_player_ids)
+           VALUES (:base, decode(md5(array_to_string(CAST(:main AS int[]), ',') || '|'
+                                     || array_to_string(CAST(:bench AS int[]), ',')), 'hex'),
+                   :main, :bench)""",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), params)
+        await session.execute(
+            text("""INSERT INTO player_match_stats (player_id, match_id, team_id, league_id, points)
+                    VALUES (:player_id, :base, :base + :n % 2, :base, :points)"""),
+            [{"base": BASE, "n": n, "player_id": BASE + n, "points": points} for n, points in enumerate(MATCH_POINTS)],
+        )
+        await session.execute(
+            text("""INSERT INTO squad_tours (id, squad_id, tour_id, is_current, points, penalty_points, budget,
+                                             replacements, is_finalized, captain_id, vice_captain_id,
+                                             used_boost, lineup_version_id)
+                    VALUES (:id, :id, :base, true, 0, 0, 100000, 2, false, :captain_id, :vice_captain_id,
+                            :used_boost, :base)"""),
+            [{"base": BASE, "id": BASE + n, **lineup} for n, lineup in enumerate(SQUAD_LINEUPS)],
+        )
+        await session.commit()
+
+
+async def _cleanup():
+    statements = [
+        "DELETE FROM batch_partitions WHERE job_id IN (SELECT id FROM batch_jobs WHERE target_id = :base)",
+        "DELETE FROM batch_jobs WHERE target_id = :base",
+        "DELETE FROM squad_tours WHERE squad_id >= :base AND squad_id < :base + 100",
+        "DELETE FROM lineup_versions WHERE id = :base",
+        "DELETE FROM squads WHERE league_id = :base",
+        "DELETE FROM users WHERE id >= :base AND id < :base + 100",
+        "DELETE FROM player_match_stats WHERE league_id = :base",
+        "DELETE FROM matches WHERE league_id = :base",
+        "DELETE FROM players WHERE league_id = :base",
+        "DELETE FROM tours WHERE league_id = :base",
+        "DELETE FROM leagues WHERE id = :base",
+    ]
+    async with async_session_maker() as session:
+        for statement in statements:
+            await session.execute(text(statement), {"base": BASE})
+        await session.commit()
+    # туров не осталось — секции, созданные триггерами, никому не принадлежат
+    await detach_tour_partitions(BASE + 100, drop=True, from_tour_id=BASE)
+    await detach_league_partition(BASE, drop=True)
+
+
+async def _squad_tour_points() -> dict[int, tuple[int, ...]]:
+    """squad_id -> (squad_tour.points, сумма леджера, squad_standings, снимок мест, документ)."""
+    async with async_session_maker() as session:
+        return {
+            squad_id: tuple(points)
+            for squad_id, *points in (await session.execute(text("""
+                SELECT st.squad_id, st.points,
+                       (SELECT coalesce(sum(e.base_points * e.multiplier), 0) FROM squad_tour_points_ledger e
+                        WHERE e.tour_id = st.tour_id AND e.squad_tour_id = st.id),
+                       (SELECT s.total_net_points FROM squad_standings s WHERE s.squad_id = st.squad_id),
+                       (SELECT r.total_net_points FROM squad_tour_ranks r
+                        WHERE r.tour_id = st.tour_id AND r.squad_id = st.squad_id),
+                       (SELECT (d.document ->> 'points')::int FROM squad_tour_documents d
+                        WHERE d.tour_id = st.tour_id AND d.squad_id = st.squad_id)
+                FROM squad_tours st
+                WHERE st.tour_id = :base
+            """), {"base": BASE})).all()
+        }
+
+
+def _expected_points(player_points: list[int]) -> dict[int, int]:
+    points_by_player = dict(zip(MAIN_IDS + BENCH_IDS, player_points))
+    expected = {}
+    for n, lineup in enumerate(SQUAD_LINEUPS):
+        points = squad_tour_match_points(
+            main_player_ids=MAIN_IDS, bench_player_ids=BENCH_IDS, **lineup, player_points=points_by_player,
+        )
+        expected[BASE + n] = points if points > 0 else 0
+    return expected
+
+
+async def _assert_points_match_ledger(player_points: list[int]):
+    points = await _squad_tour_points()
+    assert {squad_id: row[0] for squad_id, row in points.items()} == _expected_points(player_points)
+    for squad_id, row in points.items():
+        assert len(set(row)) == 1, (squad_id, row)
+
+
+def _run_db(scenario):
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        pytest.skip("seeds the database; set MODE=TEST")
+
+    async def wrapped():
+        engine.echo = False
+        try:
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except (OSError, ConnectionError) as e:
+                pytest.skip(f"database is not available: {e}")
+            await _cleanup()
+            await _seed()
+            try:
+                await scenario()
+            finally:
+                await _cleanup()
+        finally:
+            # у каждого asyncio.run свой loop, соединения пула к нему привязаны
+            await engine.dispose()
+
+    asyncio.run(wrapped())
+
+
+def test_finalize_tour_keeps_ledger_points():
+    from app.matches.services import MatchService
+    from app.squads.services import SquadService
+
+    # капитан и бусты дают разные суммы
+    assert len(set(_expected_points(MATCH_POINTS).values())) == len(SQUAD_LINEUPS)
+
+    async def scenario():
+        await MatchService.finalize_match(BASE)
+        await SquadService.finalize_tour_for_all_squads(BASE)
+        await _assert_points_match_ledger(MATCH_POINTS)
+
+    _run_db(scenario)
+
+
+def test_rescore_after_finalize_tour():
+    from app.matches.services import MatchService
+    from app.squads.services import SquadService
+
+    assert _expected_points(RESCORED_POINTS) != _expected_points(MATCH_POINTS)
+
+    async def scenario():
+        await MatchService.finalize_match(BASE)
+        await SquadService.finalize_tour_for_all_squads(BASE)
+        async with async_session_maker() as session:
+            await session.execute(
+                text("UPDATE player_match_stats SET points = :points WHERE match_id = :base AND player_id = :player_id"),
+                [{"base": BASE, "player_id": BASE + n, "points": points} for n, points in enumerate(RESCORED_POINTS)],
+            )
+            await session.commit()
+
+        await MatchService.rescore_match(BASE)
+        await _assert_points_match_ledger(RESCORED_POINTS)
+        # повторный пересчёт ничего не меняет
+        assert (await MatchService.rescore_match(BASE))["updated_squad_tours"] == 0
+        await _assert_points_match_ledger(RESCORED_POINTS)
+
+    _run_db(scenario)
+
+
+if __name__ == "__main__":
+    test_rescore_requires_admin()
+    test_rescore_negative_sum_matches_finalize()
+    test_ledger_rows_sum_to_squad_tour_points()
+    test_finalize_tour_keeps_ledger_points()
+    test_rescore_after_finalize_tour()
+    print("OK")
@@ -0,0 +1,97 @@
+"""
+Проверка отсоединения секций туров (нужен PostgreSQL с применёнными миграциями).
+
+У идущей лиги первые туры завершены, а следующий — в другой секции — нет:
+секция её завершённых туров остаётся на месте. Когда лига закончена,
+та же секция отсоединяется. Лига, туры и секции создаются и удаляются
+тестом. Без доступной БД (или не в MODE=TEST) тест пропускается.
+
+Запуск: MODE=TEST pytest test_partitions.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.partitions import TOUR_TABLES, detach_league_partition, detach_tour_partitions, list_partitions
+
+LEAGUE_ID = 930_000_000
+EARLY_TOURS = [LEAGUE_ID, LEAGUE_ID + 1]  # секция [LEAGUE_ID, LEAGUE_ID + 100)
+LATER_TOUR = LEAGUE_ID + 100  # следующая секция
+
+
+async def _tour_partitions() -> set[int]:
+    async with engine.connect() as conn:
+        return {
+            partition.lower_tour_id for partition in await list_partitions(conn)
+            if partition.parent in TOUR_TABLES and partition.lower_tour_id >= LEAGUE_ID
+        }
+
+
+async def _cleanup():
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM tours WHERE league_id = :id"), {"id": LEAGUE_ID})
+        await conn.execute(text("DELETE FROM leagues WHERE id = :id"), {"id": LEAGUE_ID})
+    # туров не осталось — секции никому не принадлежат
+    await detach_tour_partitions(LEAGUE_ID + 1_000, drop=True, from_tour_id=LEAGUE_ID)
+    await detach_league_partition(LEAGUE_ID, drop=True)
+
+
+async def _scenario():
+    engine.echo = False
+    try:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (OSError, ConnectionError) as e:
+            pytest.skip(f"database is not available: {e}")
+
+        await _cleanup()
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("INSERT INTO leagues (id, name, sport) VALUES (:id, 'partitions-check', 'football')"),
+                {"id": LEAGUE_ID},
+            )
+            for number, tour_id in enumerate([*EARLY_TOURS, LATER_TOUR]):
+                await conn.execute(
+                    text("INSERT INTO tours (id, number, league_id, is_started, is_finalized) "
+                         "VALUES (:id, :number, :league_id, :done, :done)"),
+                    {"id": tour_id, "number": number + 1, "league_id": LEAGUE_ID, "done": tour_id in EARLY_TOURS},
+                )
+        try:
+            assert await _tour_partitions() == {LEAGUE_ID, LATER_TOUR}
+
+            with pytest.raises(ValueError, match=str(LEAGUE_ID)):
+                await detach_tour_partitions(LATER_TOUR, from_tour_id=LEAGUE_ID)
+            assert await _tour_partitions() == {LEAGUE_ID, LATER_TOUR}
+
+            async with engine.begin() as conn:
+                await conn.execute(text("UPDATE tours SET is_started = true, is_finalized = true WHERE id = :id"),
+                                   {"id": LATER_TOUR})
+            detached = await detach_tour_partitions(LATER_TOUR, drop=True, from_tour_id=LEAGUE_ID)
+            assert sorted(detached) == sorted(f"{table}_p{LEAGUE_ID}" for table in TOUR_TABLES)
+            assert await _tour_partitions() == {LATER_TOUR}
+        finally:
+            await _cleanup()
+    finally:
+        # у каждого asyncio.run свой loop, соединения пула к нему привязаны
+        await engine.dispose()
+
+
+def test_running_league_keeps_its_finalized_tours():
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        pytest.skip("seeds the database; set MODE=TEST")
+    asyncio.run(_scenario())
+
+
+if __name__ == "__main__":
+    test_running_league_keeps_its_finalized_tours()
+    print("OK")
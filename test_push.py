@@ -0,0 +1,129 @@
+"""
+Проверка push-обновлений (без сети и БД).
+
+- /api/push/stream требует авторизации: без токена 401, чужой состав
+  и user-лига без состава пользователя — 403.
+- Чтение live-очков (get_by_squad) обновляет кэш LiveScoring, но ничего
+  не рассылает; рассылка идёт из пути импорта статистики (publish)
+  и включает изменения, накопленные между публикациями.
+
+Запуск: python test_push.py  (или pytest test_push.py)
+"""
+
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.push import router as push_router_module
+from app.squad_tours import live as live_module
+from app.squad_tours.live import LiveScoring
+from app.users.dependencies import get_current_user
+
+TOUR_ID = 7
+MATCH_ID = 70
+SQUAD_ID = 10
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+
+class FakeSession:
+    """Отдаёт заранее заготовленные результаты запросов по порядку."""
+
+    def __init__(self, results: list):
+        self.results = results
+
+    async def execute(self, statement):
+        return FakeResult(self.results.pop(0))
+
+
+def _session_maker(results: list):
+    @asynccontextmanager
+    async def session_maker():
+        yield FakeSession(results)
+
+    return session_maker
+
+
+def test_stream_requires_auth():
+    original = push_router_module.async_session_maker
+    app = FastAPI()
+    app.include_router(push_router_module.router, prefix="/api")
+    client = TestClient(app)
+    try:
+        assert client.get("/api/push/stream", params={"tour_id": TOUR_ID}).status_code == 401
+
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+        # у пользователя один состав 5, он состоит только в user-лиге 3
+        push_router_module.async_session_maker = _session_maker([[5]])
+        assert client.get("/api/push/stream", params={"squad_id": SQUAD_ID}).status_code == 403
+        push_router_module.async_session_maker = _session_maker([[5], [3]])
+        response = client.get("/api/push/stream", params={"user_league_id": [3, 4]})
+        assert response.status_code == 403
+    finally:
+        push_router_module.async_session_maker = original
+
+
+def test_reads_do_not_publish():
+    lineup = SimpleNamespace(
+        id=100, squad_id=SQUAD_ID, tour_id=TOUR_ID, points=3, captain_id=None,
+        vice_captain_id=None, used_boost=None, main_player_ids=[1, 2], bench_player_ids=[3],
+    )
+    scoring = LiveScoring(refresh_interval=0)
+    published = []
+
+    async def notify(squad_tours):
+        published.append({squad_tour.squad_id: squad_tour.provisional_points for squad_tour in squad_tours})
+
+    scoring._notify = notify
+    original = live_module.async_session_maker
+
+    def queries(points: int, rebuild: bool = False) -> list:
+        # порядок запросов refresh: туры, матчи, [составы при перестроении], статистика
+        return [[TOUR_ID], [(MATCH_ID, TOUR_ID)], *([[lineup]] if rebuild else []), [(MATCH_ID, 1, points)]]
+
+    async def scenario():
+        live_module.async_session_maker = _session_maker(queries(5, rebuild=True))
+        assert (await scoring.get_by_squad(SQUAD_ID)).provisional_points == 8
+        assert published == []
+
+        live_module.async_session_maker = _session_maker(queries(5))
+        await scoring.publish()
+        assert published == [{SQUAD_ID: 8}]
+
+        # изменение, замеченное чтением, уходит со следующей публикацией
+        live_module.async_session_maker = _session_maker(queries(7))
+        assert (await scoring.get_by_squad(SQUAD_ID)).provisional_points == 10
+        live_module.async_session_maker = _session_maker(queries(7))
+        await scoring.publish()
+        assert published == [{SQUAD_ID: 8}, {SQUAD_ID: 10}]
+
+        live_module.async_session_maker = _session_maker(queries(7))
+        await scoring.publish()
+        assert len(published) == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        live_module.async_session_maker = original
+
+
+if __name__ == "__main__":
+    test_stream_requires_auth()
+    test_reads_do_not_publish()
+    print("OK")
@@ -0,0 +1,54 @@
+"""
+Проверка планов горячих запросов (нужен PostgreSQL с применёнными миграциями).
+
+Тот же прогон, что benchmarks/query_plans.py: синтетическая лига в
+откатываемой транзакции, EXPLAIN каждого запроса; тест падает, если запрос
+перестал использовать свой индекс, ушёл в seq scan большой таблицы или
+читает лишние секции. Без доступной БД (или не в MODE=TEST) тест
+пропускается.
+
+Запуск: MODE=TEST pytest test_query_plans.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+
+SQUADS = 2_000
+
+
+async def _check() -> list[str]:
+    from query_plans import check_plans
+
+    engine.echo = False
+    try:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (OSError, ConnectionError) as e:
+            pytest.skip(f"database is not available: {e}")
+        return await check_plans(SQUADS)
+    finally:
+        # у каждого asyncio.run свой loop, соединения пула к нему привязаны
+        await engine.dispose()
+
+
+def test_hot_queries_use_their_indexes():
+    if settings.MODE not in ("TEST", "DEV", "LOCAL"):
+        pytest.skip("seeds the database; set MODE=TEST")
+    assert asyncio.run(_check()) == []
+
+
+if __name__ == "__main__":
+    test_hot_queries_use_their_indexes()
+    print("OK")
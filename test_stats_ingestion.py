@@ -0,0 +1,124 @@
+"""
+Проверка импорта live-статистики на записанных ответах API (без сети и БД).
+
+Ответы лежат в fixtures/external_api (формат API-Football):
+- 1035001 — завершённый матч (FT)
+- 1035002 — идёт второй тайм (2H)
+
+Запуск: python test_stats_ingestion.py  (или pytest test_stats_ingestion.py)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.player_match_stats.services import (
+    FINISHED_STATUSES,
+    PlayerMatchStatsService,
+    fixture_players_to_rows,
+)
+from app.utils.batch_scoring import columns_from_statistics, score_batch
+from app.utils.count_points import calculate_points
+from app.utils.external_api import ExternalAPIClient
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "external_api"
+
+
+def _replay_client() -> ExternalAPIClient:
+    client = ExternalAPIClient()
+    client.fixtures_dir = str(FIXTURES_DIR)
+    return client
+
+
+async def _load(fixture_id: int):
+    client = _replay_client()
+    fixture = await client.fetch_fixture(fixture_id)
+    teams = await client.fetch_fixture_players(fixture_id)
+    return fixture, fixture_players_to_rows(fixture_id, 235, teams)
+
+
+def test_finished_match_rows_and_points():
+    fixture, rows = asyncio.run(_load(1035001))
+    assert fixture["fixture"]["status"]["short"] in FINISHED_STATUSES
+
+    points = {row["player_id"]: row["points"] for row in rows}
+    assert points == {
+        1: 1,    # вратарь, пропустил — без бонуса за сухой матч
+        2: 5,    # 90 мин + гол - жёлтая
+        3: 4,    # 75 мин + передача
+        4: 0,    # 15 мин
+        5: 0,    # не вышел
+        21: 1,
+        22: 0,   # красная, очки не уходят в минус
+        23: 0,   # незабитый пенальти
+        24: 6,
+        999999: 0,
+    }
+    by_player = {row["player_id"]: row for row in rows}
+    assert by_player[1]["position"] == "Goalkeeper"
+    assert by_player[2]["team_id"] == 1 and by_player[24]["team_id"] == 2
+    assert by_player[2]["goals_total"] == 1 and by_player[2]["yellow_cards"] == 1
+    assert by_player[22]["red_cards"] == 1
+    assert by_player[5]["minutes_played"] == 0
+    assert all(row["match_id"] == 1035001 and row["league_id"] == 235 for row in rows)
+
+
+def test_live_match_rows_and_points():
+    fixture, rows = asyncio.run(_load(1035002))
+    status = fixture["fixture"]["status"]
+    assert status["short"] not in FINISHED_STATUSES
+    assert status["elapsed"] == 67
+
+    points = {row["player_id"]: row["points"] for row in rows}
+    assert points == {41: 11, 42: 6, 61: 1, 62: 0}
+
+
+def test_batch_scoring_matches_calculate_points():
+    statistics = []
+    for fixture_id in (1035001, 1035002):
+        client = _replay_client()
+        for team in asyncio.run(client.fetch_fixture_players(fixture_id)):
+            for entry in team["players"]:
+                stats = entry["statistics"][0]
+                games = {**stats["games"], "position": {"G": "Goalkeeper"}.get(stats["games"]["position"])}
+                statistics.append({**stats, "games": games})
+    statistics += [
+        {"games": {"minutes": 90, "position": "Goalkeeper"}, "goals": {"conceded": None}},
+        {"games": {"minutes": 59, "position": "Goalkeeper"}, "goals": {"conceded": 0}},
+        {"games": {"minutes": None}, "cards": {"yellowred": 1}, "penalty": {"missed": 1}},
+    ]
+    points = score_batch(columns_from_statistics(statistics))
+    assert points.tolist() == [calculate_points(stats) for stats in statistics]
+
+
+def test_failed_match_does_not_stop_ingestion():
+    calls = []
+
+    async def ingest_match(match_id: int) -> dict:
+        calls.append(match_id)
+        if match_id == 2:
+            raise TypeError("'NoneType' object is not subscriptable")  # кривой ответ API
+        if match_id == 3:
+            raise RuntimeError("IntegrityError")
+        return {"match_id": match_id, "status": "2H", "changed": 1, "finalized": False}
+
+    original = PlayerMatchStatsService.ingest_match
+    PlayerMatchStatsService.ingest_match = ingest_match
+    try:
+        results = asyncio.run(PlayerMatchStatsService.ingest_matches([1, 2, 3, 4]))
+    finally:
+        PlayerMatchStatsService.ingest_match = original
+
+    assert calls == [1, 2, 3, 4]
+    assert [result["match_id"] for result in results] == [1, 2, 3, 4]
+    assert ["error" in result for result in results] == [False, True, True, False]
+
+
+if __name__ == "__main__":
+    test_finished_match_rows_and_points()
+    test_live_match_rows_and_points()
+    test_batch_scoring_matches_calculate_points()
+    test_failed_match_does_not_stop_ingestion()
+    print("OK")
@@ -0,0 +1,97 @@
+"""
+Проверка пайплайна перевода имён на заглушке backend (без сети и БД).
+
+Заглушка блокирует поток через time.sleep, как настоящий HTTP-клиент:
+event loop при этом должен продолжать работать, а одновременных вызовов
+не больше TRANSLATION_MAX_WORKERS.
+
+Запуск: python test_translation.py  (или pytest test_translation.py)
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.translations.pipeline import translate_missing
+
+
+class StubBackend:
+    def __init__(self, delay: float = 0.05, fail_on: tuple = (), broken_batch_with: str = ""):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.broken_batch_with = broken_batch_with
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.broken_batch_with in texts:
+                raise RuntimeError("backend unavailable")
+            return [None if text in self.fail_on else text.upper() for text in texts]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _names(count: int) -> list[str]:
+    return [f"name-{n}" for n in range(count)]
+
+
+def test_batches_and_results():
+    names = _names(settings.TRANSLATION_BATCH_SIZE * 3 + 1)
+    backend = StubBackend(delay=0)
+    translated = asyncio.run(translate_missing(names, backend))
+
+    assert translated == {name: name.upper() for name in names}
+    assert [len(batch) for batch in backend.batches].count(settings.TRANSLATION_BATCH_SIZE) == 3
+    assert sorted(name for batch in backend.batches for name in batch) == sorted(names)
+
+
+def test_failures_are_skipped():
+    names = _names(settings.TRANSLATION_BATCH_SIZE * 2)
+    broken = names[-1]
+    backend = StubBackend(delay=0, fail_on=(names[0],), broken_batch_with=broken)
+    translated = asyncio.run(translate_missing(names, backend))
+
+    assert names[0] not in translated
+    assert broken not in translated
+    # вторая пачка упала целиком, первая — без одного имени
+    assert len(translated) == settings.TRANSLATION_BATCH_SIZE - 1
+
+
+def test_event_loop_not_blocked_and_pool_bounded():
+    names = _names(settings.TRANSLATION_BATCH_SIZE * settings.TRANSLATION_MAX_WORKERS * 2)
+    backend = StubBackend(delay=0.05)
+
+    async def run():
+        ticks = 0
+        task = asyncio.create_task(translate_missing(names, backend))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        return ticks, task.result()
+
+    ticks, translated = asyncio.run(run())
+    assert len(translated) == len(names)
+    # 2 волны по 50ms: loop успевает сделать десятки итераций
+    assert ticks >= 10, ticks
+    assert 1 < backend.peak <= settings.TRANSLATION_MAX_WORKERS, backend.peak
+
+
+if __name__ == "__main__":
+    test_batches_and_results()
+    test_failures_are_skipped()
+    test_event_loop_not_blocked_and_pool_bounded()
+    print("OK")